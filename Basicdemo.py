@@ -1,13 +1,23 @@
 import os
 import sys
+import threading
 import numpy as np
 from os import getcwd
 import cv2
-import msvcrt
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
 from ctypes import *
  
 sys.path.append("../MvImport")
 from MvCameraControl_class import *
+from PixelType_registry import PixelFormatResolver
+from Bayer_demosaic import BayerDemosaicer, DEMOSAIC_BILINEAR
+from Image_writer import ImageWriter, IMAGE_FORMAT_BMP
+from MvNodeCache import MvNodeCache, NODE_INT, NODE_FLOAT, NODE_ENUM, NODE_BOOL, NODE_STRING
+from MvParamBatch import apply_parameters
+from Callback_ring import CallbackFrameRing
  
  
 # 枚举设备
@@ -225,61 +235,25 @@ def open_device(cam):
         print("open device fail! ret[0x%x]" % ret)
         sys.exit()
  
+# get_Value 的节点类型 -> 节点缓存类型
+PARAM_NODE_TYPES = {"int_value": NODE_INT, "float_value": NODE_FLOAT, "enum_value": NODE_ENUM,
+                    "bool_value": NODE_BOOL, "string_value": NODE_STRING}
+ 
 # 获取各种类型节点参数
 def get_Value(cam , param_type = "int_value" , node_name = "PayloadSize"):
     """
-    :param cam:            相机实例
+    :param cam:            相机实例 (MvNodeCache,重复读取同一节点时不再访问相机)
     :param_type:           获取节点值得类型
     :param node_name:      节点名 可选 int 、float 、enum 、bool 、string 型节点
     :return:               节点值
     """
-    if param_type == "int_value":
-        stParam = MVCC_INTVALUE_EX()
-        memset(byref(stParam), 0, sizeof(MVCC_INTVALUE_EX))
-        ret = cam.MV_CC_GetIntValueEx(node_name, stParam)
-        if ret != 0:
-            print("获取 int 型数据 %s 失败 ! 报错码 ret[0x%x]" % (node_name , ret))
-            sys.exit()
-        int_value = stParam.nCurValue
-        return int_value
- 
-    elif param_type == "float_value":
-        stFloatValue = MVCC_FLOATVALUE()
-        memset(byref(stFloatValue), 0, sizeof(MVCC_FLOATVALUE))
-        ret = cam.MV_CC_GetFloatValue( node_name , stFloatValue)
-        if ret != 0:
-            print("获取 float 型数据 %s 失败 ! 报错码 ret[0x%x]" % (node_name , ret))
-            sys.exit()
-        float_value = stFloatValue.fCurValue
-        return float_value
- 
-    elif param_type == "enum_value":
-        stEnumValue = MVCC_ENUMVALUE()
-        memset(byref(stEnumValue), 0, sizeof(MVCC_ENUMVALUE))
-        ret = cam.MV_CC_GetEnumValue(node_name, stEnumValue)
-        if ret != 0:
-            print("获取 enum 型数据 %s 失败 ! 报错码 ret[0x%x]" % (node_name , ret))
-            sys.exit()
-        enum_value = stEnumValue.nCurValue
-        return enum_value
- 
-    elif param_type == "bool_value":
-        stBool = c_bool(False)
-        ret = cam.MV_CC_GetBoolValue(node_name, stBool)
-        if ret != 0:
-            print("获取 bool 型数据 %s 失败 ! 报错码 ret[0x%x]" % (node_name , ret))
-            sys.exit()
-        return stBool.value
- 
-    elif param_type == "string_value":
-        stStringValue =  MVCC_STRINGVALUE()
-        memset(byref(stStringValue), 0, sizeof( MVCC_STRINGVALUE))
-        ret = cam.MV_CC_GetStringValue(node_name, stStringValue)
-        if ret != 0:
-            print("获取 string 型数据 %s 失败 ! 报错码 ret[0x%x]" % (node_name , ret))
-            sys.exit()
-        string_value = stStringValue.chCurValue
-        return string_value
+    if not isinstance(cam, MvNodeCache):
+        cam = MvNodeCache(cam)
+    ret, value = cam.get_value(node_name, PARAM_NODE_TYPES[param_type])
+    if ret != 0:
+        print("获取 %s 型数据 %s 失败 ! 报错码 ret[0x%x]" % (param_type.split("_")[0], node_name , ret))
+        sys.exit()
+    return value
  
 # 设置各种类型节点参数
 def set_Value(cam , param_type = "int_value" , node_name = "PayloadSize" , node_value = None):
@@ -297,7 +271,7 @@ def set_Value(cam , param_type = "int_value" , node_name = "PayloadSize" , node_
     """
     if param_type == "int_value":
         stParam = int(node_value)
-        ret = cam.MV_CC_SetIntValueEx(node_name, stParam)
+        ret = cam.MV_CC_SetIntValue(node_name, stParam)
         if ret != 0:
             print("设置 int 型数据节点 %s 失败 ! 报错码 ret[0x%x]" % (node_name , ret))
             sys.exit()
@@ -334,6 +308,22 @@ def set_Value(cam , param_type = "int_value" , node_name = "PayloadSize" , node_
             sys.exit()
         print("设置 string 型数据节点 %s 成功 ！设置值为 %s !" % (node_name, node_value))
  
+# 批量设置节点参数,按依赖顺序写入,值未变的节点跳过,失败时回滚已写入的节点
+def set_Values(cam , node_values):
+    """
+    :param cam:               相机实例 (MvNodeCache)
+    :param node_values:       {节点名: 值},类型见 MvParamBatch.NODE_TYPES,也可写成 {节点名: (节点类型, 值)}
+    :return:                  ret,失败时不退出程序
+    """
+    if not isinstance(cam, MvNodeCache):
+        cam = MvNodeCache(cam)
+    ret, report = apply_parameters(cam, node_values)
+    if ret != 0:
+        print("设置节点 %s 失败 ! 报错码 ret[0x%x] , 已回滚 %s" % (report["failed"], ret, report["rolled_back"]))
+    else:
+        print("设置 %d 个节点成功 , 跳过 %d 个未变化的节点 , 耗时 %.1f ms" % (len(report["written"]), len(report["skipped"]), report["ms"]))
+    return ret
+ 
 # 寄存器读写
 def read_or_write_memory(cam , way = "read"):
     if way == "read":
@@ -387,30 +377,25 @@ def set_grab_strategy(cam , grabstrategy = 0 , outputqueuesize = 1):
             print("设置 输出缓存个数为 %d  ，设置成功!" % outputqueuesize)
  
 # 显示图像
+# ch:预览图后台写入,写图线程忙时丢弃本帧,不阻塞取流 | en:The preview file is written in the background; while the writer is busy the frame is skipped instead of stalling the grab loop
+preview_writer = ImageWriter(nWorkers=1, nQueueSize=1)
 def image_show(image , name):
     image = cv2.resize(image, (600, 400), interpolation=cv2.INTER_AREA)
     name = str(name)
     cv2.imshow(name, image)
-    cv2.imwrite("name.bmp", image)
+    preview_writer.submit("name.bmp", image, IMAGE_FORMAT_BMP)
     k = cv2.waitKey(1) & 0xff
  
 # 需要显示的图像数据转换
+# ch:格式不变时复用上一帧解析出的转换函数 | en:Reuses the converter resolved for the previous frame while the format is unchanged
+pixel_resolver = PixelFormatResolver(BayerDemosaicer(DEMOSAIC_BILINEAR))
 def image_control(data , stFrameInfo):
-    if stFrameInfo.enPixelType == 17301505:
-        image = data.reshape((stFrameInfo.nHeight, stFrameInfo.nWidth))
-        image_show(image=image , name = stFrameInfo.nHeight)
-    elif stFrameInfo.enPixelType == 17301514:
-        data = data.reshape(stFrameInfo.nHeight, stFrameInfo.nWidth, -1)
-        image = cv2.cvtColor(data, cv2.COLOR_BAYER_GB2RGB)
-        image_show(image=image, name = stFrameInfo.nHeight)
-    elif stFrameInfo.enPixelType == 35127316:
-        data = data.reshape(stFrameInfo.nHeight, stFrameInfo.nWidth, -1)
-        image = cv2.cvtColor(data, cv2.COLOR_RGB2BGR)
-        image_show(image=image, name = stFrameInfo.nHeight)
-    elif stFrameInfo.enPixelType == 34603039:
-        data = data.reshape(stFrameInfo.nHeight, stFrameInfo.nWidth, -1)
-        image = cv2.cvtColor(data, cv2.COLOR_YUV2BGR_Y422)
-        image_show(image = image, name = stFrameInfo.nHeight)
+    stFormat = pixel_resolver.resolve(stFrameInfo.enPixelType)
+    if stFormat is None or pixel_resolver.converter is None:
+        print("unsupported pixel type[0x%x]" % stFrameInfo.enPixelType)
+        return
+    image = pixel_resolver.converter(data, stFrameInfo.nWidth, stFrameInfo.nHeight)
+    image_show(image=image, name = stFrameInfo.nHeight)
  
 # 主动图像采集
 def access_get_image(cam , active_way = "getImagebuffer"):
@@ -420,42 +405,21 @@ def access_get_image(cam , active_way = "getImagebuffer"):
     :return:
     """
     if active_way == "getImagebuffer":
-        stOutFrame = MV_FRAME_OUT()
-        memset(byref(stOutFrame), 0, sizeof(stOutFrame))
         while True:
-            ret = cam.MV_CC_GetImageBuffer(stOutFrame, 1000)
-            if None != stOutFrame.pBufAddr and 0 == ret and stOutFrame.stFrameInfo.enPixelType == 17301505:
-                print("get one frame: Width[%d], Height[%d], nFrameNum[%d]" % (stOutFrame.stFrameInfo.nWidth, stOutFrame.stFrameInfo.nHeight, stOutFrame.stFrameInfo.nFrameNum))
-                pData = (c_ubyte * stOutFrame.stFrameInfo.nWidth * stOutFrame.stFrameInfo.nHeight)()
-                cdll.msvcrt.memcpy(byref(pData), stOutFrame.pBufAddr,stOutFrame.stFrameInfo.nWidth * stOutFrame.stFrameInfo.nHeight)
-                data = np.frombuffer(pData, count=int(stOutFrame.stFrameInfo.nWidth * stOutFrame.stFrameInfo.nHeight),dtype=np.uint8)
-                image_control(data=data, stFrameInfo=stOutFrame.stFrameInfo)
-            elif None != stOutFrame.pBufAddr and 0 == ret and stOutFrame.stFrameInfo.enPixelType == 17301514:
-                print("get one frame: Width[%d], Height[%d], nFrameNum[%d]" % (stOutFrame.stFrameInfo.nWidth, stOutFrame.stFrameInfo.nHeight, stOutFrame.stFrameInfo.nFrameNum))
-                pData = (c_ubyte * stOutFrame.stFrameInfo.nWidth * stOutFrame.stFrameInfo.nHeight)()
-                cdll.msvcrt.memcpy(byref(pData), stOutFrame.pBufAddr,stOutFrame.stFrameInfo.nWidth * stOutFrame.stFrameInfo.nHeight)
-                data = np.frombuffer(pData, count=int(stOutFrame.stFrameInfo.nWidth * stOutFrame.stFrameInfo.nHeight),dtype=np.uint8)
-                image_control(data=data, stFrameInfo=stOutFrame.stFrameInfo)
-            elif None != stOutFrame.pBufAddr and 0 == ret and stOutFrame.stFrameInfo.enPixelType == 35127316:
-                print("get one frame: Width[%d], Height[%d], nFrameNum[%d]" % (stOutFrame.stFrameInfo.nWidth, stOutFrame.stFrameInfo.nHeight, stOutFrame.stFrameInfo.nFrameNum))
-                pData = (c_ubyte * stOutFrame.stFrameInfo.nWidth * stOutFrame.stFrameInfo.nHeight*3)()
-                cdll.msvcrt.memcpy(byref(pData), stOutFrame.pBufAddr,stOutFrame.stFrameInfo.nWidth * stOutFrame.stFrameInfo.nHeight*3)
-                data = np.frombuffer(pData, count=int(stOutFrame.stFrameInfo.nWidth * stOutFrame.stFrameInfo.nHeight*3),dtype=np.uint8)
-                image_control(data=data, stFrameInfo=stOutFrame.stFrameInfo)
-            elif None != stOutFrame.pBufAddr and 0 == ret and stOutFrame.stFrameInfo.enPixelType == 34603039:
-                print("get one frame: Width[%d], Height[%d], nFrameNum[%d]" % (stOutFrame.stFrameInfo.nWidth, stOutFrame.stFrameInfo.nHeight, stOutFrame.stFrameInfo.nFrameNum))
-                pData = (c_ubyte * stOutFrame.stFrameInfo.nWidth * stOutFrame.stFrameInfo.nHeight * 2)()
-                cdll.msvcrt.memcpy(byref(pData), stOutFrame.pBufAddr,stOutFrame.stFrameInfo.nWidth * stOutFrame.stFrameInfo.nHeight * 2)
-                data = np.frombuffer(pData, count=int(stOutFrame.stFrameInfo.nWidth * stOutFrame.stFrameInfo.nHeight * 2),dtype=np.uint8)
-                image_control(data=data, stFrameInfo=stOutFrame.stFrameInfo)
-            else:
+            # ch:零拷贝访问SDK缓存,with块结束时自动FreeImageBuffer | en:Zero-copy access to the SDK buffer, freed when the with block exits
+            ret, stFrame = cam.GetFrameView(1000)
+            if ret != 0:
                 print("no data[0x%x]" % ret)
-            nRet = cam.MV_CC_FreeImageBuffer(stOutFrame)
+                continue
+            with stFrame:
+                stFrameInfo = stFrame.stFrameInfo
+                print("get one frame: Width[%d], Height[%d], nFrameNum[%d]" % (stFrameInfo.nWidth, stFrameInfo.nHeight, stFrameInfo.nFrameNum))
+                image_control(data=stFrame.data, stFrameInfo=stFrameInfo)
  
     elif active_way == "getoneframetimeout":
-        stParam = MVCC_INTVALUE_EX()
-        memset(byref(stParam), 0, sizeof(MVCC_INTVALUE_EX))
-        ret = cam.MV_CC_GetIntValueEx("PayloadSize", stParam)
+        stParam = MVCC_INTVALUE()
+        memset(byref(stParam), 0, sizeof(MVCC_INTVALUE))
+        ret = cam.MV_CC_GetIntValue("PayloadSize", stParam)
         if ret != 0:
             print("get payload size fail! ret[0x%x]" % ret)
             sys.exit()
@@ -473,41 +437,19 @@ def access_get_image(cam , active_way = "getImagebuffer"):
                 print("no data[0x%x]" % ret)
  
 # 回调取图采集
-winfun_ctype = WINFUNCTYPE
-stFrameInfo = POINTER(MV_FRAME_OUT_INFO_EX)
-pData = POINTER(c_ubyte)
-FrameInfoCallBack = winfun_ctype(None, pData, stFrameInfo, c_void_p)
-def image_callback(pData, pFrameInfo, pUser):
-    global img_buff
-    img_buff = None
-    stFrameInfo = cast(pFrameInfo, POINTER(MV_FRAME_OUT_INFO_EX)).contents
-    if stFrameInfo:
+# ch:回调只把帧拷入预分配的环形缓存,转换/显示/保存在消费线程中进行,不阻塞SDK的出图线程 | en:The callback only copies the frame into a preallocated ring; conversion, display and saving run on a consumer thread so the SDK's delivery thread is never blocked
+winfun_ctype = MV_FUNCTYPE
+callback_ring = None
+callback_consumer = None
+def image_consumer(ring):
+    buf = np.empty(ring.nPayloadSize, np.uint8)
+    nSeq = 0
+    while not ring.bClosed:
+        ret, nSeq, data, stFrameInfo = ring.read(nSeq + 1, fTimeout=1.0, out=buf)
+        if ret != 0:
+            continue
         print ("get one frame: Width[%d], Height[%d], nFrameNum[%d]" % (stFrameInfo.nWidth, stFrameInfo.nHeight, stFrameInfo.nFrameNum))
-    if img_buff is None and stFrameInfo.enPixelType == 17301505:
-        img_buff = (c_ubyte * stFrameInfo.nWidth*stFrameInfo.nHeight)()
-        cdll.msvcrt.memcpy(byref(img_buff) , pData , stFrameInfo.nWidth*stFrameInfo.nHeight)
-        data = np.frombuffer(img_buff , count = int(stFrameInfo.nWidth*stFrameInfo.nHeight) , dtype = np.uint8)
-        image_control(data=data, stFrameInfo=stFrameInfo)
-        del img_buff
-    elif img_buff is None and stFrameInfo.enPixelType == 17301514:
-        img_buff = (c_ubyte * stFrameInfo.nWidth*stFrameInfo.nHeight)()
-        cdll.msvcrt.memcpy(byref(img_buff) , pData , stFrameInfo.nWidth*stFrameInfo.nHeight)
-        data = np.frombuffer(img_buff , count = int(stFrameInfo.nWidth*stFrameInfo.nHeight) , dtype = np.uint8)
-        image_control(data=data, stFrameInfo=stFrameInfo)
-        del img_buff
-    elif img_buff is None and stFrameInfo.enPixelType == 35127316:
-        img_buff = (c_ubyte * stFrameInfo.nWidth * stFrameInfo.nHeight*3)()
-        cdll.msvcrt.memcpy(byref(img_buff), pData, stFrameInfo.nWidth * stFrameInfo.nHeight*3)
-        data = np.frombuffer(img_buff, count=int(stFrameInfo.nWidth * stFrameInfo.nHeight*3), dtype=np.uint8)
         image_control(data=data, stFrameInfo=stFrameInfo)
-        del img_buff
-    elif img_buff is None and stFrameInfo.enPixelType == 34603039:
-        img_buff = (c_ubyte * stFrameInfo.nWidth * stFrameInfo.nHeight * 2)()
-        cdll.msvcrt.memcpy(byref(img_buff), pData, stFrameInfo.nWidth * stFrameInfo.nHeight * 2)
-        data = np.frombuffer(img_buff, count=int(stFrameInfo.nWidth * stFrameInfo.nHeight * 2), dtype=np.uint8)
-        image_control(data=data, stFrameInfo=stFrameInfo)
-        del img_buff
-CALL_BACK_FUN = FrameInfoCallBack(image_callback)
  
 # 事件回调
 stEventInfo = POINTER(MV_EVENT_OUT_INFO)
@@ -524,12 +466,22 @@ def event_callback(pEventInfo, pUser):
 CALL_BACK_FUN_2 = EventInfoCallBack(event_callback)
  
 # 注册回调取图
-def call_back_get_image(cam):
-    # ch:注册抓图回调 | en:Register image callback
-    ret = cam.MV_CC_RegisterImageCallBackEx(CALL_BACK_FUN, None)
+def call_back_get_image(cam , slots = 8):
+    global callback_ring, callback_consumer
+    # ch:按PayloadSize预分配环形缓存后注册抓图回调 | en:Preallocate the ring from PayloadSize, then register the image callback
+    stParam = MVCC_INTVALUE()
+    memset(byref(stParam), 0, sizeof(MVCC_INTVALUE))
+    ret = cam.MV_CC_GetIntValue("PayloadSize", stParam)
+    if ret != 0:
+        print("get payload size fail! ret[0x%x]" % ret)
+        sys.exit()
+    callback_ring = CallbackFrameRing(stParam.nCurValue, nSlots=slots)
+    ret = callback_ring.register(cam)
     if ret != 0:
         print("register image callback fail! ret[0x%x]" % ret)
         sys.exit()
+    callback_consumer = threading.Thread(target=image_consumer, args=(callback_ring,), daemon=True)
+    callback_consumer.start()
  
 # 关闭设备与销毁句柄
 def close_and_destroy_device(cam , data_buf=None):
@@ -538,6 +490,11 @@ def close_and_destroy_device(cam , data_buf=None):
     if ret != 0:
         print("stop grabbing fail! ret[0x%x]" % ret)
         sys.exit()
+    # 停止回调消费线程
+    if callback_ring is not None:
+        callback_ring.close()
+        callback_consumer.join()
+        print("callback stats: %s" % callback_ring.stats())
     # 关闭设备
     ret = cam.MV_CC_CloseDevice()
     if ret != 0:
@@ -551,6 +508,8 @@ def close_and_destroy_device(cam , data_buf=None):
         del data_buf
         sys.exit()
     del data_buf
+    # 等待后台写图完成
+    preview_writer.flush()
  
 # 开启取流并获取数据包大小
 def start_grab_and_get_data_size(cam):
@@ -571,12 +530,16 @@ def main():
     # decide_divice_on_line(cam)  ==============
     # 打开设备
     open_device(cam)
+    # 节点读写经缓存,写入直达相机并更新缓存
+    cam = MvNodeCache(cam)
     # # 设置缓存节点个数
     # set_image_Node_num(cam, Num=10)
     # # 设置取流策略
     # set_grab_strategy(cam, grabstrategy=2, outputqueuesize=10)
     # 设置设备的一些参数
     # set_Value(cam, param_type="bool_value", node_name="TriggerCacheEnable", node_value=1)
+    # 批量设置参数
+    # set_Values(cam, {"ExposureTime": 10000.0, "Gain": 5.0, "AcquisitionFrameRate": 30.0})
     # 获取设备的一些参数
     # get_value = get_Value(cam , param_type = "int_value" , node_name = "PayloadSize")
  
@@ -588,7 +551,10 @@ def main():
         start_grab_and_get_data_size(cam)
         # 当使用 回调取流时，需要在此处添加
         print ("press a key to stop grabbing.")
-        msvcrt.getch()
+        if msvcrt is not None:
+            msvcrt.getch()
+        else:
+            input()
         # 关闭设备与销毁句柄
         close_and_destroy_device(cam)
     elif int(stdcall) == 1:
@@ -0,0 +1,298 @@
+# -- coding: utf-8 --
+"""
+ch:高速连拍 | en:High-speed burst capture
+
+BurstCapture grabs a fixed number of consecutive raw frames into RAM and
+writes them to disk only after the burst, so nothing on the capture path
+waits for an encoder or the disk:
+
+    arm()      MV_CC_SetImageNodeNum grows the SDK node pool, then the ring
+               is allocated: one contiguous (nFrames, PayloadSize) uint8
+               array plus a FRAME_META_DTYPE record per slot
+    start()    StartGrabbing and a capture thread that copies every frame
+               into the next ring slot and frees the SDK buffer at once
+    trigger()  with nPreFrames > 0 the ring keeps overwriting the last
+               nPreFrames frames until the trigger, then nFrames - nPreFrames
+               more are taken; without pre-trigger frames capture starts at
+               once and trigger() is not needed
+    flush()    after the burst, hands the frames in order to an ImageWriter
+               on a background thread (raw bytes, .npy or an image format)
+               and saves the metadata as <prefix>_meta.npy; the "mvraw"
+               format writes one Raw_archive <prefix>.mvraw/.mvidx instead
+
+Frames lost before they reached the host show up as gaps in nFrameNum and
+are counted in stats() together with the sustained capture rate in frames/s
+and MB/s. The ring is kept between bursts and reallocated only when the
+payload size or frame count changes.
+"""
+import os
+import time
+import threading
+
+import numpy as np
+
+from MvCameraControl_class import *
+from Bayer_demosaic import DEMOSAIC_BILINEAR
+from Image_writer import ImageWriter, frame_file_name, IMAGE_FORMAT_RAW
+from Raw_archive import (RawArchiveWriter, FRAME_META_DTYPE, RAW_ARCHIVE_FORMAT, fill_frame_meta,
+                         decode_raw_frame)
+
+# ch:SDK允许的缓存节点数上限 | en:Largest node count MV_CC_SetImageNodeNum accepts
+BURST_MAX_IMAGE_NODES = 30
+
+
+class BurstCapture():
+    """
+    Burst of nFrames raw frames, of which nPreFrames are taken before
+    trigger(). The caller owns the open device; BurstCapture starts and
+    stops grabbing itself because the node count must be set before
+    StartGrabbing.
+    """
+
+    def __init__(self, cam, nFrames=200, nPreFrames=0, nImageNodes=BURST_MAX_IMAGE_NODES, nGrabTimeout=100):
+        if nFrames <= 0 or not 0 <= nPreFrames < nFrames:
+            raise ValueError("need nFrames > 0 and 0 <= nPreFrames < nFrames")
+        self.cam = cam
+        self.nFrames = nFrames
+        self.nPreFrames = nPreFrames
+        self.nImageNodes = min(max(int(nImageNodes), 1), BURST_MAX_IMAGE_NODES)
+        self.nGrabTimeout = nGrabTimeout
+        self.nPayloadSize = 0
+        self.data = None
+        self.meta = None
+        # ch:按时间顺序排列的槽位号 | en:Ring slots in capture order
+        self.order = np.zeros(0, np.intp)
+        self.ev_stop = threading.Event()
+        self.ev_trigger = threading.Event()
+        self.ev_done = threading.Event()
+        # ch:没有连拍在进行 | en:No burst running
+        self.ev_done.set()
+        self.thread = None
+        self.flush_thread = None
+        self.nAllocations = 0
+        self._reset_counters()
+
+    def _reset_counters(self):
+        self.order = np.zeros(0, np.intp)
+        self.nGrabbed = 0
+        self.nMissed = 0
+        self.nGrabErrors = 0
+        self.nTriggerIndex = -1
+        self.fTrigger = 0.0
+        self.fEnd = 0.0
+        self.nRet = MV_OK
+        self.nFlushed = 0
+        self.nFlushFailed = 0
+        self.nFlushBytes = 0
+        self.fFlushTime = 0.0
+
+    # ch:设置缓存节点数并分配连拍缓存 | en:Grow the SDK node pool and allocate the ring
+    def arm(self):
+        stParam = MVCC_INTVALUE()
+        ret = self.cam.MV_CC_GetIntValue("PayloadSize", stParam)
+        if ret != MV_OK:
+            return ret
+        ret = self.cam.MV_CC_SetImageNodeNum(self.nImageNodes)
+        if ret != MV_OK:
+            return ret
+        nPayloadSize = stParam.nCurValue
+        if self.data is None or self.data.shape != (self.nFrames, nPayloadSize):
+            # ch:np.zeros会触碰每一页,连拍中不再缺页 | en:np.zeros touches every page, so the burst takes no page faults
+            self.data = np.zeros((self.nFrames, nPayloadSize), np.uint8)
+            self.meta = np.zeros(self.nFrames, FRAME_META_DTYPE)
+            self.nPayloadSize = nPayloadSize
+            self.nAllocations += 1
+        return MV_OK
+
+    def start(self):
+        """arm(), StartGrabbing and run the capture thread; returns an MV_ ret code."""
+        if self.thread is not None:
+            return MV_E_CALLORDER
+        # ch:上一次连拍还在写盘时不能覆盖缓存 | en:The ring must not be overwritten while the last burst is being flushed
+        self.wait_flush()
+        ret = self.arm()
+        if ret != MV_OK:
+            return ret
+        self._reset_counters()
+        ret = self.cam.MV_CC_StartGrabbing()
+        if ret != MV_OK:
+            return ret
+        # ch:取流开始后才清除事件,失败时wait()/flush()不会一直等待 | en:Events are cleared only once grabbing started, so a failed start never leaves wait()/flush() blocked
+        self.ev_stop.clear()
+        self.ev_done.clear()
+        self.ev_trigger.clear()
+        if self.nPreFrames == 0:
+            self.ev_trigger.set()
+        self.thread = threading.Thread(target=self._capture, name="burst-capture", daemon=True)
+        self.thread.start()
+        return MV_OK
+
+    def trigger(self):
+        """The next frame grabbed is the first post-trigger frame."""
+        self.ev_trigger.set()
+
+    def wait(self, fTimeout=None):
+        """Wait for the burst to complete; returns False on timeout."""
+        if not self.ev_done.wait(fTimeout):
+            return False
+        self._join()
+        return True
+
+    def stop(self):
+        """Abort the burst; the frames captured so far stay in the ring."""
+        self.ev_stop.set()
+        self._join()
+
+    def _join(self):
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def count(self):
+        return len(self.order)
+
+    def frame(self, nIndex):
+        """(raw bytes, metadata record) of the nIndex-th frame of the burst in capture order."""
+        nSlot = self.order[nIndex]
+        meta = self.meta[nSlot]
+        return self.data[nSlot, :int(meta["nFrameLen"])], meta
+
+    def frame_meta(self):
+        """Metadata of the burst in capture order."""
+        return self.meta[self.order]
+
+    def _capture(self):
+        cam = self.cam
+        nPreFrames = self.nPreFrames
+        nPostFrames = self.nFrames - nPreFrames
+        nPre = 0
+        nPost = 0
+        try:
+            while not self.ev_stop.is_set():
+                ret, view = cam.GetFrameView(self.nGrabTimeout)
+                if view is None:
+                    self.nGrabErrors += 1
+                    # ch:断线后SDK可能立即返回错误,等一个取流超时再试,避免空转 | en:After a disconnect the SDK may fail at once; wait one grab timeout before retrying instead of spinning
+                    if ret != MV_E_NODATA:
+                        self.ev_stop.wait(self.nGrabTimeout / 1e3)
+                    continue
+                if self.nTriggerIndex < 0 and self.ev_trigger.is_set():
+                    self.nTriggerIndex = min(nPre, nPreFrames)
+                    self.fTrigger = time.perf_counter()
+                if self.nTriggerIndex < 0:
+                    # ch:触发前的帧在前nPreFrames个槽位中循环覆盖 | en:Pre-trigger frames overwrite each other in the first nPreFrames slots
+                    nSlot = nPre % nPreFrames
+                else:
+                    nSlot = nPreFrames + nPost
+                with view:
+                    stFrameInfo = view.stFrameInfo
+                    nLen = min(stFrameInfo.nFrameLen, self.nPayloadSize)
+                    np.copyto(self.data[nSlot, :nLen], view.data[:nLen])
+                    fill_frame_meta(self.meta[nSlot], stFrameInfo)
+                    self.meta[nSlot]["nFrameLen"] = nLen
+                self.nGrabbed += 1
+                if self.nTriggerIndex < 0:
+                    nPre += 1
+                else:
+                    nPost += 1
+                    if nPost >= nPostFrames:
+                        break
+        finally:
+            self.fEnd = time.perf_counter()
+            self.nRet = cam.MV_CC_StopGrabbing()
+            nKept = min(nPre, nPreFrames)
+            listOrder = [(nPre - nKept + i) % nPreFrames for i in range(nKept)]
+            self.order = np.array(listOrder + list(range(nPreFrames, nPreFrames + nPost)), np.intp)
+            # ch:帧号不连续说明帧在到达主机前丢失 | en:Gaps in nFrameNum are frames lost before they reached the host
+            nFrameNums = self.meta["nFrameNum"][self.order].astype(np.int64)
+            self.nMissed = int(np.maximum(np.diff(nFrameNums) - 1, 0).sum()) if len(nFrameNums) > 1 else 0
+            self.ev_done.set()
+
+    def flush(self, strDir, strFormat=IMAGE_FORMAT_RAW, nQuality=None, writer=None, strPrefix="burst",
+              nDemosaicQuality=DEMOSAIC_BILINEAR, nFsyncEvery=0, fn_done=None):
+        """
+        Write the burst to strDir on a background thread and return at once;
+        a burst still running is waited for on that thread, so start() then
+        flush() queues the write without blocking the caller. Frames go through writer (a private ImageWriter when None) with
+        blocking submits, so none is dropped; fn_done(nWritten, nFailed)
+        runs on the flush thread at the end. wait_flush() waits for it.
+        """
+        self.wait_flush()
+        self.flush_thread = threading.Thread(target=self._flush, name="burst-flush", daemon=True,
+                                             args=(strDir, strFormat, nQuality, writer, strPrefix,
+                                                   nDemosaicQuality, nFsyncEvery, fn_done))
+        self.flush_thread.start()
+
+    def wait_flush(self, fTimeout=None):
+        """Wait for a running flush; returns False on timeout."""
+        if self.flush_thread is None:
+            return True
+        self.flush_thread.join(fTimeout)
+        if self.flush_thread.is_alive():
+            return False
+        self.flush_thread = None
+        return True
+
+    def _flush(self, strDir, strFormat, nQuality, writer, strPrefix, nDemosaicQuality, nFsyncEvery, fn_done):
+        self.ev_done.wait()
+        self._join()
+        fStart = time.perf_counter()
+        bOwnWriter = writer is None and strFormat != RAW_ARCHIVE_FORMAT
+        if bOwnWriter:
+            writer = ImageWriter(nWorkers=2, nQueueSize=8, nFsyncEvery=nFsyncEvery)
+        lock = threading.Lock()
+
+        def done(strPath, bOk):
+            nBytes = os.path.getsize(strPath) if bOk else 0
+            with lock:
+                if bOk:
+                    self.nFlushed += 1
+                    self.nFlushBytes += nBytes
+                else:
+                    self.nFlushFailed += 1
+
+        try:
+            os.makedirs(strDir, exist_ok=True)
+            if strFormat == RAW_ARCHIVE_FORMAT:
+                self._flush_archive(os.path.join(strDir, strPrefix), nFsyncEvery)
+                return
+            listMeta = self.frame_meta()
+            np.save(os.path.join(strDir, "%s_meta.npy" % strPrefix), listMeta)
+            for i in range(self.count()):
+                data, meta = self.frame(i)
+
+                def image(data=data, meta=meta):
+                    return decode_raw_frame(data, meta, strFormat, nDemosaicQuality)
+
+                strPath = frame_file_name(strDir, int(meta["nFrameNum"]), meta["nHostTimeStamp"] / 1000.0,
+                                          strFormat, strPrefix)
+                writer.submit(strPath, image, strFormat, nQuality, fn_done=done, bBlock=True)
+            writer.flush()
+        except Exception as e:
+            print("burst flush to %s failed: %s" % (strDir, e))
+        finally:
+            if bOwnWriter:
+                writer.close()
+            self.fFlushTime = time.perf_counter() - fStart
+            if fn_done is not None:
+                fn_done(self.nFlushed, self.nFlushFailed)
+
+    # ch:整个连拍顺序写入一个归档 | en:The whole burst as one sequentially written archive
+    def _flush_archive(self, strPath, nFsyncEvery):
+        with RawArchiveWriter(strPath, self.nPayloadSize, nFsyncEvery=nFsyncEvery) as archive:
+            for i in range(self.count()):
+                data, meta = self.frame(i)
+                archive.append_record(data, meta)
+                self.nFlushed += 1
+        self.nFlushBytes = archive.nBytes
+
+    def stats(self):
+        nPost = max(self.count() - max(self.nTriggerIndex, 0), 0)
+        fElapsed = self.fEnd - self.fTrigger if self.fTrigger > 0 else 0.0
+        fRate = nPost / fElapsed if fElapsed > 0 else 0.0
+        return {"frames": self.count(), "grabbed": self.nGrabbed, "trigger_index": self.nTriggerIndex,
+                "missed": self.nMissed, "grab_errors": self.nGrabErrors, "allocations": self.nAllocations,
+                "fps": fRate, "mb_s": fRate * self.nPayloadSize / 1e6,
+                "ring_mb": self.nFrames * self.nPayloadSize / 1e6,
+                "flushed": self.nFlushed, "flush_failed": self.nFlushFailed, "flush_bytes": self.nFlushBytes,
+                "flush_s": self.fFlushTime}
@@ -0,0 +1,140 @@
+# -- coding: utf-8 --
+"""
+ch:回调取流环形缓存 | en:Callback ingestion into a preallocated ring
+
+CallbackFrameRing registers itself with MV_CC_RegisterImageCallBackEx. The
+callback runs on the SDK's delivery thread and only copies the frame and its
+MV_FRAME_OUT_INFO_EX into the next of nSlots preallocated slots and bumps the
+sequence counter; no allocation, conversion, display or file I/O happens
+there, so the driver's node pool never waits on Python processing.
+
+Consumers run on their own threads and read by sequence number:
+
+    nSeq = 0
+    while running:
+        ret, nSeq, data, stFrameInfo = ring.read(nSeq + 1, fTimeout=1.0, out=buf)
+
+read() blocks until frame nSeq has arrived and copies it out of its slot. A
+consumer that falls more than nSlots - 1 frames behind gets the oldest
+frame still in the ring instead (the returned nSeq tells how many it
+skipped); every slot carries the sequence number of the frame in it, which
+is checked again after the copy so a frame overwritten mid-copy is never
+returned. Any number of consumers can read the same ring independently.
+
+Callback dwell time (entry to return) is kept for the last nDwellSamples
+calls; stats() reports its mean, p99 and maximum in microseconds.
+"""
+import time
+import threading
+
+import numpy as np
+
+from ctypes import *
+from MvCameraControl_class import *
+
+# ch:SDK图像回调原型 | en:Prototype of the SDK image callback
+FrameCallBack = MV_FUNCTYPE(None, POINTER(c_ubyte), POINTER(MV_FRAME_OUT_INFO_EX), c_void_p)
+# ch:正在写入的槽的序号 | en:Sequence number of a slot being written
+RING_SLOT_WRITING = -1
+
+
+class CallbackFrameRing():
+
+    def __init__(self, nPayloadSize, nSlots=8, nDwellSamples=4096):
+        if nSlots < 2:
+            raise ValueError("the ring needs at least 2 slots")
+        self.nPayloadSize = nPayloadSize
+        self.nSlots = nSlots
+        self.listData = [np.empty(nPayloadSize, np.uint8) for _ in range(nSlots)]
+        self.listAddr = [arr.ctypes.data for arr in self.listData]
+        self.listInfo = [MV_FRAME_OUT_INFO_EX() for _ in range(nSlots)]
+        self.listInfoAddr = [addressof(stInfo) for stInfo in self.listInfo]
+        self.listSeq = [0] * nSlots
+        self.nSequence = 0
+        self.cond = threading.Condition()
+        self.bClosed = False
+        self.arrDwell = np.zeros(nDwellSamples, np.float64)
+        self.nCallbacks = 0
+        self.nOversize = 0
+        self.nOverruns = 0
+        # ch:回调对象必须一直被引用 | en:The callback object must stay referenced while registered
+        self.fnCallback = FrameCallBack(self._on_frame)
+
+    def register(self, cam):
+        """MV_CC_RegisterImageCallBackEx on cam; call before MV_CC_StartGrabbing."""
+        self.bClosed = False
+        return cam.MV_CC_RegisterImageCallBackEx(self.fnCallback, None)
+
+    # ch:SDK回调线程:只拷贝,不做其他处理 | en:SDK callback thread: copy and nothing else
+    def _on_frame(self, pData, pFrameInfo, pUser):
+        fStart = time.perf_counter()
+        stFrameInfo = pFrameInfo.contents
+        nLen = stFrameInfo.nFrameLen
+        if nLen > self.nPayloadSize:
+            self.nOversize += 1
+        else:
+            nSeq = self.nSequence + 1
+            nSlot = nSeq % self.nSlots
+            self.listSeq[nSlot] = RING_SLOT_WRITING
+            memmove(self.listAddr[nSlot], pData, nLen)
+            memmove(self.listInfoAddr[nSlot], pFrameInfo, sizeof(MV_FRAME_OUT_INFO_EX))
+            self.listSeq[nSlot] = nSeq
+            self.nSequence = nSeq
+            with self.cond:
+                self.cond.notify_all()
+        self.arrDwell[self.nCallbacks % len(self.arrDwell)] = time.perf_counter() - fStart
+        self.nCallbacks += 1
+
+    def sequence(self):
+        """Sequence number of the newest frame, 0 before the first one."""
+        return self.nSequence
+
+    def read(self, nSeq, fTimeout=1.0, out=None):
+        """
+        (ret, nSeq, data, stFrameInfo) of frame nSeq, or of the oldest frame
+        still in the ring when nSeq was overwritten. data is a copy (into out
+        when given, a uint8 array of at least nPayloadSize bytes); ret is
+        MV_E_NODATA on timeout or close.
+        """
+        fDeadline = time.perf_counter() + fTimeout
+        while True:
+            with self.cond:
+                while self.nSequence < nSeq and not self.bClosed:
+                    fWait = fDeadline - time.perf_counter()
+                    if fWait <= 0:
+                        break
+                    self.cond.wait(fWait)
+                nNewest = self.nSequence
+            if nNewest < nSeq:
+                return MV_E_NODATA, nSeq - 1, None, None
+            # ch:回调可能正在写下一个槽,最旧的可用帧再后移一帧 | en:The callback may be writing the next slot, so the oldest safe frame is one later
+            nOldest = nNewest - self.nSlots + 2
+            if nSeq < nOldest:
+                self.nOverruns += 1
+                nSeq = nOldest
+            nSlot = nSeq % self.nSlots
+            stFrameInfo = MV_FRAME_OUT_INFO_EX()
+            memmove(addressof(stFrameInfo), self.listInfoAddr[nSlot], sizeof(MV_FRAME_OUT_INFO_EX))
+            nLen = stFrameInfo.nFrameLen
+            data = np.empty(nLen, np.uint8) if out is None else out[:nLen]
+            np.copyto(data, self.listData[nSlot][:nLen])
+            # ch:拷贝后序号不变才说明帧未被覆盖 | en:The frame is intact only if the slot still holds it after the copy
+            if self.listSeq[nSlot] == nSeq:
+                return MV_OK, nSeq, data, stFrameInfo
+            self.nOverruns += 1
+            nSeq += 1
+
+    def close(self):
+        """Wake every blocked read(); the ring can be registered again afterwards."""
+        with self.cond:
+            self.bClosed = True
+            self.cond.notify_all()
+
+    def stats(self):
+        nSamples = min(self.nCallbacks, len(self.arrDwell))
+        arrDwell = self.arrDwell[:nSamples] * 1e6
+        return {"frames": self.nSequence, "callbacks": self.nCallbacks, "oversize": self.nOversize,
+                "reader_overruns": self.nOverruns,
+                "dwell_mean_us": float(arrDwell.mean()) if nSamples else 0.0,
+                "dwell_p99_us": float(np.percentile(arrDwell, 99)) if nSamples else 0.0,
+                "dwell_max_us": float(arrDwell.max()) if nSamples else 0.0}
@@ -1,7 +1,6 @@
 # -- coding: utf-8 --
 import sys
 import threading
-import msvcrt
 import _tkinter
 import tkinter.messagebox
 from tkinter import * 
@@ -12,8 +11,6 @@ import cv2
 import time
 import sys, os
 import datetime
-import inspect
-import ctypes
 import random
 from PIL import Image,ImageTk
 from ctypes import *
@@ -21,26 +18,22 @@ from tkinter import ttk
  
 # sys.path.append("../MvImport")
 from MvCameraControl_class import *
- 
-def Async_raise(tid, exctype):
-    tid = ctypes.c_long(tid)
-    if not inspect.isclass(exctype):
-        exctype = type(exctype)
-    res = ctypes.pythonapi.PyThreadState_SetAsyncExc(tid, ctypes.py_object(exctype))
-    if res == 0:
-        raise ValueError("invalid thread id")
-    elif res != 1:
-        ctypes.pythonapi.PyThreadState_SetAsyncExc(tid, None)
-        raise SystemError("PyThreadState_SetAsyncExc failed")
- 
-def Stop_thread(thread):
-    Async_raise(thread.ident, SystemExit)
+from PixelType_registry import *
+from Bayer_demosaic import *
+from Grab_pipeline import GrabPipeline
+from Image_writer import ImageWriter, IMAGE_FORMAT_JPEG, IMAGE_FORMAT_BMP
+from Video_recorder import VideoRecorder
+from MvNodeCache import MvNodeCache, NODE_FLOAT, NODE_BOOL, NODE_ENUM
+from MvParamBatch import apply_parameters
+from MvRecipeStore import RecipeStore, RECIPE_SWITCH_AUTO
+from Camera_supervisor import CameraSupervisor
  
 class CameraOperation():
  
     def __init__(self,obj_cam,st_device_list,n_connect_num=0,b_open_device=False,b_start_grabbing = False,h_thread_handle=None,\
                 b_thread_closed=False,st_frame_info=None,b_exit=False,b_save_bmp=False,b_save_jpg=False,buf_save_image=None,\
-                n_save_image_size=0,n_win_gui_id=0,frame_rate=0,exposure_time=0,gain=0):
+                n_save_image_size=0,n_win_gui_id=0,frame_rate=0,exposure_time=0,gain=0,demosaic_quality=DEMOSAIC_BILINEAR,\
+                b_preview_half_res=False,n_grab_timeout=100,str_recipe_dir="recipes",b_auto_reconnect=True):
  
         self.obj_cam = obj_cam
         self.st_device_list = st_device_list
@@ -60,6 +53,27 @@ class CameraOperation():
         self.frame_rate = frame_rate
         self.exposure_time = exposure_time
         self.gain = gain
+        self.demosaic_quality = demosaic_quality
+        self.b_preview_half_res = b_preview_half_res
+        # ch:取流线程每次取图最多等待n_grab_timeout毫秒,其间检查ev_stop | en:The grab thread waits at most n_grab_timeout ms per frame and checks ev_stop in between
+        self.n_grab_timeout = n_grab_timeout
+        self.ev_stop = threading.Event()
+        self.f_stop_latency = 0.0
+        # ch:上次取流结束时流水线的统计,由调用方决定是否显示 | en:Pipeline stats of the last grab run, for the caller to show if it wants
+        self.pipeline_stats = None
+        self.image_writer = ImageWriter(nWorkers=2)
+        # ch:录像在自己的线程中编码,取流不会等待编码器 | en:Video is encoded on its own thread, grabbing never waits for the encoder
+        self.video_recorder = None
+        # ch:参数读写经节点缓存,重复读取不再访问相机 | en:Parameters are read and written through a node cache, repeated reads skip the camera
+        self.node_cache = None
+        # ch:配方按相机序列号保存,切换时选择整体加载或只写差异节点 | en:Recipes are kept per camera serial; a switch either loads the whole snapshot or writes only the nodes that differ
+        self.recipe_store = RecipeStore(str_recipe_dir)
+        # ch:取流期间断线或长时间无帧时自动重建句柄并恢复参数与取流 | en:While grabbing, a disconnect or a long frame gap rebuilds the handle and restores parameters and grabbing
+        self.b_auto_reconnect = b_auto_reconnect
+        self.st_device_info = None
+        self.supervisor = None
+        # ch:上次监督结束时的重连统计 | en:Reconnect stats of the last supervised run
+        self.reconnect_stats = None
  
     def To_hex_str(self,num):
         chaDic = {10: 'a', 11: 'b', 12: 'c', 13: 'd', 14: 'e', 15: 'f'}
@@ -90,6 +104,11 @@ class CameraOperation():
                 tkinter.messagebox.showerror('show error','open device fail! ret = '+ self.To_hex_str(ret))
                 return ret
             print ("open device successfully!")
+            self.st_device_info = stDeviceList
+            self.node_cache = MvNodeCache(self.obj_cam)
+            # ch:关闭设备时写图线程已停止,重新打开时重建 | en:Closing the device stopped the writer threads, so reopening creates a new writer
+            if self.image_writer is None:
+                self.image_writer = ImageWriter(nWorkers=2)
             self.b_open_device = True
             self.b_thread_closed = False
  
@@ -97,19 +116,18 @@ class CameraOperation():
             if stDeviceList.nTLayerType == MV_GIGE_DEVICE:
                 nPacketSize = self.obj_cam.MV_CC_GetOptimalPacketSize()
                 if int(nPacketSize) > 0:
-                    ret = self.obj_cam.MV_CC_SetIntValue("GevSCPSPacketSize",nPacketSize)
+                    ret = self.node_cache.MV_CC_SetIntValue("GevSCPSPacketSize",nPacketSize)
                     if ret != 0:
                         print ("warning: set packet size fail! ret[0x%x]" % ret)
                 else:
                     print ("warning: set packet size fail! ret[0x%x]" % nPacketSize)
  
-            stBool = c_bool(False)
-            ret =self.obj_cam.MV_CC_GetBoolValue("AcquisitionFrameRateEnable", stBool)
+            ret, bFrameRateEnable = self.node_cache.get_value("AcquisitionFrameRateEnable", NODE_BOOL)
             if ret != 0:
                 print ("get acquisition frame rate enable fail! ret[0x%x]" % ret)
  
             # ch:设置触发模式为off | en:Set trigger mode as off
-            ret = self.obj_cam.MV_CC_SetEnumValue("TriggerMode", MV_TRIGGER_MODE_OFF)
+            ret = self.node_cache.MV_CC_SetEnumValue("TriggerMode", MV_TRIGGER_MODE_OFF)
             if ret != 0:
                 print ("set trigger mode fail! ret[0x%x]" % ret)
             return 0
@@ -117,27 +135,61 @@ class CameraOperation():
     def Start_grabbing(self):
         if False == self.b_start_grabbing and True == self.b_open_device:
             self.b_exit = False
+            self.ev_stop.clear()
             ret = self.obj_cam.MV_CC_StartGrabbing()
             if ret != 0:
                 tkinter.messagebox.showerror('show error', 'start grabbing fail! ret = '+ self.To_hex_str(ret))
                 return
             self.b_start_grabbing = True
             print("start grabbing successfully!")
+            if self.b_auto_reconnect and self.st_device_info is not None:
+                self.supervisor = CameraSupervisor(self.st_device_info, self.obj_cam, self.node_cache,
+                                                   fn_lost=self.On_camera_lost, fn_recovered=self.On_camera_recovered)
+                ret, nTriggerMode = self.node_cache.get_value("TriggerMode", NODE_ENUM)
+                self.supervisor.bWatchFrames = ret != 0 or nTriggerMode == MV_TRIGGER_MODE_OFF
+                ret = self.supervisor.start()
+                if ret != 0:
+                    print ("warning: register exception callback fail! ret[0x%x]" % ret)
             try:
                 self.n_win_gui_id = random.randint(1,10000)
-                self.h_thread_handle = threading.Thread(target=CameraOperation.Work_thread, args=(self,))
-                self.h_thread_handle.start()
-                self.b_thread_closed = True
+                self.Start_work_thread()
             except:
                 tkinter.messagebox.showerror('show error','error: unable to start thread')
                 False == self.b_start_grabbing
+
+    def Start_work_thread(self):
+        self.b_exit = False
+        self.ev_stop.clear()
+        self.h_thread_handle = threading.Thread(target=CameraOperation.Work_thread, args=(self,))
+        self.h_thread_handle.start()
+        self.b_thread_closed = True
+
+    def Stop_supervisor(self):
+        supervisor, self.supervisor = self.supervisor, None
+        if supervisor is not None:
+            supervisor.stop()
+            self.reconnect_stats = supervisor.stats()
+
+    # ch:监督线程回调:相机丢失,停止取流线程 | en:Supervisor callback: the camera is lost, stop the grab thread
+    def On_camera_lost(self,str_reason):
+        print("camera lost (%s), stopping grab thread" % str_reason)
+        if True == self.b_thread_closed:
+            self.Stop_work_thread()
+
+    # ch:监督线程回调:新句柄已恢复参数并开始取流 | en:Supervisor callback: the new handle has its parameters back and is grabbing
+    def On_camera_recovered(self,obj_cam,node_cache):
+        self.obj_cam = obj_cam
+        self.node_cache = node_cache
+        self.Start_work_thread()
  
     def Stop_grabbing(self):
         if True == self.b_start_grabbing and self.b_open_device == True:
+            self.Stop_supervisor()
             #退出线程
             if True == self.b_thread_closed:
-                Stop_thread(self.h_thread_handle)
-                self.b_thread_closed = False
+                self.Stop_work_thread()
+            # ch:等待已提交的图片写完 | en:Wait until the images already submitted are written
+            self.image_writer.flush()
             ret = self.obj_cam.MV_CC_StopGrabbing()
             if ret != 0:
                 tkinter.messagebox.showerror('show error','stop grabbing fail! ret = '+self.To_hex_str(ret))
@@ -146,12 +198,26 @@ class CameraOperation():
             self.b_start_grabbing = False
             self.b_exit  = True      
  
+    # ch:通知取流线程退出并等待,线程在两次取图之间检查事件,不会在持有SDK缓存时被打断 | en:Ask the grab thread to exit and wait for it; it checks the event between grabs, so it is never interrupted while holding an SDK buffer
+    def Stop_work_thread(self, f_timeout=None):
+        f_start = time.perf_counter()
+        self.ev_stop.set()
+        if self.h_thread_handle is not None and self.h_thread_handle is not threading.current_thread():
+            self.h_thread_handle.join(f_timeout)
+        self.f_stop_latency = time.perf_counter() - f_start
+        self.b_thread_closed = False
+        return self.f_stop_latency
+ 
     def Close_device(self):
+        self.Stop_supervisor()
         if True == self.b_open_device:
             #退出线程
             if True == self.b_thread_closed:
-                Stop_thread(self.h_thread_handle)
-                self.b_thread_closed = False
+                self.Stop_work_thread()
+            # ch:写完队列中的图片并停止写图线程 | en:Write the queued images and stop the writer threads
+            if self.image_writer is not None:
+                self.image_writer.close()
+                self.image_writer = None
             ret = self.obj_cam.MV_CC_CloseDevice()
             if ret != 0:
                 tkinter.messagebox.showerror('show error','close deivce fail! ret = '+self.To_hex_str(ret))
@@ -159,6 +225,7 @@ class CameraOperation():
                 
         # ch:销毁句柄 | Destroy handle
         self.obj_cam.MV_CC_DestroyHandle()
+        self.node_cache = None
         self.b_open_device = False
         self.b_start_grabbing = False
         self.b_exit  = True
@@ -166,15 +233,18 @@ class CameraOperation():
  
     def Set_trigger_mode(self,strMode):
         if True == self.b_open_device:
+            # ch:触发模式下没有连续帧,不按无帧超时判断断线 | en:Trigger mode has no steady frames, so frame gaps are not treated as a loss
+            if self.supervisor is not None:
+                self.supervisor.bWatchFrames = "continuous" == strMode
             if "continuous" == strMode: 
-                ret = self.obj_cam.MV_CC_SetEnumValue("TriggerMode",0)
+                ret = self.node_cache.MV_CC_SetEnumValue("TriggerMode",0)
                 if ret != 0:
                     tkinter.messagebox.showerror('show error','set triggermode fail! ret = '+self.To_hex_str(ret))
             if "triggermode" == strMode:
-                ret = self.obj_cam.MV_CC_SetEnumValue("TriggerMode",1)
+                ret = self.node_cache.MV_CC_SetEnumValue("TriggerMode",1)
                 if ret != 0:
                     tkinter.messagebox.showerror('show error','set triggermode fail! ret = '+self.To_hex_str(ret))
-                ret = self.obj_cam.MV_CC_SetEnumValue("TriggerSource",7)
+                ret = self.node_cache.MV_CC_SetEnumValue("TriggerSource",7)
                 if ret != 0:
                     tkinter.messagebox.showerror('show error','set triggersource fail! ret = '+self.To_hex_str(ret))
  
@@ -187,24 +257,22 @@ class CameraOperation():
  
     def Get_parameter(self):
         if True == self.b_open_device:
-            stFloatParam_FrameRate =  MVCC_FLOATVALUE()
-            memset(byref(stFloatParam_FrameRate), 0, sizeof(MVCC_FLOATVALUE))
-            stFloatParam_exposureTime = MVCC_FLOATVALUE()
-            memset(byref(stFloatParam_exposureTime), 0, sizeof(MVCC_FLOATVALUE))
-            stFloatParam_gain = MVCC_FLOATVALUE()
-            memset(byref(stFloatParam_gain), 0, sizeof(MVCC_FLOATVALUE))
-            ret = self.obj_cam.MV_CC_GetFloatValue("AcquisitionFrameRate", stFloatParam_FrameRate)
+            # ch:首次读取访问相机,之后从缓存返回直到节点被写入或失效 | en:The first read goes to the camera, later ones come from the cache until the node is written or invalidated
+            ret, fFrameRate = self.node_cache.get_value("AcquisitionFrameRate", NODE_FLOAT)
             if ret != 0:
                 tkinter.messagebox.showerror('show error','get acquistion frame rate fail! ret = '+self.To_hex_str(ret))
-            self.frame_rate = stFloatParam_FrameRate.fCurValue
-            ret = self.obj_cam.MV_CC_GetFloatValue("ExposureTime", stFloatParam_exposureTime)
+            else:
+                self.frame_rate = fFrameRate
+            ret, fExposureTime = self.node_cache.get_value("ExposureTime", NODE_FLOAT)
             if ret != 0:
                 tkinter.messagebox.showerror('show error','get exposure time fail! ret = '+self.To_hex_str(ret))
-            self.exposure_time = stFloatParam_exposureTime.fCurValue
-            ret = self.obj_cam.MV_CC_GetFloatValue("Gain", stFloatParam_gain)
+            else:
+                self.exposure_time = fExposureTime
+            ret, fGain = self.node_cache.get_value("Gain", NODE_FLOAT)
             if ret != 0:
                 tkinter.messagebox.showerror('show error','get gain fail! ret = '+self.To_hex_str(ret))
-            self.gain = stFloatParam_gain.fCurValue
+            else:
+                self.gain = fGain
             tkinter.messagebox.showinfo('show info','get parameter success!')
  
     def Set_parameter(self,frameRate,exposureTime,gain):
@@ -212,238 +280,131 @@ class CameraOperation():
             tkinter.messagebox.showinfo('show info','please type in the text box !')
             return
         if True == self.b_open_device:
-            ret = self.obj_cam.MV_CC_SetFloatValue("ExposureTime",float(exposureTime))
+            # ch:一次写入,未变化的节点跳过,失败时回滚已写入的节点 | en:One batch: unchanged nodes are skipped, written ones rolled back on failure
+            ret, dict_report = apply_parameters(self.node_cache, {"ExposureTime": float(exposureTime), "Gain": float(gain),
+                                                                  "AcquisitionFrameRate": float(frameRate)})
+            print("set parameter: %s" % dict_report)
             if ret != 0:
-                tkinter.messagebox.showerror('show error','set exposure time fail! ret = '+self.To_hex_str(ret))
+                tkinter.messagebox.showerror('show error','set %s fail, parameters restored! ret = ' % dict_report["failed"]
+                                             + self.To_hex_str(ret))
+                return
  
-            ret = self.obj_cam.MV_CC_SetFloatValue("Gain",float(gain))
+            tkinter.messagebox.showinfo('show info','set parameter success!')
+
+    def Save_recipe(self,str_name):
+        if True == self.b_open_device:
+            ret = self.recipe_store.capture(self.node_cache, str_name)
             if ret != 0:
-                tkinter.messagebox.showerror('show error','set gain fail! ret = '+self.To_hex_str(ret))
- 
-            ret = self.obj_cam.MV_CC_SetFloatValue("AcquisitionFrameRate",float(frameRate))
+                tkinter.messagebox.showerror('show error','save recipe %s fail! ret = ' % str_name + self.To_hex_str(ret))
+                return
+            tkinter.messagebox.showinfo('show info','save recipe %s success!' % str_name)
+
+    # ch:str_mode为"auto"时按测得耗时在FeatureLoad与逐节点写入之间选择 | en:With str_mode "auto" the measured times decide between FeatureLoad and writing the changed nodes
+    def Switch_recipe(self,str_name,str_mode=RECIPE_SWITCH_AUTO):
+        if True == self.b_open_device:
+            ret, dict_report = self.recipe_store.switch(self.node_cache, str_name, str_mode)
+            print("switch recipe: %s" % dict_report)
             if ret != 0:
-                tkinter.messagebox.showerror('show error','set acquistion frame rate fail! ret = '+self.To_hex_str(ret))
- 
-            tkinter.messagebox.showinfo('show info','set parameter success!')
+                tkinter.messagebox.showerror('show error','switch recipe %s fail! ret = ' % str_name + self.To_hex_str(ret))
+                return
+            self.Get_parameter()
  
     def Work_thread(self):
-        stOutFrame = MV_FRAME_OUT()  
-        img_buff = None
-        buf_cache = None
-        numArray = None
-        while True:
-            ret = self.obj_cam.MV_CC_GetImageBuffer(stOutFrame, 1000)
-            if 0 == ret:
-                if None == buf_cache:
-                    buf_cache = (c_ubyte * stOutFrame.stFrameInfo.nFrameLen)()
-                #获取到图像的时间开始节点获取到图像的时间开始节点
-                self.st_frame_info = stOutFrame.stFrameInfo
-                cdll.msvcrt.memcpy(byref(buf_cache), stOutFrame.pBufAddr, self.st_frame_info.nFrameLen)
-                print ("get one frame: Width[%d], Height[%d], nFrameNum[%d]"  % (self.st_frame_info.nWidth, self.st_frame_info.nHeight, self.st_frame_info.nFrameNum))
-                self.n_save_image_size = self.st_frame_info.nWidth * self.st_frame_info.nHeight * 3 + 2048
-                if img_buff is None:
-                    img_buff = (c_ubyte * self.n_save_image_size)()
-                
-                if True == self.b_save_jpg:
-                    self.Save_jpg(buf_cache) #ch:保存Jpg图片 | en:Save Jpg
-                if True == self.b_save_bmp:
-                    self.Save_Bmp(buf_cache) #ch:保存Bmp图片 | en:Save Bmp
-            else:
-                print("no data, nret = "+self.To_hex_str(ret))
-                continue
- 
-            #转换像素结构体赋值
-            stConvertParam = MV_CC_PIXEL_CONVERT_PARAM()
-            memset(byref(stConvertParam), 0, sizeof(stConvertParam))
-            stConvertParam.nWidth = self.st_frame_info.nWidth
-            stConvertParam.nHeight = self.st_frame_info.nHeight
-            stConvertParam.pSrcData = cast(buf_cache, POINTER(c_ubyte))
-            stConvertParam.nSrcDataLen = self.st_frame_info.nFrameLen
-            stConvertParam.enSrcPixelType = self.st_frame_info.enPixelType 
- 
-            mode = None     # array转为Image图像的转换模式
-            # RGB8直接显示
-            if PixelType_Gvsp_RGB8_Packed == self.st_frame_info.enPixelType :
-                numArray = CameraOperation.Color_numpy(self,buf_cache,self.st_frame_info.nWidth,self.st_frame_info.nHeight)
-                mode = "RGB"
- 
-            # Mono8直接显示
-            elif PixelType_Gvsp_Mono8 == self.st_frame_info.enPixelType :
-                numArray = CameraOperation.Mono_numpy(self,buf_cache,self.st_frame_info.nWidth,self.st_frame_info.nHeight)
-                mode = "L"
- 
-            # 如果是彩色且非RGB则转为RGB后显示
-            elif self.Is_color_data(self.st_frame_info.enPixelType):
-                nConvertSize = self.st_frame_info.nWidth * self.st_frame_info.nHeight * 3
-                stConvertParam.enDstPixelType = PixelType_Gvsp_RGB8_Packed
-                stConvertParam.pDstBuffer = (c_ubyte * nConvertSize)()
-                stConvertParam.nDstBufferSize = nConvertSize
-                time_start=time.time()
-                ret = self.obj_cam.MV_CC_ConvertPixelType(stConvertParam)
-                time_end=time.time()
-                print('MV_CC_ConvertPixelType to RGB:',time_end - time_start) 
-                if ret != 0:
-                    print('show error','convert pixel fail! ret = '+self.To_hex_str(ret))
-                    continue
-                cdll.msvcrt.memcpy(byref(img_buff), stConvertParam.pDstBuffer, nConvertSize)
-                numArray = CameraOperation.Color_numpy(self,img_buff,self.st_frame_info.nWidth,self.st_frame_info.nHeight)
-                mode = "RGB"
-                
-            # 如果是黑白且非Mono8则转为Mono8后显示
-            elif self.Is_mono_data(self.st_frame_info.enPixelType):
-                nConvertSize = self.st_frame_info.nWidth * self.st_frame_info.nHeight
-                stConvertParam.enDstPixelType = PixelType_Gvsp_Mono8
-                stConvertParam.pDstBuffer = (c_ubyte * nConvertSize)()
-                stConvertParam.nDstBufferSize = nConvertSize
-                time_start=time.time()
-                ret = self.obj_cam.MV_CC_ConvertPixelType(stConvertParam)
-                time_end=time.time()
-                print('MV_CC_ConvertPixelType to Mono8:',time_end - time_start) 
-                if ret != 0:
-                    print('show error','convert pixel fail! ret = '+self.To_hex_str(ret))
-                    continue
-                cdll.msvcrt.memcpy(byref(img_buff), stConvertParam.pDstBuffer, nConvertSize)
-                numArray = CameraOperation.Mono_numpy(self,img_buff,self.st_frame_info.nWidth,self.st_frame_info.nHeight)
-                mode = "L"
- 
-            #合并OpenCV到Tkinter界面中
-            current_image = Image.frombuffer(mode, (self.st_frame_info.nWidth,self.st_frame_info.nHeight), numArray.astype('uint8')).resize((800, 600), Image.ANTIALIAS)
-            numArray = cv2.cvtColor(numArray, cv2.COLOR_BGR2RGB)
-            # imgtk = ImageTk.PhotoImage(image=current_image, master=root)
-            # =================== where i change ===========
-            cv2.imshow('view', numArray)
- 
-            if cv2.waitKey(1) & 0xFF == ord('q') :
-                break
-            # =================== where i change ===========
- 
-            nRet = self.obj_cam.MV_CC_FreeImageBuffer(stOutFrame)
-            if self.b_exit == True:
-                if img_buff is not None:
-                    del img_buff
-                if buf_cache is not None:
-                    del buf_cache
-                break
- 
-    '''
-    def Save_jpg(self,buf_cache):
-        if(None == buf_cache):
-            return
-        self.buf_save_image = None
-        file_path = str(self.st_frame_info.nFrameNum) + ".jpg"
-        self.n_save_image_size = self.st_frame_info.nWidth * self.st_frame_info.nHeight * 3 + 2048
-        if self.buf_save_image is None:
-            self.buf_save_image = (c_ubyte * self.n_save_image_size)()
-        stParam = MV_SAVE_IMAGE_PARAM_EX()
-        stParam.enImageType = MV_Image_Jpeg;                                        # ch:需要保存的图像类型 | en:Image format to save
-        stParam.enPixelType = self.st_frame_info.enPixelType                               # ch:相机对应的像素格式 | en:Camera pixel type
-        stParam.nWidth      = self.st_frame_info.nWidth                                    # ch:相机对应的宽 | en:Width
-        stParam.nHeight     = self.st_frame_info.nHeight                                   # ch:相机对应的高 | en:Height
-        stParam.nDataLen    = self.st_frame_info.nFrameLen
-        stParam.pData       = cast(buf_cache, POINTER(c_ubyte))
-        stParam.pImageBuffer=  cast(byref(self.buf_save_image), POINTER(c_ubyte)) 
-        stParam.nBufferSize = self.n_save_image_size                                 # ch:存储节点的大小 | en:Buffer node size
-        stParam.nJpgQuality = 80;                                                    # ch:jpg编码，仅在保存Jpg图像时有效。保存BMP时SDK内忽略该参数
-        return_code = self.obj_cam.MV_CC_SaveImageEx2(stParam)            
-        if return_code != 0:
-            tkinter.messagebox.showerror('show error','save jpg fail! ret = '+self.To_hex_str(return_code))
-            self.b_save_jpg = False
-            return
-        file_open = open(file_path.encode('ascii'), 'wb+')
-        img_buff = (c_ubyte * stParam.nImageLen)()
+        # ch:取流/转换/显示/保存各自一个线程,由有界队列连接,SDK缓存拷贝后立即释放 | en:Grab, convert, display and save each run on their own thread joined by bounded queues; SDK buffers are freed right after the copy
+        pipeline = GrabPipeline(self.obj_cam, display=self.Display_frame, save=self.Save_frame,
+                                fn_save_wanted=lambda: self.b_save_jpg or self.b_save_bmp,
+                                demosaicer=BayerDemosaicer(self.demosaic_quality, bPreview=self.b_preview_half_res),
+                                nGrabTimeout=self.n_grab_timeout, record=self.Record_frame,
+                                fn_grabbed=self.supervisor.frame if self.supervisor is not None else None)
+        pipeline.start()
         try:
-            cdll.msvcrt.memcpy(byref(img_buff), stParam.pImageBuffer, stParam.nImageLen)
-            file_open.write(img_buff)
-            self.b_save_jpg = False
-            tkinter.messagebox.showinfo('show info','save jpg success!')
-        except:
+            while not self.ev_stop.wait(0.01):
+                if self.b_exit or not pipeline.is_running():
+                    break
+        finally:
+            pipeline.stop()
+            self.Stop_recording()
+            self.pipeline_stats = pipeline.stats()
+ 
+    # ch:显示阶段回调 | en:Display stage callback
+    def Display_frame(self, numArray, stFrameInfo):
+        self.st_frame_info = stFrameInfo
+        cv2.imshow('view', numArray)
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            self.b_exit = True
+
+    # ch:保存阶段回调:交给后台写图线程,帧在写完后才释放 | en:Save stage callback: hands the frame to the image writer, which releases it once written
+    def Save_frame(self, frame):
+        if True == self.b_save_jpg:
+            strFormat, nQuality = IMAGE_FORMAT_JPEG, 80
             self.b_save_jpg = False
-            raise Exception("get one frame failed:%s" % e.message)
-        if None != img_buff:
-            del img_buff
-        if None != self.buf_save_image:
-            del self.buf_save_image
-    def Save_Bmp(self,buf_cache):
-        if(0 == buf_cache):
-            return
-        self.buf_save_image = None
-        file_path = str(self.st_frame_info.nFrameNum) + ".bmp"    
-        self.n_save_image_size = self.st_frame_info.nWidth * self.st_frame_info.nHeight * 3 + 2048
-        if self.buf_save_image is None:
-            self.buf_save_image = (c_ubyte * self.n_save_image_size)()
-        stParam = MV_SAVE_IMAGE_PARAM_EX()
-        stParam.enImageType = MV_Image_Bmp;                                        # ch:需要保存的图像类型 | en:Image format to save
-        stParam.enPixelType = self.st_frame_info.enPixelType                               # ch:相机对应的像素格式 | en:Camera pixel type
-        stParam.nWidth      = self.st_frame_info.nWidth                                    # ch:相机对应的宽 | en:Width
-        stParam.nHeight     = self.st_frame_info.nHeight                                   # ch:相机对应的高 | en:Height
-        stParam.nDataLen    = self.st_frame_info.nFrameLen
-        stParam.pData       = cast(buf_cache, POINTER(c_ubyte))
-        stParam.pImageBuffer=  cast(byref(self.buf_save_image), POINTER(c_ubyte)) 
-        stParam.nBufferSize = self.n_save_image_size                                 # ch:存储节点的大小 | en:Buffer node size
-        return_code = self.obj_cam.MV_CC_SaveImageEx2(stParam)            
-        if return_code != 0:
-            tkinter.messagebox.showerror('show error','save bmp fail! ret = '+self.To_hex_str(return_code))
+        elif True == self.b_save_bmp:
+            strFormat, nQuality = IMAGE_FORMAT_BMP, None
             self.b_save_bmp = False
+        else:
             return
-        file_open = open(file_path.encode('ascii'), 'wb+')
-        img_buff = (c_ubyte * stParam.nImageLen)()
-        try:
-            cdll.msvcrt.memcpy(byref(img_buff), stParam.pImageBuffer, stParam.nImageLen)
-            file_open.write(img_buff)
-            self.b_save_bmp = False
-            tkinter.messagebox.showinfo('show info','save bmp success!')
-        except:
-            self.b_save_bmp = False
-            raise Exception("get one frame failed:%s" % e.message)
-        if None != img_buff:
-            del img_buff
-        if None != self.buf_save_image:
-            del self.buf_save_image
-    '''
- 
+
+        def done(file_path, bOk):
+            frame.release()
+            print("save %s %s!" % (file_path, "success" if bOk else "fail"))
+
+        frame.retain()
+        file_path = self.image_writer.submit_frame(".", frame.image, frame.stFrameInfo, strFormat, nQuality,
+                                                   fHostTime=frame.fHostTime, fn_done=done)
+        if file_path is None:
+            frame.release()
+            print("save frame %d dropped, image writer busy" % frame.stFrameInfo.nFrameNum)
+ 
+    # ch:录像回调:交给录像线程,帧在编码后才释放,队列满时丢弃并计数 | en:Record callback: hands the frame to the recorder, released once encoded; dropped and counted when its queue is full
+    def Record_frame(self, frame):
+        recorder = self.video_recorder
+        if recorder is None:
+            return
+        frame.retain()
+        if not recorder.submit(frame.image, frame.stFrameInfo, fn_done=lambda bOk: frame.release()):
+            frame.release()
+
+    # ch:开始分段录像,n_decimate帧中保留一帧,b_lossless时Mono8无损存储 | en:Start segmented recording keeping one frame in n_decimate; b_lossless stores Mono8 exactly
+    def Start_recording(self, str_dir=".", f_segment_seconds=300.0, n_decimate=1, b_lossless=False):
+        if self.video_recorder is not None:
+            return
+        self.video_recorder = VideoRecorder(str_dir, fSegmentSeconds=f_segment_seconds, nDecimate=n_decimate,
+                                            bLossless=b_lossless)
+        print("start recording to %s" % str_dir)
+
+    def Stop_recording(self):
+        recorder, self.video_recorder = self.video_recorder, None
+        if recorder is None:
+            return
+        recorder.close()
+        print("recording stats: %s" % recorder.stats())
+
     def Is_mono_data(self,enGvspPixelType):
-        if PixelType_Gvsp_Mono8 == enGvspPixelType or PixelType_Gvsp_Mono10 == enGvspPixelType \
-            or PixelType_Gvsp_Mono10_Packed == enGvspPixelType or PixelType_Gvsp_Mono12 == enGvspPixelType \
-            or PixelType_Gvsp_Mono12_Packed == enGvspPixelType:
-            return True
-        else:
-            return False
+        stFormat = get_pixel_format(enGvspPixelType)
+        return stFormat is not None and stFormat.bIsMono
  
     def Is_color_data(self,enGvspPixelType):
-        if PixelType_Gvsp_BayerGR8 == enGvspPixelType or PixelType_Gvsp_BayerRG8 == enGvspPixelType \
-            or PixelType_Gvsp_BayerGB8 == enGvspPixelType or PixelType_Gvsp_BayerBG8 == enGvspPixelType \
-            or PixelType_Gvsp_BayerGR10 == enGvspPixelType or PixelType_Gvsp_BayerRG10 == enGvspPixelType \
-            or PixelType_Gvsp_BayerGB10 == enGvspPixelType or PixelType_Gvsp_BayerBG10 == enGvspPixelType \
-            or PixelType_Gvsp_BayerGR12 == enGvspPixelType or PixelType_Gvsp_BayerRG12 == enGvspPixelType \
-            or PixelType_Gvsp_BayerGB12 == enGvspPixelType or PixelType_Gvsp_BayerBG12 == enGvspPixelType \
-            or PixelType_Gvsp_BayerGR10_Packed == enGvspPixelType or PixelType_Gvsp_BayerRG10_Packed == enGvspPixelType \
-            or PixelType_Gvsp_BayerGB10_Packed == enGvspPixelType or PixelType_Gvsp_BayerBG10_Packed == enGvspPixelType \
-            or PixelType_Gvsp_BayerGR12_Packed == enGvspPixelType or PixelType_Gvsp_BayerRG12_Packed== enGvspPixelType \
-            or PixelType_Gvsp_BayerGB12_Packed == enGvspPixelType or PixelType_Gvsp_BayerBG12_Packed == enGvspPixelType \
-            or PixelType_Gvsp_YUV422_Packed == enGvspPixelType or PixelType_Gvsp_YUV422_YUYV_Packed == enGvspPixelType:
-            return True
-        else:
-            return False
- 
-    def Mono_numpy(self,data,nWidth,nHeight):
-        data_ = np.frombuffer(data, count=int(nWidth * nHeight), dtype=np.uint8, offset=0)
-        data_mono_arr = data_.reshape(nHeight, nWidth)
-        numArray = np.zeros([nHeight, nWidth, 1],"uint8")
-        numArray[:, :, 0] = data_mono_arr
-        return numArray
- 
-    def Color_numpy(self,data,nWidth,nHeight):
-        data_ = np.frombuffer(data, count=int(nWidth*nHeight*3), dtype=np.uint8, offset=0)
-        data_r = data_[0:nWidth*nHeight*3:3]
-        data_g = data_[1:nWidth*nHeight*3:3]
-        data_b = data_[2:nWidth*nHeight*3:3]
- 
-        data_r_arr = data_r.reshape(nHeight, nWidth)
-        data_g_arr = data_g.reshape(nHeight, nWidth)
-        data_b_arr = data_b.reshape(nHeight, nWidth)
-        numArray = np.zeros([nHeight, nWidth, 3],"uint8")
- 
-        numArray[:, :, 0] = data_r_arr
-        numArray[:, :, 1] = data_g_arr
-        numArray[:, :, 2] = data_b_arr
-        return numArray
\ No newline at end of file
+        stFormat = get_pixel_format(enGvspPixelType)
+        return stFormat is not None and stFormat.bIsColor
+ 
+    # ch:将帧数据解释为(h, w, 1)数组;源连续时返回零拷贝视图,给定out时写入out | en:Interpret frame data as (h, w, 1); a zero-copy view when the source is contiguous, written into out when given
+    def Mono_numpy(self,data,nWidth,nHeight,out=None):
+        numArray = self.Frame_numpy(data, int(nWidth * nHeight)).reshape(nHeight, nWidth, 1)
+        if out is None:
+            return numArray
+        np.copyto(out, numArray.reshape(out.shape))
+        return out
+ 
+    # ch:将RGB8 packed数据解释为(h, w, 3)数组,规则同Mono_numpy | en:Interpret RGB8 packed data as (h, w, 3), same rules as Mono_numpy
+    def Color_numpy(self,data,nWidth,nHeight,out=None):
+        numArray = self.Frame_numpy(data, int(nWidth * nHeight * 3)).reshape(nHeight, nWidth, 3)
+        if out is None:
+            return numArray
+        np.copyto(out, numArray.reshape(out.shape))
+        return out
+ 
+    # ch:取前nCount字节的一维uint8数组,尽量不拷贝 | en:Flat uint8 array over the first nCount bytes, without copying where possible
+    def Frame_numpy(self,data,nCount):
+        if isinstance(data, np.ndarray):
+            return data.reshape(-1).view(np.uint8)[:nCount]
+        return np.frombuffer(data, count=nCount, dtype=np.uint8, offset=0)
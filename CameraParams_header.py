@@ -311,6 +311,14 @@ _MV_FRAME_OUT_INFO_EX_._fields_ = [
     ('nReserved', c_uint * 39),
 ]
 MV_FRAME_OUT_INFO_EX = _MV_FRAME_OUT_INFO_EX_
+class _MV_FRAME_OUT_(Structure):
+    pass
+_MV_FRAME_OUT_._fields_ = [
+    ('pBufAddr', POINTER(c_ubyte)),
+    ('stFrameInfo', MV_FRAME_OUT_INFO_EX),
+    ('nRes', c_uint * 16),
+]
+MV_FRAME_OUT = _MV_FRAME_OUT_
 # CameraParams.h 176
 class _MV_DISPLAY_FRAME_INFO_(Structure):
     pass
@@ -929,6 +937,7 @@ __all__ = ['_MV_ALL_MATCH_INFO_', '_MV_XML_FEATURE_Integer_',
            '_MVCC_FLOATVALUE_T', 'MV_XML_FEATURE_Port',
            'PixelType_Gvsp_YUV422_YUYV_Packed',
            'MV_FRAME_OUT_INFO_EX', '_MV_IMAGE_BASIC_INFO_',
+           'MV_FRAME_OUT', '_MV_FRAME_OUT_',
            '_MV_CAM_BALANCEWHITE_AUTO_', 'MV_XML_FEATURE_Base',
            '_MV_USB3_DEVICE_INFO_', 'PixelType_Gvsp_BayerBG8',
            'MVCC_INTVALUE_EX', 'MV_XML_FEATURE_Register', 'AM_WO',
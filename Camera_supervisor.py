@@ -0,0 +1,232 @@
+# -- coding: utf-8 --
+"""
+ch:相机断线自动重连 | en:Automatic camera reconnection
+
+CameraSupervisor watches one opened, grabbing camera and brings it back when
+it drops off the network. A loss is detected two ways:
+
+    disconnect  MV_EXCEPTION_DEV_DISCONNECT from MV_CC_RegisterExceptionCallBack
+    timeout     no frame for fFrameTimeout seconds while frames are expected;
+                the grab loop reports frames with frame() (GrabPipeline's
+                fn_grabbed), and bWatchFrames is cleared in trigger mode
+
+The exception callback only records the loss and wakes the supervisor's own
+thread, which then:
+
+    1. snapshots the node values cached in the MvNodeCache (the NODE_TYPES
+       nodes other than the packet size) and calls fn_lost(strReason) so the
+       owner can stop its grab thread
+    2. stops grabbing, closes the device and destroys the handle, ignoring
+       the errors a vanished device returns
+    3. creates and opens a new handle, sets the optimal packet size (GigE),
+       reapplies the snapshot with apply_parameters, registers the exception
+       callback again and starts grabbing; a failed attempt is retried after
+       fBackoffInitial seconds, doubling up to fBackoffMax, until it succeeds
+       or nMaxAttempts attempts failed (0 retries forever), after which the
+       supervisor stops
+    4. calls fn_recovered(cam, cache) with the new MvCamera and MvNodeCache
+
+Every loss is recorded per camera (by serial number): how long detection
+took after the last frame, attempts, time to recover from detection until
+grabbing restarted, and the whole outage from the last frame before the loss
+to the first frame after it. Nothing is printed: listEvents holds each
+loss, stats() summarises them, and the caller decides what to show.
+"""
+import time
+import threading
+
+from MvCameraControl_class import *
+from MvNodeCache import MvNodeCache
+from MvParamBatch import NODE_TYPES, apply_parameters
+
+SUPERVISOR_REASON_DISCONNECT = "disconnect"
+SUPERVISOR_REASON_TIMEOUT = "timeout"
+# ch:SDK异常回调原型 | en:Prototype of the SDK exception callback
+ExceptionCallBack = MV_FUNCTYPE(None, c_uint, c_void_p)
+# ch:重连后由探测结果重新设置,不从缓存恢复 | en:Re-detected after reconnecting rather than restored from the cache
+SUPERVISOR_SKIP_NODES = ("GevSCPSPacketSize",)
+
+
+def device_serial(stDevInfo):
+    if stDevInfo.nTLayerType == MV_GIGE_DEVICE:
+        arrSerial = stDevInfo.SpecialInfo.stGigEInfo.chSerialNumber
+    elif stDevInfo.nTLayerType == MV_USB_DEVICE:
+        arrSerial = stDevInfo.SpecialInfo.stUsb3VInfo.chSerialNumber
+    else:
+        return ""
+    return bytes(bytearray(arrSerial)).split(b"\0", 1)[0].decode("ascii", "replace")
+
+
+class CameraSupervisor():
+
+    def __init__(self, stDevInfo, cam, cache=None, fn_lost=None, fn_recovered=None, fFrameTimeout=2.0,
+                 fBackoffInitial=0.25, fBackoffMax=8.0, nMaxAttempts=0):
+        self.stDevInfo = stDevInfo
+        self.strSerial = device_serial(stDevInfo)
+        self.cam = cam
+        self.cache = cache if cache is not None else MvNodeCache(cam)
+        self.fn_lost = fn_lost
+        self.fn_recovered = fn_recovered
+        self.fFrameTimeout = fFrameTimeout
+        self.fBackoffInitial = fBackoffInitial
+        self.fBackoffMax = fBackoffMax
+        self.nMaxAttempts = nMaxAttempts
+        self.bWatchFrames = True
+        self.ev_stop = threading.Event()
+        self.ev_wake = threading.Event()
+        self.hThread = None
+        self.fLastFrame = time.perf_counter()
+        self.strPending = None
+        self.fPendingAt = 0.0
+        self.dictOutage = None
+        self.listEvents = []
+        # ch:回调对象必须一直被引用 | en:The callback object must stay referenced while registered
+        self.fnException = ExceptionCallBack(self._on_exception)
+
+    def start(self):
+        """
+        Register the exception callback on the current camera and start
+        watching; returns the registration ret, on failure only frame
+        timeouts are detected.
+        """
+        ret = self.cam.MV_CC_RegisterExceptionCallBack(self.fnException, None)
+        self.ev_stop.clear()
+        self.fLastFrame = time.perf_counter()
+        self.hThread = threading.Thread(target=self._run, name="supervisor-" + self.strSerial, daemon=True)
+        self.hThread.start()
+        return ret
+
+    def stop(self, fTimeout=None):
+        """Stop watching; a recovery in progress gives up at its next backoff wait."""
+        self.ev_stop.set()
+        self.ev_wake.set()
+        if self.hThread is not None and self.hThread is not threading.current_thread():
+            self.hThread.join(fTimeout)
+        self.hThread = None
+
+    # ch:取流线程每帧调用 | en:Called by the grab thread for every frame
+    def frame(self):
+        self.fLastFrame = time.perf_counter()
+        dictOutage = self.dictOutage
+        if dictOutage is not None:
+            self.dictOutage = None
+            dictOutage["outage_ms"] = (self.fLastFrame - dictOutage["last_frame"]) * 1e3
+
+    # ch:SDK回调线程:只记录,重连在监督线程中进行 | en:SDK callback thread: record only, the supervisor thread reconnects
+    def _on_exception(self, nMsgType, pUser):
+        if nMsgType == MV_EXCEPTION_DEV_DISCONNECT and self.strPending is None:
+            self.fPendingAt = time.perf_counter()
+            self.strPending = SUPERVISOR_REASON_DISCONNECT
+            self.ev_wake.set()
+
+    def _run(self):
+        while not self.ev_stop.is_set():
+            self.ev_wake.wait(min(0.1, self.fFrameTimeout / 4) if self.fFrameTimeout > 0 else 0.1)
+            self.ev_wake.clear()
+            if self.ev_stop.is_set():
+                break
+            fNow = time.perf_counter()
+            if (self.strPending is None and self.bWatchFrames and self.fFrameTimeout > 0
+                    and fNow - self.fLastFrame > self.fFrameTimeout):
+                self.fPendingAt = fNow
+                self.strPending = SUPERVISOR_REASON_TIMEOUT
+            if self.strPending is not None:
+                self._recover(self.strPending, self.fPendingAt)
+                self.strPending = None
+
+    def _recover(self, strReason, fDetected):
+        fLastFrame = self.fLastFrame
+        dictEvent = {"reason": strReason, "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                     "last_frame": fLastFrame, "detect_ms": (fDetected - fLastFrame) * 1e3, "attempts": 0,
+                     "recover_ms": None, "outage_ms": None, "reapplied": 0, "reapply_failed": None,
+                     "reapply_error": MV_OK, "packet_size_error": MV_OK, "recovered": False, "last_error": MV_OK}
+        self.listEvents.append(dictEvent)
+        dictParams = self._cached_parameters()
+        if self.fn_lost is not None:
+            self.fn_lost(strReason)
+        self._teardown()
+
+        fBackoff = self.fBackoffInitial
+        while not self.ev_stop.is_set():
+            dictEvent["attempts"] += 1
+            ret = self._rebuild(dictParams, dictEvent)
+            if ret == MV_OK:
+                break
+            dictEvent["last_error"] = ret
+            if self.nMaxAttempts and dictEvent["attempts"] >= self.nMaxAttempts:
+                self.ev_stop.set()
+                return
+            self.ev_stop.wait(fBackoff)
+            fBackoff = min(fBackoff * 2, self.fBackoffMax)
+        if not dictEvent["recovered"]:
+            return
+        dictEvent["recover_ms"] = (time.perf_counter() - fDetected) * 1e3
+        if self.fn_recovered is not None:
+            self.fn_recovered(self.cam, self.cache)
+
+    def _cached_parameters(self):
+        dictParams = {}
+        for strKey, strType in NODE_TYPES.items():
+            if strKey in SUPERVISOR_SKIP_NODES:
+                continue
+            bCached, value = self.cache.peek_value(strKey, strType)
+            if bCached:
+                dictParams[strKey] = (strType, value.decode("ascii") if isinstance(value, bytes) else value)
+        return dictParams
+
+    def _teardown(self):
+        # ch:设备已不在,这些调用的错误码不影响重连 | en:The device is gone, so errors from these calls do not matter
+        self.cam.MV_CC_StopGrabbing()
+        self.cache.invalidate()
+        self.cam.MV_CC_CloseDevice()
+        self.cam.MV_CC_DestroyHandle()
+
+    def _rebuild(self, dictParams, dictEvent):
+        cam = MvCamera()
+        ret = cam.MV_CC_CreateHandle(self.stDevInfo)
+        if ret != MV_OK:
+            cam.MV_CC_DestroyHandle()
+            return ret
+        ret = cam.MV_CC_OpenDevice(MV_ACCESS_Exclusive, 0)
+        if ret != MV_OK:
+            cam.MV_CC_DestroyHandle()
+            return ret
+        cache = MvNodeCache(cam)
+        if self.stDevInfo.nTLayerType == MV_GIGE_DEVICE:
+            nPacketSize = cam.MV_CC_GetOptimalPacketSize()
+            if int(nPacketSize) > 0:
+                dictEvent["packet_size_error"] = cache.set_value("GevSCPSPacketSize", NODE_TYPES["GevSCPSPacketSize"],
+                                                                 nPacketSize)
+        # ch:新句柄缓存为空,bRollback=False时不读旧值直接写入 | en:The new cache is empty, so bRollback=False writes every value without reading it first
+        ret, dictReport = apply_parameters(cache, dictParams, bRollback=False)
+        dictEvent["reapplied"] = len(dictReport["written"]) + len(dictReport["skipped"])
+        dictEvent["reapply_failed"] = dictReport["failed"]
+        if ret != MV_E_NETER:
+            # ch:个别节点恢复失败不阻止取流,记录在事件中 | en:A node that fails to reapply does not block grabbing, it is recorded in the event
+            dictEvent["reapply_error"] = ret
+            cam.MV_CC_RegisterExceptionCallBack(self.fnException, None)
+            self.fLastFrame = time.perf_counter()
+            ret = cam.MV_CC_StartGrabbing()
+        if ret != MV_OK:
+            cam.MV_CC_CloseDevice()
+            cam.MV_CC_DestroyHandle()
+            return ret
+        self.cam = cam
+        self.cache = cache
+        dictEvent["recovered"] = True
+        self.dictOutage = dictEvent
+        return MV_OK
+
+    def stats(self):
+        listRecovered = [dictEvent for dictEvent in self.listEvents if dictEvent["recovered"]]
+        listRecoverMs = [dictEvent["recover_ms"] for dictEvent in listRecovered]
+        listOutageMs = [dictEvent["outage_ms"] for dictEvent in listRecovered if dictEvent["outage_ms"] is not None]
+        return {"serial": self.strSerial,
+                "disconnects": sum(dictEvent["reason"] == SUPERVISOR_REASON_DISCONNECT for dictEvent in self.listEvents),
+                "timeouts": sum(dictEvent["reason"] == SUPERVISOR_REASON_TIMEOUT for dictEvent in self.listEvents),
+                "recoveries": len(listRecovered), "failures": len(self.listEvents) - len(listRecovered),
+                "attempts": sum(dictEvent["attempts"] for dictEvent in self.listEvents),
+                "recover_ms_mean": sum(listRecoverMs) / len(listRecoverMs) if listRecoverMs else 0.0,
+                "recover_ms_max": max(listRecoverMs) if listRecoverMs else 0.0,
+                "outage_ms_mean": sum(listOutageMs) / len(listOutageMs) if listOutageMs else 0.0,
+                "outage_ms_max": max(listOutageMs) if listOutageMs else 0.0}
@@ -0,0 +1,75 @@
+# -- coding: utf-8 --
+"""
+ch:显示缩放 | en:Display scaler
+
+DisplayScaler brings converted frames down to the size of the widget that
+shows them, on the acquisition thread, so the GUI thread only wraps the
+result in a QImage. cv2.resize with INTER_AREA writes into a buffer from a
+FrameBufferPool; the target size (aspect ratio kept) is only recomputed
+when the source size or the widget size changes, which the GUI reports
+through set_target() from its resize events.
+
+For Bayer frames convert() demosaics straight at the scale it needs: when
+the widget is at most half the sensor size the 2x2 superpixel path is used,
+so the full-resolution BGR frame is never built just to be shrunk.
+"""
+import threading
+
+import cv2
+
+from FrameBuffer_pool import FrameBufferPool
+from PixelType_registry import PIXEL_FAMILY_BAYER
+
+
+class DisplayScaler():
+
+    def __init__(self, pool=None):
+        self.pool = pool if pool is not None else FrameBufferPool()
+        self.lock = threading.Lock()
+        self.nTargetWidth = 0
+        self.nTargetHeight = 0
+        self.dictSizes = {}
+        self.nGeometryUpdates = 0
+
+    # ch:由GUI线程在控件尺寸变化时调用 | en:Called from the GUI thread when the widget is resized
+    def set_target(self, nWidth, nHeight):
+        with self.lock:
+            nWidth, nHeight = max(int(nWidth), 0), max(int(nHeight), 0)
+            if (nWidth, nHeight) != (self.nTargetWidth, self.nTargetHeight):
+                self.nTargetWidth, self.nTargetHeight = nWidth, nHeight
+                self.dictSizes = {}
+
+    # ch:保持宽高比的显示尺寸,每个源尺寸只在目标尺寸变化后计算一次 | en:Display size keeping the aspect ratio, computed once per source size until the target changes
+    def size_for(self, nSrcWidth, nSrcHeight):
+        with self.lock:
+            dictSizes = self.dictSizes
+            nTargetWidth, nTargetHeight = self.nTargetWidth, self.nTargetHeight
+        key = (nSrcWidth, nSrcHeight)
+        if key in dictSizes:
+            return dictSizes[key]
+        if nTargetWidth <= 0 or nTargetHeight <= 0 or nSrcWidth <= 0 or nSrcHeight <= 0:
+            tupleSize = None
+        else:
+            fScale = min(nTargetWidth / nSrcWidth, nTargetHeight / nSrcHeight)
+            tupleSize = (max(int(nSrcWidth * fScale), 1), max(int(nSrcHeight * fScale), 1))
+        dictSizes[key] = tupleSize
+        self.nGeometryUpdates += 1
+        return tupleSize
+
+    def scale(self, image):
+        """Resize image to the display size into a pooled buffer; returned unchanged when no target is set or it already fits."""
+        tupleSize = self.size_for(image.shape[1], image.shape[0])
+        if tupleSize is None or tupleSize == (image.shape[1], image.shape[0]):
+            return image
+        nWidth, nHeight = tupleSize
+        nInterpolation = cv2.INTER_AREA if nWidth < image.shape[1] else cv2.INTER_LINEAR
+        dst = self.pool.get((nHeight, nWidth) + image.shape[2:], image.dtype)
+        return cv2.resize(image, tupleSize, dst=dst, interpolation=nInterpolation)
+
+    def convert(self, stFormat, converter, demosaicer, data, nWidth, nHeight):
+        """Convert and scale one frame; Bayer frames shrunk by 2 or more skip the full-resolution demosaic."""
+        if stFormat.strFamily == PIXEL_FAMILY_BAYER and demosaicer is not None:
+            tupleSize = self.size_for(nWidth, nHeight)
+            if tupleSize is not None and tupleSize[0] * 2 <= nWidth and tupleSize[1] * 2 <= nHeight:
+                return self.scale(demosaicer.superpixel(stFormat, data, nWidth, nHeight))
+        return self.scale(converter(data, nWidth, nHeight))
@@ -0,0 +1,87 @@
+# -- coding: utf-8 --
+"""
+ch:帧缓存池 | en:Frame buffer pool
+
+Grab loops ask the pool for a destination array of a given shape and dtype
+instead of allocating one per frame. Each (shape, dtype) key owns a small
+ring of nDepth arrays handed out in turn, so the frame returned last time
+stays intact while the next one is being written; a consumer that keeps a
+frame longer than nDepth - 1 further requests must copy it, or hold() it:
+held buffers are skipped by get() until release(), and the ring grows when
+every buffer of a key is held.
+"""
+import threading
+
+import numpy as np
+
+
+class FrameBufferPool():
+
+    def __init__(self, nDepth=2):
+        if nDepth < 1:
+            raise ValueError("pool depth must be at least 1")
+        self.nDepth = nDepth
+        self.dictRings = {}
+        self.lock = threading.Lock()
+        self.dictHeld = {}
+        self.nAllocations = 0
+        self.nRequests = 0
+
+    # ch:取下一个(shape, dtype)缓存,首次使用时分配 | en:Next buffer for (shape, dtype), allocated on first use
+    def get(self, shape, dtype=np.uint8):
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self.lock:
+            self.nRequests += 1
+            ring = self.dictRings.get(key)
+            if ring is None:
+                ring = [[], 0]
+                self.dictRings[key] = ring
+            listBuffers, nNext = ring
+            if len(listBuffers) < self.nDepth:
+                return self._allocate(ring, shape, dtype)
+            for i in range(len(listBuffers)):
+                nIndex = (nNext + i) % len(listBuffers)
+                buf = listBuffers[nIndex]
+                if id(buf) not in self.dictHeld:
+                    ring[1] = (nIndex + 1) % len(listBuffers)
+                    return buf
+            return self._allocate(ring, shape, dtype)
+
+    def _allocate(self, ring, shape, dtype):
+        listBuffers = ring[0]
+        buf = np.empty(shape, dtype)
+        listBuffers.insert(ring[1], buf)
+        ring[1] = (ring[1] + 1) % len(listBuffers)
+        self.nAllocations += 1
+        return buf
+
+    # ch:是否为本池分配的缓存 | en:Whether buf was allocated by this pool
+    def owns(self, buf):
+        key = (buf.shape, buf.dtype.str)
+        with self.lock:
+            ring = self.dictRings.get(key)
+            return ring is not None and any(b is buf for b in ring[0])
+
+    # ch:标记缓存仍被使用,get()跳过它直到release() | en:Mark buf as in use so get() skips it until release()
+    def hold(self, buf):
+        with self.lock:
+            self.dictHeld[id(buf)] = self.dictHeld.get(id(buf), 0) + 1
+
+    def release(self, buf):
+        with self.lock:
+            nCount = self.dictHeld.get(id(buf), 0) - 1
+            if nCount > 0:
+                self.dictHeld[id(buf)] = nCount
+            else:
+                self.dictHeld.pop(id(buf), None)
+
+    # ch:释放全部缓存,如分辨率变化后 | en:Drop every buffer, e.g. after a resolution change
+    def clear(self):
+        with self.lock:
+            self.dictRings.clear()
+            self.dictHeld.clear()
+
+    # ch:当前持有的字节数 | en:Bytes currently held by the pool
+    def nbytes(self):
+        with self.lock:
+            return sum(buf.nbytes for listBuffers, _ in self.dictRings.values() for buf in listBuffers)
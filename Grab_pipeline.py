@@ -0,0 +1,391 @@
+# -- coding: utf-8 --
+"""
+ch:分级取流流水线 | en:Staged grab pipeline
+
+    grab ──q──> convert ──q──> display
+                         └─q──> save
+
+Each stage runs on its own thread and stages are joined by bounded
+FrameQueues, so a slow display or disk never holds an SDK buffer: the grab
+stage copies the frame into a pooled buffer and calls MV_CC_FreeImageBuffer
+straight away. Every queue has a drop policy:
+
+    drop-oldest   a full queue discards its oldest frame (live view)
+    drop-newest   a full queue refuses the incoming frame (keep a backlog)
+    block         the producer waits for room (no loss, applies back-pressure)
+
+Pooled buffers are held while any queue or stage references the frame and
+handed back to the FrameBufferPool when the last reference is released.
+An optional record callback sees every converted frame on the convert
+thread, for a VideoRecorder that must not slow the pipeline down.
+stats() reports per-stage frame counts, rates and busy time plus per-queue
+depth, high-water mark and drops.
+
+Shutdown is cooperative: stop() sets an Event that the grab thread checks
+between GetFrameView calls, which use a short timeout (nGrabTimeout, 100 ms
+by default), so stopping takes at most about one grab timeout and never
+interrupts a thread while it owns an SDK buffer.
+"""
+import time
+import threading
+from collections import deque
+
+import numpy as np
+
+from MvCameraControl_class import *
+from FrameBuffer_pool import FrameBufferPool
+from PixelType_registry import PixelFormatResolver
+
+QUEUE_DROP_OLDEST = "drop-oldest"
+QUEUE_DROP_NEWEST = "drop-newest"
+QUEUE_BLOCK = "block"
+QUEUE_POLICIES = (QUEUE_DROP_OLDEST, QUEUE_DROP_NEWEST, QUEUE_BLOCK)
+
+STAGE_GRAB = "grab"
+STAGE_CONVERT = "convert"
+STAGE_DISPLAY = "display"
+STAGE_SAVE = "save"
+
+
+class PipelineFrame():
+    """
+    One frame travelling through the pipeline: raw bytes copied out of the
+    SDK buffer, a copy of its MV_FRAME_OUT_INFO_EX, and the converted image
+    once the convert stage has run. Reference counted so pooled buffers go
+    back to the pool when the last stage or queue lets go of it.
+    """
+
+    def __init__(self, pool, raw, stFrameInfo, fHostTime):
+        self.pool = pool
+        self.raw = raw
+        self.stFrameInfo = stFrameInfo
+        self.fHostTime = fHostTime
+        self.image = None
+        self.listHeld = [raw]
+        self.nRefs = 1
+        self.lock = threading.Lock()
+
+    # ch:让缓存池在释放前不复用buf | en:Keep buf out of the pool until this frame is released
+    def hold(self, buf):
+        self.pool.hold(buf)
+        self.listHeld.append(buf)
+
+    def retain(self):
+        with self.lock:
+            self.nRefs += 1
+        return self
+
+    def release(self):
+        with self.lock:
+            self.nRefs -= 1
+            if self.nRefs > 0:
+                return
+            listHeld, self.listHeld = self.listHeld, []
+        for buf in listHeld:
+            self.pool.release(buf)
+
+
+class FrameQueue():
+    """Bounded frame queue with a drop policy, see the module docstring."""
+
+    def __init__(self, strName, nMaxSize=4, strPolicy=QUEUE_DROP_OLDEST):
+        if strPolicy not in QUEUE_POLICIES:
+            raise ValueError("unknown queue policy '%s', expected one of %s" % (strPolicy, ", ".join(QUEUE_POLICIES)))
+        if nMaxSize < 1:
+            raise ValueError("queue size must be at least 1")
+        self.strName = strName
+        self.nMaxSize = nMaxSize
+        self.strPolicy = strPolicy
+        self.items = deque()
+        self.cond = threading.Condition()
+        self.b_closed = False
+        self.nPut = 0
+        self.nDropped = 0
+        self.nMaxDepth = 0
+
+    # ch:放入一帧,被丢弃的帧在此释放;返回是否入队 | en:Queue a frame, releasing whatever gets dropped; returns whether it was queued
+    def put(self, frame, fTimeout=None):
+        dropped = None
+        with self.cond:
+            if self.b_closed:
+                dropped = frame
+            elif len(self.items) >= self.nMaxSize:
+                if self.strPolicy == QUEUE_DROP_OLDEST:
+                    dropped = self.items.popleft()
+                elif self.strPolicy == QUEUE_DROP_NEWEST:
+                    dropped = frame
+                else:
+                    fDeadline = None if fTimeout is None else time.perf_counter() + fTimeout
+                    while len(self.items) >= self.nMaxSize and not self.b_closed:
+                        fRemain = None if fDeadline is None else fDeadline - time.perf_counter()
+                        if fRemain is not None and fRemain <= 0:
+                            break
+                        self.cond.wait(fRemain)
+                    if self.b_closed or len(self.items) >= self.nMaxSize:
+                        dropped = frame
+            if dropped is not frame:
+                self.items.append(frame)
+                self.nPut += 1
+                self.nMaxDepth = max(self.nMaxDepth, len(self.items))
+                self.cond.notify_all()
+            if dropped is not None:
+                self.nDropped += 1
+        if dropped is not None:
+            dropped.release()
+        return dropped is not frame
+
+    # ch:取一帧,超时或队列已关闭且为空时返回None | en:Take a frame; None on timeout or once closed and empty
+    def get(self, fTimeout=None):
+        with self.cond:
+            if not self.items and not self.b_closed:
+                self.cond.wait(fTimeout)
+            if not self.items:
+                return None
+            frame = self.items.popleft()
+            self.cond.notify_all()
+            return frame
+
+    # ch:关闭后不再接收新帧,已入队的帧仍可取出 | en:After close() no frame is accepted, queued ones can still be taken
+    def close(self):
+        with self.cond:
+            self.b_closed = True
+            self.cond.notify_all()
+
+    # ch:丢弃并释放全部排队的帧 | en:Discard and release every queued frame
+    def clear(self):
+        with self.cond:
+            listItems = list(self.items)
+            self.items.clear()
+            self.cond.notify_all()
+        for frame in listItems:
+            frame.release()
+
+    def depth(self):
+        with self.cond:
+            return len(self.items)
+
+    def stats(self):
+        with self.cond:
+            return {"depth": len(self.items), "max_depth": self.nMaxDepth, "size": self.nMaxSize,
+                    "policy": self.strPolicy, "put": self.nPut, "dropped": self.nDropped}
+
+
+class PipelineStage():
+    """Counters for one stage: frames handled, time spent working, errors."""
+
+    def __init__(self, strName):
+        self.strName = strName
+        self.nFrames = 0
+        self.nErrors = 0
+        self.fBusy = 0.0
+        self.fStart = None
+        self.thread = None
+
+    def record(self, fElapsed):
+        self.nFrames += 1
+        self.fBusy += fElapsed
+
+    def stats(self):
+        fRun = time.perf_counter() - self.fStart if self.fStart else 0.0
+        return {"frames": self.nFrames, "fps": self.nFrames / fRun if fRun > 0 else 0.0,
+                "busy_ms": self.fBusy / self.nFrames * 1e3 if self.nFrames else 0.0,
+                "errors": self.nErrors}
+
+
+class GrabPipeline():
+    """
+    Grab -> convert -> display/save pipeline for one opened, grabbing MvCamera.
+
+    display(image, stFrameInfo) and save(frame) are plain callables run on
+    their own stage threads; either may be None to leave that branch out.
+    fn_save_wanted, when given, is asked per frame whether the save branch
+    needs it (e.g. only while a "save" button is armed). record(frame), when
+    given, sees every converted frame on the convert thread and must not
+    block: it is meant to hand the frame to a VideoRecorder, retaining it
+    until encoded. fn_grabbed(), when given, is called on the grab thread
+    after every frame, e.g. CameraSupervisor.frame. queue_policies maps 'convert', 'display', 'save' to a
+    (size, policy) pair.
+    """
+
+    def __init__(self, cam, display=None, save=None, fn_save_wanted=None, demosaicer=None,
+                 queue_policies=None, nGrabTimeout=100, pool=None, record=None, fn_grabbed=None):
+        self.cam = cam
+        self.display = display
+        self.save = save
+        self.record = record
+        self.fn_grabbed = fn_grabbed
+        self.fn_save_wanted = fn_save_wanted
+        self.nGrabTimeout = nGrabTimeout
+        self.pool = pool if pool is not None else FrameBufferPool()
+        if demosaicer is not None and demosaicer.pool is not self.pool:
+            demosaicer.pool = self.pool
+        self.resolver = PixelFormatResolver(demosaicer)
+
+        dictPolicies = {STAGE_CONVERT: (4, QUEUE_DROP_OLDEST),
+                        STAGE_DISPLAY: (2, QUEUE_DROP_OLDEST),
+                        STAGE_SAVE: (16, QUEUE_BLOCK)}
+        dictPolicies.update(queue_policies or {})
+        self.queues = dict((strName, FrameQueue(strName, nSize, strPolicy))
+                           for strName, (nSize, strPolicy) in dictPolicies.items())
+        self.stages = dict((strName, PipelineStage(strName))
+                           for strName in (STAGE_GRAB, STAGE_CONVERT, STAGE_DISPLAY, STAGE_SAVE))
+        self.ev_stop = threading.Event()
+        self.nGrabTimeouts = 0
+        self.nConvertFailures = 0
+        self.fGrabStopMs = 0.0
+        self.fStopMs = 0.0
+
+    def start(self):
+        self.ev_stop.clear()
+        listTargets = [(STAGE_GRAB, self._grab_loop), (STAGE_CONVERT, self._convert_loop)]
+        if self.display is not None:
+            listTargets.append((STAGE_DISPLAY, self._display_loop))
+        if self.save is not None:
+            listTargets.append((STAGE_SAVE, self._save_loop))
+        for strName, target in listTargets:
+            stage = self.stages[strName]
+            stage.fStart = time.perf_counter()
+            stage.thread = threading.Thread(target=target, name="pipeline-" + strName, daemon=True)
+            stage.thread.start()
+
+    def stop(self, fTimeout=None, bDrain=True):
+        """
+        Stop grabbing and join the stage threads. The grab thread notices the
+        stop event between GetFrameView calls, so it exits within one grab
+        timeout plus one frame copy. With bDrain the frames already queued
+        still go through convert and save, otherwise they are discarded; the
+        display backlog is always dropped, it is only live view and would make
+        the stop as slow as the display. SDK buffers are never held by the
+        queues, so either way none leaks. Returns the time in ms until the
+        grab thread had exited.
+        """
+        fStart = time.perf_counter()
+        self.ev_stop.set()
+        self._join(STAGE_GRAB, fTimeout)
+        self.fGrabStopMs = (time.perf_counter() - fStart) * 1e3
+        for strName, queue in self.queues.items():
+            if not bDrain or strName == STAGE_DISPLAY:
+                queue.close()
+                queue.clear()
+        for strName in (STAGE_CONVERT, STAGE_DISPLAY, STAGE_SAVE):
+            self._join(strName, fTimeout)
+        for queue in self.queues.values():
+            queue.clear()
+        self.fStopMs = (time.perf_counter() - fStart) * 1e3
+        return self.fGrabStopMs
+
+    def _join(self, strName, fTimeout):
+        thread = self.stages[strName].thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(fTimeout)
+
+    def is_running(self):
+        return any(stage.thread is not None and stage.thread.is_alive() for stage in self.stages.values())
+
+    def stats(self):
+        return {"stages": dict((strName, stage.stats()) for strName, stage in self.stages.items()),
+                "queues": dict((strName, queue.stats()) for strName, queue in self.queues.items()),
+                "grab_timeouts": self.nGrabTimeouts, "convert_failures": self.nConvertFailures,
+                "pool_allocations": self.pool.nAllocations,
+                "grab_stop_ms": self.fGrabStopMs, "stop_ms": self.fStopMs}
+
+    # ch:取流:拷贝进缓存池后立即归还SDK缓存 | en:Grab: copy into a pooled buffer and hand the SDK buffer back at once
+    def _grab_loop(self):
+        stage = self.stages[STAGE_GRAB]
+        queue = self.queues[STAGE_CONVERT]
+        try:
+            while not self.ev_stop.is_set():
+                ret, stFrame = self.cam.GetFrameView(self.nGrabTimeout)
+                if ret != 0:
+                    self.nGrabTimeouts += 1
+                    # ch:断线后SDK可能立即返回错误,等一个取流超时再试,避免空转 | en:After a disconnect the SDK may fail at once; wait one grab timeout before retrying instead of spinning
+                    if ret != MV_E_NODATA:
+                        self.ev_stop.wait(self.nGrabTimeout / 1e3)
+                    continue
+                fStart = time.perf_counter()
+                with stFrame:
+                    raw = self.pool.get(stFrame.data.shape, np.uint8)
+                    np.copyto(raw, stFrame.data)
+                    stFrameInfo = MV_FRAME_OUT_INFO_EX()
+                    memmove(byref(stFrameInfo), byref(stFrame.stFrameInfo), sizeof(stFrameInfo))
+                    frame = PipelineFrame(self.pool, raw, stFrameInfo, time.time())
+                    self.pool.hold(raw)
+                stage.record(time.perf_counter() - fStart)
+                if self.fn_grabbed is not None:
+                    self.fn_grabbed()
+                # ch:阻塞策略下也只等一个取流超时,保证停止延迟有界 | en:Even a blocking queue is waited on for one grab timeout at most, keeping stop latency bounded
+                queue.put(frame, self.nGrabTimeout / 1e3)
+        finally:
+            queue.close()
+
+    def _convert_loop(self):
+        stage = self.stages[STAGE_CONVERT]
+        queue = self.queues[STAGE_CONVERT]
+        listOutputs = []
+        if self.display is not None:
+            listOutputs.append(self.queues[STAGE_DISPLAY])
+        try:
+            while True:
+                frame = queue.get(0.1)
+                if frame is None:
+                    if queue.b_closed:
+                        break
+                    continue
+                fStart = time.perf_counter()
+                stFrameInfo = frame.stFrameInfo
+                self.resolver.resolve(stFrameInfo.enPixelType)
+                if self.resolver.converter is None:
+                    self.nConvertFailures += 1
+                    frame.release()
+                    continue
+                try:
+                    frame.image = self.resolver.converter(frame.raw, stFrameInfo.nWidth, stFrameInfo.nHeight)
+                except Exception as e:
+                    print("pipeline convert failed: %s" % e)
+                    stage.nErrors += 1
+                    frame.release()
+                    continue
+                if self.pool.owns(frame.image):
+                    frame.hold(frame.image)
+                if self.record is not None:
+                    try:
+                        self.record(frame)
+                    except Exception as e:
+                        print("pipeline record failed: %s" % e)
+                stage.record(time.perf_counter() - fStart)
+
+                listTargets = list(listOutputs)
+                if self.save is not None and (self.fn_save_wanted is None or self.fn_save_wanted()):
+                    listTargets.append(self.queues[STAGE_SAVE])
+                for target in listTargets:
+                    target.put(frame.retain())
+                frame.release()
+        finally:
+            for queue_out in self.queues.values():
+                if queue_out is not queue:
+                    queue_out.close()
+
+    def _consume_loop(self, strName, handler):
+        stage = self.stages[strName]
+        queue = self.queues[strName]
+        while True:
+            frame = queue.get(0.1)
+            if frame is None:
+                if queue.b_closed:
+                    break
+                continue
+            fStart = time.perf_counter()
+            try:
+                handler(frame)
+            except Exception as e:
+                print("pipeline %s failed: %s" % (strName, e))
+                stage.nErrors += 1
+            finally:
+                frame.release()
+            stage.record(time.perf_counter() - fStart)
+
+    def _display_loop(self):
+        self._consume_loop(STAGE_DISPLAY, lambda frame: self.display(frame.image, frame.stFrameInfo))
+
+    def _save_loop(self):
+        self._consume_loop(STAGE_SAVE, self.save)
@@ -0,0 +1,284 @@
+# -- coding: utf-8 --
+"""
+ch:后台图像保存 | en:Background image writer
+
+ImageWriter encodes and writes images on a pool of worker threads behind a
+bounded queue, so the caller (GUI thread, grab loop, pipeline save stage)
+only pays for queueing the job. OpenCV releases the GIL while encoding, so
+several workers really do run in parallel.
+
+Encoders are looked up by format name in IMAGE_ENCODERS; register_encoder()
+adds more. Built in:
+
+    png    cv2 PNG, compression level 0 (fastest, largest) .. 9 (smallest)
+    jpg    cv2 JPEG, quality 0 .. 100
+    bmp    cv2 BMP, uncompressed
+    tiff   cv2 TIFF, keeps 16-bit data (e.g. demosaic_full output), level
+           1 = none, 5 = LZW, 8 = deflate
+    npy    np.save, keeps dtype, shape and bit depth
+    raw    the array bytes as they are, no header
+
+Backpressure is chosen per call: submit() drops and counts the job when
+the queue is full, or waits up to fTimeout seconds for room with bBlock.
+frame_file_name() names files from nFrameNum and the host timestamp, and
+submit_frame() does both in one call. With nFsyncEvery > 0 written files
+are fsync'ed in batches of that many (plus on flush()), which keeps burst
+captures from either losing data on power loss or paying one fsync per
+frame. stats() reports written/failed/dropped counts, queue depth and its
+high-water mark, encode+write latency and bytes written.
+"""
+import os
+import time
+import queue
+import threading
+
+import cv2
+import numpy as np
+
+IMAGE_FORMAT_PNG = "png"
+IMAGE_FORMAT_JPEG = "jpg"
+IMAGE_FORMAT_BMP = "bmp"
+IMAGE_FORMAT_TIFF = "tiff"
+IMAGE_FORMAT_NPY = "npy"
+IMAGE_FORMAT_RAW = "raw"
+
+# ch:各格式的默认压缩参数及取值范围 | en:Default compression setting and valid range per format
+IMAGE_FORMAT_QUALITY = {
+    IMAGE_FORMAT_PNG: (3, 0, 9),
+    IMAGE_FORMAT_JPEG: (95, 0, 100),
+    IMAGE_FORMAT_BMP: (None, None, None),
+    IMAGE_FORMAT_TIFF: (5, 1, 8),
+    IMAGE_FORMAT_NPY: (None, None, None),
+    IMAGE_FORMAT_RAW: (None, None, None),
+}
+
+
+def _cv2_encoder(strExt, nParam=None):
+    def encode(image, nQuality):
+        listParams = [] if nParam is None or nQuality is None else [nParam, int(nQuality)]
+        bOk, data = cv2.imencode(strExt, image, listParams)
+        if not bOk:
+            raise ValueError("cv2 could not encode %s %s as %s" % (image.dtype, image.shape, strExt))
+        return data
+    return encode
+
+
+def _encode_npy(image, nQuality):
+    return image
+
+
+def _write_npy(f, image):
+    np.save(f, image)
+
+
+def _encode_raw(image, nQuality):
+    return np.ascontiguousarray(image)
+
+
+# ch:格式 -> 编码函数(image, nQuality) -> 可写入的数组 | en:Format -> encoder(image, nQuality) returning an array to write
+IMAGE_ENCODERS = {
+    IMAGE_FORMAT_PNG: _cv2_encoder(".png", cv2.IMWRITE_PNG_COMPRESSION),
+    IMAGE_FORMAT_JPEG: _cv2_encoder(".jpg", cv2.IMWRITE_JPEG_QUALITY),
+    IMAGE_FORMAT_BMP: _cv2_encoder(".bmp"),
+    IMAGE_FORMAT_TIFF: _cv2_encoder(".tiff", cv2.IMWRITE_TIFF_COMPRESSION),
+    IMAGE_FORMAT_NPY: _encode_npy,
+    IMAGE_FORMAT_RAW: _encode_raw,
+}
+# ch:需特殊写法的格式 | en:Formats that need their own way of writing the encoded data
+_IMAGE_WRITERS = {IMAGE_FORMAT_NPY: _write_npy}
+
+
+def register_encoder(strFormat, encoder, nDefaultQuality=None, nMin=None, nMax=None):
+    """Add or replace an encoder; encoder(image, nQuality) returns an array whose bytes are the file content."""
+    IMAGE_ENCODERS[strFormat] = encoder
+    IMAGE_FORMAT_QUALITY[strFormat] = (nDefaultQuality, nMin, nMax)
+
+
+def _check_format(strFormat):
+    if strFormat not in IMAGE_ENCODERS:
+        raise ValueError("unknown image format '%s', expected one of %s" % (strFormat, ", ".join(IMAGE_ENCODERS)))
+
+
+# ch:按格式编码并写文件,返回写入的字节数 | en:Encode and write one image in the given format, returns the bytes written
+def write_image(strPath, image, strFormat=IMAGE_FORMAT_PNG, nQuality=None):
+    _check_format(strFormat)
+    if nQuality is None:
+        nQuality = IMAGE_FORMAT_QUALITY[strFormat][0]
+    data = IMAGE_ENCODERS[strFormat](image, nQuality)
+    # ch:用文件对象写入,np.save不会再追加后缀 | en:Written through a file object, so np.save does not append a suffix
+    with open(strPath, "wb") as f:
+        writer = _IMAGE_WRITERS.get(strFormat)
+        if writer is not None:
+            writer(f, data)
+        else:
+            f.write(memoryview(data).cast("B"))
+        return f.tell()
+
+
+def frame_file_name(strDir, nFrameNum, fHostTime=None, strFormat=IMAGE_FORMAT_PNG, strPrefix="frame"):
+    """<dir>/<prefix>_<nFrameNum>_<YYYYmmdd_HHMMSS_mmm>.<format>, host time defaults to now."""
+    if fHostTime is None:
+        fHostTime = time.time()
+    strTime = time.strftime("%Y%m%d_%H%M%S", time.localtime(fHostTime)) + "_%03d" % int(fHostTime * 1000 % 1000)
+    return os.path.join(strDir, "%s_%08d_%s.%s" % (strPrefix, nFrameNum, strTime, strFormat))
+
+
+# ch:帧的主机时间戳(秒),SDK未填写时取当前时间 | en:Host timestamp of a frame in seconds, now when the SDK left it empty
+def frame_host_time(stFrameInfo):
+    if stFrameInfo.nHostTimeStamp > 0:
+        return stFrameInfo.nHostTimeStamp / 1000.0
+    return time.time()
+
+
+class ImageWriter():
+    """
+    Pool of nWorkers writer threads behind a queue of nQueueSize jobs.
+    fn_done(strPath, bOk) runs on the worker thread after each job.
+    """
+
+    def __init__(self, nWorkers=2, nQueueSize=16, nFsyncEvery=0):
+        self.jobs = queue.Queue(nQueueSize)
+        self.nQueueSize = nQueueSize
+        self.nFsyncEvery = nFsyncEvery
+        self.listThreads = []
+        self.lock = threading.Lock()
+        self.listUnsynced = []
+        self.nWritten = 0
+        self.nFailed = 0
+        self.nDropped = 0
+        self.nBytes = 0
+        self.nMaxDepth = 0
+        self.nFsyncs = 0
+        self.fEncodeTotal = 0.0
+        self.fEncodeMax = 0.0
+        for i in range(nWorkers):
+            thread = threading.Thread(target=self._work, name="image-writer-%d" % i, daemon=True)
+            thread.start()
+            self.listThreads.append(thread)
+
+    def submit(self, strPath, image, strFormat=IMAGE_FORMAT_PNG, nQuality=None, fn_done=None, bBlock=False,
+               fTimeout=None):
+        """
+        Queue one image; image may be a callable producing it on the worker.
+        Returns False and counts a drop if the queue is full (after waiting
+        up to fTimeout seconds with bBlock).
+        """
+        _check_format(strFormat)
+        try:
+            self.jobs.put((strPath, image, strFormat, nQuality, fn_done), bBlock, fTimeout)
+        except queue.Full:
+            with self.lock:
+                self.nDropped += 1
+            return False
+        with self.lock:
+            self.nMaxDepth = max(self.nMaxDepth, self.jobs.qsize())
+        return True
+
+    def submit_frame(self, strDir, image, stFrameInfo, strFormat=IMAGE_FORMAT_PNG, nQuality=None, fHostTime=None,
+                     strPrefix="frame", **kwargs):
+        """submit() under frame_file_name() (host time from the frame by default); returns the path, or None when dropped."""
+        if fHostTime is None:
+            fHostTime = frame_host_time(stFrameInfo)
+        strPath = frame_file_name(strDir, stFrameInfo.nFrameNum, fHostTime, strFormat, strPrefix)
+        if not self.submit(strPath, image, strFormat, nQuality, **kwargs):
+            return None
+        return strPath
+
+    def pending(self):
+        return self.jobs.qsize()
+
+    def flush(self):
+        """Wait for every queued job, then fsync whatever the batching left unsynced."""
+        self.jobs.join()
+        if self.nFsyncEvery > 0:
+            self._fsync_batch(bAll=True)
+
+    def close(self):
+        """Finish the queued jobs and stop the workers."""
+        if not self.listThreads:
+            return
+        self.flush()
+        for _ in self.listThreads:
+            self.jobs.put(None)
+        for thread in self.listThreads:
+            thread.join()
+        self.listThreads = []
+
+    def stats(self):
+        with self.lock:
+            nDone = self.nWritten + self.nFailed
+            return {"written": self.nWritten, "failed": self.nFailed, "dropped": self.nDropped,
+                    "depth": self.jobs.qsize(), "max_depth": self.nMaxDepth, "size": self.nQueueSize,
+                    "bytes": self.nBytes, "fsyncs": self.nFsyncs,
+                    "encode_ms": self.fEncodeTotal / nDone * 1e3 if nDone else 0.0,
+                    "encode_max_ms": self.fEncodeMax * 1e3}
+
+    # ch:批量fsync文件及其所在目录 | en:fsync a batch of files and their directories
+    def _fsync_batch(self, bAll=False):
+        with self.lock:
+            if not self.listUnsynced or (not bAll and len(self.listUnsynced) < self.nFsyncEvery):
+                return
+            listPaths, self.listUnsynced = self.listUnsynced, []
+        setDirs = set()
+        for strPath in listPaths:
+            try:
+                fd = os.open(strPath, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+                setDirs.add(os.path.dirname(os.path.abspath(strPath)))
+            except OSError as e:
+                print("fsync %s failed: %s" % (strPath, e))
+        for strDir in setDirs:
+            try:
+                fd = os.open(strDir, os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            except OSError:
+                # ch:部分平台不支持目录fsync | en:Directory fsync is not supported everywhere
+                pass
+        with self.lock:
+            self.nFsyncs += 1
+
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                self.jobs.task_done()
+                return
+            strPath, image, strFormat, nQuality, fn_done = job
+            bOk = False
+            nBytes = 0
+            fStart = time.perf_counter()
+            try:
+                if callable(image):
+                    image = image()
+                strDir = os.path.dirname(strPath)
+                if strDir and not os.path.isdir(strDir):
+                    os.makedirs(strDir, exist_ok=True)
+                nBytes = write_image(strPath, image, strFormat, nQuality)
+                bOk = True
+            except Exception as e:
+                print("write %s failed: %s" % (strPath, e))
+            fElapsed = time.perf_counter() - fStart
+            with self.lock:
+                if bOk:
+                    self.nWritten += 1
+                    self.nBytes += nBytes
+                    if self.nFsyncEvery > 0:
+                        self.listUnsynced.append(strPath)
+                else:
+                    self.nFailed += 1
+                self.fEncodeTotal += fElapsed
+                self.fEncodeMax = max(self.fEncodeMax, fElapsed)
+            if self.nFsyncEvery > 0:
+                self._fsync_batch()
+            if fn_done is not None:
+                try:
+                    fn_done(strPath, bOk)
+                except Exception as e:
+                    print("write callback for %s failed: %s" % (strPath, e))
+            self.jobs.task_done()
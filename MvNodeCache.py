@@ -0,0 +1,282 @@
+# -- coding: utf-8 --
+"""
+ch:GenICam节点值缓存 | en:GenICam node value cache
+
+Every MV_CC_Get*Value call is a GVCP round-trip to a GigE camera, a few
+milliseconds each. MvNodeCache sits on top of an opened MvCamera and takes
+the same MV_CC_Get*/Set* calls:
+
+    reads        the first read of a node goes to the camera and keeps the
+                 returned MVCC_* struct (or c_bool) per node and type; later
+                 reads copy it into the caller's struct without a round-trip
+    writes       MV_CC_Set*Value goes to the camera and, on success, updates
+                 the cached value (write-through); MV_CC_SetEnumValueByString
+                 drops it instead, since the numeric value is not known. A
+                 node written before it was ever read only has its value
+                 cached: get_value() hits, a full MVCC_* read still misses
+                 once to fetch the range
+    dependents   a successful write drops the nodes the camera recomputes
+                 from it (NODE_DEPENDENCIES), e.g. PayloadSize after
+                 PixelFormat, Width or Height, so the next read is fresh;
+                 nodes whose range but not value follows it
+                 (NODE_RANGE_DEPENDENCIES, e.g. OffsetX after Width) keep
+                 their value for get_value() and are re-read for a full struct
+    volatile     nodes the camera changes on its own (NODE_VOLATILE, e.g.
+                 DeviceTemperature) are never cached
+    reload       opening or closing the device, FeatureLoad and commands in
+                 NODE_RELOAD_COMMANDS (UserSetLoad, ...) drop everything
+
+get_value(strKey, strType) returns (ret, value) without a struct at all.
+Anything else (grabbing, callbacks, ...) is passed to the wrapped camera, so
+the cache can stand in for it. stats() reports hits, misses, writes and
+invalidations, and the mean miss round-trip, i.e. what each hit saved.
+
+The cache only sees writes made through it: after a write straight to the
+camera, or when an auto function is running, call invalidate(). A written
+value is cached as given; a camera that rounds it to the node's increment
+reports the rounded value once the node is invalidated.
+"""
+import time
+import threading
+
+from MvCameraControl_class import *
+
+NODE_INT = "int"
+NODE_FLOAT = "float"
+NODE_ENUM = "enum"
+NODE_BOOL = "bool"
+NODE_STRING = "string"
+# ch:节点类型 -> (缓存结构体, 读接口, 写接口, 当前值字段) | en:node type -> (cached struct, getter, setter, current value field)
+NODE_ACCESS = {
+    NODE_INT:    (MVCC_INTVALUE, "MV_CC_GetIntValue", "MV_CC_SetIntValue", "nCurValue"),
+    NODE_FLOAT:  (MVCC_FLOATVALUE, "MV_CC_GetFloatValue", "MV_CC_SetFloatValue", "fCurValue"),
+    NODE_ENUM:   (MVCC_ENUMVALUE, "MV_CC_GetEnumValue", "MV_CC_SetEnumValue", "nCurValue"),
+    NODE_BOOL:   (c_bool, "MV_CC_GetBoolValue", "MV_CC_SetBoolValue", "value"),
+    NODE_STRING: (MVCC_STRINGVALUE, "MV_CC_GetStringValue", "MV_CC_SetStringValue", "chCurValue"),
+}
+
+# ch:写入某节点后相机会重新计算其值的节点 | en:Nodes whose value the camera recomputes after a write to the key
+NODE_DEPENDENCIES = {
+    "Width":                      ("PayloadSize",),
+    "Height":                     ("PayloadSize",),
+    "PixelFormat":                ("PayloadSize", "PixelSize"),
+    "BinningHorizontal":          ("Width", "WidthMax", "OffsetX", "PayloadSize"),
+    "BinningVertical":            ("Height", "HeightMax", "OffsetY", "PayloadSize"),
+    "DecimationHorizontal":       ("Width", "WidthMax", "OffsetX", "PayloadSize"),
+    "DecimationVertical":         ("Height", "HeightMax", "OffsetY", "PayloadSize"),
+    "ExposureAuto":               ("ExposureTime",),
+    "GainAuto":                   ("Gain",),
+    "TriggerSelector":            ("TriggerMode", "TriggerSource"),
+    "UserSetSelector":            ("UserSetDefault",),
+}
+# ch:写入某节点后只有范围变化的节点 | en:Nodes whose range, but not value, changes after a write to the key
+NODE_RANGE_DEPENDENCIES = {
+    "Width":                      ("OffsetX",),
+    "Height":                     ("OffsetY",),
+    "OffsetX":                    ("Width",),
+    "OffsetY":                    ("Height",),
+    "ExposureTime":               ("AcquisitionFrameRate",),
+    "AcquisitionFrameRate":       ("ExposureTime",),
+}
+# ch:相机自行变化的节点,从不缓存 | en:Nodes the camera changes on its own (ResultingFrameRate also with link load), never cached
+NODE_VOLATILE = ("DeviceTemperature", "GevTimestampValue", "TimestampValue", "ResultingFrameRate")
+# ch:执行后节点状态整体改变的命令 | en:Commands after which any node may have changed
+NODE_RELOAD_COMMANDS = ("UserSetLoad", "DeviceReset", "DeviceFeaturePersistenceEnd")
+
+
+class MvNodeCache():
+    """
+    Node cache for one MvCamera; thread-safe, one per opened device.
+    tupleVolatile, dictDependencies and dictRangeDependencies replace
+    NODE_VOLATILE, NODE_DEPENDENCIES and NODE_RANGE_DEPENDENCIES, e.g. for
+    nodes specific to a camera model.
+    """
+
+    def __init__(self, cam, tupleVolatile=NODE_VOLATILE, dictDependencies=NODE_DEPENDENCIES,
+                 dictRangeDependencies=NODE_RANGE_DEPENDENCIES):
+        self.cam = cam
+        self.setVolatile = set(tupleVolatile)
+        self.dictDependencies = dictDependencies
+        self.dictRangeDependencies = dictRangeDependencies
+        self.lock = threading.RLock()
+        # ch:节点名 -> {节点类型: 结构体} | en:node name -> {node type: struct}
+        self.dictNodes = {}
+        # ch:只写入过、结构体中只有当前值的节点 | en:(name, type) written but never read, only the current value is valid
+        self.setValueOnly = set()
+        self.nHits = 0
+        self.nMisses = 0
+        self.nWrites = 0
+        self.nWriteFailures = 0
+        self.nInvalidations = 0
+        self.fMissTotal = 0.0
+
+    def __getattr__(self, strName):
+        # ch:其余接口直接交给相机 | en:Everything else goes to the camera
+        if strName == "cam":
+            raise AttributeError(strName)
+        return getattr(self.cam, strName)
+
+    def invalidate(self, strKey=None):
+        """Drop one node, or every node when strKey is None; the next read goes to the camera."""
+        with self.lock:
+            if strKey is None:
+                self.nInvalidations += len(self.dictNodes)
+                self.dictNodes.clear()
+                self.setValueOnly.clear()
+            elif self.dictNodes.pop(strKey, None) is not None:
+                self.nInvalidations += 1
+                self.setValueOnly = set(tupleKey for tupleKey in self.setValueOnly if tupleKey[0] != strKey)
+
+    def get_node(self, strKey, strType, bValueOnly=False):
+        """
+        (ret, struct) for a node, read from the camera on a miss. The struct
+        is the cache's own: do not modify it. With bValueOnly only its
+        current value field is used, so a written but unread node is a hit.
+        """
+        with self.lock:
+            dictTypes = self.dictNodes.get(strKey)
+            if dictTypes is not None and strType in dictTypes \
+                    and (bValueOnly or (strKey, strType) not in self.setValueOnly):
+                self.nHits += 1
+                return MV_OK, dictTypes[strType]
+            structType, strGetter, _, _ = NODE_ACCESS[strType]
+            stValue = structType()
+            fStart = time.perf_counter()
+            ret = getattr(self.cam, strGetter)(strKey, stValue)
+            self.fMissTotal += time.perf_counter() - fStart
+            self.nMisses += 1
+            if ret != MV_OK:
+                return ret, None
+            if strKey not in self.setVolatile:
+                self.dictNodes.setdefault(strKey, {})[strType] = stValue
+                self.setValueOnly.discard((strKey, strType))
+            return MV_OK, stValue
+
+    def get_value(self, strKey, strType):
+        """(ret, current value) of a node; the value is None when ret is not MV_OK."""
+        ret, stValue = self.get_node(strKey, strType, bValueOnly=True)
+        if ret != MV_OK:
+            return ret, None
+        return ret, getattr(stValue, NODE_ACCESS[strType][3])
+
+    def peek_value(self, strKey, strType):
+        """(bCached, value) without ever going to the camera."""
+        with self.lock:
+            stValue = self.dictNodes.get(strKey, {}).get(strType)
+            if stValue is None:
+                return False, None
+            return True, getattr(stValue, NODE_ACCESS[strType][3])
+
+    def set_value(self, strKey, strType, value):
+        """Write a node through to the camera; on success the cache holds value and its dependents are dropped."""
+        with self.lock:
+            ret = getattr(self.cam, NODE_ACCESS[strType][2])(strKey, value)
+            if ret != MV_OK:
+                self.nWriteFailures += 1
+                return ret
+            self.nWrites += 1
+            self.remember(strKey, strType, value)
+            self._invalidate_dependents(strKey)
+            return ret
+
+    def remember(self, strKey, strType, value):
+        """Cache a value known to be on the camera (e.g. loaded with MV_CC_FeatureLoad) without reading it."""
+        strField = NODE_ACCESS[strType][3]
+        with self.lock:
+            # ch:同一节点按其他类型缓存的结构体不再可信 | en:The node cached under another type is stale now
+            stValue = self.dictNodes.pop(strKey, {}).get(strType)
+            bValueOnly = (strKey, strType) in self.setValueOnly
+            self.setValueOnly = set(tupleKey for tupleKey in self.setValueOnly if tupleKey[0] != strKey)
+            if strKey in self.setVolatile:
+                return
+            if stValue is None:
+                stValue = NODE_ACCESS[strType][0]()
+                bValueOnly = True
+            setattr(stValue, strField, value.encode("ascii") if strType == NODE_STRING else value)
+            self.dictNodes[strKey] = {strType: stValue}
+            if bValueOnly:
+                self.setValueOnly.add((strKey, strType))
+
+    def _invalidate_dependents(self, strKey):
+        for strDependent in self.dictDependencies.get(strKey, ()):
+            self.invalidate(strDependent)
+        for strDependent in self.dictRangeDependencies.get(strKey, ()):
+            for strType in self.dictNodes.get(strDependent, ()):
+                self.setValueOnly.add((strDependent, strType))
+
+    def stats(self):
+        with self.lock:
+            nReads = self.nHits + self.nMisses
+            fMissMs = self.fMissTotal / self.nMisses * 1e3 if self.nMisses else 0.0
+            return {"hits": self.nHits, "misses": self.nMisses,
+                    "hit_rate": self.nHits / nReads if nReads else 0.0,
+                    "writes": self.nWrites, "write_failures": self.nWriteFailures,
+                    "invalidations": self.nInvalidations, "cached": len(self.dictNodes),
+                    "miss_ms": fMissMs, "saved_ms": fMissMs * self.nHits}
+
+    # ch:与MvCamera相同签名的读接口,把缓存的值拷贝到调用方结构体 | en:Getters with MvCamera's signatures, copying the cached value into the caller's struct
+    def _get_into(self, strKey, strType, stOut):
+        ret, stValue = self.get_node(strKey, strType)
+        if ret == MV_OK:
+            memmove(byref(stOut), byref(stValue), sizeof(stValue))
+        return ret
+
+    def MV_CC_GetIntValue(self, strKey, stIntValue):
+        return self._get_into(strKey, NODE_INT, stIntValue)
+
+    def MV_CC_GetFloatValue(self, strKey, stFloatValue):
+        return self._get_into(strKey, NODE_FLOAT, stFloatValue)
+
+    def MV_CC_GetEnumValue(self, strKey, stEnumValue):
+        return self._get_into(strKey, NODE_ENUM, stEnumValue)
+
+    def MV_CC_GetBoolValue(self, strKey, BoolValue):
+        return self._get_into(strKey, NODE_BOOL, BoolValue)
+
+    def MV_CC_GetStringValue(self, strKey, StringValue):
+        return self._get_into(strKey, NODE_STRING, StringValue)
+
+    def MV_CC_SetIntValue(self, strKey, nValue):
+        return self.set_value(strKey, NODE_INT, int(nValue))
+
+    def MV_CC_SetFloatValue(self, strKey, fValue):
+        return self.set_value(strKey, NODE_FLOAT, float(fValue))
+
+    def MV_CC_SetEnumValue(self, strKey, nValue):
+        return self.set_value(strKey, NODE_ENUM, int(nValue))
+
+    def MV_CC_SetBoolValue(self, strKey, bValue):
+        return self.set_value(strKey, NODE_BOOL, bool(bValue))
+
+    def MV_CC_SetStringValue(self, strKey, sValue):
+        return self.set_value(strKey, NODE_STRING, str(sValue))
+
+    def MV_CC_SetEnumValueByString(self, strKey, sValue):
+        with self.lock:
+            ret = self.cam.MV_CC_SetEnumValueByString(strKey, sValue)
+            if ret != MV_OK:
+                self.nWriteFailures += 1
+                return ret
+            self.nWrites += 1
+            self.invalidate(strKey)
+            self._invalidate_dependents(strKey)
+            return ret
+
+    def MV_CC_SetCommandValue(self, strKey):
+        ret = self.cam.MV_CC_SetCommandValue(strKey)
+        if ret == MV_OK and strKey in NODE_RELOAD_COMMANDS:
+            self.invalidate()
+        return ret
+
+    def MV_CC_FeatureLoad(self, pFileName):
+        ret = self.cam.MV_CC_FeatureLoad(pFileName)
+        self.invalidate()
+        return ret
+
+    def MV_CC_OpenDevice(self, nAccessMode=MV_ACCESS_Exclusive, nSwitchoverKey=0):
+        self.invalidate()
+        return self.cam.MV_CC_OpenDevice(nAccessMode, nSwitchoverKey)
+
+    def MV_CC_CloseDevice(self):
+        self.invalidate()
+        return self.cam.MV_CC_CloseDevice()
@@ -0,0 +1,156 @@
+# -- coding: utf-8 --
+"""
+ch:批量事务式参数写入 | en:Batched, transactional parameter apply
+
+apply_parameters(cache, dictValues) writes a set of nodes through a
+MvNodeCache in one pass, under the cache lock so no other writer interleaves:
+
+    types      taken from NODE_TYPES, else from the Python value (bool,
+               float, int, str); give (strType, value) to force one. A str
+               for an enum node is written with MV_CC_SetEnumValueByString
+    order      writes follow NODE_APPLY_ORDER whatever the dict order: auto
+               modes off before manual values, trigger setup, pixel format
+               and binning before the ROI, AcquisitionFrameRateEnable before
+               the rate, exposure before frame rate; nodes it does not list
+               go last in the order given. Width/OffsetX (Height/OffsetY)
+               are swapped when the new size would not fit next to the
+               current offset
+    skip       a node whose current value already matches is not written;
+               with bRollback=False only cached values are compared, so no
+               node is read just to be skipped
+    rollback   on the first failed write the nodes already written are set
+               back to their previous values in reverse order, and the
+               batch stops (bRollback=False keeps what was written)
+
+It returns (ret, dictReport): ret is MV_OK or the failed write's error, and
+the report lists written, skipped and rolled back nodes, the failing node and
+the total apply time in ms. Nodes locked while grabbing (Width, PixelFormat,
+...) fail with MV_E_GC_ACCESS unless grabbing is stopped first.
+"""
+import time
+
+from MvCameraControl_class import *
+from MvNodeCache import NODE_INT, NODE_FLOAT, NODE_ENUM, NODE_BOOL, NODE_STRING
+
+# ch:常用节点的类型 | en:Types of the usual nodes
+NODE_TYPES = {
+    "Width": NODE_INT, "Height": NODE_INT, "OffsetX": NODE_INT, "OffsetY": NODE_INT,
+    "GevSCPSPacketSize": NODE_INT, "GevSCPD": NODE_INT, "GevHeartbeatTimeout": NODE_INT, "BlackLevel": NODE_INT,
+    "ExposureTime": NODE_FLOAT, "Gain": NODE_FLOAT, "AcquisitionFrameRate": NODE_FLOAT, "Gamma": NODE_FLOAT,
+    "TriggerDelay": NODE_FLOAT,
+    "PixelFormat": NODE_ENUM, "TriggerMode": NODE_ENUM, "TriggerSource": NODE_ENUM, "TriggerSelector": NODE_ENUM,
+    "TriggerActivation": NODE_ENUM, "ExposureAuto": NODE_ENUM, "GainAuto": NODE_ENUM,
+    "BalanceWhiteAuto": NODE_ENUM, "AcquisitionMode": NODE_ENUM, "BinningHorizontal": NODE_ENUM,
+    "BinningVertical": NODE_ENUM, "DecimationHorizontal": NODE_ENUM, "DecimationVertical": NODE_ENUM,
+    "AcquisitionFrameRateEnable": NODE_BOOL, "GammaEnable": NODE_BOOL, "ReverseX": NODE_BOOL, "ReverseY": NODE_BOOL,
+    "DeviceUserID": NODE_STRING,
+}
+
+# ch:写入顺序,未列出的节点排在最后 | en:Write order; nodes not listed go last
+NODE_APPLY_ORDER = (
+    "ExposureAuto", "GainAuto", "BalanceWhiteAuto",
+    "AcquisitionMode", "TriggerSelector", "TriggerMode", "TriggerSource", "TriggerActivation", "TriggerDelay",
+    "PixelFormat", "BinningHorizontal", "BinningVertical", "DecimationHorizontal", "DecimationVertical",
+    "Width", "OffsetX", "Height", "OffsetY",
+    "GevSCPSPacketSize", "GevSCPD",
+    "AcquisitionFrameRateEnable", "ExposureTime", "Gain", "BlackLevel", "GammaEnable", "Gamma",
+    "AcquisitionFrameRate",
+)
+# ch:(尺寸, 偏移, 上限) | en:(size, offset, maximum)
+ROI_AXES = (("Width", "OffsetX", "WidthMax"), ("Height", "OffsetY", "HeightMax"))
+
+
+def parameter_type(strKey, value):
+    """(strType, value) for one entry of a batch, the value converted to the node type."""
+    if isinstance(value, tuple):
+        strType, value = value
+    elif strKey in NODE_TYPES:
+        strType = NODE_TYPES[strKey]
+    elif isinstance(value, bool):
+        strType = NODE_BOOL
+    elif isinstance(value, float):
+        strType = NODE_FLOAT
+    elif isinstance(value, int):
+        strType = NODE_INT
+    elif isinstance(value, str):
+        strType = NODE_STRING
+    else:
+        raise ValueError("cannot tell the node type of %s = %r" % (strKey, value))
+    if strType == NODE_FLOAT:
+        return strType, float(value)
+    if strType == NODE_BOOL:
+        return strType, bool(value)
+    if strType in (NODE_INT, NODE_ENUM) and not isinstance(value, str):
+        return strType, int(value)
+    return strType, value
+
+
+def _current(cache, strKey, strType, bRead):
+    if bRead:
+        ret, value = cache.get_value(strKey, strType)
+        if ret != MV_OK:
+            value = None
+    else:
+        value = cache.peek_value(strKey, strType)[1]
+    return value.decode("ascii") if isinstance(value, bytes) else value
+
+
+def values_equal(strType, current, value):
+    """Whether a node holding current already has value; floats compare at float32 precision."""
+    if current is None or isinstance(value, str) and strType == NODE_ENUM:
+        return False
+    if strType == NODE_FLOAT:
+        # ch:缓存的是float32 | en:The cached value is a float32
+        return abs(current - value) <= 1e-5 * max(1.0, abs(value))
+    return current == value
+
+
+def order_parameters(cache, dictValues):
+    """Node names of dictValues in write order."""
+    dictRank = dict((strKey, i) for i, strKey in enumerate(NODE_APPLY_ORDER))
+    listKeys = sorted(dictValues, key=lambda strKey: dictRank.get(strKey, len(dictRank)))
+    for strSize, strOffset, strMax in ROI_AXES:
+        if strSize not in dictValues or strOffset not in dictValues:
+            continue
+        nOffset = _current(cache, strOffset, NODE_INT, True)
+        ret, nMax = cache.get_value(strMax, NODE_INT)
+        # ch:新尺寸放不下当前偏移时先移动偏移 | en:Move the offset first when the new size does not fit next to the current one
+        if nOffset is not None and ret == MV_OK and parameter_type(strSize, dictValues[strSize])[1] + nOffset > nMax:
+            listKeys.remove(strOffset)
+            listKeys.insert(listKeys.index(strSize), strOffset)
+    return listKeys
+
+
+def _write(cache, strKey, strType, value):
+    if strType == NODE_ENUM and isinstance(value, str):
+        return cache.MV_CC_SetEnumValueByString(strKey, value)
+    return cache.set_value(strKey, strType, value)
+
+
+def apply_parameters(cache, dictValues, bRollback=True):
+    """Write dictValues (node -> value) through cache; returns (ret, dictReport)."""
+    fStart = time.perf_counter()
+    dictReport = {"written": [], "skipped": [], "failed": None, "rolled_back": [], "rollback_failed": [], "ms": 0.0}
+    ret = MV_OK
+    with cache.lock:
+        listDone = []
+        for strKey in order_parameters(cache, dictValues):
+            strType, value = parameter_type(strKey, dictValues[strKey])
+            current = _current(cache, strKey, strType, bRollback)
+            if values_equal(strType, current, value):
+                dictReport["skipped"].append(strKey)
+                continue
+            ret = _write(cache, strKey, strType, value)
+            if ret != MV_OK:
+                dictReport["failed"] = strKey
+                break
+            dictReport["written"].append(strKey)
+            listDone.append((strKey, strType, current))
+        if ret != MV_OK and bRollback:
+            for strKey, strType, previous in reversed(listDone):
+                if previous is None or cache.set_value(strKey, strType, previous) != MV_OK:
+                    dictReport["rollback_failed"].append(strKey)
+                else:
+                    dictReport["rolled_back"].append(strKey)
+    dictReport["ms"] = (time.perf_counter() - fStart) * 1e3
+    return ret, dictReport
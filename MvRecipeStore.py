@@ -0,0 +1,209 @@
+# -- coding: utf-8 --
+"""
+ch:配方快照与快速切换 | en:Recipe snapshots and fast recipe switching
+
+RecipeStore keeps full camera configurations ("recipes") per camera serial
+number under strDir:
+
+    <serial>/<recipe>.mfs     MV_CC_FeatureSave file, the full snapshot
+    <serial>/<recipe>.json    typed values of the tracked nodes (NODE_TYPES
+                              by default) at capture time, for diffing
+    <serial>/timings.json     measured FeatureLoad time and time per write
+    <serial>/switches.csv     one line per switch: recipe, mode, nodes
+                              changed and written, time and both estimates
+
+switch() brings a camera to a recipe the cheaper of two ways:
+
+    load    MV_CC_FeatureLoad of the snapshot; the camera writes every
+            feature in the file, so its cost is roughly fixed per camera
+    write   diff the recipe against the node state in the MvNodeCache and
+            apply only the nodes that differ with apply_parameters()
+            (dependency order, rollback on failure)
+
+With RECIPE_SWITCH_AUTO the choice uses the measured FeatureLoad time and
+time per write of that camera (estimated from the feature file until
+measured). Nodes not in the cache must be read before they can be diffed,
+so when those reads alone would cost more than a load the store loads
+without diffing. After a load the cache is told the snapshot values, so the
+next switch diffs without reading.
+"""
+import os
+import csv
+import json
+import time
+
+from MvCameraControl_class import *
+from MvNodeCache import NODE_STRING
+from MvParamBatch import NODE_TYPES, apply_parameters, values_equal
+
+RECIPE_SWITCH_AUTO = "auto"
+RECIPE_SWITCH_LOAD = "load"
+RECIPE_SWITCH_WRITE = "write"
+RECIPE_FEATURE_EXT = ".mfs"
+RECIPE_INDEX_EXT = ".json"
+RECIPE_TIMINGS_FILE = "timings.json"
+RECIPE_LOG_FILE = "switches.csv"
+# ch:尚未测得时假定的单次节点访问耗时 | en:Node access time assumed until one has been measured
+RECIPE_DEFAULT_ACCESS_MS = 5.0
+# ch:测得耗时的平滑系数 | en:Smoothing applied to measured times
+RECIPE_TIMING_ALPHA = 0.5
+
+
+class RecipeStore():
+    """
+    Recipes for any number of cameras under strDir. tupleNodes are the
+    nodes diffed by switch(); a recipe only restores other nodes by load.
+    """
+
+    def __init__(self, strDir, tupleNodes=tuple(NODE_TYPES)):
+        self.strDir = strDir
+        self.tupleNodes = tupleNodes
+        self.listSwitches = []
+        self.dictTimings = {}
+
+    def serial(self, cache):
+        """(ret, serial number) of the camera behind cache."""
+        ret, value = cache.get_value("DeviceSerialNumber", NODE_STRING)
+        if ret != MV_OK:
+            return ret, None
+        return ret, value.decode("ascii")
+
+    def paths(self, strSerial, strName):
+        strBase = os.path.join(self.strDir, strSerial, strName)
+        return strBase + RECIPE_FEATURE_EXT, strBase + RECIPE_INDEX_EXT
+
+    def recipes(self, strSerial):
+        strDir = os.path.join(self.strDir, strSerial)
+        if not os.path.isdir(strDir):
+            return []
+        return sorted(os.path.splitext(strFile)[0] for strFile in os.listdir(strDir)
+                      if strFile.endswith(RECIPE_FEATURE_EXT))
+
+    def recipe(self, strSerial, strName):
+        """{node: (type, value)} of a captured recipe."""
+        with open(self.paths(strSerial, strName)[1]) as f:
+            return dict((strKey, tuple(listValue)) for strKey, listValue in json.load(f).items())
+
+    def capture(self, cache, strName):
+        """Save the camera's current configuration as recipe strName."""
+        ret, strSerial = self.serial(cache)
+        if ret != MV_OK:
+            return ret
+        strFeature, strIndex = self.paths(strSerial, strName)
+        os.makedirs(os.path.dirname(strFeature), exist_ok=True)
+        ret = cache.MV_CC_FeatureSave(strFeature)
+        if ret != MV_OK:
+            return ret
+        dictValues = {}
+        for strKey in self.tupleNodes:
+            strType = NODE_TYPES.get(strKey)
+            if strType is None:
+                continue
+            ret, value = cache.get_value(strKey, strType)
+            # ch:相机没有的节点不记录 | en:Nodes this camera does not have are left out
+            if ret == MV_OK:
+                dictValues[strKey] = (strType, value.decode("ascii") if isinstance(value, bytes) else value)
+        with open(strIndex, "w") as f:
+            json.dump(dictValues, f, indent=1)
+        return MV_OK
+
+    def timings(self, strSerial):
+        """{'load_ms', 'write_ms'} measured for a camera; None where not measured yet."""
+        if strSerial not in self.dictTimings:
+            strPath = os.path.join(self.strDir, strSerial, RECIPE_TIMINGS_FILE)
+            dictTimings = {"load_ms": None, "write_ms": None}
+            if os.path.exists(strPath):
+                with open(strPath) as f:
+                    dictTimings.update(json.load(f))
+            self.dictTimings[strSerial] = dictTimings
+        return self.dictTimings[strSerial]
+
+    def switch(self, cache, strName, strMode=RECIPE_SWITCH_AUTO):
+        """Bring the camera to recipe strName; returns (ret, dictReport)."""
+        fStart = time.perf_counter()
+        ret, strSerial = self.serial(cache)
+        if ret != MV_OK:
+            return ret, None
+        strFeature, strIndex = self.paths(strSerial, strName)
+        if not os.path.exists(strFeature) or not os.path.exists(strIndex):
+            return MV_E_PARAMETER, None
+        dictTarget = self.recipe(strSerial, strName)
+        dictTimings = self.timings(strSerial)
+        fAccessMs = dictTimings["write_ms"] or cache.stats()["miss_ms"] or RECIPE_DEFAULT_ACCESS_MS
+        fLoadMs = dictTimings["load_ms"] or self._feature_count(strFeature) * fAccessMs
+        dictReport = {"recipe": strName, "mode": strMode, "changed": None, "written": 0, "failed": None,
+                      "estimate_load_ms": fLoadMs, "estimate_write_ms": None, "ms": 0.0}
+        with cache.lock:
+            nUncached = sum(not cache.peek_value(strKey, strType)[0] for strKey, (strType, _) in dictTarget.items())
+            if strMode == RECIPE_SWITCH_AUTO and nUncached * fAccessMs >= fLoadMs:
+                strMode = RECIPE_SWITCH_LOAD
+            dictChanged = None
+            if strMode != RECIPE_SWITCH_LOAD:
+                dictChanged = self._diff(cache, dictTarget)
+                dictReport["changed"] = len(dictChanged)
+                dictReport["estimate_write_ms"] = len(dictChanged) * fAccessMs
+                if strMode == RECIPE_SWITCH_AUTO:
+                    strMode = RECIPE_SWITCH_LOAD if fLoadMs < dictReport["estimate_write_ms"] else RECIPE_SWITCH_WRITE
+            dictReport["mode"] = strMode
+
+            fApply = time.perf_counter()
+            if strMode == RECIPE_SWITCH_LOAD:
+                ret = cache.MV_CC_FeatureLoad(strFeature)
+                if ret == MV_OK:
+                    for strKey, (strType, value) in dictTarget.items():
+                        cache.remember(strKey, strType, value)
+                    self._measured(strSerial, "load_ms", (time.perf_counter() - fApply) * 1e3)
+                else:
+                    dictReport["failed"] = strFeature
+            else:
+                ret, dictApply = apply_parameters(cache, dictChanged)
+                dictReport["written"] = len(dictApply["written"])
+                dictReport["failed"] = dictApply["failed"]
+                if dictApply["written"]:
+                    self._measured(strSerial, "write_ms", dictApply["ms"] / len(dictApply["written"]))
+        dictReport["ms"] = (time.perf_counter() - fStart) * 1e3
+        self._log(strSerial, dictReport)
+        return ret, dictReport
+
+    def stats(self):
+        """Every switch() so far: count, mean time per mode and the reports themselves."""
+        dictStats = {"switches": len(self.listSwitches), "history": list(self.listSwitches)}
+        for strMode in (RECIPE_SWITCH_LOAD, RECIPE_SWITCH_WRITE):
+            listMs = [dictReport["ms"] for dictReport in self.listSwitches if dictReport["mode"] == strMode]
+            dictStats[strMode + "_ms"] = sum(listMs) / len(listMs) if listMs else 0.0
+        return dictStats
+
+    def _diff(self, cache, dictTarget):
+        dictChanged = {}
+        for strKey, (strType, value) in dictTarget.items():
+            ret, current = cache.get_value(strKey, strType)
+            if isinstance(current, bytes):
+                current = current.decode("ascii")
+            if ret != MV_OK or not values_equal(strType, current, value):
+                dictChanged[strKey] = (strType, value)
+        return dictChanged
+
+    def _feature_count(self, strFeature):
+        with open(strFeature) as f:
+            return sum(1 for strLine in f if strLine.strip() and not strLine.startswith("#"))
+
+    def _measured(self, strSerial, strKey, fMs):
+        dictTimings = self.timings(strSerial)
+        fOld = dictTimings[strKey]
+        dictTimings[strKey] = fMs if fOld is None else (1 - RECIPE_TIMING_ALPHA) * fOld + RECIPE_TIMING_ALPHA * fMs
+        with open(os.path.join(self.strDir, strSerial, RECIPE_TIMINGS_FILE), "w") as f:
+            json.dump(dictTimings, f)
+
+    def _log(self, strSerial, dictReport):
+        self.listSwitches.append(dictReport)
+        strPath = os.path.join(self.strDir, strSerial, RECIPE_LOG_FILE)
+        bNew = not os.path.exists(strPath)
+        with open(strPath, "a", newline="") as f:
+            writer = csv.writer(f)
+            if bNew:
+                writer.writerow(["time", "recipe", "mode", "changed", "written", "failed", "ms",
+                                 "estimate_load_ms", "estimate_write_ms"])
+            writer.writerow([time.strftime("%Y-%m-%d %H:%M:%S"), dictReport["recipe"], dictReport["mode"],
+                             dictReport["changed"], dictReport["written"], dictReport["failed"] or "",
+                             "%.1f" % dictReport["ms"], "%.1f" % dictReport["estimate_load_ms"],
+                             "" if dictReport["estimate_write_ms"] is None else "%.1f" % dictReport["estimate_write_ms"]])
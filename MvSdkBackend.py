@@ -0,0 +1,92 @@
+# -- coding: utf-8 --
+"""
+ch:SDK后端选择 | en:SDK backend selection
+
+MvCameraControl_class loads its function table from whatever this module
+returns, so the same MvCamera code runs against:
+
+    windows  - MvCameraControl.dll from the MVS runtime
+    linux    - libMvCameraControl.so from the MVS Linux package
+    sim      - MvSimulatedSdk, an in-process NumPy camera (no hardware, no driver)
+    auto     - the native library for this platform; a missing or broken MVS
+               runtime raises OSError, the simulator is never loaded implicitly
+
+Environment variables:
+    MVCAM_BACKEND   one of auto/windows/linux/sim (default: auto)
+    MVCAM_SDK_PATH  explicit path to the native library
+"""
+import os
+import sys
+import ctypes
+import ctypes.util
+from ctypes import CDLL, CFUNCTYPE
+
+MV_BACKEND_AUTO = "auto"
+MV_BACKEND_WINDOWS = "windows"
+MV_BACKEND_LINUX = "linux"
+MV_BACKEND_SIM = "sim"
+
+WINDOWS_SDK_PATH = "C:/Program Files (x86)/Common Files/MVS/Runtime/Win64_x64/MvCameraControl.dll"
+LINUX_SDK_PATHS = (
+    "/opt/MVS/lib/64/libMvCameraControl.so",
+    "/opt/MVS/lib/aarch64/libMvCameraControl.so",
+    "/opt/MVS/lib/32/libMvCameraControl.so",
+)
+
+# ch:SDK回调函数类型(Windows为stdcall) | en:Callback function type used by the SDK (stdcall on Windows)
+if sys.platform.startswith("win"):
+    MV_FUNCTYPE = ctypes.WINFUNCTYPE
+else:
+    MV_FUNCTYPE = CFUNCTYPE
+
+# ch:当前生效的后端名 | en:Name of the backend actually loaded
+MV_BACKEND = None
+
+
+def _load_windows(strPath=None):
+    return ctypes.WinDLL(strPath or WINDOWS_SDK_PATH)
+
+
+def _load_linux(strPath=None):
+    if strPath:
+        return CDLL(strPath)
+    for strCandidate in LINUX_SDK_PATHS:
+        if os.path.exists(strCandidate):
+            return CDLL(strCandidate)
+    # ch:依赖LD_LIBRARY_PATH查找 | en:Let the dynamic loader search LD_LIBRARY_PATH
+    strFound = ctypes.util.find_library("MvCameraControl")
+    return CDLL(strFound or "libMvCameraControl.so")
+
+
+def _load_sim():
+    from MvSimulatedSdk import MvSimulatedSdk
+    return MvSimulatedSdk.from_environment()
+
+
+def load_sdk_library(strBackend=None, strPath=None):
+    """
+    Load the SDK function table for the requested backend.
+
+    The returned object exposes the MV_CC_* exports as attributes: a ctypes
+    library for the native backends, an MvSimulatedSdk instance for 'sim'.
+    """
+    global MV_BACKEND
+    strBackend = (strBackend or os.environ.get("MVCAM_BACKEND", MV_BACKEND_AUTO)).lower()
+    strPath = strPath or os.environ.get("MVCAM_SDK_PATH")
+
+    if strBackend == MV_BACKEND_WINDOWS:
+        dll = _load_windows(strPath)
+    elif strBackend == MV_BACKEND_LINUX:
+        dll = _load_linux(strPath)
+    elif strBackend == MV_BACKEND_SIM:
+        dll = _load_sim()
+    elif strBackend == MV_BACKEND_AUTO:
+        strNative = MV_BACKEND_WINDOWS if sys.platform.startswith("win") else MV_BACKEND_LINUX
+        # ch:找不到MVS运行库时直接报错,模拟相机只能通过MVCAM_BACKEND=sim显式选择 | en:A missing MVS runtime is an error; the simulated camera is only used when MVCAM_BACKEND=sim is set
+        dll = _load_windows(strPath) if strNative == MV_BACKEND_WINDOWS else _load_linux(strPath)
+        strBackend = strNative
+    else:
+        raise ValueError("unknown MVCAM_BACKEND '%s'" % strBackend)
+
+    MV_BACKEND = strBackend
+    return dll
@@ -0,0 +1,871 @@
+# -- coding: utf-8 --
+"""
+ch:模拟相机SDK | en:Simulated camera SDK
+
+MvSimulatedSdk exposes the same MV_CC_* exports as MvCameraControl.dll, so
+MvCamera, CameraOperation and camera_gui run unchanged on machines without a
+camera or the MVS runtime (select it with MVCAM_BACKEND=sim).
+
+Each simulated device is a GigE camera that produces a moving test scene in
+Mono8/10/12, Bayer RG/GB/GR/BG 8/10/12 or RGB8/BGR8 at a configurable
+resolution and frame rate. Frames are rendered once when grabbing starts, so
+delivering a frame costs one memmove, which keeps benchmarks focused on the
+consumer side.
+
+Environment variables read by from_environment():
+    MVCAM_SIM_DEVICES       number of devices                 (default 1)
+    MVCAM_SIM_WIDTH         frame width                       (default 1920)
+    MVCAM_SIM_HEIGHT        frame height                      (default 1080)
+    MVCAM_SIM_PIXEL_FORMAT  e.g. Mono8, BayerRG8, RGB8_Packed (default Mono8)
+    MVCAM_SIM_FPS           frame rate, 0 = as fast as possible (default 30)
+    MVCAM_SIM_NODE_LATENCY  seconds per GenICam node access   (default 0)
+"""
+import os
+import time
+import threading
+import numpy as np
+import cv2
+from ctypes import *
+
+from CameraParams_const import *
+from CameraParams_header import *
+from MvCameraControl_header import *
+from MvErrorDefine_const import *
+from PixelType_header import *
+from PixelType_unpack import pack_packed, unpack_packed_8bit
+
+# ch:模拟相机支持的像素格式 | en:Pixel formats the simulated camera can produce
+# pixel type: (name, bits per pixel, family, bayer pattern)
+SIM_PIXEL_FORMATS = {
+    PixelType_Gvsp_Mono8:        ("Mono8", 8, "mono", None),
+    PixelType_Gvsp_Mono10:       ("Mono10", 16, "mono", None),
+    PixelType_Gvsp_Mono12:       ("Mono12", 16, "mono", None),
+    PixelType_Gvsp_BayerRG8:     ("BayerRG8", 8, "bayer", "RGGB"),
+    PixelType_Gvsp_BayerGB8:     ("BayerGB8", 8, "bayer", "GBRG"),
+    PixelType_Gvsp_BayerGR8:     ("BayerGR8", 8, "bayer", "GRBG"),
+    PixelType_Gvsp_BayerBG8:     ("BayerBG8", 8, "bayer", "BGGR"),
+    PixelType_Gvsp_BayerRG10:    ("BayerRG10", 16, "bayer", "RGGB"),
+    PixelType_Gvsp_BayerGB10:    ("BayerGB10", 16, "bayer", "GBRG"),
+    PixelType_Gvsp_BayerGR10:    ("BayerGR10", 16, "bayer", "GRBG"),
+    PixelType_Gvsp_BayerBG10:    ("BayerBG10", 16, "bayer", "BGGR"),
+    PixelType_Gvsp_BayerRG12:    ("BayerRG12", 16, "bayer", "RGGB"),
+    PixelType_Gvsp_BayerGB12:    ("BayerGB12", 16, "bayer", "GBRG"),
+    PixelType_Gvsp_BayerGR12:    ("BayerGR12", 16, "bayer", "GRBG"),
+    PixelType_Gvsp_BayerBG12:    ("BayerBG12", 16, "bayer", "BGGR"),
+    PixelType_Gvsp_Mono10_Packed:      ("Mono10_Packed", 12, "mono", None),
+    PixelType_Gvsp_Mono12_Packed:      ("Mono12_Packed", 12, "mono", None),
+    PixelType_Gvsp_BayerRG10_Packed:   ("BayerRG10_Packed", 12, "bayer", "RGGB"),
+    PixelType_Gvsp_BayerGB10_Packed:   ("BayerGB10_Packed", 12, "bayer", "GBRG"),
+    PixelType_Gvsp_BayerGR10_Packed:   ("BayerGR10_Packed", 12, "bayer", "GRBG"),
+    PixelType_Gvsp_BayerBG10_Packed:   ("BayerBG10_Packed", 12, "bayer", "BGGR"),
+    PixelType_Gvsp_BayerRG12_Packed:   ("BayerRG12_Packed", 12, "bayer", "RGGB"),
+    PixelType_Gvsp_BayerGB12_Packed:   ("BayerGB12_Packed", 12, "bayer", "GBRG"),
+    PixelType_Gvsp_BayerGR12_Packed:   ("BayerGR12_Packed", 12, "bayer", "GRBG"),
+    PixelType_Gvsp_BayerBG12_Packed:   ("BayerBG12_Packed", 12, "bayer", "BGGR"),
+    PixelType_Gvsp_RGB8_Packed:  ("RGB8_Packed", 24, "rgb", None),
+    PixelType_Gvsp_BGR8_Packed:  ("BGR8_Packed", 24, "bgr", None),
+}
+
+# ch:10/12位格式的有效位数 | en:Significant bits of the 10/12-bit formats
+SIM_SIGNIFICANT_BITS = {
+    PixelType_Gvsp_Mono10: 10, PixelType_Gvsp_Mono12: 12,
+    PixelType_Gvsp_BayerRG10: 10, PixelType_Gvsp_BayerGB10: 10,
+    PixelType_Gvsp_BayerGR10: 10, PixelType_Gvsp_BayerBG10: 10,
+    PixelType_Gvsp_BayerRG12: 12, PixelType_Gvsp_BayerGB12: 12,
+    PixelType_Gvsp_BayerGR12: 12, PixelType_Gvsp_BayerBG12: 12,
+    PixelType_Gvsp_Mono10_Packed: 10, PixelType_Gvsp_Mono12_Packed: 12,
+    PixelType_Gvsp_BayerRG10_Packed: 10, PixelType_Gvsp_BayerGB10_Packed: 10,
+    PixelType_Gvsp_BayerGR10_Packed: 10, PixelType_Gvsp_BayerBG10_Packed: 10,
+    PixelType_Gvsp_BayerRG12_Packed: 12, PixelType_Gvsp_BayerGB12_Packed: 12,
+    PixelType_Gvsp_BayerGR12_Packed: 12, PixelType_Gvsp_BayerBG12_Packed: 12,
+}
+
+SIM_PATTERN_FRAMES = 8          # ch:预渲染的帧数 | en:Frames rendered ahead when grabbing starts
+SIM_DEFAULT_IMAGE_NODES = 8     # ch:默认图像缓存节点数 | en:Default SDK image node count
+SIM_MAX_WIDTH = 5472
+SIM_MAX_HEIGHT = 3648
+
+_NODE_INT = "int"
+_NODE_FLOAT = "float"
+_NODE_ENUM = "enum"
+_NODE_BOOL = "bool"
+_NODE_STRING = "string"
+_NODE_COMMAND = "command"
+
+# ch:取流时不可修改的节点 | en:Nodes that are locked while grabbing
+_LOCKED_WHILE_GRABBING = ("Width", "Height", "PixelFormat", "OffsetX", "OffsetY")
+# ch:只读节点 | en:Read-only nodes
+_READ_ONLY = ("PayloadSize", "WidthMax", "HeightMax", "DeviceModelName", "DeviceSerialNumber", "ResultingFrameRate")
+# ch:ROI节点 -> (配对节点, 上限节点),两者之和不能超过上限 | en:ROI node -> (paired node, maximum node); the two may not add up past the maximum
+_ROI_LIMITS = {"Width": ("OffsetX", "WidthMax"), "OffsetX": ("Width", "WidthMax"),
+               "Height": ("OffsetY", "HeightMax"), "OffsetY": ("Height", "HeightMax")}
+
+
+def pixel_type_from_name(strName):
+    strKey = strName.replace("_", "").lower()
+    for enPixelType, (strFormatName, _, _, _) in SIM_PIXEL_FORMATS.items():
+        strFormatKey = strFormatName.replace("_", "").lower()
+        if strFormatKey == strKey or strFormatKey == strKey + "packed":
+            return enPixelType
+    raise ValueError("simulated camera does not support pixel format '%s'" % strName)
+
+
+def frame_length(nWidth, nHeight, enPixelType):
+    return nWidth * nHeight * SIM_PIXEL_FORMATS[enPixelType][1] // 8
+
+
+def render_scene(nWidth, nHeight, nIndex, nCount):
+    """RGB test scene: colour gradients plus a bar that moves across the frame."""
+    x = np.linspace(0, 255, nWidth, dtype=np.float32)[np.newaxis, :]
+    y = np.linspace(0, 255, nHeight, dtype=np.float32)[:, np.newaxis]
+    fPhase = 255.0 * nIndex / max(nCount, 1)
+    scene = np.empty((nHeight, nWidth, 3), np.uint8)
+    scene[..., 0] = np.broadcast_to(x, (nHeight, nWidth))
+    scene[..., 1] = np.broadcast_to(y, (nHeight, nWidth))
+    scene[..., 2] = ((x + y) * 0.5 + fPhase) % 256
+    nBar = max(nWidth // 32, 1)
+    nStart = (nIndex * nWidth // max(nCount, 1)) % nWidth
+    scene[:, nStart:nStart + nBar, :] = 255
+    return scene
+
+
+def encode_scene(scene, enPixelType):
+    """Encode an RGB scene into the raw payload bytes of enPixelType."""
+    strName, nBits, strFamily, strPattern = SIM_PIXEL_FORMATS[enPixelType]
+    if strFamily == "rgb":
+        raw8 = scene
+    elif strFamily == "bgr":
+        raw8 = scene[..., ::-1]
+    elif strFamily == "mono":
+        raw8 = ((scene[..., 0].astype(np.uint16) * 77 + scene[..., 1].astype(np.uint16) * 150
+                 + scene[..., 2].astype(np.uint16) * 29) >> 8).astype(np.uint8)
+    else:
+        raw8 = np.empty(scene.shape[:2], np.uint8)
+        dictChannel = {"R": 0, "G": 1, "B": 2}
+        for nPos, strColor in enumerate(strPattern):
+            nRow, nCol = nPos // 2, nPos % 2
+            raw8[nRow::2, nCol::2] = scene[nRow::2, nCol::2, dictChannel[strColor]]
+    if nBits == 16:
+        nSignificant = SIM_SIGNIFICANT_BITS[enPixelType]
+        return np.ascontiguousarray((raw8.astype("<u2") << (nSignificant - 8))).view(np.uint8).reshape(-1)
+    if nBits == 12:
+        # ch:GVSP Packed:2个像素占3字节 | en:GVSP packed: two pixels in three bytes
+        nSignificant = SIM_SIGNIFICANT_BITS[enPixelType]
+        return pack_packed(raw8.astype(np.uint16) << (nSignificant - 8), nSignificant)
+    return np.ascontiguousarray(raw8).reshape(-1)
+
+
+def _deref(obj):
+    # ch:byref()/pointer()/结构体统一取出结构体 | en:Accept byref(), pointer() or the structure itself
+    if hasattr(obj, "_obj"):
+        return obj._obj
+    if hasattr(obj, "contents"):
+        return obj.contents
+    return obj
+
+
+def _value(obj):
+    return obj.value if hasattr(obj, "value") else obj
+
+
+def _key(strKey):
+    strKey = _value(strKey)
+    return strKey.decode("ascii") if isinstance(strKey, bytes) else strKey
+
+
+def _set_chars(arr, strValue):
+    data = strValue.encode("ascii")[:len(arr) - 1]
+    for i in range(len(arr)):
+        arr[i] = data[i] if i < len(data) else 0
+
+
+class _SimDevice(object):
+
+    def __init__(self, nIndex, nWidth, nHeight, enPixelType, fFrameRate):
+        self.nIndex = nIndex
+        self.strSerial = "SIM%05d" % nIndex
+        self.stDevInfo = MV_CC_DEVICE_INFO()
+        memset(byref(self.stDevInfo), 0, sizeof(self.stDevInfo))
+        self.stDevInfo.nMajorVer = 1
+        self.stDevInfo.nTLayerType = MV_GIGE_DEVICE
+        self.stDevInfo.nMacAddrHigh = 0x5349
+        self.stDevInfo.nMacAddrLow = 0x4d000000 + nIndex
+        stGigE = self.stDevInfo.SpecialInfo.stGigEInfo
+        stGigE.nCurrentIp = (192 << 24) | (168 << 16) | (1 << 8) | (100 + nIndex)
+        stGigE.nCurrentSubNetMask = 0xffffff00
+        stGigE.nDefultGateWay = (192 << 24) | (168 << 16) | (1 << 8) | 1
+        stGigE.nNetExport = (192 << 24) | (168 << 16) | (1 << 8) | 2
+        _set_chars(stGigE.chManufacturerName, "Hikrobot (simulated)")
+        _set_chars(stGigE.chModelName, "MV-SIM-CAM")
+        _set_chars(stGigE.chDeviceVersion, "sim-1.0")
+        _set_chars(stGigE.chSerialNumber, self.strSerial)
+
+        self.nodes = {
+            "Width":                      [_NODE_INT, nWidth],
+            "Height":                     [_NODE_INT, nHeight],
+            "WidthMax":                   [_NODE_INT, SIM_MAX_WIDTH],
+            "HeightMax":                  [_NODE_INT, SIM_MAX_HEIGHT],
+            "OffsetX":                    [_NODE_INT, 0],
+            "OffsetY":                    [_NODE_INT, 0],
+            "PayloadSize":                [_NODE_INT, 0],
+            "GevSCPSPacketSize":          [_NODE_INT, 1500],
+            "GevHeartbeatTimeout":        [_NODE_INT, 3000],
+            "ExposureTime":               [_NODE_FLOAT, 10000.0],
+            "Gain":                       [_NODE_FLOAT, 0.0],
+            "AcquisitionFrameRate":       [_NODE_FLOAT, float(fFrameRate)],
+            "ResultingFrameRate":         [_NODE_FLOAT, float(fFrameRate)],
+            "AcquisitionFrameRateEnable": [_NODE_BOOL, fFrameRate > 0],
+            "PixelFormat":                [_NODE_ENUM, enPixelType],
+            "TriggerMode":                [_NODE_ENUM, MV_TRIGGER_MODE_OFF],
+            "TriggerSource":              [_NODE_ENUM, MV_TRIGGER_SOURCE_SOFTWARE],
+            "ExposureAuto":               [_NODE_ENUM, 0],
+            "GainAuto":                   [_NODE_ENUM, 0],
+            "AcquisitionMode":            [_NODE_ENUM, MV_ACQ_MODE_CONTINUOUS],
+            "DeviceUserID":               [_NODE_STRING, ""],
+            "DeviceModelName":            [_NODE_STRING, "MV-SIM-CAM"],
+            "DeviceSerialNumber":         [_NODE_STRING, self.strSerial],
+            "TriggerSoftware":            [_NODE_COMMAND, None],
+        }
+
+        self.lock = threading.Lock()
+        self.ev_stop = threading.Event()
+        self.ev_trigger = threading.Event()
+        self.b_open = False
+        self.b_grabbing = False
+        self.n_image_nodes = SIM_DEFAULT_IMAGE_NODES
+        self.list_frames = []
+        self.n_next = 0
+        self.t_start = 0.0
+        self.n_lost_frames = 0
+        self.list_free_nodes = []
+        self.dict_held_nodes = {}
+        self.cb_image = None
+        self.p_image_user = None
+        self.h_callback_thread = None
+        self.cb_exception = None
+        self.p_exception_user = None
+        self.f_offline_until = 0.0
+        self.dict_default_nodes = dict((strKey, list(listNode)) for strKey, listNode in self.nodes.items())
+
+    def is_online(self):
+        return time.perf_counter() >= self.f_offline_until
+
+    def value(self, strKey):
+        if strKey == "PayloadSize":
+            return frame_length(self.nodes["Width"][1], self.nodes["Height"][1], self.nodes["PixelFormat"][1])
+        return self.nodes[strKey][1]
+
+    def render(self):
+        nWidth = self.value("Width")
+        nHeight = self.value("Height")
+        enPixelType = self.value("PixelFormat")
+        self.list_frames = [encode_scene(render_scene(nWidth, nHeight, i, SIM_PATTERN_FRAMES), enPixelType)
+                            for i in range(SIM_PATTERN_FRAMES)]
+        nPayload = len(self.list_frames[0])
+        self.list_free_nodes = [(c_ubyte * nPayload)() for _ in range(self.n_image_nodes)]
+        self.dict_held_nodes = {}
+
+    def frame_period(self):
+        if not self.value("AcquisitionFrameRateEnable"):
+            return 0.0
+        fRate = self.value("AcquisitionFrameRate")
+        return 1.0 / fRate if fRate > 0 else 0.0
+
+    def wait_frame(self, nMsec):
+        """Block until the next frame is due; returns its index or None on timeout/stop."""
+        fTimeout = nMsec / 1000.0
+        if self.value("TriggerMode") == 1:
+            if not self.ev_trigger.wait(fTimeout) or self.ev_stop.is_set():
+                return None
+            self.ev_trigger.clear()
+            nIndex = self.n_next
+            self.n_next += 1
+            return nIndex
+
+        fPeriod = self.frame_period()
+        if fPeriod > 0:
+            fNow = time.perf_counter()
+            # ch:消费者落后超过缓存节点数时丢弃最旧的帧 | en:Frames older than the node pool are lost when the consumer falls behind
+            nLatest = int((fNow - self.t_start) / fPeriod)
+            nOldest = nLatest - self.n_image_nodes + 1
+            if self.n_next < nOldest:
+                self.n_lost_frames += nOldest - self.n_next
+                self.n_next = nOldest
+            fDue = self.t_start + self.n_next * fPeriod
+            fWait = fDue - fNow
+            if fWait > fTimeout:
+                self.ev_stop.wait(fTimeout)
+                return None
+            if fWait > 0 and self.ev_stop.wait(fWait):
+                return None
+        if self.ev_stop.is_set():
+            return None
+        nIndex = self.n_next
+        self.n_next += 1
+        return nIndex
+
+    def fill_frame_info(self, stFrameInfo, nIndex):
+        fNow = time.time()
+        nDevTicks = int((time.perf_counter() - self.t_start) * 1e8)
+        stFrameInfo.nWidth = self.value("Width")
+        stFrameInfo.nHeight = self.value("Height")
+        stFrameInfo.enPixelType = self.value("PixelFormat")
+        stFrameInfo.nFrameNum = nIndex
+        stFrameInfo.nDevTimeStampHigh = (nDevTicks >> 32) & 0xffffffff
+        stFrameInfo.nDevTimeStampLow = nDevTicks & 0xffffffff
+        stFrameInfo.nHostTimeStamp = int(fNow * 1000)
+        stFrameInfo.nFrameLen = len(self.list_frames[0])
+        stFrameInfo.fGain = self.value("Gain")
+        stFrameInfo.fExposureTime = self.value("ExposureTime")
+        stFrameInfo.nFrameCounter = nIndex
+        stFrameInfo.nOffsetX = self.value("OffsetX")
+        stFrameInfo.nOffsetY = self.value("OffsetY")
+        stFrameInfo.nLostPacket = 0
+
+    def payload(self, nIndex):
+        return self.list_frames[nIndex % len(self.list_frames)]
+
+
+class MvSimulatedSdk(object):
+    """In-process stand-in for MvCameraControl.dll."""
+
+    def __init__(self, n_devices=1, width=1920, height=1080, pixel_type=PixelType_Gvsp_Mono8,
+                 frame_rate=30.0, node_latency=0.0):
+        self.f_node_latency = node_latency
+        self.list_devices = [_SimDevice(i, width, height, pixel_type, frame_rate) for i in range(n_devices)]
+        self.dict_handles = {}
+        self.set_stale_handles = set()
+        self.n_next_handle = 0x5100
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls):
+        strFormat = os.environ.get("MVCAM_SIM_PIXEL_FORMAT", "Mono8")
+        return cls(n_devices=int(os.environ.get("MVCAM_SIM_DEVICES", "1")),
+                   width=int(os.environ.get("MVCAM_SIM_WIDTH", "1920")),
+                   height=int(os.environ.get("MVCAM_SIM_HEIGHT", "1080")),
+                   pixel_type=pixel_type_from_name(strFormat),
+                   frame_rate=float(os.environ.get("MVCAM_SIM_FPS", "30")),
+                   node_latency=float(os.environ.get("MVCAM_SIM_NODE_LATENCY", "0")))
+
+    def configure(self, width=None, height=None, pixel_type=None, frame_rate=None, node_latency=None):
+        """Reconfigure every simulated device; takes effect at the next StartGrabbing."""
+        if node_latency is not None:
+            self.f_node_latency = node_latency
+        for dev in self.list_devices:
+            if width is not None:
+                dev.nodes["Width"][1] = int(width)
+            if height is not None:
+                dev.nodes["Height"][1] = int(height)
+            if pixel_type is not None:
+                dev.nodes["PixelFormat"][1] = pixel_type
+            if frame_rate is not None:
+                dev.nodes["AcquisitionFrameRate"][1] = float(frame_rate)
+                dev.nodes["ResultingFrameRate"][1] = float(frame_rate)
+                dev.nodes["AcquisitionFrameRateEnable"][1] = frame_rate > 0
+
+    def lost_frames(self, nIndex=0):
+        return self.list_devices[nIndex].n_lost_frames
+
+    def simulate_disconnect(self, nIndex=0, fSeconds=1.0, bNotify=True, bPowerCycle=False):
+        """
+        Take device nIndex off the network for fSeconds, as a cable glitch does:
+        grabbing stops and every handle open on it goes stale (frames time out,
+        node access fails with MV_E_NETER, Stop/Close/Destroy still succeed).
+        The device can be opened again on a new handle once it is back. With
+        bNotify the stale handle's exception callback receives
+        MV_EXCEPTION_DEV_DISCONNECT, otherwise frames simply stop arriving;
+        bPowerCycle also resets every node to its power-on value.
+        """
+        dev = self.list_devices[nIndex]
+        with self.lock:
+            listKeys = [nKey for nKey, handleDev in self.dict_handles.items() if handleDev is dev]
+            self.set_stale_handles.update(listKeys)
+        dev.f_offline_until = time.perf_counter() + fSeconds
+        if dev.b_grabbing:
+            self._stop(dev)
+        dev.b_open = False
+        dev.cb_image = None
+        cbException, pUser = dev.cb_exception, dev.p_exception_user
+        dev.cb_exception = None
+        if bPowerCycle:
+            dev.nodes = dict((strKey, list(listNode)) for strKey, listNode in dev.dict_default_nodes.items())
+        if bNotify and cbException is not None:
+            threading.Thread(target=cbException, args=(MV_EXCEPTION_DEV_DISCONNECT, pUser), daemon=True).start()
+
+    # ---------------------------------------------------------------- handles
+    def _device(self, handle):
+        nKey = cast(handle, c_void_p).value
+        return self.dict_handles.get(nKey)
+
+    def _stale(self, handle):
+        return cast(handle, c_void_p).value in self.set_stale_handles
+
+    def _node_access(self):
+        if self.f_node_latency > 0:
+            time.sleep(self.f_node_latency)
+
+    def MV_CC_EnumDevices(self, nTLayerType, pstDevList):
+        stDevList = _deref(pstDevList)
+        if not (_value(nTLayerType) & MV_GIGE_DEVICE):
+            stDevList.nDeviceNum = 0
+            return MV_OK
+        stDevList.nDeviceNum = len(self.list_devices)
+        for i, dev in enumerate(self.list_devices):
+            # ch:两套头文件各自定义了结构体类型 | en:Both generated headers define their own structure types
+            stDevList.pDeviceInfo[i] = cast(pointer(dev.stDevInfo), stDevList.pDeviceInfo._type_)
+        return MV_OK
+
+    def MV_CC_CreateHandle(self, pHandle, pstDevInfo):
+        stDevInfo = _deref(pstDevInfo)
+        for dev in self.list_devices:
+            if dev.stDevInfo.nMacAddrLow == stDevInfo.nMacAddrLow:
+                with self.lock:
+                    nKey = self.n_next_handle
+                    self.n_next_handle += 1
+                    self.dict_handles[nKey] = dev
+                c_void_p.from_buffer(_deref(pHandle)).value = nKey
+                return MV_OK
+        return MV_E_PARAMETER
+
+    MV_CC_CreateHandleWithoutLog = MV_CC_CreateHandle
+
+    def MV_CC_DestroyHandle(self, handle):
+        nKey = cast(handle, c_void_p).value
+        with self.lock:
+            dev = self.dict_handles.pop(nKey, None)
+            bStale = nKey in self.set_stale_handles
+            self.set_stale_handles.discard(nKey)
+        if dev is None:
+            return MV_E_HANDLE
+        if bStale:
+            return MV_OK
+        if dev.b_grabbing:
+            self._stop(dev)
+        dev.b_open = False
+        dev.cb_image = None
+        return MV_OK
+
+    def MV_CC_OpenDevice(self, handle, nAccessMode=MV_ACCESS_Exclusive, nSwitchoverKey=0):
+        dev = self._device(handle)
+        if dev is None:
+            return MV_E_HANDLE
+        if not dev.is_online():
+            return MV_E_NETER
+        if dev.b_open:
+            return MV_E_ACCESS_DENIED
+        dev.b_open = True
+        return MV_OK
+
+    def MV_CC_CloseDevice(self, handle):
+        dev = self._device(handle)
+        if dev is None:
+            return MV_E_HANDLE
+        if self._stale(handle):
+            return MV_OK
+        if dev.b_grabbing:
+            self._stop(dev)
+        dev.b_open = False
+        dev.cb_image = None
+        return MV_OK
+
+    def MV_GIGE_ForceIpEx(self, handle, nIP, nSubNetMask, nDefaultGateWay):
+        return MV_E_SUPPORT
+
+    def MV_GIGE_SetIpConfig(self, handle, nType):
+        return MV_E_SUPPORT
+
+    def MV_GIGE_SetTransmissionType(self, handle, pstTransmissionType):
+        return MV_E_SUPPORT
+
+    def MV_CC_GetOptimalPacketSize(self, handle):
+        dev = self._device(handle)
+        if dev is None or not dev.b_open:
+            return c_int(MV_E_CALLORDER).value
+        return 1500
+
+    # ---------------------------------------------------------------- grabbing
+    def MV_CC_SetImageNodeNum(self, handle, nNum):
+        dev = self._device(handle)
+        if dev is None:
+            return MV_E_HANDLE
+        nNum = _value(nNum)
+        if nNum < 1 or dev.b_grabbing:
+            return MV_E_PARAMETER if nNum < 1 else MV_E_CALLORDER
+        dev.n_image_nodes = nNum
+        return MV_OK
+
+    def MV_CC_StartGrabbing(self, handle):
+        dev = self._device(handle)
+        if dev is None:
+            return MV_E_HANDLE
+        if self._stale(handle):
+            return MV_E_NETER
+        if not dev.b_open or dev.b_grabbing:
+            return MV_E_CALLORDER
+        dev.render()
+        dev.ev_stop.clear()
+        dev.ev_trigger.clear()
+        dev.n_next = 0
+        dev.n_lost_frames = 0
+        dev.t_start = time.perf_counter()
+        dev.b_grabbing = True
+        if dev.cb_image is not None:
+            dev.h_callback_thread = threading.Thread(target=self._callback_loop, args=(dev,), daemon=True)
+            dev.h_callback_thread.start()
+        return MV_OK
+
+    def _stop(self, dev):
+        dev.b_grabbing = False
+        dev.ev_stop.set()
+        # ch:与SDK一样,停止取流返回后不再有回调 | en:Like the SDK, no callback runs once stopping has returned
+        hThread, dev.h_callback_thread = dev.h_callback_thread, None
+        if hThread is not None and hThread is not threading.current_thread():
+            hThread.join()
+
+    # ch:回调取流:一个节点缓存,回调返回前不交付下一帧,回调太慢时按节点数丢帧 | en:Callback delivery: one driver buffer, the next frame waits for the callback to return; a slow callback loses frames like a full node pool
+    def _callback_loop(self, dev):
+        cbOutput, pUser = dev.cb_image, dev.p_image_user
+        node = (c_ubyte * dev.value("PayloadSize"))()
+        stFrameInfo = MV_FRAME_OUT_INFO_EX()
+        # ch:两套头文件各自定义了结构体类型,按回调原型转换 | en:Both generated headers define their own structure types, so cast to the callback's prototype
+        tupleArgTypes = getattr(cbOutput, "argtypes", None) or (POINTER(c_ubyte), POINTER(MV_FRAME_OUT_INFO_EX))
+        pData = cast(node, tupleArgTypes[0])
+        pFrameInfo = cast(pointer(stFrameInfo), tupleArgTypes[1])
+        while not dev.ev_stop.is_set():
+            nIndex = dev.wait_frame(100)
+            if nIndex is None:
+                continue
+            payload = dev.payload(nIndex)
+            memmove(node, payload.ctypes.data, len(payload))
+            dev.fill_frame_info(stFrameInfo, nIndex)
+            cbOutput(pData, pFrameInfo, pUser)
+
+    def MV_CC_StopGrabbing(self, handle):
+        dev = self._device(handle)
+        if dev is None:
+            return MV_E_HANDLE
+        if self._stale(handle):
+            return MV_OK
+        if not dev.b_grabbing:
+            return MV_E_CALLORDER
+        self._stop(dev)
+        return MV_OK
+
+    def MV_CC_GetOneFrameTimeout(self, handle, pData, nDataSize, pstFrameInfo, nMsec=1000):
+        dev = self._device(handle)
+        if dev is None:
+            return MV_E_HANDLE
+        if self._stale(handle):
+            # ch:断线后的句柄与SDK一样只会超时 | en:Like the SDK, a handle whose device dropped off only times out
+            time.sleep(_value(nMsec) / 1000.0)
+            return MV_E_NODATA
+        if not dev.b_grabbing or dev.cb_image is not None:
+            return MV_E_CALLORDER
+        nIndex = dev.wait_frame(_value(nMsec))
+        if nIndex is None:
+            return MV_E_NODATA
+        payload = dev.payload(nIndex)
+        if _value(nDataSize) < len(payload):
+            return MV_E_NOENOUGH_BUF
+        memmove(pData, payload.ctypes.data, len(payload))
+        dev.fill_frame_info(_deref(pstFrameInfo), nIndex)
+        return MV_OK
+
+    def MV_CC_GetImageBuffer(self, handle, pstFrame, nMsec=1000):
+        dev = self._device(handle)
+        if dev is None:
+            return MV_E_HANDLE
+        if self._stale(handle):
+            # ch:断线后的句柄与SDK一样只会超时 | en:Like the SDK, a handle whose device dropped off only times out
+            time.sleep(_value(nMsec) / 1000.0)
+            return MV_E_NODATA
+        if not dev.b_grabbing or dev.cb_image is not None:
+            return MV_E_CALLORDER
+        with dev.lock:
+            if not dev.list_free_nodes:
+                node = None
+            else:
+                node = dev.list_free_nodes.pop()
+        if node is None:
+            # ch:所有节点都被用户占用,不再出图 | en:Every node is held by the caller, no new frame can arrive
+            dev.ev_stop.wait(_value(nMsec) / 1000.0)
+            return MV_E_NODATA
+        nIndex = dev.wait_frame(_value(nMsec))
+        if nIndex is None:
+            with dev.lock:
+                dev.list_free_nodes.append(node)
+            return MV_E_NODATA
+        payload = dev.payload(nIndex)
+        memmove(node, payload.ctypes.data, len(payload))
+        stFrame = _deref(pstFrame)
+        stFrame.pBufAddr = cast(node, POINTER(c_ubyte))
+        dev.fill_frame_info(stFrame.stFrameInfo, nIndex)
+        with dev.lock:
+            dev.dict_held_nodes[addressof(node)] = node
+        return MV_OK
+
+    def MV_CC_FreeImageBuffer(self, handle, pstFrame):
+        dev = self._device(handle)
+        if dev is None:
+            return MV_E_HANDLE
+        stFrame = _deref(pstFrame)
+        nAddr = cast(stFrame.pBufAddr, c_void_p).value
+        with dev.lock:
+            node = dev.dict_held_nodes.pop(nAddr, None)
+            if node is None:
+                return MV_E_PARAMETER
+            # ch:停止取流后节点重新分配,不再回收旧节点 | en:Nodes from a previous grabbing session are simply dropped
+            if len(node) == dev.value("PayloadSize"):
+                dev.list_free_nodes.append(node)
+        return MV_OK
+
+    def MV_CC_RegisterImageCallBackEx(self, handle, cbOutput, pUser):
+        dev = self._device(handle)
+        if dev is None:
+            return MV_E_HANDLE
+        if not dev.b_open or dev.b_grabbing:
+            return MV_E_CALLORDER
+        dev.cb_image = cbOutput
+        dev.p_image_user = pUser
+        return MV_OK
+
+    def MV_CC_RegisterExceptionCallBack(self, handle, cbException, pUser):
+        dev = self._device(handle)
+        if dev is None:
+            return MV_E_HANDLE
+        if not dev.b_open:
+            return MV_E_CALLORDER
+        dev.cb_exception = cbException
+        dev.p_exception_user = pUser
+        return MV_OK
+
+    def MV_CC_RegisterEventCallBackEx(self, handle, pEventName, cbEvent, pUser):
+        return MV_E_SUPPORT
+
+    # ---------------------------------------------------------------- nodes
+    def _get_node(self, handle, strKey, strType):
+        dev = self._device(handle)
+        if dev is None:
+            return None, MV_E_HANDLE
+        if self._stale(handle):
+            return None, MV_E_NETER
+        if not dev.b_open:
+            return None, MV_E_CALLORDER
+        self._node_access()
+        strKey = _key(strKey)
+        if strKey not in dev.nodes or dev.nodes[strKey][0] != strType:
+            return None, MV_E_GC_PROPERTY
+        return dev.value(strKey), MV_OK
+
+    def _set_node(self, handle, strKey, strType, value):
+        dev = self._device(handle)
+        if dev is None:
+            return MV_E_HANDLE
+        if self._stale(handle):
+            return MV_E_NETER
+        if not dev.b_open:
+            return MV_E_CALLORDER
+        self._node_access()
+        strKey = _key(strKey)
+        if strKey not in dev.nodes or dev.nodes[strKey][0] != strType:
+            return MV_E_GC_PROPERTY
+        if strKey in _READ_ONLY or (dev.b_grabbing and strKey in _LOCKED_WHILE_GRABBING):
+            return MV_E_GC_ACCESS
+        if strKey == "PixelFormat" and value not in SIM_PIXEL_FORMATS:
+            return MV_E_GC_RANGE
+        if strKey in ("Width", "Height") and value <= 0:
+            return MV_E_GC_RANGE
+        if strKey in _ROI_LIMITS:
+            strPaired, strMax = _ROI_LIMITS[strKey]
+            if value < 0 or value + dev.value(strPaired) > dev.value(strMax):
+                return MV_E_GC_RANGE
+        dev.nodes[strKey][1] = value
+        if strKey == "AcquisitionFrameRate":
+            dev.nodes["ResultingFrameRate"][1] = value
+        return MV_OK
+
+    def MV_CC_GetIntValue(self, handle, strKey, pstIntValue):
+        value, ret = self._get_node(handle, strKey, _NODE_INT)
+        if ret == MV_OK:
+            stIntValue = _deref(pstIntValue)
+            stIntValue.nCurValue = value
+            stIntValue.nMin = 0
+            stIntValue.nMax = max(value, 0xffffffff if _key(strKey) == "PayloadSize" else SIM_MAX_WIDTH * 4)
+            stIntValue.nInc = 1
+        return ret
+
+    def MV_CC_SetIntValue(self, handle, strKey, nValue):
+        return self._set_node(handle, strKey, _NODE_INT, int(_value(nValue)))
+
+    def MV_CC_GetEnumValue(self, handle, strKey, pstEnumValue):
+        value, ret = self._get_node(handle, strKey, _NODE_ENUM)
+        if ret == MV_OK:
+            stEnumValue = _deref(pstEnumValue)
+            stEnumValue.nCurValue = value & 0xffffffff
+            if _key(strKey) == "PixelFormat":
+                listSupported = list(SIM_PIXEL_FORMATS)
+                stEnumValue.nSupportedNum = len(listSupported)
+                for i, enPixelType in enumerate(listSupported):
+                    stEnumValue.nSupportValue[i] = enPixelType
+            else:
+                stEnumValue.nSupportedNum = 0
+        return ret
+
+    def MV_CC_SetEnumValue(self, handle, strKey, nValue):
+        return self._set_node(handle, strKey, _NODE_ENUM, int(_value(nValue)))
+
+    def MV_CC_SetEnumValueByString(self, handle, strKey, sValue):
+        strValue = _key(sValue)
+        if _key(strKey) == "PixelFormat":
+            try:
+                return self.MV_CC_SetEnumValue(handle, strKey, pixel_type_from_name(strValue))
+            except ValueError:
+                return MV_E_GC_RANGE
+        dictNamed = {"Off": 0, "On": 1, "Continuous": 2, "Software": 7}
+        if strValue not in dictNamed:
+            return MV_E_GC_RANGE
+        return self.MV_CC_SetEnumValue(handle, strKey, dictNamed[strValue])
+
+    def MV_CC_GetFloatValue(self, handle, strKey, pstFloatValue):
+        value, ret = self._get_node(handle, strKey, _NODE_FLOAT)
+        if ret == MV_OK:
+            stFloatValue = _deref(pstFloatValue)
+            stFloatValue.fCurValue = value
+            stFloatValue.fMin = 0.0
+            stFloatValue.fMax = 1e7
+        return ret
+
+    def MV_CC_SetFloatValue(self, handle, strKey, fValue):
+        return self._set_node(handle, strKey, _NODE_FLOAT, float(_value(fValue)))
+
+    def MV_CC_GetBoolValue(self, handle, strKey, pBoolValue):
+        value, ret = self._get_node(handle, strKey, _NODE_BOOL)
+        if ret == MV_OK:
+            _deref(pBoolValue).value = bool(value)
+        return ret
+
+    def MV_CC_SetBoolValue(self, handle, strKey, bValue):
+        return self._set_node(handle, strKey, _NODE_BOOL, bool(_value(bValue)))
+
+    def MV_CC_GetStringValue(self, handle, strKey, pstStringValue):
+        value, ret = self._get_node(handle, strKey, _NODE_STRING)
+        if ret == MV_OK:
+            stStringValue = _deref(pstStringValue)
+            stStringValue.chCurValue = value.encode("ascii")
+            stStringValue.nMaxLength = 256
+        return ret
+
+    def MV_CC_SetStringValue(self, handle, strKey, sValue):
+        return self._set_node(handle, strKey, _NODE_STRING, _key(sValue))
+
+    def MV_CC_SetCommandValue(self, handle, strKey):
+        dev = self._device(handle)
+        if dev is None:
+            return MV_E_HANDLE
+        self._node_access()
+        if _key(strKey) != "TriggerSoftware":
+            return MV_E_GC_PROPERTY
+        if dev.b_grabbing:
+            dev.ev_trigger.set()
+        return MV_OK
+
+    # ---------------------------------------------------------------- image processing
+    def MV_CC_ConvertPixelType(self, handle, pstConvertParam):
+        stParam = _deref(pstConvertParam)
+        enSrc = stParam.enSrcPixelType
+        if enSrc not in SIM_PIXEL_FORMATS:
+            return MV_E_SUPPORT
+        nWidth, nHeight = stParam.nWidth, stParam.nHeight
+        src = np.ctypeslib.as_array(stParam.pSrcData, shape=(stParam.nSrcDataLen,))
+        strName, nBits, strFamily, strPattern = SIM_PIXEL_FORMATS[enSrc]
+        if nBits == 16:
+            image = (src.view("<u2")[:nWidth * nHeight] >> (SIM_SIGNIFICANT_BITS[enSrc] - 8)).astype(np.uint8)
+        elif nBits == 12:
+            image = unpack_packed_8bit(src, nWidth, nHeight, SIM_SIGNIFICANT_BITS[enSrc])
+        else:
+            image = src[:nWidth * nHeight * nBits // 8]
+        image = image.reshape(nHeight, nWidth, -1)
+
+        enDst = stParam.enDstPixelType
+        if strFamily == "bayer":
+            # ch:OpenCV的Bayer代码以第二行为准,RGGB对应BayerBG | en:OpenCV names Bayer codes from the second row, so RGGB is BayerBG
+            dictCode = {"RGGB": cv2.COLOR_BayerBG2RGB, "GBRG": cv2.COLOR_BayerGR2RGB,
+                        "GRBG": cv2.COLOR_BayerGB2RGB, "BGGR": cv2.COLOR_BayerRG2RGB}
+            rgb = cv2.cvtColor(image[..., 0], dictCode[strPattern])
+        elif strFamily == "mono":
+            rgb = cv2.cvtColor(image[..., 0], cv2.COLOR_GRAY2RGB)
+        elif strFamily == "bgr":
+            rgb = image[..., ::-1]
+        else:
+            rgb = image
+
+        if enDst == PixelType_Gvsp_RGB8_Packed:
+            out = rgb
+        elif enDst == PixelType_Gvsp_BGR8_Packed:
+            out = rgb[..., ::-1]
+        elif enDst == PixelType_Gvsp_Mono8:
+            out = image[..., 0] if strFamily == "mono" else cv2.cvtColor(np.ascontiguousarray(rgb), cv2.COLOR_RGB2GRAY)
+        else:
+            return MV_E_SUPPORT
+        out = np.ascontiguousarray(out)
+        if out.nbytes > stParam.nDstBufferSize:
+            return MV_E_NOENOUGH_BUF
+        memmove(stParam.pDstBuffer, out.ctypes.data, out.nbytes)
+        stParam.nDstLen = out.nbytes
+        return MV_OK
+
+    def MV_CC_SaveImageEx2(self, handle, pstSaveParam):
+        return MV_E_SUPPORT
+
+    # ch:属性文件每行"节点名\t值",每个节点计一次节点访问 | en:Feature files hold one "name\tvalue" line per writable node, each costing one node access
+    def MV_CC_FeatureSave(self, handle, pFileName):
+        dev = self._device(handle)
+        if dev is None:
+            return MV_E_HANDLE
+        if not dev.b_open:
+            return MV_E_CALLORDER
+        listLines = ["# %s %s feature file" % (dev.value("DeviceModelName"), dev.strSerial)]
+        for strKey, (strType, value) in dev.nodes.items():
+            if strType == _NODE_COMMAND or strKey in _READ_ONLY:
+                continue
+            self._node_access()
+            listLines.append("%s\t%s" % (strKey, int(value) if strType == _NODE_BOOL else value))
+        with open(_key(pFileName), "w") as f:
+            f.write("\n".join(listLines) + "\n")
+        return MV_OK
+
+    def MV_CC_FeatureLoad(self, handle, pFileName):
+        dev = self._device(handle)
+        if dev is None:
+            return MV_E_HANDLE
+        try:
+            with open(_key(pFileName)) as f:
+                listLines = [strLine.rstrip("\n").split("\t", 1) for strLine in f if not strLine.startswith("#")]
+        except IOError:
+            return MV_E_PARAMETER
+        dictParse = {_NODE_INT: int, _NODE_ENUM: int, _NODE_FLOAT: float, _NODE_BOOL: lambda s: bool(int(s)),
+                     _NODE_STRING: str}
+        listPending = [(strKey, strValue) for strKey, strValue in listLines if strKey in dev.nodes]
+        # ch:与GenApi一样重放失败的节点,直到不再有进展 | en:Like GenApi, replay failed nodes until no more progress is made
+        while listPending:
+            listFailed = []
+            ret = MV_OK
+            for strKey, strValue in listPending:
+                strType = dev.nodes[strKey][0]
+                ret = self._set_node(handle, strKey, strType, dictParse[strType](strValue))
+                if ret != MV_OK:
+                    listFailed.append((strKey, strValue))
+            if len(listFailed) == len(listPending):
+                return ret
+            listPending = listFailed
+        return MV_OK
+
+    def MV_CC_FileAccessRead(self, handle, pstFileAccess):
+        return MV_E_SUPPORT
+
+    def MV_CC_FileAccessWrite(self, handle, pstFileAccess):
+        return MV_E_SUPPORT
+
+    def MV_CC_GetFileAccessProgress(self, handle, pstFileAccessProgress):
+        return MV_E_SUPPORT
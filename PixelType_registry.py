@@ -0,0 +1,240 @@
+# -- coding: utf-8 --
+"""
+ch:像素格式注册表 | en:Pixel format registry
+
+One entry per supported PixelType_Gvsp_* constant, built once at import:
+
+    nBitsPerPixel      storage bits per pixel in the frame buffer
+    nSignificantBits   bits actually carrying image data
+    strFamily          'mono', 'bayer', 'rgb', 'bgr' or 'yuv'
+    strPattern         Bayer phase ('RG', 'GB', 'GR', 'BG') or None
+    bPacked            GVSP packed layout (3 bytes per 2 pixels)
+    converter          converter(data, nWidth, nHeight) -> uint8 image ready for
+                       display, (h, w) for mono or (h, w, 3) BGR; None when the
+                       format still needs MV_CC_ConvertPixelType
+
+PixelFormat.unpack() gives mono and Bayer data at full bit depth instead,
+for measurement code that must not lose the low bits.
+
+Ingest loops hold a PixelFormatResolver so the lookup happens once per
+stream and the resolved converter is reused until enPixelType changes.
+"""
+import cv2
+import numpy as np
+
+from PixelType_header import *
+from PixelType_unpack import unpack_packed, unpack_packed_8bit
+
+PIXEL_FAMILY_MONO = "mono"
+PIXEL_FAMILY_BAYER = "bayer"
+PIXEL_FAMILY_RGB = "rgb"
+PIXEL_FAMILY_BGR = "bgr"
+PIXEL_FAMILY_YUV = "yuv"
+
+# ch:GenICam的Bayer相位对应的OpenCV转换码(OpenCV按第二行命名) | en:OpenCV demosaic code per GenICam Bayer phase (OpenCV names the pattern from the second row)
+BAYER_CV2_CODES = {
+    "RG": cv2.COLOR_BayerBG2BGR,
+    "GB": cv2.COLOR_BayerGR2BGR,
+    "GR": cv2.COLOR_BayerGB2BGR,
+    "BG": cv2.COLOR_BayerRG2BGR,
+}
+
+
+class PixelFormat():
+    """One registry entry, see the module docstring for the fields."""
+
+    def __init__(self, enPixelType, strName, nBitsPerPixel, nSignificantBits, strFamily,
+                 strPattern=None, bPacked=False, converter=None):
+        self.enPixelType = enPixelType
+        self.strName = strName
+        self.nBitsPerPixel = nBitsPerPixel
+        self.nSignificantBits = nSignificantBits
+        self.strFamily = strFamily
+        self.strPattern = strPattern
+        self.bPacked = bPacked
+        self.converter = converter
+
+    @property
+    def bIsMono(self):
+        return self.strFamily == PIXEL_FAMILY_MONO
+
+    @property
+    def bIsColor(self):
+        return self.strFamily != PIXEL_FAMILY_MONO
+
+    # ch:一帧所占字节数 | en:Bytes occupied by one frame
+    def frame_length(self, nWidth, nHeight):
+        return nWidth * nHeight * self.nBitsPerPixel // 8
+
+    # ch:单通道数据按原始位深取出,(h, w) uint8或uint16,给定out时写入out,Packed格式的中间结果用scratch | en:Single-channel data at native bit depth as (h, w) uint8 or uint16, written into out when given; packed formats work in scratch
+    def unpack(self, data, nWidth, nHeight, out=None, scratch=None):
+        if self.strFamily not in (PIXEL_FAMILY_MONO, PIXEL_FAMILY_BAYER):
+            raise ValueError("%s is not a single-channel format" % self.strName)
+        if self.bPacked:
+            return unpack_packed(data, nWidth, nHeight, self.nSignificantBits, out=out, scratch=scratch)
+        if self.nBitsPerPixel == 16:
+            image = _as_uint16(data, nWidth, nHeight)
+        else:
+            image = _as_uint8(data, nWidth * nHeight).reshape(nHeight, nWidth)
+        if out is None:
+            return image
+        np.copyto(out.reshape(nHeight, nWidth), image)
+        return out
+
+    def __repr__(self):
+        return "PixelFormat(%s, 0x%08x)" % (self.strName, self.enPixelType)
+
+
+# ch:取前nCount字节的一维uint8数组,不拷贝 | en:Flat uint8 array over the first nCount bytes, no copy
+def _as_uint8(data, nCount):
+    if isinstance(data, np.ndarray):
+        return data.reshape(-1).view(np.uint8)[:nCount]
+    return np.frombuffer(data, count=nCount, dtype=np.uint8)
+
+
+# ch:16位容器的帧数据转为(h, w) uint16 | en:Frame data in 16-bit containers as an (h, w) uint16 array
+def _as_uint16(data, nWidth, nHeight):
+    return _as_uint8(data, nWidth * nHeight * 2).view(np.uint16).reshape(nHeight, nWidth)
+
+
+def _convert_mono8(data, nWidth, nHeight):
+    return _as_uint8(data, nWidth * nHeight).reshape(nHeight, nWidth)
+
+
+def _make_mono16_converter(nSignificantBits):
+    nShift = nSignificantBits - 8
+
+    def convert(data, nWidth, nHeight):
+        return (_as_uint16(data, nWidth, nHeight) >> nShift).astype(np.uint8)
+    return convert
+
+
+def _make_bayer8_converter(strPattern):
+    nCode = BAYER_CV2_CODES[strPattern]
+
+    def convert(data, nWidth, nHeight):
+        return cv2.cvtColor(_as_uint8(data, nWidth * nHeight).reshape(nHeight, nWidth), nCode)
+    return convert
+
+
+def _make_bayer16_converter(strPattern, nSignificantBits):
+    nCode = BAYER_CV2_CODES[strPattern]
+    nShift = nSignificantBits - 8
+
+    def convert(data, nWidth, nHeight):
+        raw = (_as_uint16(data, nWidth, nHeight) >> nShift).astype(np.uint8)
+        return cv2.cvtColor(raw, nCode)
+    return convert
+
+
+def _make_mono_packed_converter(nSignificantBits):
+    def convert(data, nWidth, nHeight):
+        return unpack_packed_8bit(data, nWidth, nHeight, nSignificantBits)
+    return convert
+
+
+def _make_bayer_packed_converter(strPattern, nSignificantBits):
+    nCode = BAYER_CV2_CODES[strPattern]
+
+    def convert(data, nWidth, nHeight):
+        return cv2.cvtColor(unpack_packed_8bit(data, nWidth, nHeight, nSignificantBits), nCode)
+    return convert
+
+
+def _convert_rgb8(data, nWidth, nHeight):
+    return cv2.cvtColor(_as_uint8(data, nWidth * nHeight * 3).reshape(nHeight, nWidth, 3), cv2.COLOR_RGB2BGR)
+
+
+def _convert_bgr8(data, nWidth, nHeight):
+    return _as_uint8(data, nWidth * nHeight * 3).reshape(nHeight, nWidth, 3)
+
+
+def _make_yuv422_converter(nCode):
+    def convert(data, nWidth, nHeight):
+        return cv2.cvtColor(_as_uint8(data, nWidth * nHeight * 2).reshape(nHeight, nWidth, 2), nCode)
+    return convert
+
+
+def _build_registry():
+    dictFormats = {}
+
+    def add(enPixelType, strName, nBitsPerPixel, nSignificantBits, strFamily, strPattern=None,
+            bPacked=False, converter=None):
+        dictFormats[enPixelType] = PixelFormat(enPixelType, strName, nBitsPerPixel, nSignificantBits,
+                                               strFamily, strPattern, bPacked, converter)
+
+    add(PixelType_Gvsp_Mono8, "Mono8", 8, 8, PIXEL_FAMILY_MONO, converter=_convert_mono8)
+    for enPixelType, strName, nBits in ((PixelType_Gvsp_Mono10, "Mono10", 10),
+                                        (PixelType_Gvsp_Mono12, "Mono12", 12),
+                                        (PixelType_Gvsp_Mono14, "Mono14", 14),
+                                        (PixelType_Gvsp_Mono16, "Mono16", 16)):
+        add(enPixelType, strName, 16, nBits, PIXEL_FAMILY_MONO, converter=_make_mono16_converter(nBits))
+    add(PixelType_Gvsp_Mono10_Packed, "Mono10Packed", 12, 10, PIXEL_FAMILY_MONO, bPacked=True,
+        converter=_make_mono_packed_converter(10))
+    add(PixelType_Gvsp_Mono12_Packed, "Mono12Packed", 12, 12, PIXEL_FAMILY_MONO, bPacked=True,
+        converter=_make_mono_packed_converter(12))
+
+    for strPattern in ("RG", "GB", "GR", "BG"):
+        strBase = "Bayer" + strPattern
+        add(globals()["PixelType_Gvsp_%s8" % strBase], strBase + "8", 8, 8, PIXEL_FAMILY_BAYER, strPattern,
+            converter=_make_bayer8_converter(strPattern))
+        for nBits in (10, 12, 16):
+            add(globals()["PixelType_Gvsp_%s%d" % (strBase, nBits)], "%s%d" % (strBase, nBits), 16, nBits,
+                PIXEL_FAMILY_BAYER, strPattern, converter=_make_bayer16_converter(strPattern, nBits))
+        for nBits in (10, 12):
+            add(globals()["PixelType_Gvsp_%s%d_Packed" % (strBase, nBits)], "%s%dPacked" % (strBase, nBits), 12,
+                nBits, PIXEL_FAMILY_BAYER, strPattern, bPacked=True,
+                converter=_make_bayer_packed_converter(strPattern, nBits))
+
+    add(PixelType_Gvsp_RGB8_Packed, "RGB8", 24, 8, PIXEL_FAMILY_RGB, converter=_convert_rgb8)
+    add(PixelType_Gvsp_BGR8_Packed, "BGR8", 24, 8, PIXEL_FAMILY_BGR, converter=_convert_bgr8)
+    # ch:海康YUV422_Packed为UYVY字节序 | en:Hikrobot YUV422_Packed is UYVY byte order
+    add(PixelType_Gvsp_YUV422_Packed, "YUV422Packed", 16, 8, PIXEL_FAMILY_YUV,
+        converter=_make_yuv422_converter(cv2.COLOR_YUV2BGR_UYVY))
+    add(PixelType_Gvsp_YUV422_YUYV_Packed, "YUV422_YUYVPacked", 16, 8, PIXEL_FAMILY_YUV,
+        converter=_make_yuv422_converter(cv2.COLOR_YUV2BGR_YUYV))
+    return dictFormats
+
+
+PIXEL_FORMATS = _build_registry()
+
+
+# ch:查找像素格式,未注册返回None | en:Look up a pixel format, None when it is not registered
+def get_pixel_format(enPixelType):
+    return PIXEL_FORMATS.get(enPixelType)
+
+
+class PixelFormatResolver():
+    """
+    Per-stream cache in front of the registry: resolve() only consults
+    PIXEL_FORMATS when enPixelType differs from the previous frame. The
+    converter to use for the current format is kept in `converter`; with a
+    demosaicer (see Bayer_demosaic) Bayer formats get its pooled converter
+    instead of the registry default.
+    """
+
+    def __init__(self, demosaicer=None):
+        self.demosaicer = demosaicer
+        self.enPixelType = None
+        self.stFormat = None
+        self.converter = None
+        self.nResolveCount = 0
+
+    def resolve(self, enPixelType):
+        if enPixelType != self.enPixelType:
+            self.stFormat = PIXEL_FORMATS.get(enPixelType)
+            self.converter = None
+            if self.stFormat is not None:
+                if self.demosaicer is not None and self.stFormat.strFamily == PIXEL_FAMILY_BAYER:
+                    self.converter = self.demosaicer.converter(self.stFormat)
+                else:
+                    self.converter = self.stFormat.converter
+            self.enPixelType = enPixelType
+            self.nResolveCount += 1
+        return self.stFormat
+
+    # ch:格式切换后强制重新查找 | en:Force a fresh lookup, e.g. after a PixelFormat change
+    def reset(self):
+        self.enPixelType = None
+        self.stFormat = None
+        self.converter = None
@@ -0,0 +1,150 @@
+# -- coding: utf-8 --
+"""
+ch:GVSP 10/12位Packed格式的NumPy解包 | en:NumPy unpacking of the GVSP 10/12-bit packed formats
+
+Mono10_Packed, Mono12_Packed and Bayer*10/12_Packed store two pixels in
+three bytes:
+
+    12-bit   byte0 = p0[11:4]   byte1 = p1[3:0] << 4 | p0[3:0]   byte2 = p1[11:4]
+    10-bit   byte0 = p0[9:2]    byte1 = p1[1:0] << 4 | p0[1:0]   byte2 = p1[9:2]
+
+unpack_packed() restores the full bit depth as uint16, unpack_packed_8bit()
+goes straight to uint8 with a configurable right shift. Both write into a
+caller-supplied `out` array when given, and do their intermediate work in a
+caller-supplied `scratch` (a uint16 array of at least w * h elements), so
+a grab loop can keep every buffer for the lifetime of the stream and
+allocate nothing per frame.
+"""
+import numpy as np
+
+
+# ch:取前nCount字节的一维uint8数组,不拷贝 | en:Flat uint8 array over the first nCount bytes, no copy
+def _as_uint8(data, nCount):
+    if isinstance(data, np.ndarray):
+        return data.reshape(-1).view(np.uint8)[:nCount]
+    return np.frombuffer(data, count=nCount, dtype=np.uint8)
+
+
+# ch:Packed帧所占字节数 | en:Bytes occupied by a packed frame
+def packed_frame_length(nWidth, nHeight):
+    return (nWidth * nHeight * 3 + 1) // 2
+
+
+def _packed_groups(data, nWidth, nHeight):
+    nPixels = nWidth * nHeight
+    if nPixels % 2:
+        raise ValueError("packed formats need an even pixel count, got %dx%d" % (nWidth, nHeight))
+    return _as_uint8(data, nPixels * 3 // 2).reshape(-1, 3)
+
+
+def _check_out(out, nWidth, nHeight, dtype):
+    if out is None:
+        return np.empty((nHeight, nWidth), dtype)
+    if out.dtype != dtype or out.size != nWidth * nHeight or not out.flags.c_contiguous:
+        raise ValueError("out must be a contiguous %s array of %d elements" % (np.dtype(dtype).name, nWidth * nHeight))
+    return out
+
+
+# ch:中间结果所用的uint16数组,至少w*h个元素 | en:uint16 array for the intermediate results, at least w * h elements
+def _check_scratch(scratch, nWidth, nHeight):
+    if scratch is None:
+        return np.empty(nWidth * nHeight, np.uint16)
+    if scratch.dtype != np.uint16 or scratch.size < nWidth * nHeight or not scratch.flags.c_contiguous:
+        raise ValueError("scratch must be a contiguous uint16 array of at least %d elements" % (nWidth * nHeight))
+    return scratch.reshape(-1)
+
+
+def unpack_packed(data, nWidth, nHeight, nBits, out=None, scratch=None):
+    """
+    Unpack a 10/12-bit packed payload into an (h, w) uint16 array at full
+    bit depth; the temporaries live in scratch when given.
+    """
+    if nBits not in (10, 12):
+        raise ValueError("unsupported packed bit depth %d" % nBits)
+    groups = _packed_groups(data, nWidth, nHeight)
+    out = _check_out(out, nWidth, nHeight, np.uint16)
+    nLow = nBits - 8
+    nMask = (1 << nLow) - 1
+    nGroups = groups.shape[0]
+
+    # ch:在连续数组上做位运算,比直接在跨步视图上运算快约一倍 | en:Do the bit twiddling on contiguous arrays, about 2x faster than on strided views
+    scratch = _check_scratch(scratch, nWidth, nHeight)
+    pixel = scratch[:nGroups]
+    arrBytes = scratch[nGroups:2 * nGroups].view(np.uint8)
+    mid, low = arrBytes[:nGroups], arrBytes[nGroups:]
+    np.copyto(mid, groups[:, 1])
+    pairs = out.reshape(-1, 2)
+
+    np.copyto(pixel, groups[:, 0])
+    np.left_shift(pixel, nLow, out=pixel)
+    np.bitwise_and(mid, nMask, out=low)
+    np.bitwise_or(pixel, low, out=pixel)
+    pairs[:, 0] = pixel
+
+    np.copyto(pixel, groups[:, 2])
+    np.left_shift(pixel, nLow, out=pixel)
+    np.right_shift(mid, 4, out=low)
+    np.bitwise_and(low, nMask, out=low)
+    np.bitwise_or(pixel, low, out=pixel)
+    pairs[:, 1] = pixel
+    return out.reshape(nHeight, nWidth)
+
+
+def unpack_packed_8bit(data, nWidth, nHeight, nBits, nShift=None, out=None, scratch=None):
+    """
+    Unpack a 10/12-bit packed payload into an (h, w) uint8 array, each pixel
+    shifted right by nShift (default nBits - 8, i.e. the most significant
+    byte). Smaller shifts brighten dark scenes and saturate at 255; they
+    work in scratch, a uint16 array of at least w * h elements, so a caller
+    passing both out and scratch allocates nothing per frame.
+    """
+    if nBits not in (10, 12):
+        raise ValueError("unsupported packed bit depth %d" % nBits)
+    if nShift is None:
+        nShift = nBits - 8
+    if nShift < 0:
+        raise ValueError("negative shift %d" % nShift)
+    groups = _packed_groups(data, nWidth, nHeight)
+    out = _check_out(out, nWidth, nHeight, np.uint8)
+    flat = out.reshape(-1)
+    nLow = nBits - 8
+    # ch:移位不小于低位宽度时,结果只取决于byte0/byte2 | en:With a shift of at least the low-bit width the result only depends on byte0/byte2
+    if nShift >= nLow:
+        np.right_shift(groups[:, 0], nShift - nLow, out=flat[0::2])
+        np.right_shift(groups[:, 2], nShift - nLow, out=flat[1::2])
+        return out.reshape(nHeight, nWidth)
+
+    # ch:每个像素 min(255, (高字节 << k) | (低位 >> nShift)),在连续的scratch上计算 | en:Per pixel min(255, (high byte << k) | (low bits >> nShift)), computed on the contiguous scratch
+    nGroups = groups.shape[0]
+    scratch = _check_scratch(scratch, nWidth, nHeight)
+    pixel = scratch[:nGroups]
+    low = scratch[nGroups:2 * nGroups].view(np.uint8)[:nGroups]
+    nMask = (1 << nLow) - 1
+    for nByte, nMidShift, dst in ((0, 0, flat[0::2]), (2, 4, flat[1::2])):
+        np.right_shift(groups[:, 1], nMidShift, out=low)
+        np.bitwise_and(low, nMask, out=low)
+        np.right_shift(low, nShift, out=low)
+        np.copyto(pixel, groups[:, nByte])
+        np.left_shift(pixel, nLow - nShift, out=pixel)
+        np.bitwise_or(pixel, low, out=pixel)
+        np.minimum(pixel, 255, out=pixel)
+        np.copyto(dst, pixel, casting="unsafe")
+    return out.reshape(nHeight, nWidth)
+
+
+def pack_packed(image, nBits):
+    """Inverse of unpack_packed: pack an (h, w) integer image into GVSP packed bytes."""
+    if nBits not in (10, 12):
+        raise ValueError("unsupported packed bit depth %d" % nBits)
+    flat = np.ascontiguousarray(image, dtype=np.uint16).reshape(-1)
+    if flat.size % 2:
+        raise ValueError("packed formats need an even pixel count")
+    nLow = nBits - 8
+    nMask = (1 << nLow) - 1
+    p0 = flat[0::2]
+    p1 = flat[1::2]
+    groups = np.empty((flat.size // 2, 3), np.uint8)
+    groups[:, 0] = p0 >> nLow
+    groups[:, 1] = ((p1 & nMask) << 4) | (p0 & nMask)
+    groups[:, 2] = p1 >> nLow
+    return groups.reshape(-1)
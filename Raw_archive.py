@@ -0,0 +1,291 @@
+# -- coding: utf-8 --
+"""
+ch:原始帧归档 | en:Raw frame archive
+
+A recording is two append-only files next to each other:
+
+    <name>.mvraw   frames back to back at a fixed stride (PayloadSize
+                   rounded up to RAW_ARCHIVE_ALIGN), exactly as the SDK
+                   delivered them, no header
+    <name>.mvidx   a 64-byte header (magic, version, record size, stride)
+                   followed by one FRAME_META_DTYPE record per frame:
+                   nFrameNum, device and host timestamps, fGain,
+                   fExposureTime, nLostPacket, pixel type, size and length
+
+Frame i lives at byte i * stride of the data file, so nothing has to be
+parsed to find it. RawArchiveWriter writes the frame before its index
+record; after a crash the shorter of the two files decides how many frames
+are valid and reopening with bAppend trims the other one. RawArchive maps
+both files with np.memmap, so opening a capture of any size is instant and
+frame(i) returns a view into the page cache, not a copy; image(i) decodes
+one frame with the registered pixel formats.
+"""
+import os
+import time
+import struct
+
+import numpy as np
+
+from MvCameraControl_class import *
+from PixelType_registry import PIXEL_FAMILY_BAYER, PIXEL_FAMILY_MONO, get_pixel_format
+from Bayer_demosaic import BayerDemosaicer, DEMOSAIC_BILINEAR
+from FrameBuffer_pool import FrameBufferPool
+from Image_writer import IMAGE_FORMAT_RAW, IMAGE_FORMAT_NPY
+
+# ch:连拍等写盘接口中表示写入归档的格式名 | en:Format name that asks burst flushes and recorders for an archive
+RAW_ARCHIVE_FORMAT = "mvraw"
+RAW_ARCHIVE_DATA_EXT = ".mvraw"
+RAW_ARCHIVE_INDEX_EXT = ".mvidx"
+RAW_ARCHIVE_MAGIC = b"MVRAWIDX"
+RAW_ARCHIVE_VERSION = 1
+# ch:帧步长按页对齐,每帧都从页边界开始 | en:Stride is page aligned so every frame starts on a page boundary
+RAW_ARCHIVE_ALIGN = 4096
+RAW_ARCHIVE_HEADER_SIZE = 64
+_HEADER = struct.Struct("<8sIIQ")
+
+# ch:每帧保存的MV_FRAME_OUT_INFO_EX字段 | en:MV_FRAME_OUT_INFO_EX fields kept per frame
+FRAME_META_DTYPE = np.dtype([
+    ("nFrameNum", np.uint32),
+    ("nDevTimeStamp", np.uint64),
+    ("nHostTimeStamp", np.int64),
+    ("fGain", np.float32),
+    ("fExposureTime", np.float32),
+    ("nLostPacket", np.uint32),
+    ("enPixelType", np.uint32),
+    ("nWidth", np.uint32),
+    ("nHeight", np.uint32),
+    ("nFrameLen", np.uint32),
+])
+
+
+# ch:把帧信息写入一条元数据记录 | en:Copy the frame info into one metadata record
+def fill_frame_meta(meta, stFrameInfo):
+    meta["nFrameNum"] = stFrameInfo.nFrameNum
+    meta["nDevTimeStamp"] = (stFrameInfo.nDevTimeStampHigh << 32) | stFrameInfo.nDevTimeStampLow
+    meta["nHostTimeStamp"] = stFrameInfo.nHostTimeStamp
+    meta["fGain"] = stFrameInfo.fGain
+    meta["fExposureTime"] = stFrameInfo.fExposureTime
+    meta["nLostPacket"] = stFrameInfo.nLostPacket
+    meta["enPixelType"] = stFrameInfo.enPixelType
+    meta["nWidth"] = stFrameInfo.nWidth
+    meta["nHeight"] = stFrameInfo.nHeight
+    meta["nFrameLen"] = stFrameInfo.nFrameLen
+
+
+# ch:由元数据记录还原帧信息,可写入已有结构体 | en:Rebuild an MV_FRAME_OUT_INFO_EX from a metadata record, optionally into an existing one
+def frame_info_from_meta(meta, stFrameInfo=None):
+    if stFrameInfo is None:
+        stFrameInfo = MV_FRAME_OUT_INFO_EX()
+    stFrameInfo.nFrameNum = int(meta["nFrameNum"])
+    stFrameInfo.nDevTimeStampHigh = int(meta["nDevTimeStamp"]) >> 32
+    stFrameInfo.nDevTimeStampLow = int(meta["nDevTimeStamp"]) & 0xffffffff
+    stFrameInfo.nHostTimeStamp = int(meta["nHostTimeStamp"])
+    stFrameInfo.fGain = float(meta["fGain"])
+    stFrameInfo.fExposureTime = float(meta["fExposureTime"])
+    stFrameInfo.nLostPacket = int(meta["nLostPacket"])
+    stFrameInfo.enPixelType = int(meta["enPixelType"])
+    stFrameInfo.nWidth = int(meta["nWidth"])
+    stFrameInfo.nHeight = int(meta["nHeight"])
+    stFrameInfo.nFrameLen = int(meta["nFrameLen"])
+    return stFrameInfo
+
+
+def decode_raw_frame(data, meta, strFormat, nDemosaicQuality=DEMOSAIC_BILINEAR):
+    """
+    Image to write for one raw frame: the bytes themselves for raw, sensor
+    data at native bit depth for npy (Mono/Bayer), otherwise the converted
+    Mono8/BGR8 image.
+    """
+    if strFormat == IMAGE_FORMAT_RAW:
+        return data[:int(meta["nFrameLen"])]
+    stFormat = get_pixel_format(int(meta["enPixelType"]))
+    if stFormat is None or stFormat.converter is None:
+        raise ValueError("unsupported pixel format 0x%x" % int(meta["enPixelType"]))
+    nWidth, nHeight = int(meta["nWidth"]), int(meta["nHeight"])
+    if strFormat == IMAGE_FORMAT_NPY and stFormat.strFamily in (PIXEL_FAMILY_MONO, PIXEL_FAMILY_BAYER):
+        return np.array(stFormat.unpack(data, nWidth, nHeight))
+    if stFormat.strFamily == PIXEL_FAMILY_BAYER:
+        demosaicer = BayerDemosaicer(nDemosaicQuality, pool=FrameBufferPool(1))
+        return demosaicer.demosaic(stFormat, data, nWidth, nHeight)
+    return stFormat.converter(data, nWidth, nHeight)
+
+
+def archive_paths(strPath):
+    """(data path, index path) for an archive name, with or without either extension."""
+    strBase, strExt = os.path.splitext(strPath)
+    if strExt not in (RAW_ARCHIVE_DATA_EXT, RAW_ARCHIVE_INDEX_EXT):
+        strBase = strPath
+    return strBase + RAW_ARCHIVE_DATA_EXT, strBase + RAW_ARCHIVE_INDEX_EXT
+
+
+def archive_stride(nPayloadSize):
+    return (nPayloadSize + RAW_ARCHIVE_ALIGN - 1) // RAW_ARCHIVE_ALIGN * RAW_ARCHIVE_ALIGN
+
+
+def _read_header(strIndexPath):
+    with open(strIndexPath, "rb") as f:
+        header = f.read(RAW_ARCHIVE_HEADER_SIZE)
+    if len(header) < RAW_ARCHIVE_HEADER_SIZE:
+        raise ValueError("%s: truncated archive header" % strIndexPath)
+    strMagic, nVersion, nRecordSize, nStride = _HEADER.unpack_from(header)
+    if strMagic != RAW_ARCHIVE_MAGIC:
+        raise ValueError("%s is not a raw frame archive index" % strIndexPath)
+    if nVersion != RAW_ARCHIVE_VERSION or nRecordSize != FRAME_META_DTYPE.itemsize:
+        raise ValueError("%s: unsupported archive version %d (record size %d)" % (strIndexPath, nVersion, nRecordSize))
+    return nStride
+
+
+# ch:两个文件中较短者决定有效帧数 | en:The shorter of the two files decides how many frames are valid
+def _valid_frames(strDataPath, strIndexPath, nStride):
+    nRecords = (os.path.getsize(strIndexPath) - RAW_ARCHIVE_HEADER_SIZE) // FRAME_META_DTYPE.itemsize
+    nFrames = os.path.getsize(strDataPath) // nStride if os.path.exists(strDataPath) else 0
+    return max(min(nRecords, nFrames), 0)
+
+
+class RawArchiveWriter():
+    """
+    Appends frames to <name>.mvraw/.mvidx. nPayloadSize sets the stride of
+    a new archive; with bAppend an existing archive is continued at its own
+    stride. With nFsyncEvery > 0 both files are fsync'ed every that many
+    frames, otherwise only on close().
+    """
+
+    def __init__(self, strPath, nPayloadSize, bAppend=False, nFsyncEvery=0):
+        self.strDataPath, self.strIndexPath = archive_paths(strPath)
+        strDir = os.path.dirname(self.strDataPath)
+        if strDir:
+            os.makedirs(strDir, exist_ok=True)
+        self.nFsyncEvery = nFsyncEvery
+        self.nFrames = 0
+        self.nBytes = 0
+        self.fWriteTime = 0.0
+        if bAppend and os.path.exists(self.strIndexPath):
+            self.nStride = _read_header(self.strIndexPath)
+            self.nFrames = _valid_frames(self.strDataPath, self.strIndexPath, self.nStride)
+            self.fileData = open(self.strDataPath, "r+b" if os.path.exists(self.strDataPath) else "w+b")
+            self.fileIndex = open(self.strIndexPath, "r+b")
+            # ch:截掉崩溃时写了一半的帧 | en:Drop anything half written by a crash
+            self.fileData.truncate(self.nFrames * self.nStride)
+            self.fileIndex.truncate(RAW_ARCHIVE_HEADER_SIZE + self.nFrames * FRAME_META_DTYPE.itemsize)
+            self.fileData.seek(0, os.SEEK_END)
+            self.fileIndex.seek(0, os.SEEK_END)
+        else:
+            self.nStride = archive_stride(nPayloadSize)
+            self.fileData = open(self.strDataPath, "wb")
+            self.fileIndex = open(self.strIndexPath, "wb")
+            header = _HEADER.pack(RAW_ARCHIVE_MAGIC, RAW_ARCHIVE_VERSION, FRAME_META_DTYPE.itemsize, self.nStride)
+            self.fileIndex.write(header.ljust(RAW_ARCHIVE_HEADER_SIZE, b"\0"))
+        if nPayloadSize > self.nStride:
+            self.close()
+            raise ValueError("payload of %d bytes does not fit the archive stride of %d" % (nPayloadSize, self.nStride))
+        self.padding = bytes(self.nStride)
+        self.record = np.zeros(1, FRAME_META_DTYPE)
+
+    def append(self, data, stFrameInfo):
+        """Write one frame (any buffer of at least nFrameLen bytes) with its MV_FRAME_OUT_INFO_EX."""
+        fill_frame_meta(self.record[0], stFrameInfo)
+        return self.append_record(data, self.record[0])
+
+    def append_record(self, data, meta):
+        """Write one frame with a FRAME_META_DTYPE record; returns its index in the archive."""
+        nLen = int(meta["nFrameLen"])
+        if nLen > self.nStride:
+            raise ValueError("frame of %d bytes does not fit the archive stride of %d" % (nLen, self.nStride))
+        fStart = time.perf_counter()
+        self.fileData.write(memoryview(data).cast("B")[:nLen])
+        if nLen < self.nStride:
+            self.fileData.write(self.padding[:self.nStride - nLen])
+        # ch:先写数据再写索引,索引中的帧总是完整的 | en:Data first, so every indexed frame is complete
+        self.fileIndex.write(np.asarray(meta, FRAME_META_DTYPE).tobytes())
+        nIndex = self.nFrames
+        self.nFrames += 1
+        self.nBytes += self.nStride
+        if self.nFsyncEvery > 0 and self.nFrames % self.nFsyncEvery == 0:
+            self.flush(bSync=True)
+        self.fWriteTime += time.perf_counter() - fStart
+        return nIndex
+
+    def flush(self, bSync=False):
+        self.fileData.flush()
+        self.fileIndex.flush()
+        if bSync:
+            os.fsync(self.fileData.fileno())
+            os.fsync(self.fileIndex.fileno())
+
+    def close(self):
+        if self.fileData is None:
+            return
+        self.flush(bSync=True)
+        self.fileData.close()
+        self.fileIndex.close()
+        self.fileData = None
+        self.fileIndex = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def stats(self):
+        return {"frames": self.nFrames, "bytes": self.nBytes, "stride": self.nStride,
+                "mb_s": self.nBytes / self.fWriteTime / 1e6 if self.fWriteTime > 0 else 0.0}
+
+
+class RawArchive():
+    """
+    Read-only, memory-mapped view of an archive. meta is the index as a
+    FRAME_META_DTYPE array and data a (frames, stride) uint8 array, both
+    backed by the files, so only the pages actually touched are read.
+    """
+
+    def __init__(self, strPath):
+        self.strDataPath, self.strIndexPath = archive_paths(strPath)
+        self.nStride = _read_header(self.strIndexPath)
+        nFrames = _valid_frames(self.strDataPath, self.strIndexPath, self.nStride)
+        if nFrames > 0:
+            self.meta = np.memmap(self.strIndexPath, FRAME_META_DTYPE, "r", RAW_ARCHIVE_HEADER_SIZE, (nFrames,))
+            self.data = np.memmap(self.strDataPath, np.uint8, "r", 0, (nFrames, self.nStride))
+        else:
+            # ch:np.memmap不能映射空文件 | en:np.memmap cannot map an empty file
+            self.meta = np.zeros(0, FRAME_META_DTYPE)
+            self.data = np.zeros((0, self.nStride), np.uint8)
+
+    def __len__(self):
+        return len(self.meta)
+
+    def frame(self, nIndex):
+        """(raw bytes, metadata record) of frame nIndex, the bytes a view into the mapping."""
+        meta = self.meta[nIndex]
+        return self.data[nIndex, :int(meta["nFrameLen"])], meta
+
+    def frame_info(self, nIndex):
+        return frame_info_from_meta(self.meta[nIndex])
+
+    def image(self, nIndex, bRaw=False, nDemosaicQuality=DEMOSAIC_BILINEAR):
+        """Frame nIndex converted to Mono8/BGR8, or with bRaw the unpacked sensor data."""
+        data, meta = self.frame(nIndex)
+        return decode_raw_frame(data, meta, IMAGE_FORMAT_NPY if bRaw else None, nDemosaicQuality)
+
+    def index_of(self, nFrameNum):
+        """Archive index of the frame numbered nFrameNum, or -1."""
+        listFrameNums = self.meta["nFrameNum"]
+        nIndex = int(np.searchsorted(listFrameNums, nFrameNum))
+        if nIndex < len(listFrameNums) and listFrameNums[nIndex] == nFrameNum:
+            return nIndex
+        # ch:帧号不单调(如相机重启)时退回线性查找 | en:Linear search when frame numbers are not monotonic (camera restarted)
+        listHits = np.flatnonzero(listFrameNums == nFrameNum)
+        return int(listHits[0]) if len(listHits) else -1
+
+    def close(self):
+        """Drop the mappings; they are unmapped once no frame view handed out refers to them."""
+        self.meta = np.zeros(0, FRAME_META_DTYPE)
+        self.data = np.zeros((0, self.nStride), np.uint8)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
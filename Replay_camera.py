@@ -0,0 +1,463 @@
+# -- coding: utf-8 --
+"""
+ch:回放相机 | en:Replay camera
+
+ReplayCamera serves recorded frames through the same calls as a live
+MvCamera, so grab loops, GrabPipeline, BurstCapture and the acquisition
+workers run unchanged on machines with no camera, and deterministically:
+
+    MV_CC_StartGrabbing / MV_CC_StopGrabbing
+    MV_CC_GetOneFrameTimeout   copy into the caller's buffer
+    MV_CC_GetImageBuffer / MV_CC_FreeImageBuffer, GetFrameView
+    MV_CC_GetIntValue          PayloadSize, Width, Height
+    MV_CC_GetEnumValue         PixelFormat
+    MV_CC_GetFloatValue        ResultingFrameRate, AcquisitionFrameRate
+
+and, for code written against OpenCV (the ezviz RTSP loops), the
+cv2.VideoCapture calls read(), grab(), retrieve(), isOpened(), get(),
+set() and release(); read() returns a converted Mono8/BGR8 image.
+
+Sources, picked by open_replay_source() from the path:
+
+    Raw_archive   <name>.mvraw/.mvidx, frames and metadata as recorded,
+                  served straight from the memory mapping
+    directory     image files (cv2) and .npy arrays in name order, served
+                  as Mono8, Mono16 or BGR8
+    video file    anything cv2.VideoCapture opens, served as BGR8
+
+Pacing:
+
+    original   the recorded host timestamps (an archive), the file's frame
+               rate (a video) or fFps (a directory), scaled by fSpeed
+    fixed      fFps frames per second
+    fast       every frame as soon as it is asked for
+
+A consumer that falls behind delays the replay instead of losing frames,
+so every run sees the same frames in the same order. With bLoop the source
+restarts at the end, otherwise grabbing times out (MV_E_NODATA) and read()
+returns (False, None) once it is exhausted. Frame metadata is served as
+recorded; sources without host timestamps are stamped at the time each
+frame is served.
+"""
+import os
+import time
+import threading
+
+import cv2
+import numpy as np
+
+from MvCameraControl_class import *
+from Raw_archive import (RawArchive, FRAME_META_DTYPE, RAW_ARCHIVE_DATA_EXT, RAW_ARCHIVE_INDEX_EXT, archive_paths,
+                         frame_info_from_meta, decode_raw_frame)
+
+REPLAY_PACE_ORIGINAL = "original"
+REPLAY_PACE_FIXED = "fixed"
+REPLAY_PACE_FAST = "fast"
+REPLAY_PACES = (REPLAY_PACE_ORIGINAL, REPLAY_PACE_FIXED, REPLAY_PACE_FAST)
+
+# ch:目录回放识别的文件后缀 | en:File suffixes a directory source picks up
+REPLAY_IMAGE_EXTS = (".png", ".bmp", ".jpg", ".jpeg", ".tif", ".tiff", ".npy")
+# ch:没有时间戳也没有帧率时的默认帧率 | en:Frame rate used when a source has neither timestamps nor a rate
+REPLAY_DEFAULT_FPS = 30.0
+
+
+def _image_meta(image, nIndex):
+    """Pixel type and size for a decoded image; Mono8, Mono16 or BGR8."""
+    meta = np.zeros((), FRAME_META_DTYPE)
+    if image.ndim == 3 and image.shape[2] == 4:
+        image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+    if image.ndim == 2 and image.dtype == np.uint8:
+        enPixelType = PixelType_Gvsp_Mono8
+    elif image.ndim == 2 and image.dtype == np.uint16:
+        enPixelType = PixelType_Gvsp_Mono16
+    elif image.ndim == 3 and image.shape[2] == 3 and image.dtype == np.uint8:
+        enPixelType = PixelType_Gvsp_BGR8_Packed
+    else:
+        raise ValueError("cannot replay %s image of shape %s" % (image.dtype, image.shape))
+    data = np.ascontiguousarray(image).reshape(-1).view(np.uint8)
+    meta["nFrameNum"] = nIndex
+    meta["enPixelType"] = enPixelType
+    meta["nWidth"] = image.shape[1]
+    meta["nHeight"] = image.shape[0]
+    meta["nFrameLen"] = data.nbytes
+    return data, meta
+
+
+class ArchiveSource():
+    """Frames of a Raw_archive, zero-copy from the mapping."""
+
+    def __init__(self, strPath):
+        self.archive = RawArchive(strPath)
+        self.nFrames = len(self.archive)
+        self.nPayloadSize = int(self.archive.meta["nFrameLen"].max()) if self.nFrames else 0
+        self.fFps = 0.0
+        if self.nFrames > 1:
+            listStamps = self.archive.meta["nHostTimeStamp"]
+            fSpan = (int(listStamps[-1]) - int(listStamps[0])) / 1e3
+            self.fFps = (self.nFrames - 1) / fSpan if fSpan > 0 else 0.0
+
+    def frame(self, nIndex):
+        if nIndex >= self.nFrames:
+            return None
+        return self.archive.frame(nIndex)
+
+    def close(self):
+        self.archive.close()
+
+
+class ImageDirSource():
+    """Image files and .npy arrays of one directory, in name order."""
+
+    def __init__(self, strPath):
+        self.listFiles = sorted(os.path.join(strPath, strName) for strName in os.listdir(strPath)
+                                if os.path.splitext(strName)[1].lower() in REPLAY_IMAGE_EXTS)
+        self.nFrames = len(self.listFiles)
+        self.fFps = 0.0
+        self.nPayloadSize = 0
+        if self.nFrames:
+            self.nPayloadSize = len(self.frame(0)[0])
+
+    def frame(self, nIndex):
+        if nIndex >= self.nFrames:
+            return None
+        strFile = self.listFiles[nIndex]
+        if strFile.lower().endswith(".npy"):
+            image = np.load(strFile)
+        else:
+            image = cv2.imread(strFile, cv2.IMREAD_UNCHANGED)
+            if image is None:
+                raise ValueError("cannot read %s" % strFile)
+        return _image_meta(image, nIndex)
+
+    def close(self):
+        pass
+
+
+class VideoSource():
+    """Frames of a video file through cv2.VideoCapture, as BGR8."""
+
+    def __init__(self, strPath):
+        self.cap = cv2.VideoCapture(strPath)
+        if not self.cap.isOpened():
+            raise ValueError("cannot open video %s" % strPath)
+        self.nFrames = int(self.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        self.fFps = self.cap.get(cv2.CAP_PROP_FPS)
+        nWidth = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        nHeight = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self.nPayloadSize = nWidth * nHeight * 3
+        self.nNext = 0
+        # ch:按视频时间轴生成主机时间戳 | en:Host timestamps follow the video time line from the moment it is opened
+        self.nStartMs = int(time.time() * 1000)
+
+    def frame(self, nIndex):
+        if nIndex != self.nNext:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, nIndex)
+        fPosMs = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+        bOk, image = self.cap.read()
+        if not bOk:
+            self.nFrames = nIndex
+            return None
+        self.nNext = nIndex + 1
+        data, meta = _image_meta(image, nIndex)
+        meta["nHostTimeStamp"] = self.nStartMs + int(fPosMs)
+        return data, meta
+
+    def close(self):
+        self.cap.release()
+
+
+def open_replay_source(strPath):
+    """ArchiveSource, ImageDirSource or VideoSource for a path."""
+    if os.path.isdir(strPath):
+        return ImageDirSource(strPath)
+    if os.path.splitext(strPath)[1] in (RAW_ARCHIVE_DATA_EXT, RAW_ARCHIVE_INDEX_EXT) \
+            or os.path.exists(archive_paths(strPath)[1]):
+        return ArchiveSource(strPath)
+    return VideoSource(strPath)
+
+
+class ReplayCamera(MvCamera):
+    """
+    A recorded source behind the MvCamera grab calls. Calls it does not
+    implement reach the SDK with an empty handle and fail as on a closed
+    device. Frames handed out by MV_CC_GetImageBuffer/GetFrameView from an
+    archive point into a read-only mapping and must not be written.
+    """
+
+    def __init__(self, source, strPace=REPLAY_PACE_ORIGINAL, fFps=0.0, fSpeed=1.0, bLoop=False):
+        super().__init__()
+        if strPace not in REPLAY_PACES:
+            raise ValueError("unknown pace '%s', expected one of %s" % (strPace, ", ".join(REPLAY_PACES)))
+        self.source = open_replay_source(source) if isinstance(source, str) else source
+        self.strPace = strPace
+        self.fFps = fFps
+        self.fSpeed = fSpeed
+        self.bLoop = bLoop
+        self.lock = threading.Lock()
+        self.ev_stop = threading.Event()
+        self.b_grabbing = False
+        self.b_released = False
+        self.nNext = 0
+        self.nImageNodes = 0
+        self.dictHeld = {}
+        self.pending = None
+        self.retrieved = None
+        self._reset_clock()
+        self.nServed = 0
+        self.nLoops = 0
+        self.nTimeouts = 0
+        self.fLateTotal = 0.0
+
+    def _reset_clock(self):
+        # ch:第一帧取出时确定回放起点 | en:The replay origin is fixed when the first frame is served
+        self.fOrigin = None
+        self.nOriginStamp = 0
+        self.nOriginIndex = 0
+
+    def frame_rate(self):
+        """Frames per second the pacing aims at, 0 for fast."""
+        if self.strPace == REPLAY_PACE_FAST:
+            return 0.0
+        if self.strPace == REPLAY_PACE_FIXED:
+            return self.fFps or REPLAY_DEFAULT_FPS
+        return (self.source.fFps or self.fFps or REPLAY_DEFAULT_FPS) * self.fSpeed
+
+    def _due(self, meta, nServedSinceOrigin):
+        if self.strPace == REPLAY_PACE_FAST:
+            return 0.0
+        if self.strPace == REPLAY_PACE_ORIGINAL and int(meta["nHostTimeStamp"]) > 0:
+            return self.fOrigin + (int(meta["nHostTimeStamp"]) - self.nOriginStamp) / 1e3 / self.fSpeed
+        return self.fOrigin + nServedSinceOrigin / self.frame_rate()
+
+    def _peek(self):
+        """Next frame, restarting the source with bLoop; None when it is exhausted."""
+        if self.pending is None:
+            frame = self.source.frame(self.nNext)
+            if frame is None and self.bLoop and self.nNext > 0:
+                self.nNext = 0
+                self.nLoops += 1
+                self._reset_clock()
+                frame = self.source.frame(0)
+            self.pending = frame
+        return self.pending
+
+    def _take(self, nMsec):
+        """Wait until the next frame is due, at most nMsec; returns (ret, data, meta)."""
+        fTimeout = nMsec / 1e3
+        with self.lock:
+            frame = self._peek()
+            if frame is not None:
+                fNow = time.perf_counter()
+                if self.fOrigin is None:
+                    self.fOrigin = fNow
+                    self.nOriginStamp = int(frame[1]["nHostTimeStamp"])
+                    self.nOriginIndex = self.nServed
+                fWait = self._due(frame[1], self.nServed - self.nOriginIndex) - fNow
+        if frame is None or fWait > fTimeout:
+            self.ev_stop.wait(fTimeout)
+            self.nTimeouts += 1
+            return MV_E_NODATA, None, None
+        if fWait > 0 and self.ev_stop.wait(fWait):
+            return MV_E_NODATA, None, None
+        with self.lock:
+            # ch:等待期间被set()跳转过 | en:Seeked with set() while waiting
+            if self.pending is not frame:
+                return MV_E_NODATA, None, None
+            self.pending = None
+            self.nNext += 1
+            self.nServed += 1
+            self.fLateTotal += max(-fWait, 0.0)
+        data, meta = frame
+        if int(meta["nHostTimeStamp"]) == 0:
+            meta = meta.copy()
+            meta["nHostTimeStamp"] = int(time.time() * 1000)
+        return MV_OK, data, meta
+
+    def stats(self):
+        return {"served": self.nServed, "loops": self.nLoops, "timeouts": self.nTimeouts,
+                "late_ms": self.fLateTotal / self.nServed * 1e3 if self.nServed else 0.0,
+                "fps": self.frame_rate()}
+
+    # ch:以下为MvCamera取流接口 | en:MvCamera grab interface
+    def MV_CC_CreateHandle(self, stDevInfo=None):
+        return MV_OK
+
+    def MV_CC_CreateHandleWithoutLog(self, stDevInfo=None):
+        return MV_OK
+
+    def MV_CC_DestroyHandle(self):
+        return MV_OK
+
+    def MV_CC_OpenDevice(self, nAccessMode=MV_ACCESS_Exclusive, nSwitchoverKey=0):
+        return MV_OK
+
+    def MV_CC_CloseDevice(self):
+        self.MV_CC_StopGrabbing()
+        return MV_OK
+
+    def MV_CC_SetImageNodeNum(self, nNum):
+        if nNum < 1:
+            return MV_E_PARAMETER
+        if self.b_grabbing:
+            return MV_E_CALLORDER
+        self.nImageNodes = nNum
+        return MV_OK
+
+    def MV_CC_StartGrabbing(self):
+        if self.b_grabbing:
+            return MV_E_CALLORDER
+        self.ev_stop.clear()
+        self._reset_clock()
+        self.b_grabbing = True
+        return MV_OK
+
+    def MV_CC_StopGrabbing(self):
+        if not self.b_grabbing:
+            return MV_E_CALLORDER
+        self.b_grabbing = False
+        self.ev_stop.set()
+        return MV_OK
+
+    def MV_CC_GetOneFrameTimeout(self, pData, nDataSize, stFrameInfo, nMsec=1000):
+        if not self.b_grabbing:
+            return MV_E_CALLORDER
+        with self.lock:
+            frame = self._peek()
+        if frame is not None and int(frame[1]["nFrameLen"]) > nDataSize:
+            return MV_E_NOENOUGH_BUF
+        ret, data, meta = self._take(nMsec)
+        if ret != MV_OK:
+            return ret
+        memmove(pData, data.ctypes.data, int(meta["nFrameLen"]))
+        frame_info_from_meta(meta, stFrameInfo)
+        return MV_OK
+
+    def MV_CC_GetImageBuffer(self, stFrame, nMsec=1000):
+        if not self.b_grabbing:
+            return MV_E_CALLORDER
+        ret, data, meta = self._take(nMsec)
+        if ret != MV_OK:
+            return ret
+        nAddress = data.ctypes.data
+        with self.lock:
+            # ch:数据在释放前保持有效 | en:Data stays alive until it is freed
+            listHeld = self.dictHeld.setdefault(nAddress, [])
+            listHeld.append(data)
+        stFrame.pBufAddr = cast(nAddress, POINTER(c_ubyte))
+        frame_info_from_meta(meta, stFrame.stFrameInfo)
+        return MV_OK
+
+    def MV_CC_FreeImageBuffer(self, stFrame):
+        nAddress = addressof(stFrame.pBufAddr.contents) if stFrame.pBufAddr else 0
+        with self.lock:
+            listHeld = self.dictHeld.get(nAddress)
+            if not listHeld:
+                return MV_E_PARAMETER
+            listHeld.pop()
+            if not listHeld:
+                del self.dictHeld[nAddress]
+        return MV_OK
+
+    def MV_CC_GetIntValue(self, strKey, stIntValue):
+        with self.lock:
+            frame = self._peek()
+        if strKey == "PayloadSize":
+            nValue = self.source.nPayloadSize
+        elif strKey in ("Width", "Height") and frame is not None:
+            nValue = int(frame[1]["n" + strKey])
+        else:
+            return MV_E_SUPPORT
+        stIntValue.nCurValue = nValue
+        stIntValue.nMax = nValue
+        stIntValue.nMin = nValue
+        return MV_OK
+
+    def MV_CC_GetEnumValue(self, strKey, stEnumValue):
+        with self.lock:
+            frame = self._peek()
+        if strKey != "PixelFormat" or frame is None:
+            return MV_E_SUPPORT
+        stEnumValue.nCurValue = int(frame[1]["enPixelType"])
+        return MV_OK
+
+    def MV_CC_GetFloatValue(self, strKey, stFloatValue):
+        if strKey not in ("ResultingFrameRate", "AcquisitionFrameRate"):
+            return MV_E_SUPPORT
+        stFloatValue.fCurValue = self.frame_rate()
+        return MV_OK
+
+    # ch:以下为cv2.VideoCapture接口 | en:cv2.VideoCapture interface
+    def isOpened(self):
+        return not self.b_released
+
+    def grab(self):
+        """Take the next frame (paced), without converting it."""
+        while not self.b_released:
+            # ch:源已结束时立即返回,不像取流接口那样等待超时 | en:An exhausted source returns at once instead of waiting out a timeout
+            with self.lock:
+                if self._peek() is None:
+                    self.retrieved = None
+                    return False
+            if not self.b_grabbing:
+                # ch:read()不需要StartGrabbing | en:read() works without StartGrabbing
+                self.ev_stop.clear()
+            ret, data, meta = self._take(1000)
+            if ret == MV_OK:
+                self.retrieved = (data, meta)
+                return True
+        return False
+
+    def retrieve(self, image=None, flag=0):
+        """The frame taken by grab() as a Mono8/BGR8 image the caller owns."""
+        if self.retrieved is None:
+            return False, None
+        data, meta = self.retrieved
+        image = decode_raw_frame(data, meta, None)
+        if not image.flags.owndata or not image.flags.writeable:
+            image = image.copy()
+        return True, image
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve()
+
+    def get(self, propId):
+        if propId == cv2.CAP_PROP_FPS:
+            return self.frame_rate()
+        if propId == cv2.CAP_PROP_FRAME_COUNT:
+            return float(self.source.nFrames)
+        if propId == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.nNext)
+        with self.lock:
+            frame = self._peek()
+        if frame is not None and propId == cv2.CAP_PROP_FRAME_WIDTH:
+            return float(frame[1]["nWidth"])
+        if frame is not None and propId == cv2.CAP_PROP_FRAME_HEIGHT:
+            return float(frame[1]["nHeight"])
+        return 0.0
+
+    def set(self, propId, value):
+        if propId == cv2.CAP_PROP_POS_FRAMES:
+            with self.lock:
+                self.nNext = max(int(value), 0)
+                self.pending = None
+                self._reset_clock()
+            return True
+        if propId == cv2.CAP_PROP_FPS and value > 0:
+            self.fFps = float(value)
+            return True
+        # ch:缓存大小等参数对回放没有意义 | en:Buffer size and the like mean nothing to a replay
+        return propId == cv2.CAP_PROP_BUFFERSIZE
+
+    def release(self):
+        if self.b_released:
+            return
+        self.b_released = True
+        if self.b_grabbing:
+            self.MV_CC_StopGrabbing()
+        self.ev_stop.set()
+        with self.lock:
+            self.pending = None
+            self.retrieved = None
+        self.source.close()
@@ -0,0 +1,240 @@
+# -- coding: utf-8 --
+"""
+ch:分段录像 | en:Segmented video recorder
+
+VideoRecorder encodes converted frames to a series of video files with
+cv2.VideoWriter on its own thread. The grab side only calls submit(), which
+never blocks: the frame goes into a bounded queue, and when the encoder is
+behind and the queue is full the frame is dropped and counted instead of
+stalling acquisition.
+
+    segments    a new file is started every fSegmentSeconds of host time
+                (nHostTimeStamp), and whenever the frame size or colour
+                changes; files are named like frame_file_name() after their
+                first frame: <prefix>_<nFrameNum>_<YYYYmmdd_HHMMSS_mmm>.<ext>
+    decimation  with nDecimate = n only every n-th submitted frame is kept
+    lossless    FFV1 in Matroska, which stores Mono8 (and BGR8) exactly;
+                otherwise mp4v in .mp4 or .mkv
+    timestamps  video files have a constant frame rate (fFps, or measured
+                from nHostTimeStamp when None), so every segment also gets a
+                <segment>.csv with the index, nFrameNum and nHostTimeStamp
+                of each encoded frame for exact timing
+
+submit() also takes a callable producing the image, which then runs on the
+encoder thread (e.g. demosaicing a held raw buffer); fn_done(bOk) runs once
+the frame has been encoded or dropped, so the caller can release buffers.
+stats() reports written, dropped and decimated frames, segments, queue
+high-water mark and encode time per frame.
+"""
+import os
+import time
+import queue
+import threading
+
+import cv2
+import numpy as np
+
+from Image_writer import frame_file_name, frame_host_time
+
+VIDEO_CONTAINER_MP4 = "mp4"
+VIDEO_CONTAINER_MKV = "mkv"
+# ch:(容器, 是否无损) -> 编码器 | en:(container, lossless) -> fourcc
+VIDEO_CODECS = {
+    (VIDEO_CONTAINER_MP4, False): "mp4v",
+    (VIDEO_CONTAINER_MKV, False): "mp4v",
+    (VIDEO_CONTAINER_MKV, True): "FFV1",
+}
+# ch:尚未测得帧率时的默认值 | en:Frame rate used until one has been measured
+VIDEO_DEFAULT_FPS = 25.0
+
+
+class VideoRecorder():
+    """
+    Records to strDir in segments of fSegmentSeconds. bLossless implies
+    Matroska. fFps fixes the rate written into each file; None measures it
+    from the host timestamps of the frames kept after decimation.
+    """
+
+    def __init__(self, strDir, strPrefix="record", fSegmentSeconds=300.0, nDecimate=1,
+                 strContainer=VIDEO_CONTAINER_MP4, bLossless=False, fFps=None, nQueueSize=8):
+        if bLossless:
+            strContainer = VIDEO_CONTAINER_MKV
+        if (strContainer, bLossless) not in VIDEO_CODECS:
+            raise ValueError("unknown container '%s'" % strContainer)
+        self.strDir = strDir
+        self.strPrefix = strPrefix
+        self.fSegmentSeconds = fSegmentSeconds
+        self.nDecimate = max(int(nDecimate), 1)
+        self.strContainer = strContainer
+        self.bLossless = bLossless
+        self.strFourcc = VIDEO_CODECS[(strContainer, bLossless)]
+        self.fFps = fFps
+        self.jobs = queue.Queue(nQueueSize)
+        self.lock = threading.Lock()
+        self.writer = None
+        self.fileTimes = None
+        self.strSegment = None
+        self.fSegmentStart = 0.0
+        self.tupleShape = None
+        self.nSegmentFrames = 0
+        self.fLastHostTime = None
+        self.fMeasuredFps = 0.0
+        self.first = None
+        self.listSegments = []
+        self.nSubmitted = 0
+        self.nDecimated = 0
+        self.nDropped = 0
+        self.nWritten = 0
+        self.nFailed = 0
+        self.nMaxDepth = 0
+        self.fEncodeTotal = 0.0
+        self.fEncodeMax = 0.0
+        os.makedirs(strDir, exist_ok=True)
+        self.thread = threading.Thread(target=self._work, name="video-recorder", daemon=True)
+        self.thread.start()
+
+    def submit(self, image, stFrameInfo, fn_done=None):
+        """
+        Queue one frame without blocking. Returns False when the frame is
+        decimated away, dropped on a full queue or the recorder is closed;
+        fn_done is not called then.
+        """
+        with self.lock:
+            nIndex = self.nSubmitted
+            self.nSubmitted += 1
+            if nIndex % self.nDecimate:
+                self.nDecimated += 1
+                return False
+        if self.thread is None:
+            return False
+        try:
+            self.jobs.put_nowait((image, stFrameInfo.nFrameNum, frame_host_time(stFrameInfo), fn_done))
+        except queue.Full:
+            with self.lock:
+                self.nDropped += 1
+            return False
+        with self.lock:
+            self.nMaxDepth = max(self.nMaxDepth, self.jobs.qsize())
+        return True
+
+    def close(self):
+        """Encode what is queued, finish the current segment and stop the thread."""
+        if self.thread is None:
+            return
+        self.jobs.put(None)
+        self.thread.join()
+        self.thread = None
+        # ch:关闭期间仍被提交的帧不再编码,但要通知调用方释放 | en:Frames submitted while closing are not encoded, but their owners are still told
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None and job[3] is not None:
+                job[3](False)
+
+    def stats(self):
+        with self.lock:
+            nDone = self.nWritten + self.nFailed
+            return {"submitted": self.nSubmitted, "written": self.nWritten, "failed": self.nFailed,
+                    "dropped": self.nDropped, "decimated": self.nDecimated, "segments": len(self.listSegments),
+                    "depth": self.jobs.qsize(), "max_depth": self.nMaxDepth,
+                    "fps": self.fFps or self.fMeasuredFps,
+                    "encode_ms": self.fEncodeTotal / nDone * 1e3 if nDone else 0.0,
+                    "encode_max_ms": self.fEncodeMax * 1e3}
+
+    def segments(self):
+        with self.lock:
+            return list(self.listSegments)
+
+    # ch:按主机时间戳更新测得的帧率 | en:Update the measured frame rate from host timestamps
+    def _measure(self, fHostTime):
+        if self.fLastHostTime is not None and fHostTime > self.fLastHostTime:
+            fRate = 1.0 / (fHostTime - self.fLastHostTime)
+            self.fMeasuredFps = fRate if self.fMeasuredFps == 0.0 else 0.9 * self.fMeasuredFps + 0.1 * fRate
+        self.fLastHostTime = fHostTime
+
+    def _open_segment(self, image, nFrameNum, fHostTime):
+        self._close_segment()
+        fFps = self.fFps or self.fMeasuredFps or VIDEO_DEFAULT_FPS
+        strPath = frame_file_name(self.strDir, nFrameNum, fHostTime, self.strContainer, self.strPrefix)
+        bColor = image.ndim == 3
+        writer = cv2.VideoWriter(strPath, cv2.VideoWriter_fourcc(*self.strFourcc), fFps,
+                                 (image.shape[1], image.shape[0]), bColor)
+        if not writer.isOpened():
+            raise IOError("cv2.VideoWriter cannot open %s with %s" % (strPath, self.strFourcc))
+        self.writer = writer
+        self.strSegment = strPath
+        self.fileTimes = open(os.path.splitext(strPath)[0] + ".csv", "w")
+        self.fileTimes.write("index,nFrameNum,nHostTimeStamp\n")
+        self.fSegmentStart = fHostTime
+        self.tupleShape = image.shape
+        self.nSegmentFrames = 0
+        with self.lock:
+            self.listSegments.append(strPath)
+
+    def _close_segment(self):
+        if self.writer is None:
+            return
+        self.writer.release()
+        self.fileTimes.close()
+        self.writer = None
+        self.fileTimes = None
+
+    def _encode(self, image, nFrameNum, fHostTime):
+        if callable(image):
+            image = image()
+        if image.dtype != np.uint8:
+            raise ValueError("cannot encode %s frames, convert to Mono8/BGR8 first" % image.dtype)
+        if image.ndim == 3 and image.shape[2] == 1:
+            image = image[:, :, 0]
+        self._measure(fHostTime)
+        if self.fFps is None and self.fMeasuredFps == 0.0 and self.writer is None and self.first is None:
+            # ch:第一帧先留下,等第二帧测出帧率再开文件 | en:Keep the very first frame until the second one gives a frame rate
+            self.first = (image.copy(), nFrameNum, fHostTime)
+            return
+        if self.first is not None:
+            first, self.first = self.first, None
+            self._write(*first)
+        self._write(image, nFrameNum, fHostTime)
+
+    def _write(self, image, nFrameNum, fHostTime):
+        if self.writer is None or image.shape != self.tupleShape \
+                or fHostTime - self.fSegmentStart >= self.fSegmentSeconds:
+            self._open_segment(image, nFrameNum, fHostTime)
+        self.writer.write(image)
+        self.fileTimes.write("%d,%d,%d\n" % (self.nSegmentFrames, nFrameNum, int(round(fHostTime * 1000))))
+        self.nSegmentFrames += 1
+
+    def _work(self):
+        try:
+            while True:
+                job = self.jobs.get()
+                if job is None:
+                    break
+                image, nFrameNum, fHostTime, fn_done = job
+                bOk = False
+                fStart = time.perf_counter()
+                try:
+                    self._encode(image, nFrameNum, fHostTime)
+                    bOk = True
+                except Exception as e:
+                    print("record frame %d failed: %s" % (nFrameNum, e))
+                fElapsed = time.perf_counter() - fStart
+                with self.lock:
+                    if bOk:
+                        self.nWritten += 1
+                    else:
+                        self.nFailed += 1
+                    self.fEncodeTotal += fElapsed
+                    self.fEncodeMax = max(self.fEncodeMax, fElapsed)
+                if fn_done is not None:
+                    try:
+                        fn_done(bOk)
+                    except Exception as e:
+                        print("record callback for frame %d failed: %s" % (nFrameNum, e))
+        finally:
+            if self.first is not None:
+                first, self.first = self.first, None
+                self._write(*first)
+            self._close_segment()
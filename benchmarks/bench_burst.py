@@ -0,0 +1,95 @@
+# -- coding: utf-8 --
+"""
+Burst_capture.BurstCapture sustained throughput on the simulated camera.
+
+    python benchmarks/bench_burst.py [--frames 200] [--pre 0] [--nodes 30] [--fps 0]
+                                     [--width 2448 --height 2048] [--pixel bayer8]
+                                     [--format raw] [--out /tmp/bench_burst]
+
+Captures --frames consecutive full-resolution frames into the preallocated
+ring (--fps 0 runs the simulated camera free, i.e. as fast as the host
+takes frames), then flushes them to --out in the background, one file per
+frame or, with --format mvraw, one Raw_archive. Prints the sustained
+capture rate in frames/s and MB/s, frames missed (gaps in nFrameNum), grab
+timeouts, and the flush rate. With --pre the burst keeps
+the last --pre frames before a software trigger sent after --trigger-after
+seconds. Output files are removed afterwards unless --keep is given.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+
+os.environ.setdefault("MVCAM_BACKEND", "sim")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MvCameraControl_class import *
+from Burst_capture import BurstCapture
+from Image_writer import IMAGE_ENCODERS, IMAGE_FORMAT_RAW
+from Raw_archive import RAW_ARCHIVE_FORMAT
+from bench_sim_throughput import open_first_camera
+
+PIXEL_TYPES = {
+    "mono8": PixelType_Gvsp_Mono8,
+    "mono12": PixelType_Gvsp_Mono12,
+    "bayer8": PixelType_Gvsp_BayerRG8,
+    "bayer12p": PixelType_Gvsp_BayerRG12_Packed,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--pre", type=int, default=0)
+    parser.add_argument("--trigger-after", type=float, default=0.5)
+    parser.add_argument("--nodes", type=int, default=30)
+    parser.add_argument("--fps", type=float, default=0.0)
+    parser.add_argument("--width", type=int, default=2448)
+    parser.add_argument("--height", type=int, default=2048)
+    parser.add_argument("--pixel", choices=sorted(PIXEL_TYPES), default="bayer8")
+    parser.add_argument("--format", choices=sorted(IMAGE_ENCODERS) + [RAW_ARCHIVE_FORMAT], default=IMAGE_FORMAT_RAW)
+    parser.add_argument("--fsync-every", type=int, default=0)
+    parser.add_argument("--out", default="/tmp/bench_burst")
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    MvCamCtrldll.configure(width=args.width, height=args.height, pixel_type=PIXEL_TYPES[args.pixel],
+                           frame_rate=args.fps)
+    cam = open_first_camera()
+    burst = BurstCapture(cam, args.frames, args.pre, args.nodes)
+    ret = burst.arm()
+    if ret != MV_OK:
+        raise SystemExit("arm failed: 0x%x" % ret)
+
+    ret = burst.start()
+    if ret != MV_OK:
+        raise SystemExit("start failed: 0x%x" % ret)
+    if args.pre:
+        time.sleep(args.trigger_after)
+        burst.trigger()
+    burst.wait()
+    stats = burst.stats()
+
+    shutil.rmtree(args.out, ignore_errors=True)
+    burst.flush(args.out, args.format, nFsyncEvery=args.fsync_every)
+    burst.wait_flush()
+    flush = burst.stats()
+    cam.MV_CC_CloseDevice()
+    cam.MV_CC_DestroyHandle()
+
+    print("%d frames %dx%d %s, ring %.0f MB, %d image nodes" % (
+        args.frames, args.width, args.height, args.pixel, stats["ring_mb"], burst.nImageNodes))
+    print("capture   %8.1f frames/s %8.1f MB/s  missed %d  timeouts %d  grabbed %d  trigger index %d" % (
+        stats["fps"], stats["mb_s"], stats["missed"], stats["grab_errors"], stats["grabbed"],
+        stats["trigger_index"]))
+    fFlush = flush["flush_s"]
+    print("flush %-4s %7.1f frames/s %8.1f MB/s  written %d  failed %d  %.2f s" % (
+        args.format, flush["flushed"] / fFlush if fFlush else 0.0, flush["flush_bytes"] / fFlush / 1e6 if fFlush else 0.0,
+        flush["flushed"], flush["flush_failed"], fFlush))
+    if not args.keep:
+        shutil.rmtree(args.out, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+# -- coding: utf-8 --
+"""
+Callback dwell time: processing inside the image callback against
+CallbackFrameRing.
+
+    python benchmarks/bench_callback_ring.py [--seconds 3] [--fps 200] [--slots 8]
+
+The simulated camera delivers Mono8 frames through MV_CC_RegisterImageCallBackEx
+at --fps. Like the SDK it has one delivery thread and a pool of image nodes:
+while the callback runs no further frame is handed over, and frames older
+than the node pool are lost. Two callbacks are compared:
+
+    inline   what Basicdemo.image_callback did: convert, resize to the
+             preview size and encode a BMP inside the callback
+    ring     CallbackFrameRing, the callback only copies the frame into a
+             preallocated slot; a consumer thread does the same work
+
+For each the callback dwell time (mean, p99, max), the frames lost by the
+driver and, for the ring, the frames the consumer skipped are printed. The
+check then compares every frame the consumer read with the frame the
+simulator rendered for its frame number.
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+import numpy as np
+import cv2
+
+os.environ.setdefault("MVCAM_BACKEND", "sim")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MvCameraControl_class import *
+from Callback_ring import CallbackFrameRing, FrameCallBack
+from bench_sim_throughput import open_first_camera
+
+WIDTH = 1920
+HEIGHT = 1080
+
+
+def process(data, stFrameInfo):
+    image = data[:stFrameInfo.nWidth * stFrameInfo.nHeight].reshape(stFrameInfo.nHeight, stFrameInfo.nWidth)
+    image = cv2.resize(image, (600, 400), interpolation=cv2.INTER_AREA)
+    cv2.imencode(".bmp", image)
+
+
+def run_inline(cam, fSeconds):
+    listDwell = []
+
+    def on_frame(pData, pFrameInfo, pUser):
+        fStart = time.perf_counter()
+        stFrameInfo = pFrameInfo.contents
+        process(np.ctypeslib.as_array(pData, shape=(stFrameInfo.nFrameLen,)), stFrameInfo)
+        listDwell.append(time.perf_counter() - fStart)
+
+    fnCallback = FrameCallBack(on_frame)
+    cam.MV_CC_RegisterImageCallBackEx(fnCallback, None)
+    cam.MV_CC_StartGrabbing()
+    time.sleep(fSeconds)
+    cam.MV_CC_StopGrabbing()
+    arrDwell = np.array(listDwell) * 1e6
+    return {"frames": len(listDwell), "dwell_mean_us": arrDwell.mean(), "dwell_p99_us": np.percentile(arrDwell, 99),
+            "dwell_max_us": arrDwell.max(), "lost": MvCamCtrldll.lost_frames(), "skipped": 0}
+
+
+def run_ring(cam, fSeconds, nSlots):
+    ring = CallbackFrameRing(WIDTH * HEIGHT, nSlots=nSlots)
+    dev = MvCamCtrldll.list_devices[0]
+    dictConsumer = {"frames": 0, "skipped": 0, "intact": True}
+
+    def consume():
+        buf = np.empty(ring.nPayloadSize, np.uint8)
+        nSeq = 0
+        while not ring.bClosed:
+            ret, nGot, data, stFrameInfo = ring.read(nSeq + 1, fTimeout=0.2, out=buf)
+            if ret != MV_OK:
+                continue
+            dictConsumer["skipped"] += nGot - nSeq - 1
+            nSeq = nGot
+            dictConsumer["frames"] += 1
+            if not np.array_equal(data, dev.payload(stFrameInfo.nFrameNum)):
+                dictConsumer["intact"] = False
+            process(data, stFrameInfo)
+
+    hConsumer = threading.Thread(target=consume)
+    ring.register(cam)
+    hConsumer.start()
+    cam.MV_CC_StartGrabbing()
+    time.sleep(fSeconds)
+    cam.MV_CC_StopGrabbing()
+    ring.close()
+    hConsumer.join()
+    dictStats = ring.stats()
+    dictStats.update(lost=MvCamCtrldll.lost_frames(), skipped=dictConsumer["skipped"],
+                     consumed=dictConsumer["frames"])
+    return dictStats, dictConsumer["intact"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--fps", type=float, default=200.0)
+    parser.add_argument("--slots", type=int, default=8)
+    args = parser.parse_args()
+
+    MvCamCtrldll.configure(width=WIDTH, height=HEIGHT, pixel_type=PixelType_Gvsp_Mono8, frame_rate=args.fps)
+    print("%dx%d Mono8 at %.0f fps for %.1f s, %d ring slots" % (WIDTH, HEIGHT, args.fps, args.seconds, args.slots))
+    print("%-8s %8s %10s %10s %10s %8s %8s" % ("callback", "frames", "mean us", "p99 us", "max us", "lost", "skipped"))
+    listIntact = []
+    for strName in ("inline", "ring"):
+        # ch:每种方式用新句柄,回调注册不会遗留 | en:A fresh handle per mode so no callback registration carries over
+        cam = open_first_camera()
+        if strName == "inline":
+            dictStats = run_inline(cam, args.seconds)
+        else:
+            dictStats, bIntact = run_ring(cam, args.seconds, args.slots)
+            listIntact.append(bIntact)
+        print("%-8s %8d %10.1f %10.1f %10.1f %8d %8d" % (strName, dictStats["frames"], dictStats["dwell_mean_us"],
+                                                       dictStats["dwell_p99_us"], dictStats["dwell_max_us"],
+                                                       dictStats["lost"], dictStats["skipped"]))
+        cam.MV_CC_CloseDevice()
+        cam.MV_CC_DestroyHandle()
+    print("%-32s %s" % ("consumer frames intact", "ok" if all(listIntact) else "FAILED"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+# -- coding: utf-8 --
+"""
+Per-frame cost of Bayer_demosaic.BayerDemosaicer for each quality mode and
+bit depth, on frames rendered by the simulated camera.
+
+    python benchmarks/bench_demosaic.py [--width 2448] [--height 2048] [--frames 20]
+"""
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("MVCAM_BACKEND", "sim")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import MvSimulatedSdk
+from PixelType_registry import get_pixel_format
+from Bayer_demosaic import BayerDemosaicer, DEMOSAIC_QUALITIES
+
+FORMATS = ("BayerRG8", "BayerRG12", "BayerRG12_Packed")
+
+
+def timed(func, n_frames):
+    func()
+    t0 = time.perf_counter()
+    for _ in range(n_frames):
+        func()
+    return (time.perf_counter() - t0) / n_frames * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=2448)
+    parser.add_argument("--height", type=int, default=2048)
+    parser.add_argument("--frames", type=int, default=20)
+    args = parser.parse_args()
+    nWidth, nHeight = args.width, args.height
+    scene = MvSimulatedSdk.render_scene(nWidth, nHeight, 0, 1)
+
+    print("%dx%d, %d frames, ms/frame" % (nWidth, nHeight, args.frames))
+    print("%-18s" % "format" + "".join("%10s" % strQuality for strQuality in DEMOSAIC_QUALITIES))
+    for strFormat in FORMATS:
+        enPixelType = MvSimulatedSdk.pixel_type_from_name(strFormat)
+        stFormat = get_pixel_format(enPixelType)
+        data = MvSimulatedSdk.encode_scene(scene, enPixelType)
+        listTimes = []
+        for strQuality in DEMOSAIC_QUALITIES:
+            demosaicer = BayerDemosaicer(strQuality)
+            listTimes.append(timed(lambda: demosaicer.demosaic(stFormat, data, nWidth, nHeight), args.frames))
+        print("%-18s" % strFormat + "".join("%10.2f" % t for t in listTimes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# -- coding: utf-8 --
+"""
+camera_grid.CameraGridWindow with several simulated cameras, Qt offscreen.
+
+    python benchmarks/bench_grid.py [--devices 6] [--fps 30] [--seconds 5] [--repaint-hz 25]
+
+Prints per tile the grab and display rates, frames missed (nFrameNum gaps),
+frames replaced before being drawn and grab timeouts, then the GUI-thread
+cost of one shared repaint of the whole grid and the process CPU load.
+The first camera is then silently dropped off the network for --stall
+seconds: its tile must keep repainting over the last frame and be marked
+stale while every other tile stays live.
+"""
+import os
+import sys
+import time
+import argparse
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--devices", type=int, default=6)
+parser.add_argument("--width", type=int, default=1920)
+parser.add_argument("--height", type=int, default=1080)
+parser.add_argument("--format", default="BayerRG8")
+parser.add_argument("--fps", type=float, default=30)
+parser.add_argument("--seconds", type=float, default=5)
+parser.add_argument("--repaint-hz", type=float, default=25)
+parser.add_argument("--stall", type=float, default=3)
+args = parser.parse_args()
+
+# ch:设备数量需在加载SDK前设置 | en:The device count must be set before the SDK is loaded
+os.environ.setdefault("MVCAM_BACKEND", "sim")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ["MVCAM_SIM_DEVICES"] = str(args.devices)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+from MvCameraControl_class import *
+import MvSimulatedSdk
+from camera_grid import CameraGridWindow
+
+
+def main():
+    MvCamCtrldll.configure(width=args.width, height=args.height,
+                           pixel_type=MvSimulatedSdk.pixel_type_from_name(args.format), frame_rate=args.fps)
+    app = QApplication.instance() or QApplication(sys.argv)
+    deviceList = MV_CC_DEVICE_INFO_LIST()
+    MvCamera.MV_CC_EnumDevices(MV_GIGE_DEVICE | MV_USB_DEVICE, deviceList)
+
+    window = CameraGridWindow(deviceList, list(range(deviceList.nDeviceNum)), repaint_hz=args.repaint_hz)
+    window.resize(1600, 900)
+    window.show()
+    window.start()
+    t0 = time.perf_counter()
+    c0 = time.process_time()
+    while time.perf_counter() - t0 < args.seconds:
+        app.processEvents()
+        time.sleep(0.002)
+    fWall = time.perf_counter() - t0
+    fCpu = time.process_time() - c0
+
+    print("%d x %dx%d %s @ %g fps, repaint %g Hz, %g s" % (deviceList.nDeviceNum, args.width, args.height, args.format,
+                                                          args.fps, args.repaint_hz, args.seconds))
+    print("%-28s %9s %12s %7s %9s %9s" % ("tile", "grab fps", "display fps", "missed", "replaced", "timeouts"))
+    for tile in window.tiles:
+        fGrab, fShown = tile.worker.fps()
+        print("%-28s %9.1f %12.1f %7d %9d %9d" % (tile.name, fGrab, fShown, tile.worker.frames_missed,
+                                                  tile.worker.frames_replaced, tile.worker.grab_errors))
+    print("repaints %d, %.2f ms per grid repaint, process CPU %.0f%%" % (
+        window.repaint_count, window.repaint_time / max(window.repaint_count, 1) * 1e3, fCpu / fWall * 100))
+
+    MvCamCtrldll.simulate_disconnect(0, args.stall, bNotify=False)
+    nRepaints = window.repaint_count
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < args.stall - 0.2:
+        app.processEvents()
+        time.sleep(0.002)
+    listStale = [tile.frame_age() >= window.stale_timeout for tile in window.tiles]
+    bOk = (window.repaint_count > nRepaints and listStale[0] and not any(listStale[1:])
+           and "STALE" in window.tiles[0].overlay_text(listStale[0]))
+    print("%-32s %s (repaints %d, frame age %.1f s)" % ("stalled tile marked stale", "ok" if bOk else "FAILED",
+                                                      window.repaint_count - nRepaints, window.tiles[0].frame_age()))
+    window.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+# -- coding: utf-8 --
+"""
+Capture vs display rate of camera_gui with its acquisition worker, on the
+simulated backend and Qt offscreen.
+
+    python benchmarks/bench_gui_worker.py [--fps 60] [--seconds 5] [--paint-ms 0 30]
+
+--paint-ms adds a delay to every update_frame to mimic a slow repaint. The
+grab rate should stay at the camera rate whatever the paint cost; only the
+display rate drops, with the difference counted as replaced frames. The
+event-loop stall column is the worst lateness of a 10 ms QTimer probe, i.e.
+how long the window was unresponsive. gui ms is the time update_frame
+itself spends on the GUI thread per displayed frame.
+
+allocs counts grab-buffer allocations after the first frame and queries
+the PayloadSize reads during the run; both should be 0 in steady state.
+"""
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("MVCAM_BACKEND", "sim")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtWidgets import QApplication
+from PyQt5.QtCore import QTimer
+from MvCameraControl_class import *
+import MvSimulatedSdk
+import camera_gui
+
+
+def run(app, fPaintMs, fSeconds):
+    window = camera_gui.HikRobotCameraGUI()
+    update_frame = window.update_frame
+    listGuiTime = [0.0, 0]
+
+    def timed_update_frame():
+        time.sleep(fPaintMs / 1e3)
+        fStart = time.perf_counter()
+        update_frame()
+        listGuiTime[0] += time.perf_counter() - fStart
+        listGuiTime[1] += 1
+    window.show()
+    window.connect_camera()
+    window.toggle_streaming()
+    window.worker.frame_ready.disconnect()
+    window.worker.frame_ready.connect(timed_update_frame)
+
+    listLast = [time.perf_counter()]
+    listStall = [0.0]
+
+    def probe():
+        fNow = time.perf_counter()
+        listStall[0] = max(listStall[0], fNow - listLast[0] - 0.010)
+        listLast[0] = fNow
+    timer = QTimer()
+    timer.timeout.connect(probe)
+    timer.start(10)
+
+    while window.worker.frames_grabbed < 1:
+        app.processEvents()
+    nAllocations = window.buffer_ring.allocations
+    nQueries = window.worker.payload_queries
+
+    fEnd = time.perf_counter() + fSeconds
+    while time.perf_counter() < fEnd:
+        app.processEvents()
+        time.sleep(0.001)
+    timer.stop()
+    worker = window.worker
+    fGrab, fShown = worker.fps()
+    result = (fGrab, fShown, worker.frames_replaced, worker.grab_errors, listStall[0] * 1e3,
+              window.buffer_ring.allocations - nAllocations, worker.payload_queries - nQueries,
+              listGuiTime[0] / max(listGuiTime[1], 1) * 1e3)
+    window.disconnect_camera()
+    window.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--format", default="BayerRG8")
+    parser.add_argument("--fps", type=float, default=60)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--paint-ms", type=float, nargs="+", default=[0, 30])
+    args = parser.parse_args()
+    MvCamCtrldll.configure(width=args.width, height=args.height,
+                           pixel_type=MvSimulatedSdk.pixel_type_from_name(args.format), frame_rate=args.fps)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    print("%dx%d %s @ %g fps, %g s per run" % (args.width, args.height, args.format, args.fps, args.seconds))
+    print("%9s %9s %12s %9s %8s %9s %7s %8s %7s" % ("paint ms", "grab fps", "display fps", "replaced", "timeouts",
+                                                    "stall ms", "allocs", "queries", "gui ms"))
+    for fPaintMs in args.paint_ms:
+        fGrab, fShown, nReplaced, nErrors, fStall, nAllocs, nQueries, fGui = run(app, fPaintMs, args.seconds)
+        print("%9g %9.1f %12.1f %9d %8d %9.1f %7d %8d %7.2f" % (fPaintMs, fGrab, fShown, nReplaced, nErrors, fStall,
+                                                                nAllocs, nQueries, fGui))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# -- coding: utf-8 --
+"""
+Image_writer.ImageWriter throughput for a burst of frames.
+
+    python benchmarks/bench_image_writer.py [--frames 60] [--workers 1 2 4] [--format png] [--fsync-every 0 16]
+                                            [--out /tmp/bench_image_writer]
+
+Frames are rendered by the simulated camera scene (BGR8, or uint16 for
+tiff) and submitted as fast as possible with blocking backpressure, so no
+frame is dropped and the rate is what the workers sustain. Prints frames/s,
+MB/s, mean and max encode+write latency, queue high-water mark and fsync
+batches. Output files are removed afterwards.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import MvSimulatedSdk
+from Image_writer import ImageWriter, IMAGE_ENCODERS, IMAGE_FORMAT_TIFF
+
+
+class FrameInfo():
+    def __init__(self, nFrameNum):
+        self.nFrameNum = nFrameNum
+        self.nHostTimeStamp = int(time.time() * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--format", choices=sorted(IMAGE_ENCODERS), default="png")
+    parser.add_argument("--quality", type=int, default=None)
+    parser.add_argument("--fsync-every", type=int, nargs="+", default=[0])
+    parser.add_argument("--out", default="/tmp/bench_image_writer")
+    args = parser.parse_args()
+
+    image = MvSimulatedSdk.render_scene(args.width, args.height, 0, 1)
+    if image.ndim == 2:
+        image = np.dstack([image] * 3)
+    if args.format == IMAGE_FORMAT_TIFF:
+        image = image.astype(np.uint16) << 4
+
+    print("%d frames %dx%d %s %s" % (args.frames, args.width, args.height, image.dtype, args.format))
+    print("%8s %6s %9s %8s %11s %10s %6s %7s" % ("workers", "fsync", "frames/s", "MB/s", "encode ms", "max ms",
+                                                 "depth", "syncs"))
+    for nFsync in args.fsync_every:
+        for nWorkers in args.workers:
+            shutil.rmtree(args.out, ignore_errors=True)
+            os.makedirs(args.out)
+            writer = ImageWriter(nWorkers=nWorkers, nQueueSize=8, nFsyncEvery=nFsync)
+            t0 = time.perf_counter()
+            for i in range(args.frames):
+                writer.submit_frame(args.out, image, FrameInfo(i), args.format, args.quality, bBlock=True)
+            writer.flush()
+            fElapsed = time.perf_counter() - t0
+            writer.close()
+            stats = writer.stats()
+            print("%8d %6d %9.1f %8.1f %11.2f %10.2f %6d %7d" % (
+                nWorkers, nFsync, args.frames / fElapsed, stats["bytes"] / fElapsed / 1e6, stats["encode_ms"],
+                stats["encode_max_ms"], stats["max_depth"], stats["fsyncs"]))
+    shutil.rmtree(args.out, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
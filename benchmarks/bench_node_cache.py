@@ -0,0 +1,128 @@
+# -- coding: utf-8 --
+"""
+MvNodeCache read latency against direct MvCamera node access.
+
+    python benchmarks/bench_node_cache.py [--latency-ms 2] [--reads 200]
+
+The simulated camera is given --latency-ms per GenICam node access, as a
+GVCP round-trip to a GigE camera costs. Each workload is run --reads times
+straight on the camera and through a MvNodeCache:
+
+    parameters   AcquisitionFrameRate, ExposureTime and Gain, as
+                 CameraOperation.Get_parameter reads them
+    payload      PayloadSize, as a grab loop that re-reads it per frame
+    mixed        Gain written every 10th iteration, then read back
+
+and the mean time per iteration is printed with the cache's hits and
+misses. The consistency checks then verify write-through (a written value is
+read back without a camera access), that PayloadSize follows PixelFormat,
+Width and Height changes, and that a volatile node is always read live.
+"""
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("MVCAM_BACKEND", "sim")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MvCameraControl_class import *
+from MvNodeCache import MvNodeCache, NODE_INT, NODE_FLOAT
+from bench_sim_throughput import open_first_camera
+
+
+def read_float(cam, strKey):
+    stFloatValue = MVCC_FLOATVALUE()
+    memset(byref(stFloatValue), 0, sizeof(MVCC_FLOATVALUE))
+    ret = cam.MV_CC_GetFloatValue(strKey, stFloatValue)
+    if ret != MV_OK:
+        raise SystemExit("get %s failed: 0x%x" % (strKey, ret))
+    return stFloatValue.fCurValue
+
+
+def read_int(cam, strKey):
+    stIntValue = MVCC_INTVALUE()
+    memset(byref(stIntValue), 0, sizeof(MVCC_INTVALUE))
+    ret = cam.MV_CC_GetIntValue(strKey, stIntValue)
+    if ret != MV_OK:
+        raise SystemExit("get %s failed: 0x%x" % (strKey, ret))
+    return stIntValue.nCurValue
+
+
+def parameters(cam, i):
+    return (read_float(cam, "AcquisitionFrameRate"), read_float(cam, "ExposureTime"), read_float(cam, "Gain"))
+
+
+def payload(cam, i):
+    return read_int(cam, "PayloadSize")
+
+
+def mixed(cam, i):
+    if i % 10 == 0:
+        cam.MV_CC_SetFloatValue("Gain", float(i % 20))
+    return read_float(cam, "Gain")
+
+
+def run(cam, fn_workload, nReads):
+    t0 = time.perf_counter()
+    for i in range(nReads):
+        fn_workload(cam, i)
+    return (time.perf_counter() - t0) / nReads
+
+
+def check(cache):
+    listResults = []
+    nMisses = cache.stats()["misses"]
+    cache.MV_CC_SetFloatValue("ExposureTime", 12345.0)
+    ret, fExposure = cache.get_value("ExposureTime", NODE_FLOAT)
+    listResults.append(("write-through", fExposure == 12345.0 and cache.stats()["misses"] == nMisses))
+
+    _, nBefore = cache.get_value("PayloadSize", NODE_INT)
+    cache.MV_CC_SetEnumValue("PixelFormat", PixelType_Gvsp_RGB8_Packed)
+    _, nAfter = cache.get_value("PayloadSize", NODE_INT)
+    listResults.append(("PayloadSize after PixelFormat", nAfter == nBefore * 3))
+    cache.MV_CC_SetEnumValue("PixelFormat", PixelType_Gvsp_Mono8)
+
+    _, nWidth = cache.get_value("Width", NODE_INT)
+    _, nBefore = cache.get_value("PayloadSize", NODE_INT)
+    cache.MV_CC_SetIntValue("Width", nWidth // 2)
+    _, nHalf = cache.get_value("PayloadSize", NODE_INT)
+    cache.MV_CC_SetIntValue("Height", 100)
+    _, nRows = cache.get_value("PayloadSize", NODE_INT)
+    listResults.append(("PayloadSize after Width/Height", nHalf == nBefore // 2 and nRows == nWidth // 2 * 100))
+
+    nMisses = cache.stats()["misses"]
+    cache.get_value("ResultingFrameRate", NODE_FLOAT)
+    cache.get_value("ResultingFrameRate", NODE_FLOAT)
+    listResults.append(("volatile read live", cache.stats()["misses"] == nMisses + 2))
+    return listResults
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+
+    MvCamCtrldll.configure(width=1920, height=1080, pixel_type=PixelType_Gvsp_Mono8, node_latency=args.latency_ms / 1e3)
+    cam = open_first_camera()
+    print("node access latency %.1f ms, %d iterations" % (args.latency_ms, args.reads))
+    print("%-11s %12s %12s %8s %8s %9s" % ("workload", "direct ms", "cached ms", "speedup", "hits", "misses"))
+    for strName, fn_workload in (("parameters", parameters), ("payload", payload), ("mixed", mixed)):
+        fDirect = run(cam, fn_workload, args.reads)
+        cache = MvNodeCache(cam)
+        fCached = run(cache, fn_workload, args.reads)
+        stats = cache.stats()
+        print("%-11s %12.3f %12.3f %7.0fx %8d %9d" % (strName, fDirect * 1e3, fCached * 1e3, fDirect / fCached,
+                                                     stats["hits"], stats["misses"]))
+
+    cache = MvNodeCache(cam)
+    for strName, bOk in check(cache):
+        print("%-32s %s" % (strName, "ok" if bOk else "FAILED"))
+    print("stats: %s" % cache.stats())
+    cam.MV_CC_CloseDevice()
+    cam.MV_CC_DestroyHandle()
+
+
+if __name__ == "__main__":
+    main()
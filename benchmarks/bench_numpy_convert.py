@@ -0,0 +1,77 @@
+# -- coding: utf-8 --
+"""
+Per-frame cost of CameraOperation.Color_numpy / Mono_numpy before and after
+the switch to reshaped views, at 1080p and 5 MP.
+
+    python benchmarks/bench_numpy_convert.py [n_frames]
+
+    old        channel-by-channel copy into np.zeros (previous implementation)
+    view       zero-copy reshape over the frame buffer
+    out=       reshape + one copy into a preallocated destination
+"""
+import os
+import sys
+import time
+from ctypes import c_ubyte
+
+import numpy as np
+
+os.environ.setdefault("MVCAM_BACKEND", "sim")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from CamOperation_class import CameraOperation
+
+SIZES = (("1080p", 1920, 1080), ("5MP", 2448, 2048))
+
+
+def old_mono_numpy(data, nWidth, nHeight):
+    data_ = np.frombuffer(data, count=int(nWidth * nHeight), dtype=np.uint8, offset=0)
+    data_mono_arr = data_.reshape(nHeight, nWidth)
+    numArray = np.zeros([nHeight, nWidth, 1], "uint8")
+    numArray[:, :, 0] = data_mono_arr
+    return numArray
+
+
+def old_color_numpy(data, nWidth, nHeight):
+    data_ = np.frombuffer(data, count=int(nWidth * nHeight * 3), dtype=np.uint8, offset=0)
+    numArray = np.zeros([nHeight, nWidth, 3], "uint8")
+    numArray[:, :, 0] = data_[0:nWidth * nHeight * 3:3].reshape(nHeight, nWidth)
+    numArray[:, :, 1] = data_[1:nWidth * nHeight * 3:3].reshape(nHeight, nWidth)
+    numArray[:, :, 2] = data_[2:nWidth * nHeight * 3:3].reshape(nHeight, nWidth)
+    return numArray
+
+
+def timed(func, n_frames):
+    func()
+    t0 = time.perf_counter()
+    for _ in range(n_frames):
+        func()
+    return (time.perf_counter() - t0) / n_frames * 1e3
+
+
+def main():
+    n_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    # ch:转换函数不访问相机,obj_cam传None即可 | en:The converters never touch the camera, so obj_cam can be None
+    op = CameraOperation(None, None, 0)
+
+    print("%-6s %-6s %10s %10s %10s" % ("size", "format", "old ms", "view ms", "out= ms"))
+    for strSize, nWidth, nHeight in SIZES:
+        mono = (c_ubyte * (nWidth * nHeight))()
+        color = (c_ubyte * (nWidth * nHeight * 3))()
+        out_mono = np.empty((nHeight, nWidth, 1), np.uint8)
+        out_color = np.empty((nHeight, nWidth, 3), np.uint8)
+        rows = (
+            ("Mono8", lambda: old_mono_numpy(mono, nWidth, nHeight),
+                      lambda: op.Mono_numpy(mono, nWidth, nHeight),
+                      lambda: op.Mono_numpy(mono, nWidth, nHeight, out=out_mono)),
+            ("RGB8", lambda: old_color_numpy(color, nWidth, nHeight),
+                     lambda: op.Color_numpy(color, nWidth, nHeight),
+                     lambda: op.Color_numpy(color, nWidth, nHeight, out=out_color)),
+        )
+        for strFormat, fOld, fView, fOut in rows:
+            print("%-6s %-6s %10.3f %10.4f %10.3f" % (strSize, strFormat, timed(fOld, n_frames),
+                                                    timed(fView, n_frames), timed(fOut, n_frames)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# -- coding: utf-8 --
+"""
+Stage counters of Grab_pipeline.GrabPipeline on the simulated backend, with
+an artificially slow display and save so queue drops and back-pressure show.
+
+    python benchmarks/bench_pipeline.py [--seconds 5] [--display-ms 40] [--save-ms 0] [--policy drop-oldest]
+
+--policy applies to the display queue; the save queue blocks, so a slow
+save shows up as convert-stage back-pressure instead of lost frames.
+"""
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("MVCAM_BACKEND", "sim")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MvCameraControl_class import *
+from Grab_pipeline import GrabPipeline, QUEUE_POLICIES, QUEUE_DROP_OLDEST, QUEUE_BLOCK
+from Bayer_demosaic import BayerDemosaicer
+import MvSimulatedSdk
+from bench_sim_throughput import open_first_camera
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--format", default="BayerRG8")
+    parser.add_argument("--fps", type=float, default=60)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--display-ms", type=float, default=40)
+    parser.add_argument("--save-ms", type=float, default=0)
+    parser.add_argument("--policy", choices=QUEUE_POLICIES, default=QUEUE_DROP_OLDEST)
+    args = parser.parse_args()
+    MvCamCtrldll.configure(width=args.width, height=args.height,
+                           pixel_type=MvSimulatedSdk.pixel_type_from_name(args.format), frame_rate=args.fps)
+
+    cam = open_first_camera()
+    cam.MV_CC_StartGrabbing()
+    pipeline = GrabPipeline(cam, display=lambda image, stFrameInfo: time.sleep(args.display_ms / 1e3),
+                            save=(lambda frame: time.sleep(args.save_ms / 1e3)) if args.save_ms > 0 else None,
+                            demosaicer=BayerDemosaicer(),
+                            queue_policies={"display": (2, args.policy), "save": (8, QUEUE_BLOCK)})
+    pipeline.start()
+    time.sleep(args.seconds)
+    fStop = time.perf_counter()
+    pipeline.stop()
+    print("stop took %.1f ms" % ((time.perf_counter() - fStop) * 1e3))
+    cam.MV_CC_StopGrabbing()
+    cam.MV_CC_CloseDevice()
+    cam.MV_CC_DestroyHandle()
+
+    stats = pipeline.stats()
+    print("%dx%d %s @ %g fps, display %g ms, save %g ms" % (args.width, args.height, args.format, args.fps,
+                                                            args.display_ms, args.save_ms))
+    print("%-8s %8s %8s %10s %7s" % ("stage", "frames", "fps", "busy ms", "errors"))
+    for strName, st in stats["stages"].items():
+        print("%-8s %8d %8.1f %10.2f %7d" % (strName, st["frames"], st["fps"], st["busy_ms"], st["errors"]))
+    print("%-8s %12s %6s %6s %9s %6s" % ("queue", "policy", "size", "max", "put", "drop"))
+    for strName, st in stats["queues"].items():
+        print("%-8s %12s %6d %6d %9d %6d" % (strName, st["policy"], st["size"], st["max_depth"], st["put"], st["dropped"]))
+    print("grab timeouts %d, pool allocations %d" % (stats["grab_timeouts"], stats["pool_allocations"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+# -- coding: utf-8 --
+"""
+Live-view CPU per camera with and without the half-resolution superpixel
+preview, on the simulated backend.
+
+    python benchmarks/bench_preview.py [--width 2448] [--height 2048] [--format BayerRG8] [--frames 50]
+
+Measures:
+    display      Bayer frame -> BGR -> 800x600 (the Work_thread display size)
+    update_frame camera_gui streaming through its acquisition worker, Qt offscreen, label-size
+                 scaling, per displayed frame
+
+CPU is process time per frame, so it includes OpenCV worker threads. The
+last line checks that the superpixel preview averages both greens of each
+quad and gives the same image with a depth-1 buffer pool.
+"""
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("MVCAM_BACKEND", "sim")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+from MvCameraControl_class import *
+from PixelType_registry import get_pixel_format
+from Bayer_demosaic import BayerDemosaicer
+from FrameBuffer_pool import FrameBufferPool
+import MvSimulatedSdk
+
+DISPLAY_SIZE = (800, 600)
+
+
+def measure(func, n_frames):
+    func()
+    t0 = time.perf_counter()
+    c0 = time.process_time()
+    for _ in range(n_frames):
+        func()
+    return ((time.perf_counter() - t0) / n_frames * 1e3,
+            (time.process_time() - c0) / n_frames * 1e3)
+
+
+def bench_display(nWidth, nHeight, enPixelType, bPreview, n_frames):
+    stFormat = get_pixel_format(enPixelType)
+    data = MvSimulatedSdk.encode_scene(MvSimulatedSdk.render_scene(nWidth, nHeight, 0, 1), enPixelType)
+    convert = BayerDemosaicer(bPreview=bPreview).converter(stFormat)
+    return measure(lambda: cv2.resize(convert(data, nWidth, nHeight), DISPLAY_SIZE, interpolation=cv2.INTER_AREA),
+                   n_frames)
+
+
+def bench_update_frame(bPreview, n_frames):
+    from PyQt5.QtWidgets import QApplication
+    import camera_gui
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = camera_gui.HikRobotCameraGUI()
+    window.preview_checkbox.setChecked(bPreview)
+    window.connect_camera()
+    window.toggle_streaming()
+
+    # Per displayed frame, worker conversion included
+    while window.worker.frames_shown < 1:
+        app.processEvents()
+    nStart = window.worker.frames_shown
+    t0 = time.perf_counter()
+    c0 = time.process_time()
+    while window.worker.frames_shown < nStart + n_frames:
+        app.processEvents()
+        time.sleep(0.001)
+    nShown = window.worker.frames_shown - nStart
+    result = ((time.perf_counter() - t0) / nShown * 1e3, (time.process_time() - c0) / nShown * 1e3)
+    window.disconnect_camera()
+    window.close()
+    return result
+
+
+def check_superpixel(nWidth, nHeight):
+    enPixelType = PixelType_Gvsp_BayerRG8
+    stFormat = get_pixel_format(enPixelType)
+    raw = MvSimulatedSdk.encode_scene(MvSimulatedSdk.render_scene(nWidth, nHeight, 0, 1), enPixelType)
+    raw = np.frombuffer(raw, np.uint8, nWidth * nHeight).reshape(nHeight, nWidth)
+    # ch:RGGB中两个绿色位于(0,1)和(1,0) | en:The two greens of RGGB sit at (0, 1) and (1, 0)
+    green = (raw[0::2, 1::2].astype(np.uint16) + raw[1::2, 0::2] + 1) // 2
+    listImages = [BayerDemosaicer(pool=FrameBufferPool(nDepth=nDepth)).superpixel(stFormat, raw, nWidth, nHeight).copy()
+                  for nDepth in (1, 2)]
+    return (np.array_equal(listImages[0], listImages[1])
+            and np.abs(listImages[0][..., 1].astype(np.int16) - green).max() <= 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=2448)
+    parser.add_argument("--height", type=int, default=2048)
+    parser.add_argument("--format", default="BayerRG8")
+    parser.add_argument("--frames", type=int, default=50)
+    args = parser.parse_args()
+    enPixelType = MvSimulatedSdk.pixel_type_from_name(args.format)
+    MvCamCtrldll.configure(width=args.width, height=args.height, pixel_type=enPixelType, frame_rate=0)
+
+    print("%dx%d %s, %d frames" % (args.width, args.height, args.format, args.frames))
+    print("%-13s %-10s %10s %10s" % ("path", "mode", "wall ms", "cpu ms"))
+    for bPreview in (False, True):
+        strMode = "half-res" if bPreview else "full"
+        fWall, fCpu = bench_display(args.width, args.height, enPixelType, bPreview, args.frames)
+        print("%-13s %-10s %10.2f %10.2f" % ("display", strMode, fWall, fCpu))
+    for bPreview in (False, True):
+        strMode = "half-res" if bPreview else "full"
+        fWall, fCpu = bench_update_frame(bPreview, args.frames)
+        print("%-13s %-10s %10.2f %10.2f" % ("update_frame", strMode, fWall, fCpu))
+    print("%-32s %s" % ("superpixel green average", "ok" if check_superpixel(args.width, args.height) else "FAILED"))
+
+
+if __name__ == "__main__":
+    main()
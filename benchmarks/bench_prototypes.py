@@ -0,0 +1,71 @@
+# -- coding: utf-8 --
+"""
+Micro-benchmark: per-call overhead of re-declaring ctypes prototypes on every
+call (the old MvCamera wrappers) versus binding argtypes/restype once and
+calling a cached function pointer (the prototype table in MvCameraControl_class).
+
+The MVS runtime is not needed: the C runtime library stands in for
+MvCameraControl.dll, and memchr() plays the role of a small SDK getter.
+
+    python benchmarks/bench_prototypes.py [n_calls]
+"""
+import sys
+import time
+import ctypes
+import ctypes.util
+from ctypes import c_void_p, c_int, c_size_t, c_uint, create_string_buffer
+
+
+def load_stand_in_library():
+    if sys.platform.startswith("win"):
+        return ctypes.cdll.msvcrt
+    return ctypes.CDLL(ctypes.util.find_library("c"))
+
+
+def bench_redeclare_per_call(lib, buf, n_calls):
+    # ch:旧写法:每次调用都重新设置(拼错的)argtype与restype | en:Old wrappers: (misspelled) argtype and restype re-set on every call
+    t0 = time.perf_counter()
+    for _ in range(n_calls):
+        lib.memchr.argtype = (c_void_p, c_int, c_size_t)
+        lib.memchr.restype = c_uint
+        lib.memchr(buf, 1, 64)
+    return time.perf_counter() - t0
+
+
+def bench_bound_once(lib, buf, n_calls):
+    # ch:新写法:导入时绑定一次,调用缓存的函数指针 | en:New wrappers: bound once, cached function pointer is called
+    func = lib.memchr
+    func.argtypes = (c_void_p, c_int, c_size_t)
+    func.restype = c_void_p
+
+    class _Holder(object):
+        pass
+    _Holder._memchr = func
+    holder = _Holder()
+
+    t0 = time.perf_counter()
+    for _ in range(n_calls):
+        holder._memchr(buf, 1, 64)
+    return time.perf_counter() - t0
+
+
+def main():
+    n_calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    lib = load_stand_in_library()
+    buf = create_string_buffer(64)
+
+    # ch:预热 | en:Warm up both paths
+    bench_redeclare_per_call(lib, buf, 1000)
+    bench_bound_once(lib, buf, 1000)
+
+    t_before = bench_redeclare_per_call(lib, buf, n_calls)
+    t_after = bench_bound_once(lib, buf, n_calls)
+
+    print("calls per path      : %d" % n_calls)
+    print("re-declare per call : %.3f us/call" % (t_before / n_calls * 1e6))
+    print("bound once          : %.3f us/call" % (t_after / n_calls * 1e6))
+    print("speed-up            : %.2fx" % (t_before / t_after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# -- coding: utf-8 --
+"""
+Raw_archive recording and replay against per-frame image files.
+
+    python benchmarks/bench_raw_archive.py [--frames 200] [--width 2448 --height 2048] [--pixel bayer8]
+                                           [--compare bmp png] [--size-gb 0] [--out /tmp/bench_raw_archive]
+
+Records --frames frames from the free-running simulated camera straight
+into a RawArchiveWriter, then writes the same frames as one decoded image
+file each (--compare formats) for reference. Prints write rate and size on
+disk for both.
+
+Replay opens the archive with RawArchive and prints the time to open it,
+the mean latency of random frame() calls, a sequential pass over every
+frame, and whether frames are views into the mapping (zero-copy). With
+--size-gb the archive is first padded to that size by repeating the
+recorded frames, to show that open and random access do not depend on the
+size of the capture. Output files are removed afterwards unless --keep.
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+
+os.environ.setdefault("MVCAM_BACKEND", "sim")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from MvCameraControl_class import *
+from Image_writer import IMAGE_ENCODERS, write_image
+from Raw_archive import RawArchive, RawArchiveWriter, decode_raw_frame
+from bench_burst import PIXEL_TYPES
+from bench_sim_throughput import open_first_camera
+
+
+def record(cam, strPath, nFrames):
+    stParam = MVCC_INTVALUE()
+    cam.MV_CC_GetIntValue("PayloadSize", stParam)
+    writer = RawArchiveWriter(strPath, stParam.nCurValue)
+    cam.MV_CC_StartGrabbing()
+    while writer.nFrames < nFrames:
+        ret, view = cam.GetFrameView(1000)
+        if view is None:
+            continue
+        with view:
+            writer.append(view.data, view.stFrameInfo)
+    cam.MV_CC_StopGrabbing()
+    writer.close()
+    return writer.stats()
+
+
+def pad_archive(strPath, nBytes):
+    with RawArchive(strPath) as archive:
+        nRecorded = len(archive)
+        listFrames = [archive.frame(i) for i in range(nRecorded)]
+        writer = RawArchiveWriter(strPath, 0, bAppend=True)
+        i = 0
+        while writer.nFrames * writer.nStride < nBytes:
+            data, meta = listFrames[i % nRecorded]
+            meta = meta.copy()
+            meta["nFrameNum"] = writer.nFrames
+            writer.append_record(data, meta)
+            i += 1
+        writer.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--width", type=int, default=2448)
+    parser.add_argument("--height", type=int, default=2048)
+    parser.add_argument("--pixel", choices=sorted(PIXEL_TYPES), default="bayer8")
+    parser.add_argument("--compare", nargs="*", choices=sorted(IMAGE_ENCODERS), default=["bmp", "png"])
+    parser.add_argument("--size-gb", type=float, default=0.0)
+    parser.add_argument("--random", type=int, default=1000)
+    parser.add_argument("--out", default="/tmp/bench_raw_archive")
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    MvCamCtrldll.configure(width=args.width, height=args.height, pixel_type=PIXEL_TYPES[args.pixel], frame_rate=0)
+    shutil.rmtree(args.out, ignore_errors=True)
+    os.makedirs(args.out)
+    strPath = os.path.join(args.out, "capture")
+    cam = open_first_camera()
+    stats = record(cam, strPath, args.frames)
+    cam.MV_CC_CloseDevice()
+    cam.MV_CC_DestroyHandle()
+
+    print("%d frames %dx%d %s" % (args.frames, args.width, args.height, args.pixel))
+    print("%-8s %10s %10s %10s" % ("format", "frames/s", "MB/s", "disk MB"))
+    print("%-8s %10.1f %10.1f %10.1f" % ("mvraw", stats["mb_s"] * 1e6 / stats["stride"], stats["mb_s"],
+                                       stats["bytes"] / 1e6))
+    with RawArchive(strPath) as archive:
+        for strFormat in args.compare:
+            strDir = os.path.join(args.out, strFormat)
+            os.makedirs(strDir)
+            nBytes = 0
+            t0 = time.perf_counter()
+            for i in range(len(archive)):
+                data, meta = archive.frame(i)
+                nBytes += write_image(os.path.join(strDir, "%08d.%s" % (i, strFormat)),
+                                      decode_raw_frame(data, meta, strFormat), strFormat)
+            fElapsed = time.perf_counter() - t0
+            print("%-8s %10.1f %10.1f %10.1f" % (strFormat, len(archive) / fElapsed, nBytes / fElapsed / 1e6,
+                                               nBytes / 1e6))
+            shutil.rmtree(strDir)
+
+    if args.size_gb > 0:
+        pad_archive(strPath, int(args.size_gb * 1e9))
+
+    t0 = time.perf_counter()
+    archive = RawArchive(strPath)
+    fOpen = time.perf_counter() - t0
+    nFrames = len(archive)
+    listIndices = np.random.default_rng(0).integers(0, nFrames, args.random)
+    t0 = time.perf_counter()
+    nChecksum = 0
+    for i in listIndices:
+        data, meta = archive.frame(i)
+        nChecksum += int(data[0]) + int(meta["nFrameNum"])
+    fRandom = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for i in range(nFrames):
+        data, meta = archive.frame(i)
+        nChecksum += int(data[-1])
+    fSequential = time.perf_counter() - t0
+    data, meta = archive.frame(nFrames - 1)
+    bZeroCopy = np.shares_memory(data, archive.data)
+    print("replay: %d frames, %.2f GB, open %.2f ms, random frame() %.1f us, sequential %.0f frames/s, "
+          "zero-copy %s" % (nFrames, nFrames * archive.nStride / 1e9, fOpen * 1e3, fRandom / args.random * 1e6,
+                            nFrames / fSequential, bZeroCopy))
+    archive.close()
+    if not args.keep:
+        shutil.rmtree(args.out, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# -- coding: utf-8 --
+"""
+MvRecipeStore recipe switching: FeatureLoad, minimal writes and auto.
+
+    python benchmarks/bench_recipe_store.py [--latency-ms 5]
+
+The simulated camera is given --latency-ms per GenICam node access. Three
+recipes are captured (RECIPE_A and RECIPE_B of bench_param_batch, which
+differ in 8 nodes, and B with only the Gain changed), then the same
+sequence of switches is run with each switch mode, starting from a fresh
+MvNodeCache so the first switch finds nothing cached:
+
+    load    always MV_CC_FeatureLoad of the snapshot
+    write   always diff and write the changed nodes
+    auto    whichever the store estimates to be cheaper
+
+Every switch prints the mode used, the nodes changed and written, and the
+time; after each one the tracked nodes are read back without the cache and
+compared with the recipe. Each mode gets its own copy of the store so the
+timings auto learns from come from its own switches.
+"""
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+
+os.environ.setdefault("MVCAM_BACKEND", "sim")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MvCameraControl_class import *
+from MvNodeCache import MvNodeCache
+from MvParamBatch import apply_parameters, values_equal
+from MvRecipeStore import RecipeStore, RECIPE_SWITCH_AUTO, RECIPE_SWITCH_LOAD, RECIPE_SWITCH_WRITE
+from bench_sim_throughput import open_first_camera
+from bench_param_batch import RECIPE_A, RECIPE_B
+
+RECIPES = (("a", RECIPE_A), ("b", RECIPE_B), ("b-gain", dict(RECIPE_B, Gain=9.0)))
+SEQUENCE = ("a", "b", "b-gain", "b", "a", "b", "b-gain")
+
+
+def matches(cam, store, strSerial, strName):
+    # ch:绕过缓存直接读相机 | en:Read straight from the camera, bypassing any cache
+    live = MvNodeCache(cam)
+    for strKey, (strType, value) in store.recipe(strSerial, strName).items():
+        ret, current = live.get_value(strKey, strType)
+        if isinstance(current, bytes):
+            current = current.decode("ascii")
+        if ret != MV_OK or not values_equal(strType, current, value):
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    MvCamCtrldll.configure(width=1920, height=1080, pixel_type=PixelType_Gvsp_Mono8, node_latency=0.0)
+    cam = open_first_camera()
+    strRoot = tempfile.mkdtemp(prefix="recipes_")
+    try:
+        store = RecipeStore(os.path.join(strRoot, "captured"))
+        cache = MvNodeCache(cam)
+        for strName, dictRecipe in RECIPES:
+            ret, dictReport = apply_parameters(cache, dictRecipe)
+            if ret == MV_OK:
+                ret = store.capture(cache, strName)
+            if ret != MV_OK:
+                raise SystemExit("capture %s failed: 0x%x" % (strName, ret))
+        _, strSerial = store.serial(cache)
+
+        MvCamCtrldll.configure(node_latency=args.latency_ms / 1e3)
+        print("node access latency %.1f ms, serial %s, recipes %s" % (
+            args.latency_ms, strSerial, ", ".join(store.recipes(strSerial))))
+        dictTotals = {}
+        bAllMatch = True
+        for strMode in (RECIPE_SWITCH_LOAD, RECIPE_SWITCH_WRITE, RECIPE_SWITCH_AUTO):
+            strDir = os.path.join(strRoot, strMode)
+            shutil.copytree(store.strDir, strDir)
+            modeStore = RecipeStore(strDir)
+            cache = MvNodeCache(cam)
+            print("\n%-6s %-8s %-6s %8s %8s %9s %9s %9s %6s" % ("mode", "recipe", "used", "changed", "written", "ms",
+                                                             "est load", "est write", "state"))
+            for strName in SEQUENCE:
+                ret, dictReport = modeStore.switch(cache, strName, strMode)
+                if ret != MV_OK:
+                    raise SystemExit("%s switch to %s failed: 0x%x %s" % (strMode, strName, ret, dictReport))
+                MvCamCtrldll.configure(node_latency=0.0)
+                bMatch = matches(cam, modeStore, strSerial, strName)
+                MvCamCtrldll.configure(node_latency=args.latency_ms / 1e3)
+                bAllMatch = bAllMatch and bMatch
+                print("%-6s %-8s %-6s %8s %8d %9.1f %9.1f %9s %6s" % (
+                    strMode, strName, dictReport["mode"], "-" if dictReport["changed"] is None else dictReport["changed"],
+                    dictReport["written"], dictReport["ms"], dictReport["estimate_load_ms"],
+                    "-" if dictReport["estimate_write_ms"] is None else "%.1f" % dictReport["estimate_write_ms"],
+                    "ok" if bMatch else "WRONG"))
+            dictTotals[strMode] = sum(dictReport["ms"] for dictReport in modeStore.listSwitches)
+            print("%-6s total %.1f ms, timings %s" % (strMode, dictTotals[strMode], modeStore.timings(strSerial)))
+
+        fBest = min(dictTotals[RECIPE_SWITCH_LOAD], dictTotals[RECIPE_SWITCH_WRITE])
+        print("\n%-32s %s" % ("camera state after every switch", "ok" if bAllMatch else "FAILED"))
+        print("%-32s %s (auto %.1f ms, best fixed %.1f ms)" % (
+            "auto no slower than fixed", "ok" if dictTotals[RECIPE_SWITCH_AUTO] <= fBest * 1.1 else "FAILED",
+            dictTotals[RECIPE_SWITCH_AUTO], fBest))
+        print("%-32s %s" % ("switch log written", "ok" if os.path.exists(
+            os.path.join(strRoot, RECIPE_SWITCH_AUTO, strSerial, "switches.csv")) else "FAILED"))
+    finally:
+        shutil.rmtree(strRoot, ignore_errors=True)
+    cam.MV_CC_CloseDevice()
+    cam.MV_CC_DestroyHandle()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# -- coding: utf-8 --
+"""
+CameraSupervisor time to recover from simulated cable glitches.
+
+    python benchmarks/bench_reconnect.py [--fps 30] [--frame-timeout 0.5]
+
+A simulated camera is configured through a MvNodeCache (ROI, exposure,
+gain, frame rate, user ID), then grabbed with a GrabPipeline under a
+CameraSupervisor. The simulator then drops the device off the network:
+
+    notified     down 1 s, MV_EXCEPTION_DEV_DISCONNECT is raised
+    silent       down 1 s, no exception, frames simply stop (detected by the
+                 --frame-timeout frame gap)
+    power cycle  down 2 s, notified, every node back at its power-on value
+    long         down 5 s, notified; shows the bounded exponential backoff
+
+After each recovery the configured nodes are read back on the new handle
+(bypassing every cache) and compared with the values set before the loss,
+and frames must flow again. Per event the detection time, attempts, time to
+recover and the whole frame outage are printed, then the supervisor's
+per-camera stats.
+"""
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("MVCAM_BACKEND", "sim")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MvCameraControl_class import *
+from MvNodeCache import MvNodeCache
+from MvParamBatch import apply_parameters, parameter_type, values_equal
+from Grab_pipeline import GrabPipeline
+from Camera_supervisor import CameraSupervisor
+from bench_sim_throughput import open_first_camera
+
+SETTINGS = {"Width": 1280, "Height": 720, "OffsetX": 64, "OffsetY": 32, "ExposureTime": 4000.0, "Gain": 6.0,
+            "AcquisitionFrameRateEnable": True, "DeviceUserID": "line-3"}
+# name: (seconds down, exception raised, power cycle)
+GLITCHES = (("notified", 1.0, True, False), ("silent", 1.0, False, False), ("power cycle", 2.0, True, True),
+            ("long", 5.0, True, False))
+
+
+class Grabber():
+    """Owner of the grab pipeline, restarted by the supervisor callbacks."""
+
+    def __init__(self):
+        self.pipeline = None
+        self.supervisor = None
+
+    def start(self, cam):
+        self.pipeline = GrabPipeline(cam, fn_grabbed=self.supervisor.frame if self.supervisor else None)
+        self.pipeline.start()
+
+    def stop(self):
+        if self.pipeline is not None:
+            self.pipeline.stop(bDrain=False)
+            self.pipeline = None
+
+    def on_lost(self, strReason):
+        self.stop()
+
+    def on_recovered(self, cam, cache):
+        self.start(cam)
+
+
+def read_back(cam, dictSettings):
+    # ch:新建缓存,每个节点都从相机读取 | en:A fresh cache, so every node is read from the camera
+    cache = MvNodeCache(cam)
+    for strKey, value in dictSettings.items():
+        strType, value = parameter_type(strKey, value)
+        ret, current = cache.get_value(strKey, strType)
+        if ret != MV_OK or not values_equal(strType, current.decode("ascii") if isinstance(current, bytes) else current,
+                                            value):
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--frame-timeout", type=float, default=0.5)
+    args = parser.parse_args()
+
+    MvCamCtrldll.configure(width=1920, height=1080, pixel_type=PixelType_Gvsp_Mono8, frame_rate=args.fps)
+    cam = open_first_camera()
+    deviceList = MV_CC_DEVICE_INFO_LIST()
+    MvCamera.MV_CC_EnumDevices(MV_GIGE_DEVICE, deviceList)
+    stDevInfo = cast(deviceList.pDeviceInfo[0], POINTER(MV_CC_DEVICE_INFO)).contents
+    cache = MvNodeCache(cam)
+    ret, dictReport = apply_parameters(cache, dict(SETTINGS, AcquisitionFrameRate=args.fps))
+    if ret != MV_OK:
+        raise SystemExit("configure failed at %s: 0x%x" % (dictReport["failed"], ret))
+    cam.MV_CC_StartGrabbing()
+
+    grabber = Grabber()
+    supervisor = CameraSupervisor(stDevInfo, cam, cache, fn_lost=grabber.on_lost, fn_recovered=grabber.on_recovered,
+                                  fFrameTimeout=args.frame_timeout, fBackoffInitial=0.1, fBackoffMax=1.6)
+    grabber.supervisor = supervisor
+    supervisor.start()
+    grabber.start(cam)
+    time.sleep(0.5)
+
+    print("%.0f fps, frame timeout %.1f s, backoff 0.1 s doubling to 1.6 s" % (args.fps, args.frame_timeout))
+    print("%-12s %6s %-10s %10s %9s %11s %11s %10s %6s %7s" % ("glitch", "down s", "detected", "detect ms",
+                                                               "attempts", "recover ms", "outage ms", "reapplied",
+                                                               "state", "frames"))
+    bAllOk = True
+    for strName, fDown, bNotify, bPowerCycle in GLITCHES:
+        nEvents = len(supervisor.listEvents)
+        MvCamCtrldll.simulate_disconnect(0, fDown, bNotify=bNotify, bPowerCycle=bPowerCycle)
+        fDeadline = time.perf_counter() + fDown + 10.0
+        while time.perf_counter() < fDeadline and (len(supervisor.listEvents) == nEvents
+                                                   or supervisor.listEvents[-1]["outage_ms"] is None):
+            time.sleep(0.05)
+        time.sleep(0.5)
+        if len(supervisor.listEvents) == nEvents:
+            print("%-12s %6.1f not detected" % (strName, fDown))
+            bAllOk = False
+            continue
+        dictEvent = supervisor.listEvents[-1]
+        nFrames = grabber.pipeline.stages["grab"].nFrames if grabber.pipeline is not None else 0
+        bState = read_back(supervisor.cam, SETTINGS)
+        bOk = dictEvent["recovered"] and bState and nFrames > 0
+        bAllOk = bAllOk and bOk
+        print("%-12s %6.1f %-10s %10.0f %9d %11.0f %11s %10d %6s %7d" % (
+            strName, fDown, dictEvent["reason"], dictEvent["detect_ms"], dictEvent["attempts"],
+            dictEvent["recover_ms"] or 0.0, "-" if dictEvent["outage_ms"] is None else "%.0f" % dictEvent["outage_ms"],
+            dictEvent["reapplied"], "ok" if bState else "WRONG", nFrames))
+
+    supervisor.stop()
+    grabber.stop()
+    print("stats: %s" % supervisor.stats())
+    print("%-32s %s" % ("recovered with settings intact", "ok" if bAllOk else "FAILED"))
+    supervisor.cam.MV_CC_StopGrabbing()
+    supervisor.cam.MV_CC_CloseDevice()
+    supervisor.cam.MV_CC_DestroyHandle()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# -- coding: utf-8 --
+"""
+Replay_camera.ReplayCamera throughput, pacing and determinism.
+
+    python benchmarks/bench_replay.py [--frames 100] [--width 1280 --height 960] [--pixel bayer8]
+                                      [--fps 50] [--out /tmp/bench_replay]
+
+Records --frames frames of the simulated camera (at --fps) into a
+Raw_archive, and writes the same frames decoded as a PNG directory and an
+MJPG video. Each source is then replayed three ways:
+
+    grab       MV_CC_GetOneFrameTimeout loop, as CameraAcquisitionWorker does
+    read       cv2.VideoCapture-style read() loop, as the ezviz scripts do
+    pipeline   GrabPipeline with blocking queues, display stage counting frames
+
+with fast pacing for throughput, then once more with original and fixed
+(--fps) pacing to show the achieved rate against the target. Every grab run
+is repeated and the frame checksums compared, so "same" means the runs saw
+identical frames in identical order.
+"""
+import os
+import sys
+import time
+import zlib
+import shutil
+import argparse
+
+os.environ.setdefault("MVCAM_BACKEND", "sim")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+from MvCameraControl_class import *
+from Grab_pipeline import GrabPipeline, STAGE_CONVERT, STAGE_DISPLAY, QUEUE_BLOCK
+from Image_writer import write_image, IMAGE_FORMAT_PNG
+from Raw_archive import RawArchive
+from Replay_camera import ReplayCamera, REPLAY_PACE_FAST, REPLAY_PACE_FIXED, REPLAY_PACE_ORIGINAL
+from bench_burst import PIXEL_TYPES
+from bench_raw_archive import record
+from bench_sim_throughput import open_first_camera
+
+
+def make_sources(args):
+    MvCamCtrldll.configure(width=args.width, height=args.height, pixel_type=PIXEL_TYPES[args.pixel],
+                           frame_rate=args.fps)
+    cam = open_first_camera()
+    strArchive = os.path.join(args.out, "capture")
+    record(cam, strArchive, args.frames)
+    cam.MV_CC_CloseDevice()
+    cam.MV_CC_DestroyHandle()
+
+    strDir = os.path.join(args.out, "images")
+    os.makedirs(strDir)
+    strVideo = os.path.join(args.out, "capture.avi")
+    video = cv2.VideoWriter(strVideo, cv2.VideoWriter_fourcc(*"MJPG"), args.fps, (args.width, args.height))
+    with RawArchive(strArchive) as archive:
+        for i in range(len(archive)):
+            image = archive.image(i)
+            write_image(os.path.join(strDir, "%06d.png" % i), image, IMAGE_FORMAT_PNG, 1)
+            video.write(image if image.ndim == 3 else cv2.cvtColor(image, cv2.COLOR_GRAY2BGR))
+    video.release()
+    return [("archive", strArchive), ("images", strDir), ("video", strVideo)]
+
+
+def run_grab(strPath, strPace, fFps):
+    cam = ReplayCamera(strPath, strPace, fFps)
+    stParam = MVCC_INTVALUE()
+    cam.MV_CC_GetIntValue("PayloadSize", stParam)
+    pData = (c_ubyte * stParam.nCurValue)()
+    stFrameInfo = MV_FRAME_OUT_INFO_EX()
+    nCrc = 0
+    nFrames = 0
+    cam.MV_CC_StartGrabbing()
+    t0 = time.perf_counter()
+    while cam.MV_CC_GetOneFrameTimeout(pData, stParam.nCurValue, stFrameInfo, 100) == MV_OK:
+        nCrc = zlib.crc32(memoryview(pData)[:stFrameInfo.nFrameLen], zlib.crc32(bytes([stFrameInfo.nFrameNum & 0xff]), nCrc))
+        nFrames += 1
+    # ch:最后一次调用等待了一个超时才发现源已结束 | en:The last call waited one timeout before finding the source exhausted
+    fElapsed = time.perf_counter() - t0 - 0.1
+    cam.MV_CC_StopGrabbing()
+    cam.release()
+    return nFrames, fElapsed, nCrc
+
+
+def run_read(strPath):
+    cap = ReplayCamera(strPath, REPLAY_PACE_FAST)
+    nFrames = 0
+    t0 = time.perf_counter()
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        nFrames += 1
+    fElapsed = time.perf_counter() - t0
+    cap.release()
+    return nFrames, fElapsed
+
+
+def run_pipeline(strPath, nExpected):
+    cam = ReplayCamera(strPath, REPLAY_PACE_FAST)
+    listShown = []
+    pipeline = GrabPipeline(cam, display=lambda image, stFrameInfo: listShown.append(stFrameInfo.nFrameNum),
+                            queue_policies={STAGE_CONVERT: (4, QUEUE_BLOCK), STAGE_DISPLAY: (4, QUEUE_BLOCK)})
+    cam.MV_CC_StartGrabbing()
+    t0 = time.perf_counter()
+    pipeline.start()
+    while len(listShown) < nExpected and time.perf_counter() - t0 < 60:
+        time.sleep(0.005)
+    fElapsed = time.perf_counter() - t0
+    pipeline.stop()
+    cam.MV_CC_StopGrabbing()
+    cam.release()
+    return len(listShown), fElapsed, listShown == sorted(listShown)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=960)
+    parser.add_argument("--pixel", choices=sorted(PIXEL_TYPES), default="bayer8")
+    parser.add_argument("--fps", type=float, default=50.0)
+    parser.add_argument("--out", default="/tmp/bench_replay")
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    shutil.rmtree(args.out, ignore_errors=True)
+    os.makedirs(args.out)
+    listSources = make_sources(args)
+
+    print("%d frames %dx%d %s recorded at %.0f fps" % (args.frames, args.width, args.height, args.pixel, args.fps))
+    print("%-8s %-9s %7s %10s %8s" % ("source", "mode", "frames", "frames/s", "same"))
+    for strName, strPath in listSources:
+        nFrames, fElapsed, nCrc = run_grab(strPath, REPLAY_PACE_FAST, 0)
+        nAgain, _, nCrcAgain = run_grab(strPath, REPLAY_PACE_FAST, 0)
+        print("%-8s %-9s %7d %10.1f %8s" % (strName, "grab", nFrames, nFrames / fElapsed,
+                                             nFrames == nAgain and nCrc == nCrcAgain))
+        nFrames, fElapsed = run_read(strPath)
+        print("%-8s %-9s %7d %10.1f %8s" % (strName, "read", nFrames, nFrames / fElapsed, "-"))
+        nFrames, fElapsed, bOrdered = run_pipeline(strPath, nFrames)
+        print("%-8s %-9s %7d %10.1f %8s" % (strName, "pipeline", nFrames, nFrames / fElapsed, bOrdered))
+
+    print("%-8s %-9s %7s %10s %10s" % ("source", "pace", "frames", "frames/s", "target"))
+    for strName, strPath in listSources:
+        for strPace, fTarget in ((REPLAY_PACE_ORIGINAL, args.fps), (REPLAY_PACE_FIXED, args.fps / 2)):
+            nFrames, fElapsed, _ = run_grab(strPath, strPace, fTarget)
+            print("%-8s %-9s %7d %10.1f %10.1f" % (strName, strPace, nFrames, nFrames / fElapsed, fTarget))
+    if not args.keep:
+        shutil.rmtree(args.out, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# -- coding: utf-8 --
+"""
+Throughput of the Hikrobot ingest paths on the simulated camera backend.
+
+    python benchmarks/bench_sim_throughput.py --width 2448 --height 2048 --format BayerRG8
+
+Measures:
+    grab          MvCamera.MV_CC_GetOneFrameTimeout alone (simulated camera free-running)
+    buffer_copy   MV_CC_GetImageBuffer + memmove into buf_cache + NumPy copy (old Work_thread)
+    frame_view    MvCamera.GetFrameView, NumPy view over the SDK buffer, no copies
+    update_frame  camera_gui.HikRobotCameraGUI.update_frame, Qt offscreen
+    work_thread   CameraOperation.Start_grabbing/Work_thread for --seconds, stopped
+                  through ev_stop; fps counts the frames reaching Display_frame
+"""
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("MVCAM_BACKEND", "sim")
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MvCameraControl_class import *
+import MvSimulatedSdk
+import numpy as np
+
+
+def open_first_camera():
+    deviceList = MV_CC_DEVICE_INFO_LIST()
+    ret = MvCamera.MV_CC_EnumDevices(MV_GIGE_DEVICE | MV_USB_DEVICE, deviceList)
+    if ret != 0 or deviceList.nDeviceNum == 0:
+        raise SystemExit("no simulated device found, is MVCAM_BACKEND=sim?")
+    cam = MvCamera()
+    stDeviceList = cast(deviceList.pDeviceInfo[0], POINTER(MV_CC_DEVICE_INFO)).contents
+    cam.MV_CC_CreateHandle(stDeviceList)
+    cam.MV_CC_OpenDevice(MV_ACCESS_Exclusive, 0)
+    return cam
+
+
+def bench_grab(n_frames):
+    cam = open_first_camera()
+    stParam = MVCC_INTVALUE()
+    cam.MV_CC_GetIntValue("PayloadSize", stParam)
+    nDataSize = stParam.nCurValue
+    pData = (c_ubyte * nDataSize)()
+    stFrameInfo = MV_FRAME_OUT_INFO_EX()
+    cam.MV_CC_StartGrabbing()
+    t0 = time.perf_counter()
+    for _ in range(n_frames):
+        cam.MV_CC_GetOneFrameTimeout(pData, nDataSize, stFrameInfo, 1000)
+    elapsed = time.perf_counter() - t0
+    cam.MV_CC_StopGrabbing()
+    cam.MV_CC_CloseDevice()
+    cam.MV_CC_DestroyHandle()
+    return elapsed
+
+
+def bench_buffer_copy(n_frames):
+    cam = open_first_camera()
+    stOutFrame = MV_FRAME_OUT()
+    buf_cache = None
+    cam.MV_CC_StartGrabbing()
+    t0 = time.perf_counter()
+    for _ in range(n_frames):
+        cam.MV_CC_GetImageBuffer(stOutFrame, 1000)
+        nFrameLen = stOutFrame.stFrameInfo.nFrameLen
+        if buf_cache is None:
+            buf_cache = (c_ubyte * nFrameLen)()
+        memmove(byref(buf_cache), stOutFrame.pBufAddr, nFrameLen)
+        data = np.frombuffer(buf_cache, count=nFrameLen, dtype=np.uint8).copy()
+        data.sum(dtype=np.uint32)
+        cam.MV_CC_FreeImageBuffer(stOutFrame)
+    elapsed = time.perf_counter() - t0
+    cam.MV_CC_StopGrabbing()
+    cam.MV_CC_CloseDevice()
+    cam.MV_CC_DestroyHandle()
+    return elapsed
+
+
+def bench_frame_view(n_frames):
+    cam = open_first_camera()
+    cam.MV_CC_StartGrabbing()
+    t0 = time.perf_counter()
+    for _ in range(n_frames):
+        ret, stFrame = cam.GetFrameView(1000)
+        with stFrame:
+            stFrame.data.sum(dtype=np.uint32)
+    elapsed = time.perf_counter() - t0
+    cam.MV_CC_StopGrabbing()
+    cam.MV_CC_CloseDevice()
+    cam.MV_CC_DestroyHandle()
+    return elapsed
+
+
+def bench_update_frame(n_frames):
+    from PyQt5.QtWidgets import QApplication
+    import camera_gui
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = camera_gui.HikRobotCameraGUI()
+    window.connect_camera()
+    window.toggle_streaming()
+    # ch:取流线程每帧发frame_ready信号,处理事件直到显示n_frames帧 | en:The worker signals frame_ready per frame; process events until n_frames were shown
+    n_start = window.worker.frames_shown
+    t0 = time.perf_counter()
+    while window.worker.frames_shown - n_start < n_frames:
+        app.processEvents()
+    elapsed = time.perf_counter() - t0
+    window.disconnect_camera()
+    window.close()
+    return elapsed
+
+
+def bench_work_thread(f_seconds):
+    from CamOperation_class import CameraOperation
+
+    cam = open_first_camera()
+    obj = CameraOperation(cam, None, b_open_device=True)
+    listShown = []
+    # ch:显示阶段只计数,不开窗口 | en:The display stage only counts frames, no window is opened
+    obj.Display_frame = lambda numArray, stFrameInfo: listShown.append(stFrameInfo.nFrameNum)
+    t0 = time.perf_counter()
+    obj.Start_grabbing()
+    time.sleep(f_seconds)
+    obj.ev_stop.set()
+    obj.h_thread_handle.join()
+    elapsed = time.perf_counter() - t0
+    obj.Stop_grabbing()
+    obj.Close_device()
+    return len(listShown), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--format", default="Mono8")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    # ch:帧率设为0,模拟相机不限速 | en:Frame rate 0 lets the simulated camera free-run
+    MvCamCtrldll.configure(width=args.width, height=args.height,
+                           pixel_type=MvSimulatedSdk.pixel_type_from_name(args.format), frame_rate=0)
+
+    print("%dx%d %s, %d frames" % (args.width, args.height, args.format, args.frames))
+    for strName, func in (("grab", bench_grab), ("buffer_copy", bench_buffer_copy),
+                          ("frame_view", bench_frame_view), ("update_frame", bench_update_frame)):
+        elapsed = func(args.frames)
+        print("%-13s %8.2f ms/frame  %8.1f fps" % (strName, elapsed / args.frames * 1e3, args.frames / elapsed))
+    n_frames, elapsed = bench_work_thread(args.seconds)
+    print("%-13s %8.2f ms/frame  %8.1f fps" % ("work_thread", elapsed / max(n_frames, 1) * 1e3, n_frames / elapsed))
+
+
+if __name__ == "__main__":
+    main()
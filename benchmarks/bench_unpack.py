@@ -0,0 +1,113 @@
+# -- coding: utf-8 --
+"""
+Throughput of the NumPy packed-format unpacker against the SDK conversion
+path that Work_thread used (fresh MV_CC_PIXEL_CONVERT_PARAM and destination
+buffer per frame, MV_CC_ConvertPixelType to Mono8), on the simulated backend.
+
+    python benchmarks/bench_unpack.py --width 2448 --height 2048 [--frames 50]
+
+The "u8 shift 2" column is unpack_packed_8bit with a non-default shift (two
+bits brighter) into a kept output and scratch buffer, "numpy u16" is
+unpack_packed into kept buffers; the last line checks that neither call
+allocates frame-sized memory.
+
+Note that on the simulated backend MV_CC_ConvertPixelType is itself NumPy, so
+the sdk column measures the per-frame allocation and call overhead rather
+than the vendor conversion kernel.
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+os.environ.setdefault("MVCAM_BACKEND", "sim")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from MvCameraControl_class import *
+from PixelType_unpack import unpack_packed, unpack_packed_8bit
+import MvSimulatedSdk
+
+from bench_sim_throughput import open_first_camera
+
+FORMATS = ("Mono10_Packed", "Mono12_Packed", "BayerRG10_Packed", "BayerRG12_Packed")
+
+
+def grab_one(cam):
+    cam.MV_CC_StartGrabbing()
+    ret, stFrame = cam.GetFrameView(1000)
+    if ret != 0:
+        raise SystemExit("grab failed, ret = 0x%x" % ret)
+    stFrameInfo = MV_FRAME_OUT_INFO_EX()
+    memmove(byref(stFrameInfo), byref(stFrame.stFrameInfo), sizeof(stFrameInfo))
+    data = stFrame.detach()
+    cam.MV_CC_StopGrabbing()
+    return data, stFrameInfo
+
+
+def sdk_convert(cam, data, stFrameInfo):
+    nConvertSize = stFrameInfo.nWidth * stFrameInfo.nHeight
+    stConvertParam = MV_CC_PIXEL_CONVERT_PARAM()
+    memset(byref(stConvertParam), 0, sizeof(stConvertParam))
+    stConvertParam.nWidth = stFrameInfo.nWidth
+    stConvertParam.nHeight = stFrameInfo.nHeight
+    stConvertParam.pSrcData = data.ctypes.data_as(POINTER(c_ubyte))
+    stConvertParam.nSrcDataLen = stFrameInfo.nFrameLen
+    stConvertParam.enSrcPixelType = stFrameInfo.enPixelType
+    stConvertParam.enDstPixelType = PixelType_Gvsp_Mono8
+    stConvertParam.pDstBuffer = (c_ubyte * nConvertSize)()
+    stConvertParam.nDstBufferSize = nConvertSize
+    return cam.MV_CC_ConvertPixelType(stConvertParam)
+
+
+def timed(func, n_frames):
+    func()
+    t0 = time.perf_counter()
+    for _ in range(n_frames):
+        func()
+    return (time.perf_counter() - t0) / n_frames * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=2448)
+    parser.add_argument("--height", type=int, default=2048)
+    parser.add_argument("--frames", type=int, default=50)
+    args = parser.parse_args()
+    nWidth, nHeight = args.width, args.height
+    out8 = np.empty((nHeight, nWidth), np.uint8)
+    out16 = np.empty((nHeight, nWidth), np.uint16)
+    scratch = np.empty(nWidth * nHeight, np.uint16)
+    nPeak = 0
+
+    print("%dx%d, %d frames, ms/frame" % (nWidth, nHeight, args.frames))
+    print("%-18s %10s %10s %12s %10s" % ("format", "sdk", "numpy u8", "u8 shift 2", "numpy u16"))
+    for strFormat in FORMATS:
+        enPixelType = MvSimulatedSdk.pixel_type_from_name(strFormat)
+        nBits = MvSimulatedSdk.SIM_SIGNIFICANT_BITS[enPixelType]
+        MvCamCtrldll.configure(width=nWidth, height=nHeight, pixel_type=enPixelType, frame_rate=0)
+        cam = open_first_camera()
+        data, stFrameInfo = grab_one(cam)
+        t_sdk = timed(lambda: sdk_convert(cam, data, stFrameInfo), args.frames)
+        t_u8 = timed(lambda: unpack_packed_8bit(data, nWidth, nHeight, nBits, out=out8), args.frames)
+        t_shift = timed(lambda: unpack_packed_8bit(data, nWidth, nHeight, nBits, nBits - 10, out=out8,
+                                                   scratch=scratch), args.frames)
+        tracemalloc.start()
+        unpack_packed_8bit(data, nWidth, nHeight, nBits, nBits - 10, out=out8, scratch=scratch)
+        nPeak = max(nPeak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        t_u16 = timed(lambda: unpack_packed(data, nWidth, nHeight, nBits, out=out16, scratch=scratch), args.frames)
+        tracemalloc.start()
+        unpack_packed(data, nWidth, nHeight, nBits, out=out16, scratch=scratch)
+        nPeak = max(nPeak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        cam.MV_CC_CloseDevice()
+        cam.MV_CC_DestroyHandle()
+        print("%-18s %10.2f %10.2f %12.2f %10.2f" % (strFormat, t_sdk, t_u8, t_shift, t_u16))
+    print("%-32s %s (peak %d bytes)" % ("unpack allocation-free", "ok" if nPeak < nWidth * nHeight // 16
+                                        else "FAILED", nPeak))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# -- coding: utf-8 --
+"""
+Video_recorder.VideoRecorder fed from a GrabPipeline on the simulated camera.
+
+    python benchmarks/bench_video_recorder.py [--seconds 4] [--fps 30] [--width 1280 --height 960]
+                                              [--pixel bayer8] [--segment 1.5] [--decimate 1]
+                                              [--slow-ms 100] [--out /tmp/bench_video_recorder]
+
+Streams the simulated camera at --fps through a GrabPipeline whose record
+hook submits every converted frame to a VideoRecorder, as CameraOperation
+does, for --seconds, once per case:
+
+    mp4        mp4v in .mp4
+    lossless   FFV1 in .mkv
+    slow       mp4v with an encoder slowed by --slow-ms per frame, to show
+               that acquisition keeps its rate and the recorder drops instead
+
+Prints grabbed frames and grab rate next to written, dropped and decimated
+frames, segments and encode time. The lossless case is then checked by
+reading a Mono8 recording back and comparing every frame with the
+original, and every segment's .csv is checked to list its frames with
+increasing nFrameNum and nHostTimeStamp. Output is removed unless --keep.
+"""
+import os
+import sys
+import csv
+import time
+import glob
+import shutil
+import argparse
+
+os.environ.setdefault("MVCAM_BACKEND", "sim")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cv2
+import numpy as np
+from MvCameraControl_class import *
+from Grab_pipeline import GrabPipeline, STAGE_GRAB
+from Video_recorder import VideoRecorder, VIDEO_CONTAINER_MP4
+from bench_burst import PIXEL_TYPES
+from bench_sim_throughput import open_first_camera
+
+
+def run_case(args, strDir, bLossless, fSlow):
+    cam = open_first_camera()
+    recorder = VideoRecorder(strDir, fSegmentSeconds=args.segment, nDecimate=args.decimate,
+                             strContainer=VIDEO_CONTAINER_MP4, bLossless=bLossless)
+    listKept = []
+
+    def record(frame):
+        image = frame.image
+        if fSlow:
+            def image():
+                time.sleep(fSlow)
+                return frame.image
+        frame.retain()
+        if not recorder.submit(image, frame.stFrameInfo, fn_done=lambda bOk: frame.release()):
+            frame.release()
+        elif bLossless:
+            listKept.append(frame.image.copy())
+
+    pipeline = GrabPipeline(cam, record=record)
+    cam.MV_CC_StartGrabbing()
+    pipeline.start()
+    time.sleep(args.seconds)
+    pipeline.stop()
+    grab = pipeline.stats()["stages"][STAGE_GRAB]
+    cam.MV_CC_StopGrabbing()
+    cam.MV_CC_CloseDevice()
+    cam.MV_CC_DestroyHandle()
+    recorder.close()
+    return grab, recorder, listKept
+
+
+def check_lossless(recorder, listKept):
+    nFrames = 0
+    nMismatch = 0
+    for strPath in recorder.segments():
+        cap = cv2.VideoCapture(strPath)
+        while True:
+            ret, image = cap.read()
+            if not ret:
+                break
+            if image.ndim == 3:
+                image = image[:, :, 0]
+            if nFrames >= len(listKept) or not np.array_equal(image, listKept[nFrames]):
+                nMismatch += 1
+            nFrames += 1
+        cap.release()
+    return nFrames, nMismatch
+
+
+def check_timestamps(recorder):
+    nRows = 0
+    bOk = True
+    for strPath in recorder.segments():
+        with open(os.path.splitext(strPath)[0] + ".csv") as f:
+            listRows = list(csv.DictReader(f))
+        nRows += len(listRows)
+        for i, row in enumerate(listRows):
+            bOk = bOk and int(row["index"]) == i
+            if i:
+                bOk = bOk and int(row["nFrameNum"]) > int(listRows[i - 1]["nFrameNum"]) \
+                    and int(row["nHostTimeStamp"]) >= int(listRows[i - 1]["nHostTimeStamp"])
+    return nRows, bOk
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=4.0)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=960)
+    parser.add_argument("--pixel", choices=sorted(PIXEL_TYPES), default="bayer8")
+    parser.add_argument("--segment", type=float, default=1.5)
+    parser.add_argument("--decimate", type=int, default=1)
+    parser.add_argument("--slow-ms", type=float, default=100.0)
+    parser.add_argument("--out", default="/tmp/bench_video_recorder")
+    parser.add_argument("--keep", action="store_true")
+    args = parser.parse_args()
+
+    shutil.rmtree(args.out, ignore_errors=True)
+    print("%.1f s at %.0f fps %dx%d %s, %.1f s segments, decimate %d" % (
+        args.seconds, args.fps, args.width, args.height, args.pixel, args.segment, args.decimate))
+    print("%-9s %7s %8s %8s %8s %9s %9s %10s %9s" % ("case", "grabbed", "grab/s", "written", "dropped",
+                                                    "decimated", "segments", "encode ms", "MB"))
+    for strCase, strPixel, bLossless, fSlow in (("mp4", args.pixel, False, 0.0),
+                                                ("lossless", "mono8", True, 0.0),
+                                                ("slow", args.pixel, False, args.slow_ms / 1e3)):
+        MvCamCtrldll.configure(width=args.width, height=args.height, pixel_type=PIXEL_TYPES[strPixel],
+                               frame_rate=args.fps)
+        strDir = os.path.join(args.out, strCase)
+        grab, recorder, listKept = run_case(args, strDir, bLossless, fSlow)
+        stats = recorder.stats()
+        nBytes = sum(os.path.getsize(strPath) for strPath in glob.glob(os.path.join(strDir, "*")))
+        print("%-9s %7d %8.1f %8d %8d %9d %9d %10.2f %9.1f" % (
+            strCase, grab["frames"], grab["fps"], stats["written"], stats["dropped"], stats["decimated"],
+            stats["segments"], stats["encode_ms"], nBytes / 1e6))
+        nRows, bOrdered = check_timestamps(recorder)
+        print("          timestamps: %d rows, ordered %s" % (nRows, bOrdered and nRows == stats["written"]))
+        if bLossless:
+            nFrames, nMismatch = check_lossless(recorder, listKept)
+            print("          lossless: %d frames read back, %d differ" % (nFrames, nMismatch))
+    if not args.keep:
+        shutil.rmtree(args.out, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# -- coding: utf-8 --
+"""
+Every node type MvNodeCache and Basicdemo.get_Value/set_Value accept is
+readable and writable on the simulated backend.
+
+    python benchmarks/check_node_types.py [--width 1280] [--height 720]
+
+For each type in NODE_ACCESS the getter and setter it names must exist on
+MvCamera, and one node of that type is read through the cache, both with
+get_value() and with the drop-in MV_CC_Get* call. PayloadSize must equal
+width x height for Mono8. Basicdemo.get_Value then reads a node of every
+param_type ("int_value", ...) and set_Value writes one back. The check
+fails (exit code 1) on the first mismatch.
+"""
+import os
+import sys
+import argparse
+
+os.environ.setdefault("MVCAM_BACKEND", "sim")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MvCameraControl_class import *
+from MvNodeCache import MvNodeCache, NODE_ACCESS, NODE_INT, NODE_FLOAT, NODE_ENUM, NODE_BOOL, NODE_STRING
+import Basicdemo
+from bench_sim_throughput import open_first_camera
+
+NODES = {NODE_INT: "PayloadSize", NODE_FLOAT: "ExposureTime", NODE_ENUM: "TriggerMode",
+         NODE_BOOL: "AcquisitionFrameRateEnable", NODE_STRING: "DeviceUserID"}
+# param_type: (node, value written)
+PARAM_NODES = {"int_value": ("OffsetX", 16), "float_value": ("ExposureTime", 5000.0), "enum_value": ("TriggerMode", 0),
+               "bool_value": ("AcquisitionFrameRateEnable", True), "string_value": ("DeviceUserID", "line-1")}
+
+
+def check_cache(cam, nPayloadSize):
+    bPass = True
+    cache = MvNodeCache(cam)
+    for strType, (stType, strGetter, strSetter, strField) in NODE_ACCESS.items():
+        strKey = NODES[strType]
+        bApi = hasattr(MvCamera, strGetter) and hasattr(MvCamera, strSetter)
+        ret, value = cache.get_value(strKey, strType)
+        stValue = stType()
+        retInto = getattr(cache, strGetter)(strKey, stValue)
+        valueInto = stValue.value if strField == "value" else getattr(stValue, strField)
+        bOk = bApi and ret == MV_OK and retInto == MV_OK and valueInto == value
+        if strKey == "PayloadSize":
+            bOk = bOk and value == nPayloadSize
+        bPass = bPass and bOk
+        print("%-8s %-28s %-22s %-6s %s" % (strType, strKey, value if ret == MV_OK else "0x%x" % ret,
+                                            "yes" if bApi else "NO", "ok" if bOk else "FAILED"))
+    return bPass
+
+
+def check_basicdemo(cam):
+    bPass = True
+    cache = MvNodeCache(cam)
+    for strParamType, (strKey, value) in PARAM_NODES.items():
+        Basicdemo.set_Value(cache, param_type=strParamType, node_name=strKey, node_value=value)
+        current = Basicdemo.get_Value(cache, param_type=strParamType, node_name=strKey)
+        if isinstance(current, bytes):
+            current = current.decode("ascii")
+        bOk = current == value
+        bPass = bPass and bOk
+        print("%-14s %-28s %-22s %s" % (strParamType, strKey, current, "ok" if bOk else "FAILED"))
+    return bPass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    args = parser.parse_args()
+    MvCamCtrldll.configure(width=args.width, height=args.height, pixel_type=PixelType_Gvsp_Mono8)
+
+    cam = open_first_camera()
+    print("%-8s %-28s %-22s %-6s" % ("type", "node", "value", "api"))
+    bPass = check_cache(cam, args.width * args.height)
+    print("\n%-14s %-28s %-22s" % ("param_type", "node", "value"))
+    bPass = check_basicdemo(cam) and bPass
+    cam.MV_CC_CloseDevice()
+    cam.MV_CC_DestroyHandle()
+    print("PASS" if bPass else "FAIL")
+    return 0 if bPass else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
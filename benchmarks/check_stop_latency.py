@@ -0,0 +1,86 @@
+# -- coding: utf-8 --
+"""
+Stop latency of CameraOperation's cooperative shutdown on the simulated
+backend, and a check that no SDK buffer is left held afterwards.
+
+    python benchmarks/check_stop_latency.py [--timeouts 50 100 200] [--rounds 10]
+
+Each round starts grabbing, lets the pipeline run for a moment and calls
+Stop_work_thread(). Three situations are covered:
+
+    free-run   frames arriving at --fps
+    idle       trigger mode on, no frame ever arrives (GetImageBuffer waits the whole timeout)
+    slow       40 ms display callback, slower than the frame rate, queues full when stopping
+
+The check fails (exit code 1) if any stop takes 2x the grab timeout or
+longer, or if the simulated device still has buffers held after a stop.
+The bound assumes each stage callback finishes within one grab timeout:
+a frame already being displayed or saved is completed, not interrupted.
+"""
+import os
+import sys
+import time
+import argparse
+
+os.environ.setdefault("MVCAM_BACKEND", "sim")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from MvCameraControl_class import *
+from CamOperation_class import CameraOperation
+import MvSimulatedSdk
+from bench_sim_throughput import open_first_camera
+
+SCENARIOS = ("free-run", "idle", "slow")
+
+
+def run_round(cam, strScenario, nTimeout, fRunTime):
+    cam.MV_CC_SetEnumValue("TriggerMode", 1 if strScenario == "idle" else 0)
+    obj = CameraOperation(cam, None, b_open_device=True, n_grab_timeout=nTimeout)
+    fDisplay = 0.04 if strScenario == "slow" else 0.0
+    obj.Display_frame = lambda numArray, stFrameInfo: time.sleep(fDisplay)
+    obj.Start_grabbing()
+    time.sleep(fRunTime)
+    fLatency = obj.Stop_work_thread() * 1e3
+    bAlive = obj.h_thread_handle.is_alive()
+    cam.MV_CC_StopGrabbing()
+    nHeld = len(MvCamCtrldll._device(cam.handle).dict_held_nodes)
+    return fLatency, bAlive, nHeld
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--format", default="BayerRG8")
+    parser.add_argument("--fps", type=float, default=30)
+    parser.add_argument("--timeouts", type=int, nargs="+", default=[50, 100, 200])
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--run-time", type=float, default=0.3)
+    args = parser.parse_args()
+    MvCamCtrldll.configure(width=args.width, height=args.height,
+                           pixel_type=MvSimulatedSdk.pixel_type_from_name(args.format), frame_rate=args.fps)
+
+    cam = open_first_camera()
+    bPass = True
+    print("%-9s %8s %8s %8s %8s %6s" % ("scenario", "timeout", "max ms", "mean ms", "limit", "held"))
+    for nTimeout in args.timeouts:
+        for strScenario in SCENARIOS:
+            listLatency = []
+            nHeldMax = 0
+            for _ in range(args.rounds):
+                fLatency, bAlive, nHeld = run_round(cam, strScenario, nTimeout, args.run_time)
+                listLatency.append(fLatency if not bAlive else float("inf"))
+                nHeldMax = max(nHeldMax, nHeld)
+            fMax = max(listLatency)
+            bOk = fMax < 2 * nTimeout and nHeldMax == 0
+            bPass = bPass and bOk
+            print("%-9s %8d %8.1f %8.1f %8d %6d %s" % (strScenario, nTimeout, fMax, sum(listLatency) / len(listLatency),
+                                                       2 * nTimeout, nHeldMax, "ok" if bOk else "FAIL"))
+    cam.MV_CC_CloseDevice()
+    cam.MV_CC_DestroyHandle()
+    print("PASS" if bPass else "FAIL")
+    return 0 if bPass else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
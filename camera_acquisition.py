@@ -0,0 +1,347 @@
+"""
+Acquisition worker for camera_gui.
+
+CameraAcquisitionWorker grabs on its own QThread at whatever rate the camera
+delivers and converts each frame there. The GUI is never handed a queue: the
+worker keeps only the most recent converted frame and emits frame_ready when
+a new one is waiting. If the GUI is still busy with the previous frame the
+pending one is simply replaced, so a slow repaint drops display frames but
+never throttles capture.
+
+Frames are grabbed into a GrabBufferRing: a few ctypes buffers and
+MV_FRAME_OUT_INFO_EX structs sized once from PayloadSize, reused for the
+whole stream. A slot is skipped while the frame shown or pending in the GUI
+still points into it, so in steady state no buffer is allocated per frame;
+allocations and payload_queries count what was allocated or queried.
+
+With a DisplayScaler the live-view frame is also brought down to the label
+size here, so the GUI thread no longer scales full-resolution pixmaps.
+
+Snapshots need no re-grab: the GUI keeps the frame it shows pinned in the
+ring until the next one replaces it, so "Capture" retains exactly that raw
+frame and decode_snapshot() turns it into a full-resolution image on an
+ImageWriter thread. A VideoRecorder set as recorder gets every grabbed frame
+the same way: the slot is held and decoded on the recorder's encoder thread.
+"""
+import threading
+import time
+
+import numpy as np
+
+from PyQt5.QtCore import QThread, pyqtSignal
+
+from MvCameraControl_class import *
+from PixelType_registry import PIXEL_FAMILY_BAYER, PIXEL_FAMILY_MONO, get_pixel_format
+from Bayer_demosaic import BayerDemosaicer, DEMOSAIC_VNG
+from FrameBuffer_pool import FrameBufferPool
+
+
+def device_name(mvcc_dev_info):
+    """Display name of an enumerated device: model and IP for GigE, model for USB, None otherwise."""
+    if mvcc_dev_info.nTLayerType == MV_GIGE_DEVICE:
+        # Get camera name
+        model_name = ""
+        for c in mvcc_dev_info.SpecialInfo.stGigEInfo.chModelName:
+            if c == 0:
+                break
+            model_name += chr(c)
+        
+        # Get IP address
+        nip1 = ((mvcc_dev_info.SpecialInfo.stGigEInfo.nCurrentIp & 0xff000000) >> 24)
+        nip2 = ((mvcc_dev_info.SpecialInfo.stGigEInfo.nCurrentIp & 0x00ff0000) >> 16)
+        nip3 = ((mvcc_dev_info.SpecialInfo.stGigEInfo.nCurrentIp & 0x0000ff00) >> 8)
+        nip4 = (mvcc_dev_info.SpecialInfo.stGigEInfo.nCurrentIp & 0x000000ff)
+        return f"{model_name} ({nip1}.{nip2}.{nip3}.{nip4})"
+    
+    if mvcc_dev_info.nTLayerType == MV_USB_DEVICE:
+        model_name = ""
+        for c in mvcc_dev_info.SpecialInfo.stUsb3VInfo.chModelName:
+            if c == 0:
+                break
+            model_name += chr(c)
+        return f"{model_name} (USB)"
+    return None
+
+
+def open_camera(stDeviceList):
+    """
+    Create a handle for the device, open it exclusively, set the optimal
+    packet size and heartbeat for GigE and turn trigger mode off. Returns
+    (cam, error, warnings); cam is None and error says why when it failed.
+    """
+    cam = MvCamera()
+    warnings = []
+    
+    ret = cam.MV_CC_CreateHandle(stDeviceList)
+    if ret != 0:
+        return None, f"Failed to create handle: {ret}", warnings
+    
+    ret = cam.MV_CC_OpenDevice(MV_ACCESS_Exclusive, 0)
+    if ret != 0:
+        cam.MV_CC_DestroyHandle()
+        return None, f"Failed to open device: {ret}", warnings
+    
+    # For GigE cameras, set packet size
+    if stDeviceList.nTLayerType == MV_GIGE_DEVICE:
+        nPacketSize = cam.MV_CC_GetOptimalPacketSize()
+        if int(nPacketSize) > 0:
+            ret = cam.MV_CC_SetIntValue("GevSCPSPacketSize", nPacketSize)
+            if ret != 0:
+                warnings.append(f"Warning: Failed to set packet size: {ret}")
+        
+        # Set heartbeat timeout
+        ret = cam.MV_CC_SetIntValue("GevHeartbeatTimeout", 5000)
+        if ret != 0:
+            warnings.append(f"Warning: Failed to set heartbeat timeout: {ret}")
+    
+    # Set trigger mode to off
+    ret = cam.MV_CC_SetEnumValue("TriggerMode", MV_TRIGGER_MODE_OFF)
+    if ret != 0:
+        warnings.append(f"Warning: Failed to set trigger mode: {ret}")
+    return cam, None, warnings
+
+
+def decode_snapshot(data, stFrameInfo, demosaic_quality, raw=False, full_depth=False):
+    """
+    Full-resolution image of one grabbed frame. With raw, Mono and Bayer
+    frames are returned as sensor data at native bit depth instead; with
+    full_depth, >8-bit Mono and Bayer frames are decoded to uint16 (e.g.
+    for 16-bit TIFF). Safe to call from any thread, it shares no state
+    with the worker.
+    """
+    pixel_format = get_pixel_format(stFrameInfo.enPixelType)
+    if pixel_format is None or pixel_format.converter is None:
+        raise ValueError(f"Unsupported pixel format: {hex(stFrameInfo.enPixelType)}")
+    nWidth, nHeight = stFrameInfo.nWidth, stFrameInfo.nHeight
+    single_channel = pixel_format.strFamily in (PIXEL_FAMILY_MONO, PIXEL_FAMILY_BAYER)
+    if single_channel and (raw or (full_depth and pixel_format.bIsMono)):
+        return np.array(pixel_format.unpack(data, nWidth, nHeight))
+    if pixel_format.strFamily == PIXEL_FAMILY_BAYER:
+        demosaicer = BayerDemosaicer(demosaic_quality, pool=FrameBufferPool(1))
+        if full_depth and demosaic_quality != DEMOSAIC_VNG:
+            return demosaicer.demosaic_full(pixel_format, data, nWidth, nHeight)
+        return demosaicer.demosaic(pixel_format, data, nWidth, nHeight)
+    return pixel_format.converter(data, nWidth, nHeight)
+
+
+class GrabSlot():
+    def __init__(self, payload_size):
+        self.buffer = (c_ubyte * payload_size)()
+        self.frame_info = MV_FRAME_OUT_INFO_EX()
+        self.array = np.ctypeslib.as_array(self.buffer)
+        self.holds = 0
+
+
+class GrabBufferRing():
+    """Rotating ctypes grab buffers with their frame-info structs, sized from a cached PayloadSize."""
+
+    def __init__(self, depth=4):
+        self.depth = depth
+        self.payload_size = 0
+        self.slots = []
+        self.next_index = 0
+        self.lock = threading.Lock()
+        self.allocations = 0
+        self.frames = 0
+
+    def resize(self, payload_size):
+        """Reallocate depth slots if the payload size changed; held old slots stay alive with their frame."""
+        with self.lock:
+            if payload_size != self.payload_size:
+                self.payload_size = payload_size
+                self.slots = [GrabSlot(payload_size) for _ in range(self.depth)]
+                self.next_index = 0
+                self.allocations += self.depth
+
+    def acquire(self):
+        """Next slot not referenced by a shown or pending frame, allocating only when all are in use."""
+        with self.lock:
+            self.frames += 1
+            for i in range(len(self.slots)):
+                index = (self.next_index + i) % len(self.slots)
+                slot = self.slots[index]
+                if slot.holds == 0:
+                    self.next_index = (index + 1) % len(self.slots)
+                    break
+            else:
+                slot = GrabSlot(self.payload_size)
+                self.slots.insert(self.next_index, slot)
+                self.next_index = (self.next_index + 1) % len(self.slots)
+                self.allocations += 1
+        memset(byref(slot.frame_info), 0, sizeof(slot.frame_info))
+        return slot
+
+    def hold(self, slot):
+        with self.lock:
+            slot.holds += 1
+
+    def release(self, slot):
+        with self.lock:
+            slot.holds -= 1
+
+
+class CameraAcquisitionWorker(QThread):
+    # Emitted when take_latest() has a new frame; never queued more than once
+    frame_ready = pyqtSignal()
+    error = pyqtSignal(str)
+
+    def __init__(self, cam, pixel_resolver, demosaicer, buffer_ring, payload_size=0, scaler=None, grab_timeout=100,
+                 parent=None):
+        super().__init__(parent)
+        self.cam = cam
+        self.pixel_resolver = pixel_resolver
+        self.demosaicer = demosaicer
+        self.grab_timeout = grab_timeout
+        self.buffer_ring = buffer_ring
+        self.scaler = scaler
+        # Set from the GUI thread, picked up before the next grab
+        self.payload_size = payload_size
+        self.payload_queries = 0
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.pending = None
+        self.signal_pending = False
+        # A VideoRecorder set from the GUI thread gets every grabbed frame, decoded on its own thread
+        self.recorder = None
+
+        # Counters, read from the GUI thread
+        self.frames_grabbed = 0
+        self.frames_shown = 0
+        self.frames_replaced = 0
+        self.grab_errors = 0
+        # Gaps in nFrameNum: frames the camera sent that never reached us
+        self.frames_missed = 0
+        self.lost_packets = 0
+        self.last_frame_num = None
+        self.start_time = None
+
+    def stop(self):
+        """Ask the loop to finish; it checks between grabs, so this returns within one grab timeout."""
+        self.stop_event.set()
+        self.wait()
+        with self.lock:
+            pending, self.pending = self.pending, None
+        if pending is not None:
+            self._release(pending)
+
+    def take_latest(self):
+        """Hand the most recent frame to the GUI as (image, stFrameInfo, slot), or None. Call done_with() with it after drawing."""
+        with self.lock:
+            pending, self.pending = self.pending, None
+            self.signal_pending = False
+        if pending is not None:
+            self.frames_shown += 1
+        return pending
+
+    def retain(self, frame):
+        """Keep a frame from take_latest() alive for another user, e.g. a snapshot job; balance with done_with()."""
+        self._hold(frame)
+
+    def done_with(self, frame):
+        self._release(frame)
+
+    def set_payload_size(self, payload_size):
+        """New PayloadSize, e.g. after a pixel format change; the ring is resized before the next grab."""
+        self.payload_size = payload_size
+
+    def fps(self):
+        if not self.start_time:
+            return 0.0, 0.0
+        elapsed = time.perf_counter() - self.start_time
+        if elapsed <= 0:
+            return 0.0, 0.0
+        return self.frames_grabbed / elapsed, self.frames_shown / elapsed
+
+    # Neither the pooled demosaic output nor the grab slot may be reused while the GUI still reads the frame
+    def _hold(self, frame):
+        image, stFrameInfo, slot = frame
+        if self.demosaicer.pool.owns(image):
+            self.demosaicer.pool.hold(image)
+        self.buffer_ring.hold(slot)
+
+    def _release(self, frame):
+        image, stFrameInfo, slot = frame
+        if self.demosaicer.pool.owns(image):
+            self.demosaicer.pool.release(image)
+        self.buffer_ring.release(slot)
+
+    def query_payload_size(self):
+        self.payload_queries += 1
+        stParam = MVCC_INTVALUE()
+        memset(byref(stParam), 0, sizeof(MVCC_INTVALUE))
+        ret = self.cam.MV_CC_GetIntValue("PayloadSize", stParam)
+        if ret != 0:
+            self.error.emit(f"Error: Failed to get payload size: {ret}")
+            return 0
+        return stParam.nCurValue
+
+    def run(self):
+        self.start_time = time.perf_counter()
+        while not self.stop_event.is_set():
+            if self.payload_size <= 0:
+                self.payload_size = self.query_payload_size()
+                if self.payload_size <= 0:
+                    self.stop_event.wait(self.grab_timeout / 1000.0)
+                    continue
+            self.buffer_ring.resize(self.payload_size)
+            slot = self.buffer_ring.acquire()
+            stFrameInfo = slot.frame_info
+
+            ret = self.cam.MV_CC_GetOneFrameTimeout(slot.buffer, self.buffer_ring.payload_size, stFrameInfo, self.grab_timeout)
+            if ret == MV_E_NOENOUGH_BUF:
+                # PayloadSize changed behind our back, read it again
+                self.payload_size = 0
+                continue
+            if ret != 0:
+                self.grab_errors += 1
+                continue
+            self.frames_grabbed += 1
+            if self.last_frame_num is not None and stFrameInfo.nFrameNum > self.last_frame_num + 1:
+                self.frames_missed += stFrameInfo.nFrameNum - self.last_frame_num - 1
+            self.last_frame_num = stFrameInfo.nFrameNum
+            self.lost_packets += stFrameInfo.nLostPacket
+
+            recorder = self.recorder
+            if recorder is not None:
+                self.record(recorder, slot)
+
+            image = self.convert(slot.array, stFrameInfo)
+            if image is None:
+                continue
+            self.publish((image, stFrameInfo, slot))
+
+    def record(self, recorder, slot):
+        # The slot stays held until the recorder has decoded and encoded it; a full recorder queue drops the frame
+        stFrameInfo = slot.frame_info
+        demosaic_quality = self.demosaicer.strQuality
+        self.buffer_ring.hold(slot)
+        if not recorder.submit(lambda: decode_snapshot(slot.array, stFrameInfo, demosaic_quality), stFrameInfo,
+                               fn_done=lambda ok: self.buffer_ring.release(slot)):
+            self.buffer_ring.release(slot)
+
+    def convert(self, pData, stFrameInfo):
+        pixel_format = self.pixel_resolver.resolve(stFrameInfo.enPixelType)
+        if pixel_format is None or self.pixel_resolver.converter is None:
+            self.error.emit(f"Unsupported pixel format: {hex(stFrameInfo.enPixelType)}")
+            return None
+        try:
+            # Live view is converted straight at display size
+            if self.scaler is not None:
+                return self.scaler.convert(pixel_format, self.pixel_resolver.converter, self.demosaicer,
+                                           pData, stFrameInfo.nWidth, stFrameInfo.nHeight)
+            return self.pixel_resolver.converter(pData, stFrameInfo.nWidth, stFrameInfo.nHeight)
+        except Exception as e:
+            self.error.emit(f"Error processing frame: {str(e)}")
+            return None
+
+    def publish(self, frame):
+        self._hold(frame)
+        with self.lock:
+            replaced, self.pending = self.pending, frame
+            notify = not self.signal_pending
+            self.signal_pending = True
+        if replaced is not None:
+            self.frames_replaced += 1
+            self._release(replaced)
+        if notify:
+            self.frame_ready.emit()
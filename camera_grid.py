@@ -0,0 +1,193 @@
+"""
+Multi-camera grid view for camera_gui.
+
+CameraGridWindow opens several devices at once. Every tile owns its camera,
+CameraAcquisitionWorker, grab ring, demosaicer pool and DisplayScaler, so
+each device is grabbed and converted at its own rate, straight at tile
+size. Repainting is shared: a single QTimer at repaint_hz takes the latest
+frame of every tile and draws them together, so the GUI thread does a
+bounded amount of work however many cameras run and whatever their rate.
+
+Each tile carries an overlay with grab and display fps over the last
+second, frames missed (gaps in nFrameNum, i.e. lost between camera and
+host), frames replaced before they could be drawn and grab timeouts, so a
+camera that falls behind stands out. The overlay is redrawn on every repaint
+tick over the last frame shown, so the rates keep updating while a camera
+delivers nothing; once no frame has arrived for stale_timeout seconds the
+tile is marked stale.
+"""
+import math
+import time
+
+from PyQt5.QtWidgets import QWidget, QGridLayout, QLabel, QSizePolicy
+from PyQt5.QtGui import QPixmap, QImage, QPainter, QColor, QFont
+from PyQt5.QtCore import Qt, QTimer, QEvent
+
+from MvCameraControl_class import *
+from PixelType_registry import PixelFormatResolver
+from Bayer_demosaic import BayerDemosaicer, DEMOSAIC_BILINEAR
+from Display_scaler import DisplayScaler
+from camera_acquisition import CameraAcquisitionWorker, GrabBufferRing, device_name, open_camera
+
+
+class CameraTile():
+    def __init__(self, name, cam, label, demosaic_quality=DEMOSAIC_BILINEAR):
+        self.name = name
+        self.cam = cam
+        self.label = label
+        self.demosaicer = BayerDemosaicer(demosaic_quality)
+        self.scaler = DisplayScaler(self.demosaicer.pool)
+        self.buffer_ring = GrabBufferRing()
+        self.worker = CameraAcquisitionWorker(cam, PixelFormatResolver(self.demosaicer), self.demosaicer,
+                                              self.buffer_ring, scaler=self.scaler)
+        self.shown_frame = None
+        # Last frame drawn, without the overlay, and when it was taken from the worker
+        self.frame_pixmap = None
+        self.frame_time = time.perf_counter()
+        # Counters at the start of the current one-second window
+        self.window_start = time.perf_counter()
+        self.window_grabbed = 0
+        self.window_shown = 0
+        self.grab_fps = 0.0
+        self.display_fps = 0.0
+
+    def update_rates(self):
+        now = time.perf_counter()
+        elapsed = now - self.window_start
+        if elapsed >= 1.0:
+            self.grab_fps = (self.worker.frames_grabbed - self.window_grabbed) / elapsed
+            self.display_fps = (self.worker.frames_shown - self.window_shown) / elapsed
+            self.window_start = now
+            self.window_grabbed = self.worker.frames_grabbed
+            self.window_shown = self.worker.frames_shown
+
+    def frame_age(self):
+        return time.perf_counter() - self.frame_time
+
+    def overlay_text(self, stale=False):
+        worker = self.worker
+        text = (f"{self.name}\n"
+                f"grab {self.grab_fps:.1f} fps  display {self.display_fps:.1f} fps\n"
+                f"missed {worker.frames_missed}  replaced {worker.frames_replaced}  timeouts {worker.grab_errors}")
+        if stale:
+            text += f"\nSTALE: no frame for {self.frame_age():.1f} s"
+        return text
+
+    def stop(self):
+        if self.shown_frame is not None:
+            self.worker.done_with(self.shown_frame)
+            self.shown_frame = None
+        self.worker.stop()
+
+
+class CameraGridWindow(QWidget):
+    def __init__(self, deviceList, device_indices, repaint_hz=25, demosaic_quality=DEMOSAIC_BILINEAR, stale_timeout=2.0,
+                 parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Hikrobot Camera Grid")
+        self.setMinimumSize(1000, 700)
+        self.tiles = []
+        self.errors = []
+        self.repaint_count = 0
+        self.repaint_time = 0.0
+
+        layout = QGridLayout(self)
+        layout.setSpacing(2)
+        columns = max(1, math.ceil(math.sqrt(len(device_indices))))
+        for position, index in enumerate(device_indices):
+            stDeviceList = cast(deviceList.pDeviceInfo[index], POINTER(MV_CC_DEVICE_INFO)).contents
+            name = device_name(stDeviceList) or f"Camera {index}"
+            cam, error, warnings = open_camera(stDeviceList)
+            if cam is None:
+                self.errors.append(f"{name}: {error}")
+                continue
+            self.errors.extend(f"{name}: {warning}" for warning in warnings)
+
+            label = QLabel(name)
+            label.setAlignment(Qt.AlignCenter)
+            label.setStyleSheet("background-color: black; color: white;")
+            label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+            label.setMinimumSize(160, 120)
+            label.installEventFilter(self)
+            layout.addWidget(label, position // columns, position % columns)
+            self.tiles.append(CameraTile(name, cam, label, demosaic_quality))
+
+        # One timer paints every tile, rate-limited whatever the cameras deliver
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.repaint_tiles)
+        self.repaint_hz = repaint_hz
+        self.stale_timeout = stale_timeout
+
+    def start(self):
+        for tile in list(self.tiles):
+            ret = tile.cam.MV_CC_StartGrabbing()
+            if ret != 0:
+                self.errors.append(f"{tile.name}: Failed to start grabbing: {ret}")
+                tile.label.setText(f"{tile.name}\nFailed to start grabbing: {ret}")
+                continue
+            tile.frame_time = time.perf_counter()
+            tile.worker.start()
+        self.timer.start(int(1000 / self.repaint_hz))
+
+    def eventFilter(self, obj, event):
+        # Tiles are rendered at tile size, recomputed only when a tile is resized
+        if event.type() == QEvent.Resize:
+            for tile in self.tiles:
+                if tile.label is obj:
+                    tile.scaler.set_target(event.size().width(), event.size().height())
+        return super().eventFilter(obj, event)
+
+    def repaint_tiles(self):
+        start = time.perf_counter()
+        for tile in self.tiles:
+            tile.update_rates()
+            latest = tile.worker.take_latest()
+            if latest is not None:
+                image = latest[0]
+                if image.ndim == 2:
+                    qt_image = QImage(image.data, image.shape[1], image.shape[0], image.strides[0],
+                                      QImage.Format_Grayscale8)
+                else:
+                    qt_image = QImage(image.data, image.shape[1], image.shape[0], image.strides[0], QImage.Format_BGR888)
+                tile.frame_pixmap = QPixmap.fromImage(qt_image)
+                tile.frame_time = time.perf_counter()
+
+                previous, tile.shown_frame = tile.shown_frame, latest
+                if previous is not None:
+                    tile.worker.done_with(previous)
+
+            # The overlay is redrawn every tick, over the last frame when no new one came
+            stale = tile.frame_age() >= self.stale_timeout
+            text = tile.overlay_text(stale)
+            if tile.frame_pixmap is None:
+                tile.label.setText(text)
+                continue
+            pixmap = QPixmap(tile.frame_pixmap)
+            self.draw_overlay(pixmap, text, stale)
+            tile.label.setPixmap(pixmap)
+        self.repaint_count += 1
+        self.repaint_time += time.perf_counter() - start
+
+    def draw_overlay(self, pixmap, text, stale=False):
+        painter = QPainter(pixmap)
+        font = QFont()
+        font.setPointSize(9)
+        painter.setFont(font)
+        rect = painter.boundingRect(pixmap.rect().adjusted(4, 4, -4, -4), Qt.AlignLeft | Qt.AlignTop, text)
+        painter.fillRect(rect.adjusted(-3, -2, 3, 2), QColor(160, 0, 0, 200) if stale else QColor(0, 0, 0, 160))
+        painter.setPen(QColor(255, 255, 255))
+        painter.drawText(rect, Qt.AlignLeft | Qt.AlignTop, text)
+        painter.end()
+
+    def stop(self):
+        self.timer.stop()
+        for tile in self.tiles:
+            tile.stop()
+            tile.cam.MV_CC_StopGrabbing()
+            tile.cam.MV_CC_CloseDevice()
+            tile.cam.MV_CC_DestroyHandle()
+        self.tiles = []
+
+    def closeEvent(self, event):
+        self.stop()
+        event.accept()
@@ -3,9 +3,9 @@ import numpy as np
 import cv2
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                             QLabel, QPushButton, QComboBox, QSlider, QGroupBox, QMessageBox,
-                            QStatusBar, QSpinBox, QDoubleSpinBox)
+                            QStatusBar, QSpinBox, QDoubleSpinBox, QCheckBox)
 from PyQt5.QtGui import QPixmap, QImage, QFont
-from PyQt5.QtCore import QTimer, Qt, pyqtSlot
+from PyQt5.QtCore import Qt, pyqtSlot, pyqtSignal, QEvent
 from ctypes import c_ubyte, sizeof, byref, c_int, cast, POINTER, cdll
 import time
 import os
@@ -17,8 +17,24 @@ from PixelType_const import *
 from MvErrorDefine_const import *
 from CameraParams_const import *
 from CameraParams_header import *
+from PixelType_registry import PixelFormatResolver, PIXEL_FAMILY_BAYER
+from Bayer_demosaic import BayerDemosaicer, DEMOSAIC_BILINEAR, DEMOSAIC_EDGE_AWARE, DEMOSAIC_VNG
+from camera_acquisition import CameraAcquisitionWorker, GrabBufferRing, decode_snapshot, device_name, open_camera
+from Display_scaler import DisplayScaler
+from camera_grid import CameraGridWindow
+from Burst_capture import BurstCapture
+from Video_recorder import VideoRecorder
+from MvNodeCache import MvNodeCache, NODE_INT
+from Image_writer import (ImageWriter, frame_file_name, frame_host_time, IMAGE_FORMAT_PNG, IMAGE_FORMAT_JPEG,
+                          IMAGE_FORMAT_BMP, IMAGE_FORMAT_TIFF, IMAGE_FORMAT_NPY, IMAGE_FORMAT_RAW,
+                          IMAGE_FORMAT_QUALITY)
 
 class HikRobotCameraGUI(QMainWindow):
+    # Emitted from an image writer thread when a snapshot is on disk: (path, ok)
+    snapshot_saved = pyqtSignal(str, bool)
+    # Emitted from the burst flush thread when a burst is on disk: (directory, written, failed)
+    burst_saved = pyqtSignal(str, int, int)
+    
     def __init__(self):
         super().__init__()
         
@@ -28,6 +44,26 @@ class HikRobotCameraGUI(QMainWindow):
         self.frame_count = 0
         self.is_capturing = False
         self.save_path = "captured_images"
+        self.demosaicer = BayerDemosaicer(DEMOSAIC_BILINEAR)
+        self.pixel_resolver = PixelFormatResolver(self.demosaicer)
+        self.worker = None
+        # Grab buffers live for the stream, PayloadSize is read at stream start and after a format change
+        self.buffer_ring = GrabBufferRing()
+        self.payload_size = 0
+        # Live view is scaled to the label on the acquisition thread, sharing the demosaicer's buffers
+        self.display_scaler = DisplayScaler(self.demosaicer.pool)
+        # The frame on screen stays pinned in the grab ring so a snapshot saves exactly it
+        self.shown_frame = None
+        # Snapshots are decoded and encoded off the GUI thread
+        self.image_writer = ImageWriter(nWorkers=2)
+        self.snapshot_saved.connect(self.on_snapshot_saved)
+        # Bursts go to a preallocated RAM ring and are written out after the last frame
+        self.burst = None
+        self.burst_saved.connect(self.on_burst_saved)
+        self.recorder = None
+        # Parameter reads and writes go through a node cache: repeated reads skip the camera,
+        # writes update it and a pixel format change drops the cached PayloadSize
+        self.node_cache = None
         
         # Create save directory if it doesn't exist
         if not os.path.exists(self.save_path):
@@ -70,6 +106,12 @@ class HikRobotCameraGUI(QMainWindow):
         self.disconnect_btn.setEnabled(False)
         camera_layout.addWidget(self.disconnect_btn)
         
+        # Grid view opens every enumerated camera in its own tile
+        self.grid_btn = QPushButton("Grid View (All Cameras)")
+        self.grid_btn.clicked.connect(self.open_grid)
+        camera_layout.addWidget(self.grid_btn)
+        self.grid_window = None
+        
         top_layout.addWidget(camera_group)
         
         # Create camera settings group
@@ -119,6 +161,21 @@ class HikRobotCameraGUI(QMainWindow):
         format_layout.addWidget(self.format_btn)
         settings_layout.addLayout(format_layout)
         
+        # Bayer demosaic quality, applies from the next frame
+        demosaic_layout = QHBoxLayout()
+        demosaic_layout.addWidget(QLabel("Demosaic:"))
+        self.demosaic_combo = QComboBox()
+        self.demosaic_combo.addItem("Bilinear (fast)", DEMOSAIC_BILINEAR)
+        self.demosaic_combo.addItem("Edge-aware", DEMOSAIC_EDGE_AWARE)
+        self.demosaic_combo.addItem("VNG (best)", DEMOSAIC_VNG)
+        self.demosaic_combo.currentIndexChanged.connect(self.set_demosaic_quality)
+        demosaic_layout.addWidget(self.demosaic_combo)
+        self.preview_checkbox = QCheckBox("Half-res preview")
+        self.preview_checkbox.setToolTip("Collapse each 2x2 Bayer quad into one pixel for live view; saved frames stay full resolution")
+        self.preview_checkbox.toggled.connect(self.demosaicer.set_preview)
+        demosaic_layout.addWidget(self.preview_checkbox)
+        settings_layout.addLayout(demosaic_layout)
+        
         top_layout.addWidget(settings_group)
         
         # Create capture controls group
@@ -137,6 +194,49 @@ class HikRobotCameraGUI(QMainWindow):
         self.capture_btn.clicked.connect(self.capture_frame)
         capture_layout.addWidget(self.capture_btn)
         
+        # Burst capture of consecutive frames
+        burst_layout = QHBoxLayout()
+        self.burst_btn = QPushButton("Burst Capture")
+        self.burst_btn.setEnabled(False)
+        self.burst_btn.clicked.connect(self.capture_burst)
+        burst_layout.addWidget(self.burst_btn)
+        self.burst_spinbox = QSpinBox()
+        self.burst_spinbox.setRange(2, 2000)
+        self.burst_spinbox.setValue(200)
+        self.burst_spinbox.setSuffix(" frames")
+        burst_layout.addWidget(self.burst_spinbox)
+        capture_layout.addLayout(burst_layout)
+        
+        # Segmented video recording, encoded off the acquisition thread
+        record_layout = QHBoxLayout()
+        self.record_btn = QPushButton("Start Recording")
+        self.record_btn.setEnabled(False)
+        self.record_btn.clicked.connect(self.toggle_recording)
+        record_layout.addWidget(self.record_btn)
+        self.record_decimate_spinbox = QSpinBox()
+        self.record_decimate_spinbox.setRange(1, 100)
+        self.record_decimate_spinbox.setPrefix("every ")
+        record_layout.addWidget(self.record_decimate_spinbox)
+        self.record_lossless_checkbox = QCheckBox("Lossless")
+        record_layout.addWidget(self.record_lossless_checkbox)
+        capture_layout.addLayout(record_layout)
+        
+        # Snapshot format and compression
+        save_format_layout = QHBoxLayout()
+        self.save_format_combo = QComboBox()
+        self.save_format_combo.addItem("PNG", IMAGE_FORMAT_PNG)
+        self.save_format_combo.addItem("JPEG", IMAGE_FORMAT_JPEG)
+        self.save_format_combo.addItem("BMP", IMAGE_FORMAT_BMP)
+        self.save_format_combo.addItem("TIFF (16-bit)", IMAGE_FORMAT_TIFF)
+        self.save_format_combo.addItem("Sensor data (.npy)", IMAGE_FORMAT_NPY)
+        self.save_format_combo.addItem("Sensor data (.raw)", IMAGE_FORMAT_RAW)
+        self.save_format_combo.currentIndexChanged.connect(self.set_save_format)
+        save_format_layout.addWidget(self.save_format_combo)
+        self.save_quality_spinbox = QSpinBox()
+        save_format_layout.addWidget(self.save_quality_spinbox)
+        capture_layout.addLayout(save_format_layout)
+        self.set_save_format()
+        
         top_layout.addWidget(capture_group)
         
         # Create image display area
@@ -144,6 +244,7 @@ class HikRobotCameraGUI(QMainWindow):
         self.image_label.setAlignment(Qt.AlignCenter)
         self.image_label.setStyleSheet("background-color: black; color: white; font-size: 20px;")
         self.image_label.setMinimumSize(800, 500)
+        self.image_label.installEventFilter(self)
         main_layout.addWidget(self.image_label)
         
         # Status bar
@@ -151,13 +252,15 @@ class HikRobotCameraGUI(QMainWindow):
         self.setStatusBar(self.status_bar)
         self.status_bar.showMessage("Ready")
         
-        # Timer for updating frames
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_frame)
-        
         # Initialize camera list
         self.refresh_cameras()
     
+    def eventFilter(self, obj, event):
+        # The display size is only recomputed when the label is resized
+        if obj is self.image_label and event.type() == QEvent.Resize:
+            self.display_scaler.set_target(event.size().width(), event.size().height())
+        return super().eventFilter(obj, event)
+    
     def refresh_cameras(self):
         self.camera_combo.clear()
         
@@ -177,32 +280,9 @@ class HikRobotCameraGUI(QMainWindow):
         # Add cameras to combo box
         for i in range(self.deviceList.nDeviceNum):
             mvcc_dev_info = cast(self.deviceList.pDeviceInfo[i], POINTER(MV_CC_DEVICE_INFO)).contents
-            if mvcc_dev_info.nTLayerType == MV_GIGE_DEVICE:
-                # Get camera name
-                model_name = ""
-                for c in mvcc_dev_info.SpecialInfo.stGigEInfo.chModelName:
-                    if c == 0:
-                        break
-                    model_name += chr(c)
-                
-                # Get IP address
-                nip1 = ((mvcc_dev_info.SpecialInfo.stGigEInfo.nCurrentIp & 0xff000000) >> 24)
-                nip2 = ((mvcc_dev_info.SpecialInfo.stGigEInfo.nCurrentIp & 0x00ff0000) >> 16)
-                nip3 = ((mvcc_dev_info.SpecialInfo.stGigEInfo.nCurrentIp & 0x0000ff00) >> 8)
-                nip4 = (mvcc_dev_info.SpecialInfo.stGigEInfo.nCurrentIp & 0x000000ff)
-                ip_address = f"{nip1}.{nip2}.{nip3}.{nip4}"
-                
-                self.camera_combo.addItem(f"{model_name} ({ip_address})", i)
-            
-            elif mvcc_dev_info.nTLayerType == MV_USB_DEVICE:
-                # Get camera name
-                model_name = ""
-                for c in mvcc_dev_info.SpecialInfo.stUsb3VInfo.chModelName:
-                    if c == 0:
-                        break
-                    model_name += chr(c)
-                
-                self.camera_combo.addItem(f"{model_name} (USB)", i)
+            name = device_name(mvcc_dev_info)
+            if name is not None:
+                self.camera_combo.addItem(name, i)
     
     def connect_camera(self):
         if self.camera_combo.count() == 0:
@@ -211,48 +291,23 @@ class HikRobotCameraGUI(QMainWindow):
         
         camera_index = self.camera_combo.currentData()
         
-        # Create camera instance
-        self.cam = MvCamera()
-        
-        # Select device and create handle
+        # Create handle, open, GigE packet size and heartbeat, trigger off
         stDeviceList = cast(self.deviceList.pDeviceInfo[camera_index], POINTER(MV_CC_DEVICE_INFO)).contents
-        ret = self.cam.MV_CC_CreateHandle(stDeviceList)
-        if ret != 0:
-            QMessageBox.critical(self, "Error", f"Failed to create handle: {ret}")
-            self.cam = None
-            return
-        
-        # Open device
-        ret = self.cam.MV_CC_OpenDevice(MV_ACCESS_Exclusive, 0)
-        if ret != 0:
-            QMessageBox.critical(self, "Error", f"Failed to open device: {ret}")
-            self.cam.MV_CC_DestroyHandle()
-            self.cam = None
+        self.cam, error, warnings = open_camera(stDeviceList)
+        if self.cam is None:
+            QMessageBox.critical(self, "Error", error)
             return
-        
-        # For GigE cameras, set packet size
-        if stDeviceList.nTLayerType == MV_GIGE_DEVICE:
-            nPacketSize = self.cam.MV_CC_GetOptimalPacketSize()
-            if int(nPacketSize) > 0:
-                ret = self.cam.MV_CC_SetIntValue("GevSCPSPacketSize", nPacketSize)
-                if ret != 0:
-                    self.status_bar.showMessage(f"Warning: Failed to set packet size: {ret}")
-            
-            # Set heartbeat timeout
-            ret = self.cam.MV_CC_SetIntValue("GevHeartbeatTimeout", 5000)
-            if ret != 0:
-                self.status_bar.showMessage(f"Warning: Failed to set heartbeat timeout: {ret}")
-        
-        # Set trigger mode to off
-        ret = self.cam.MV_CC_SetEnumValue("TriggerMode", MV_TRIGGER_MODE_OFF)
-        if ret != 0:
-            self.status_bar.showMessage(f"Warning: Failed to set trigger mode: {ret}")
+        for warning in warnings:
+            self.status_bar.showMessage(warning)
+        self.node_cache = MvNodeCache(self.cam)
         
         # Update UI
         self.connect_btn.setEnabled(False)
         self.disconnect_btn.setEnabled(True)
         self.stream_btn.setEnabled(True)
         self.capture_btn.setEnabled(True)
+        self.burst_btn.setEnabled(True)
+        self.record_btn.setEnabled(True)
         self.exposure_spinbox.setEnabled(True)
         self.exposure_btn.setEnabled(True)
         self.gain_spinbox.setEnabled(True)
@@ -263,10 +318,37 @@ class HikRobotCameraGUI(QMainWindow):
         self.status_bar.showMessage("Camera connected successfully")
         self.image_label.setText("Camera connected. Click 'Start Streaming' to view video.")
     
+    def open_grid(self):
+        if self.deviceList is None or self.deviceList.nDeviceNum == 0:
+            QMessageBox.warning(self, "Warning", "No cameras available")
+            return
+        # Devices are opened exclusively, the grid needs the single-camera view closed
+        if self.cam:
+            QMessageBox.warning(self, "Warning", "Disconnect the camera before opening the grid view")
+            return
+        if self.grid_window is not None:
+            self.grid_window.close()
+        
+        indices = [self.camera_combo.itemData(i) for i in range(self.camera_combo.count())]
+        self.grid_window = CameraGridWindow(self.deviceList, indices, demosaic_quality=self.demosaicer.strQuality)
+        self.grid_window.show()
+        self.grid_window.start()
+        if self.grid_window.errors:
+            self.status_bar.showMessage("; ".join(self.grid_window.errors))
+        else:
+            self.status_bar.showMessage(f"Grid view: {len(self.grid_window.tiles)} cameras")
+    
     def disconnect_camera(self):
+        if self.recorder is not None:
+            self.toggle_recording()
         if self.is_capturing:
             self.toggle_streaming()
         
+        if self.burst is not None:
+            self.burst.stop()
+            self.burst.wait_flush()
+            self.burst = None
+        
         if self.cam:
             # Stop grabbing
             ret = self.cam.MV_CC_StopGrabbing()
@@ -284,12 +366,16 @@ class HikRobotCameraGUI(QMainWindow):
                 self.status_bar.showMessage(f"Warning: Failed to destroy handle: {ret}")
             
             self.cam = None
+        self.node_cache = None
+        self.payload_size = 0
         
         # Update UI
         self.connect_btn.setEnabled(True)
         self.disconnect_btn.setEnabled(False)
         self.stream_btn.setEnabled(False)
         self.capture_btn.setEnabled(False)
+        self.burst_btn.setEnabled(False)
+        self.record_btn.setEnabled(False)
         self.exposure_spinbox.setEnabled(False)
         self.exposure_btn.setEnabled(False)
         self.gain_spinbox.setEnabled(False)
@@ -308,13 +394,25 @@ class HikRobotCameraGUI(QMainWindow):
                 QMessageBox.critical(self, "Error", f"Failed to start grabbing: {ret}")
                 return
             
-            self.timer.start(30)  # Update every 30ms (~33 FPS)
+            # Grab and convert on a worker thread at the camera's own rate,
+            # the GUI only draws the latest frame when it gets to it
+            self.payload_size = self.read_payload_size()
+            self.worker = CameraAcquisitionWorker(self.cam, self.pixel_resolver, self.demosaicer,
+                                                  self.buffer_ring, self.payload_size, self.display_scaler)
+            self.worker.recorder = self.recorder
+            self.worker.frame_ready.connect(self.update_frame)
+            self.worker.error.connect(self.status_bar.showMessage)
+            self.worker.start()
             self.is_capturing = True
             self.stream_btn.setText("Stop Streaming")
             self.status_bar.showMessage("Streaming started")
         else:
-            # Stop grabbing
-            self.timer.stop()
+            # Stop the worker before grabbing stops, it exits within one grab timeout
+            if self.shown_frame is not None:
+                self.worker.done_with(self.shown_frame)
+                self.shown_frame = None
+            self.worker.stop()
+            self.worker = None
             ret = self.cam.MV_CC_StopGrabbing()
             if ret != 0:
                 self.status_bar.showMessage(f"Warning: Failed to stop grabbing: {ret}")
@@ -323,90 +421,65 @@ class HikRobotCameraGUI(QMainWindow):
             self.stream_btn.setText("Start Streaming")
             self.status_bar.showMessage("Streaming stopped")
     
+    @pyqtSlot()
     def update_frame(self):
-        if not self.cam or not self.is_capturing:
+        if not self.worker:
             return
         
+        latest = self.worker.take_latest()
+        if latest is None:
+            return
+        image, stFrameInfo, slot = latest
         try:
-            # Get payload size
-            stParam = MVCC_INTVALUE()
-            memset(byref(stParam), 0, sizeof(MVCC_INTVALUE))
-            ret = self.cam.MV_CC_GetIntValue("PayloadSize", stParam)
-            if ret != 0:
-                self.status_bar.showMessage(f"Error: Failed to get payload size: {ret}")
-                return
-            
-            nDataSize = stParam.nCurValue
-            pData = (c_ubyte * nDataSize)()
-            stFrameInfo = MV_FRAME_OUT_INFO_EX()
-            memset(byref(stFrameInfo), 0, sizeof(stFrameInfo))
+            self.frame_count += 1
+            # Size from the converted image, the half-res preview is smaller than the frame
+            if image.ndim == 2:
+                qt_image = QImage(image.data, image.shape[1], image.shape[0],
+                                 image.strides[0], QImage.Format_Grayscale8)
+            else:
+                qt_image = QImage(image.data, image.shape[1], image.shape[0],
+                                 image.strides[0], QImage.Format_BGR888)
             
-            ret = self.cam.MV_CC_GetOneFrameTimeout(pData, nDataSize, stFrameInfo, 1000)
-            if ret == 0:
-                self.frame_count += 1
+            # Display the image
+            pixmap = QPixmap.fromImage(qt_image)
+            if not pixmap.isNull():
+                # Already scaled to the label by the worker
+                self.image_label.setPixmap(pixmap)
                 
-                # Process image based on pixel format
-                if stFrameInfo.enPixelType == PixelType_Gvsp_Mono8:
-                    # 8-bit grayscale
-                    data = np.frombuffer(pData, dtype=np.uint8, count=stFrameInfo.nWidth*stFrameInfo.nHeight)
-                    image = data.reshape((stFrameInfo.nHeight, stFrameInfo.nWidth))
-                    qt_image = QImage(image.data, stFrameInfo.nWidth, stFrameInfo.nHeight, 
-                                     stFrameInfo.nWidth, QImage.Format_Grayscale8)
-                
-                elif stFrameInfo.enPixelType == PixelType_Gvsp_BGR8_Packed:
-                    # BGR format
-                    data = np.frombuffer(pData, dtype=np.uint8, count=stFrameInfo.nWidth*stFrameInfo.nHeight*3)
-                    image = data.reshape((stFrameInfo.nHeight, stFrameInfo.nWidth, 3))
-                    qt_image = QImage(image.data, stFrameInfo.nWidth, stFrameInfo.nHeight, 
-                                     stFrameInfo.nWidth*3, QImage.Format_BGR888)
-                
-                else:
-                    # Try default conversion for other formats
-                    try:
-                        if stFrameInfo.enPixelType == 17301514:  # Bayer format
-                            data = np.frombuffer(pData, dtype=np.uint8, count=stFrameInfo.nWidth*stFrameInfo.nHeight)
-                            image = data.reshape((stFrameInfo.nHeight, stFrameInfo.nWidth))
-                            # Convert Bayer to RGB
-                            image = cv2.cvtColor(image, cv2.COLOR_BayerGB2BGR)
-                            qt_image = QImage(image.data, stFrameInfo.nWidth, stFrameInfo.nHeight, 
-                                             stFrameInfo.nWidth*3, QImage.Format_BGR888)
-                        else:
-                            # Default to grayscale
-                            data = np.frombuffer(pData, dtype=np.uint8, count=stFrameInfo.nWidth*stFrameInfo.nHeight)
-                            image = data.reshape((stFrameInfo.nHeight, stFrameInfo.nWidth))
-                            qt_image = QImage(image.data, stFrameInfo.nWidth, stFrameInfo.nHeight, 
-                                             stFrameInfo.nWidth, QImage.Format_Grayscale8)
-                    except Exception as e:
-                        self.status_bar.showMessage(f"Error processing frame: {str(e)}")
-                        return
-                
-                # Display the image
-                pixmap = QPixmap.fromImage(qt_image)
-                if not pixmap.isNull():
-                    # Scale the pixmap to fit the label while maintaining aspect ratio
-                    scaled_pixmap = pixmap.scaled(self.image_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                    self.image_label.setPixmap(scaled_pixmap)
-                    
-                    # Update status bar with frame info
-                    if self.frame_count % 10 == 0:  # Update status every 10 frames
-                        self.status_bar.showMessage(
-                            f"Frame #{self.frame_count}: {stFrameInfo.nWidth}x{stFrameInfo.nHeight}, "
-                            f"PixelType: {hex(stFrameInfo.enPixelType)}"
-                        )
-                else:
-                    self.status_bar.showMessage("Error: Empty pixmap")
+                # Update status bar with frame info
+                if self.frame_count % 10 == 0:  # Update status every 10 frames
+                    grab_fps, display_fps = self.worker.fps()
+                    self.status_bar.showMessage(
+                        f"Frame #{stFrameInfo.nFrameNum}: {stFrameInfo.nWidth}x{stFrameInfo.nHeight}, "
+                        f"PixelType: {hex(stFrameInfo.enPixelType)}, "
+                        f"grab {grab_fps:.1f} fps, display {display_fps:.1f} fps, "
+                        f"buffers allocated {self.buffer_ring.allocations}"
+                    )
             else:
-                self.status_bar.showMessage(f"Error getting frame: {ret}")
+                self.status_bar.showMessage("Error: Empty pixmap")
         
         except Exception as e:
             self.status_bar.showMessage(f"Error in update_frame: {str(e)}")
+        
+        finally:
+            # Keep the frame on screen pinned for capture_frame, let go of the one it replaces
+            previous, self.shown_frame = self.shown_frame, latest
+            if previous is not None:
+                self.worker.done_with(previous)
+    
+    def read_payload_size(self):
+        ret, payload_size = self.node_cache.get_value("PayloadSize", NODE_INT)
+        if ret != 0:
+            self.status_bar.showMessage(f"Error: Failed to get payload size: {ret}")
+            return 0
+        return payload_size
     
     def set_exposure(self):
         if not self.cam:
             return
         
         exposure = self.exposure_spinbox.value()
-        ret = self.cam.MV_CC_SetFloatValue("ExposureTime", exposure)
+        ret = self.node_cache.MV_CC_SetFloatValue("ExposureTime", exposure)
         if ret != 0:
             self.status_bar.showMessage(f"Failed to set exposure: {ret}")
         else:
@@ -417,7 +490,7 @@ class HikRobotCameraGUI(QMainWindow):
             return
         
         gain = self.gain_spinbox.value()
-        ret = self.cam.MV_CC_SetFloatValue("Gain", gain)
+        ret = self.node_cache.MV_CC_SetFloatValue("Gain", gain)
         if ret != 0:
             self.status_bar.showMessage(f"Failed to set gain: {ret}")
         else:
@@ -433,85 +506,62 @@ class HikRobotCameraGUI(QMainWindow):
         else:  # BGR8
             pixel_format = PixelType_Gvsp_BGR8_Packed
         
-        ret = self.cam.MV_CC_SetEnumValue("PixelFormat", pixel_format)
+        ret = self.node_cache.MV_CC_SetEnumValue("PixelFormat", pixel_format)
         if ret != 0:
             self.status_bar.showMessage(f"Failed to set pixel format: {ret}")
         else:
             self.status_bar.showMessage(f"Pixel format set to {self.format_combo.currentText()}")
+            # The frame size follows the pixel format
+            self.payload_size = self.read_payload_size()
+            if self.worker:
+                self.worker.set_payload_size(self.payload_size)
+    
+    def set_demosaic_quality(self):
+        self.demosaicer.set_quality(self.demosaic_combo.currentData())
+        self.status_bar.showMessage(f"Demosaic set to {self.demosaic_combo.currentText()}")
+    
+    def set_save_format(self):
+        quality, low, high = IMAGE_FORMAT_QUALITY[self.save_format_combo.currentData()]
+        self.save_quality_spinbox.setEnabled(quality is not None)
+        if quality is not None:
+            self.save_quality_spinbox.setRange(low, high)
+            self.save_quality_spinbox.setValue(quality)
+            tooltips = {IMAGE_FORMAT_PNG: "PNG compression level", IMAGE_FORMAT_JPEG: "JPEG quality",
+                        IMAGE_FORMAT_TIFF: "TIFF compression: 1 none, 5 LZW, 8 deflate"}
+            self.save_quality_spinbox.setToolTip(tooltips.get(self.save_format_combo.currentData(), ""))
     
     def capture_frame(self):
         if not self.cam:
             return
         
-        # If not streaming, start grabbing for a single frame
-        was_not_streaming = False
-        if not self.is_capturing:
-            was_not_streaming = True
-            ret = self.cam.MV_CC_StartGrabbing()
-            if ret != 0:
-                QMessageBox.critical(self, "Error", f"Failed to start grabbing: {ret}")
+        # While streaming, save the frame on screen: no re-grab, the click maps to what was shown
+        if self.is_capturing:
+            if self.shown_frame is None:
+                self.status_bar.showMessage("No frame displayed yet")
                 return
+            self.worker.retain(self.shown_frame)
+            self.save_snapshot(self.shown_frame[2], self.worker.done_with, self.shown_frame)
+            return
+        
+        # If not streaming, start grabbing for a single frame
+        ret = self.cam.MV_CC_StartGrabbing()
+        if ret != 0:
+            QMessageBox.critical(self, "Error", f"Failed to start grabbing: {ret}")
+            return
         
         try:
-            # Get payload size
-            stParam = MVCC_INTVALUE()
-            memset(byref(stParam), 0, sizeof(MVCC_INTVALUE))
-            ret = self.cam.MV_CC_GetIntValue("PayloadSize", stParam)
-            if ret != 0:
-                self.status_bar.showMessage(f"Error: Failed to get payload size: {ret}")
-                return
-            
-            nDataSize = stParam.nCurValue
-            pData = (c_ubyte * nDataSize)()
-            stFrameInfo = MV_FRAME_OUT_INFO_EX()
-            memset(byref(stFrameInfo), 0, sizeof(stFrameInfo))
+            # Payload size is cached, read it only the first time
+            if self.payload_size <= 0:
+                self.payload_size = self.read_payload_size()
+                if self.payload_size <= 0:
+                    return
+            self.buffer_ring.resize(self.payload_size)
+            slot = self.buffer_ring.acquire()
             
-            ret = self.cam.MV_CC_GetOneFrameTimeout(pData, nDataSize, stFrameInfo, 1000)
+            ret = self.cam.MV_CC_GetOneFrameTimeout(slot.buffer, self.payload_size, slot.frame_info, 1000)
             if ret == 0:
-                # Process image based on pixel format
-                if stFrameInfo.enPixelType == PixelType_Gvsp_Mono8:
-                    # 8-bit grayscale
-                    data = np.frombuffer(pData, dtype=np.uint8, count=stFrameInfo.nWidth*stFrameInfo.nHeight)
-                    image = data.reshape((stFrameInfo.nHeight, stFrameInfo.nWidth))
-                    
-                    # Save image
-                    timestamp = time.strftime("%Y%m%d_%H%M%S")
-                    filename = f"{self.save_path}/capture_{timestamp}.png"
-                    cv2.imwrite(filename, image)
-                    
-                elif stFrameInfo.enPixelType == PixelType_Gvsp_BGR8_Packed:
-                    # BGR format
-                    data = np.frombuffer(pData, dtype=np.uint8, count=stFrameInfo.nWidth*stFrameInfo.nHeight*3)
-                    image = data.reshape((stFrameInfo.nHeight, stFrameInfo.nWidth, 3))
-                    
-                    # Save image
-                    timestamp = time.strftime("%Y%m%d_%H%M%S")
-                    filename = f"{self.save_path}/capture_{timestamp}.png"
-                    cv2.imwrite(filename, image)
-                
-                else:
-                    # Try default conversion for other formats
-                    try:
-                        if stFrameInfo.enPixelType == 17301514:  # Bayer format
-                            data = np.frombuffer(pData, dtype=np.uint8, count=stFrameInfo.nWidth*stFrameInfo.nHeight)
-                            image = data.reshape((stFrameInfo.nHeight, stFrameInfo.nWidth))
-                            # Convert Bayer to RGB
-                            image = cv2.cvtColor(image, cv2.COLOR_BayerGB2BGR)
-                        else:
-                            # Default to grayscale
-                            data = np.frombuffer(pData, dtype=np.uint8, count=stFrameInfo.nWidth*stFrameInfo.nHeight)
-                            image = data.reshape((stFrameInfo.nHeight, stFrameInfo.nWidth))
-                        
-                        # Save image
-                        timestamp = time.strftime("%Y%m%d_%H%M%S")
-                        filename = f"{self.save_path}/capture_{timestamp}.png"
-                        cv2.imwrite(filename, image)
-                        
-                    except Exception as e:
-                        self.status_bar.showMessage(f"Error processing frame: {str(e)}")
-                        return
-                
-                self.status_bar.showMessage(f"Image saved to {filename}")
+                self.buffer_ring.hold(slot)
+                self.save_snapshot(slot, self.buffer_ring.release, slot)
             else:
                 self.status_bar.showMessage(f"Error getting frame: {ret}")
         
@@ -519,11 +569,95 @@ class HikRobotCameraGUI(QMainWindow):
             self.status_bar.showMessage(f"Error capturing frame: {str(e)}")
         
         finally:
-            # If we started grabbing just for this capture, stop it
-            if was_not_streaming:
-                ret = self.cam.MV_CC_StopGrabbing()
-                if ret != 0:
-                    self.status_bar.showMessage(f"Warning: Failed to stop grabbing: {ret}")
+            # We started grabbing just for this capture, stop it
+            ret = self.cam.MV_CC_StopGrabbing()
+            if ret != 0:
+                self.status_bar.showMessage(f"Warning: Failed to stop grabbing: {ret}")
+    
+    def save_snapshot(self, slot, release, token):
+        # Decoding and encoding run on a writer thread; release(token) frees the grab buffer afterwards
+        save_format = self.save_format_combo.currentData()
+        quality = self.save_quality_spinbox.value() if self.save_quality_spinbox.isEnabled() else None
+        demosaic_quality = self.demosaicer.strQuality
+        stFrameInfo = slot.frame_info
+        filename = frame_file_name(self.save_path, stFrameInfo.nFrameNum, frame_host_time(stFrameInfo),
+                                   save_format, "capture")
+        
+        def decode():
+            return decode_snapshot(slot.array, stFrameInfo, demosaic_quality,
+                                   raw=save_format in (IMAGE_FORMAT_NPY, IMAGE_FORMAT_RAW),
+                                   full_depth=save_format == IMAGE_FORMAT_TIFF)
+        
+        def done(path, ok):
+            release(token)
+            self.snapshot_saved.emit(path, ok)
+        
+        if not self.image_writer.submit(filename, decode, save_format, quality, done):
+            release(token)
+            self.status_bar.showMessage("Snapshot dropped, image writer is busy")
+    
+    def capture_burst(self):
+        if not self.cam:
+            return
+        # The burst grabs on its own thread and sets the SDK node count, which needs grabbing stopped
+        if self.recorder is not None:
+            self.toggle_recording()
+        if self.is_capturing:
+            self.toggle_streaming()
+        
+        frames = self.burst_spinbox.value()
+        if self.burst is None or self.burst.nFrames != frames:
+            self.burst = BurstCapture(self.cam, frames)
+        ret = self.burst.start()
+        if ret != 0:
+            QMessageBox.critical(self, "Error", f"Failed to start burst: {ret}")
+            return
+        
+        save_format = self.save_format_combo.currentData()
+        quality = self.save_quality_spinbox.value() if self.save_quality_spinbox.isEnabled() else None
+        directory = os.path.join(self.save_path, time.strftime("burst_%Y%m%d_%H%M%S"))
+        self.burst.flush(directory, save_format, quality, writer=self.image_writer,
+                         nDemosaicQuality=self.demosaicer.strQuality,
+                         fn_done=lambda written, failed: self.burst_saved.emit(directory, written, failed))
+        self.burst_btn.setEnabled(False)
+        self.status_bar.showMessage(f"Burst of {frames} frames running")
+    
+    @pyqtSlot(str, int, int)
+    def on_burst_saved(self, directory, written, failed):
+        self.burst_btn.setEnabled(self.cam is not None)
+        if self.burst is None:
+            return
+        stats = self.burst.stats()
+        self.status_bar.showMessage(f"Burst: {written} frames saved to {directory} ({failed} failed), "
+                                    f"{stats['fps']:.1f} fps, {stats['missed']} missed")
+    
+    def toggle_recording(self):
+        if self.recorder is None:
+            # Frames reach the recorder from the acquisition worker while streaming; a busy encoder drops frames
+            directory = os.path.join(self.save_path, "video")
+            self.recorder = VideoRecorder(directory, nDecimate=self.record_decimate_spinbox.value(),
+                                          bLossless=self.record_lossless_checkbox.isChecked())
+            if self.worker is not None:
+                self.worker.recorder = self.recorder
+            self.record_btn.setText("Stop Recording")
+            self.status_bar.showMessage(f"Recording to {directory}")
+        else:
+            # Detach first so the worker stops submitting, then let the queued frames finish
+            if self.worker is not None:
+                self.worker.recorder = None
+            recorder, self.recorder = self.recorder, None
+            recorder.close()
+            stats = recorder.stats()
+            self.record_btn.setText("Start Recording")
+            self.status_bar.showMessage(f"Recording: {stats['written']} frames in {stats['segments']} segments, "
+                                        f"{stats['dropped']} dropped")
+    
+    @pyqtSlot(str, bool)
+    def on_snapshot_saved(self, filename, ok):
+        if ok:
+            self.status_bar.showMessage(f"Image saved to {filename}")
+        else:
+            self.status_bar.showMessage(f"Failed to save {filename}")
     
     def closeEvent(self, event):
         # Clean up when closing the application
@@ -533,6 +667,11 @@ class HikRobotCameraGUI(QMainWindow):
         if self.cam:
             self.disconnect_camera()
         
+        if self.grid_window is not None:
+            self.grid_window.close()
+        
+        # Let queued snapshots reach the disk
+        self.image_writer.close()
         event.accept()
 
 if __name__ == "__main__":